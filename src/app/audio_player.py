@@ -1,22 +1,121 @@
 from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
-from PyQt6.QtCore import QUrl
+from PyQt6.QtCore import QObject, QUrl, pyqtSignal
 import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
+from .play_queue import PlayQueue
 
-class AudioPlayer:
+# "Previous" restarts the current track once it has played this long (ms)
+RESTART_THRESHOLD = 3000
+
+
+class AudioPlayer(QObject):
+    """
+    Plays a queue of audio files.
+
+    Two QMediaPlayer instances take turns: while one plays, the other already
+    has the next track loaded, so it starts without a load stall when the
+    current track ends. Signals of the playing instance are forwarded, so
+    listeners do not need to know which one is active.
+
+    With normalization enabled, each track plays with its loudness gain
+    (from gain_provider or set_gain()) applied on top of the user volume.
+    """
+
+    positionChanged = pyqtSignal(int)
+    durationChanged = pyqtSignal(int)
+    playbackStateChanged = pyqtSignal(object)
+    trackChanged = pyqtSignal(str)
 
     def __init__(self):
-        self.audio_output = QAudioOutput()
-        self.player = QMediaPlayer()
-        self.player.setAudioOutput(self.audio_output)
+        super().__init__()
+        self.queue = PlayQueue()
+        self._players: List[Tuple[QMediaPlayer, QAudioOutput]] = []
+        for _ in range(2):
+            audio_output = QAudioOutput()
+            player = QMediaPlayer()
+            player.setAudioOutput(audio_output)
+            player.positionChanged.connect(
+                lambda value, p=player: self._forward(p, self.positionChanged, value)
+            )
+            player.durationChanged.connect(
+                lambda value, p=player: self._forward(p, self.durationChanged, value)
+            )
+            player.playbackStateChanged.connect(
+                lambda state, p=player: self._forward(
+                    p, self.playbackStateChanged, state
+                )
+            )
+            player.mediaStatusChanged.connect(
+                lambda status, p=player: self._on_media_status(p, status)
+            )
+            self._players.append((player, audio_output))
+        self._active = 0
+        self._preloaded: Optional[str] = None
         self.current_file = None
+        self.normalize = True
+        # Returns the gain of a track in dB, or None if it is not known yet
+        self.gain_provider: Optional[Callable[[str], Optional[float]]] = None
+        self._volume = 1.0
+        self._gains: Dict[str, float] = {}
+        self._sources: List[Optional[str]] = [None, None]
+
+    @property
+    def player(self) -> QMediaPlayer:
+        """The player instance of the current track."""
+        return self._players[self._active][0]
+
+    @property
+    def audio_output(self) -> QAudioOutput:
+        """Audio output of the current track."""
+        return self._players[self._active][1]
+
+    @property
+    def _standby(self) -> QMediaPlayer:
+        return self._players[1 - self._active][0]
 
     def load(self, file_path: str):
         if not os.path.exists(file_path):
             return
 
-        self.current_file = file_path
-        self.player.setSource(QUrl.fromLocalFile(file_path))
+        self.queue.set_tracks([file_path])
+        self._load_current()
+
+    def play_files(self, file_paths: Iterable[str], start: int = 0) -> None:
+        """Replace the queue with file_paths and play from start."""
+        tracks = [path for path in file_paths if os.path.exists(path)]
+        if not tracks:
+            return
+        self.player.stop()
+        self.queue.set_tracks(tracks, min(start, len(tracks) - 1))
+        self._load_current()
+        self.play()
+
+    def enqueue(self, file_paths: Iterable[str]) -> None:
+        """Add files to the end of the queue."""
+        self.queue.add(path for path in file_paths if os.path.exists(path))
+        if self.current_file is None and self.queue.current:
+            self._load_current()
+        else:
+            self._preload_next()
+
+    def next(self) -> bool:
+        """Skip to the next track; False at the end of the queue."""
+        if self.queue.advance() is None:
+            return False
+        self.player.stop()
+        self._load_current()
+        self.play()
+        return True
+
+    def previous(self) -> None:
+        """Go to the previous track, or restart the current one."""
+        if self.get_position() > RESTART_THRESHOLD or self.queue.back() is None:
+            self.set_position(0)
+            return
+        self.player.stop()
+        self._load_current()
+        self.play()
 
     def play(self):
         self.player.play()
@@ -27,6 +126,44 @@ class AudioPlayer:
     def stop(self):
         self.player.stop()
 
+    def set_volume(self, volume: float) -> None:
+        """Set the volume (0.0 to 1.0) of both player instances."""
+        self._volume = volume
+        for index in range(len(self._players)):
+            self._apply_volume(index)
+
+    def set_gain(self, file_path: str, gain: float) -> None:
+        """Set the normalization gain of a track in dB."""
+        self._gains[file_path] = gain
+        for index, source in enumerate(self._sources):
+            if source == file_path:
+                self._apply_volume(index)
+
+    def set_normalize(self, enabled: bool) -> None:
+        """Turn loudness normalization on or off."""
+        self.normalize = enabled
+        for index in range(len(self._players)):
+            self._apply_volume(index)
+
+    def _apply_volume(self, index: int) -> None:
+        """Set the volume of an instance from the user volume and track gain."""
+        gain = self._gains.get(self._sources[index]) if self.normalize else None
+        factor = 1.0 if gain is None else 10 ** (gain / 20)
+        # Quiet tracks can only be raised up to full volume
+        self._players[index][1].setVolume(min(1.0, self._volume * factor))
+
+    def _set_source(self, index: int, file_path: Optional[str]) -> None:
+        """Load a track into a player instance with its gain."""
+        self._players[index][0].setSource(
+            QUrl.fromLocalFile(file_path) if file_path else QUrl()
+        )
+        self._sources[index] = file_path
+        if file_path and file_path not in self._gains and self.gain_provider:
+            gain = self.gain_provider(file_path)
+            if gain is not None:
+                self._gains[file_path] = gain
+        self._apply_volume(index)
+
     def set_position(self, position):
         self.player.setPosition(position)
 
@@ -35,3 +172,43 @@ class AudioPlayer:
 
     def get_duration(self):
         return self.player.duration()
+
+    def _load_current(self) -> None:
+        """Make the queue's current track the active one."""
+        path = self.queue.current
+        if path is not None and path == self._preloaded:
+            # Already loaded and decoded by the standby instance
+            self._active = 1 - self._active
+            self._preloaded = None
+            self.durationChanged.emit(self.player.duration())
+        else:
+            self._set_source(self._active, path)
+        self.positionChanged.emit(0)
+        self.current_file = path
+        self.trackChanged.emit(path)
+        self._preload_next()
+
+    def _preload_next(self) -> None:
+        """Load the track after the current one into the standby instance."""
+        next_file = self.queue.peek_next()
+        if next_file == self._preloaded:
+            return
+        self._standby.stop()
+        self._set_source(1 - self._active, next_file)
+        self._preloaded = next_file
+
+    def _on_media_status(
+        self, player: QMediaPlayer, status: QMediaPlayer.MediaStatus
+    ) -> None:
+        """Continue with the preloaded track when the current one ends."""
+        if player is not self.player:
+            return
+        if status == QMediaPlayer.MediaStatus.EndOfMedia:
+            if self.queue.advance() is not None:
+                self._load_current()
+                self.play()
+
+    def _forward(self, player: QMediaPlayer, signal, value) -> None:
+        """Re-emit a player signal if it comes from the active instance."""
+        if player is self.player:
+            signal.emit(value)
@@ -0,0 +1,214 @@
+"""
+Global bandwidth budget shared by all running downloads.
+"""
+
+import datetime
+import re
+import threading
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+# (start, end, bytes per second or None for unlimited)
+ScheduleEntry = Tuple[datetime.time, datetime.time, Optional[float]]
+
+
+def parse_schedule(text: str) -> List[ScheduleEntry]:
+    """
+    Parse a time-of-day bandwidth schedule.
+
+    Entries are separated by ";" or "," and look like "09:00-18:00=2.5",
+    where the value is in MB/s and 0 means unlimited. Ranges may wrap past
+    midnight, e.g. "22:00-06:00=0".
+
+    Args:
+        text: Schedule text entered by the user
+
+    Returns:
+        List of (start, end, bytes_per_second) entries
+
+    Raises:
+        ValueError: If an entry cannot be parsed
+    """
+    entries = []
+    for part in re.split(r"[;,]", text):
+        part = part.strip()
+        if not part:
+            continue
+        match = re.fullmatch(
+            r"(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*=\s*([0-9.]+)", part
+        )
+        if not match:
+            raise ValueError(f"Invalid schedule entry: {part!r}")
+        h1, m1, h2, m2, rate = match.groups()
+        limit = float(rate) * 1024 * 1024
+        entries.append(
+            (
+                datetime.time(int(h1), int(m1)),
+                datetime.time(int(h2), int(m2)),
+                limit or None,
+            )
+        )
+    return entries
+
+
+class BandwidthBudget:
+    """
+    Splits a total download rate among the running tasks.
+
+    yt-dlp only accepts a fixed --limit-rate when it starts, so changing a
+    running task's rate means restarting it (resuming from its .part files).
+    To keep that rare, a starting task gets what the running tasks leave
+    over, up to an even share, and never causes restarts itself. Shares are
+    evened out periodically with rebalance(): tasks holding clearly more than
+    their share are restarted first when another task is short or the total
+    is over the cap, and short tasks get their increase once they have run
+    for a while and the gap is large.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[float] = None,
+        schedule: Optional[List[ScheduleEntry]] = None,
+        min_share: float = 64 * 1024,
+        rebalance_tolerance: float = 0.5,
+        rebalance_margin: float = 0.1,
+        increase_delay: float = 20.0,
+    ):
+        """
+        Args:
+            limit: Total bytes per second, or None for unlimited
+            schedule: Time-of-day entries that override the limit
+            min_share: Lowest rate given to a task; max_tasks() keeps the
+                number of downloads low enough that the floors fit the cap
+            rebalance_tolerance: Relative increase of a task's share that
+                justifies restarting it with a higher rate
+            rebalance_margin: Relative excess over the cap, or over an even
+                share, tolerated before restarting tasks to lower their rate
+            increase_delay: Seconds a task runs before it is restarted for
+                a higher rate
+        """
+        self.limit = limit
+        self.schedule = schedule or []
+        self.min_share = min_share
+        self.rebalance_tolerance = rebalance_tolerance
+        self.rebalance_margin = rebalance_margin
+        self.increase_delay = increase_delay
+        self._lock = threading.Lock()
+
+    def configure(
+        self, limit: Optional[float], schedule: Optional[List[ScheduleEntry]] = None
+    ) -> None:
+        """Replace the base limit and the schedule."""
+        with self._lock:
+            self.limit = limit
+            self.schedule = schedule or []
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any limit or schedule is configured."""
+        return self.limit is not None or bool(self.schedule)
+
+    def current_limit(self, now: Optional[datetime.datetime] = None) -> Optional[float]:
+        """
+        Total bytes per second allowed right now.
+
+        The first schedule entry covering the current time wins; otherwise
+        the base limit applies.
+        """
+        current = (now or datetime.datetime.now()).time()
+        with self._lock:
+            for start, end, limit in self.schedule:
+                if start <= end:
+                    inside = start <= current < end
+                else:
+                    inside = current >= start or current < end
+                if inside:
+                    return limit
+            return self.limit
+
+    def max_tasks(self, now: Optional[datetime.datetime] = None) -> Optional[int]:
+        """
+        Most downloads that fit the cap with at least min_share each.
+
+        Returns:
+            Number of downloads, or None for unlimited
+        """
+        limit = self.current_limit(now)
+        if limit is None:
+            return None
+        return max(1, int(limit // self.min_share))
+
+    def share(
+        self, active_count: int, now: Optional[datetime.datetime] = None
+    ) -> Optional[float]:
+        """
+        Even share of the limit for each of active_count running downloads.
+
+        Returns:
+            Bytes per second per task, or None for unlimited
+        """
+        limit = self.current_limit(now)
+        if limit is None:
+            return None
+        return max(self.min_share, limit / max(1, active_count))
+
+    def allocate(
+        self,
+        others: Iterable[Optional[float]],
+        now: Optional[datetime.datetime] = None,
+    ) -> Optional[float]:
+        """
+        Rate for a starting task, taken from what the others leave over.
+
+        Args:
+            others: Rates of the tasks already running, None for unlimited
+
+        Returns:
+            Bytes per second, at most an even share, or None for unlimited
+        """
+        limit = self.current_limit(now)
+        if limit is None:
+            return None
+        others = list(others)
+        leftover = limit - sum(rate for rate in others if rate is not None)
+        fair = self.share(len(others) + 1, now)
+        return max(self.min_share, min(fair, leftover))
+
+    def rebalance(
+        self,
+        running: Sequence[Tuple[Optional[float], float]],
+        active_count: Optional[int] = None,
+        now: Optional[datetime.datetime] = None,
+    ) -> List[int]:
+        """
+        Running tasks to restart so the shares even out.
+
+        Args:
+            running: (rate or None for unlimited, seconds since it started
+                with that rate) per running task
+            active_count: Tasks sharing the limit, including ones about to
+                start; defaults to len(running)
+
+        Returns:
+            Indexes into running of the tasks to restart
+        """
+        limit = self.current_limit(now)
+        ready = [age >= self.increase_delay for _, age in running]
+        if limit is None:
+            return [i for i, (rate, _) in enumerate(running) if rate and ready[i]]
+
+        fair = self.share(active_count or len(running), now)
+        over = [
+            i
+            for i, (rate, _) in enumerate(running)
+            if rate is None or rate > fair * (1 + self.rebalance_margin)
+        ]
+        short = [
+            i
+            for i, (rate, _) in enumerate(running)
+            if rate is not None and rate * (1 + self.rebalance_tolerance) < fair
+        ]
+        total = sum(float("inf") if rate is None else rate for rate, _ in running)
+        if over and (short or total > limit * (1 + self.rebalance_margin)):
+            # Free the budget first; short tasks take it at a later check
+            return over
+        return [i for i in short if ready[i]]
@@ -0,0 +1,154 @@
+"""
+Splits a downloaded MP3 into one file per chapter.
+"""
+
+import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from .task_executor import remove_files
+
+# Characters not allowed in file names on Windows
+INVALID_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+
+def sanitize_filename(name: str) -> str:
+    """Make a chapter title safe to use as a file name."""
+    name = INVALID_FILENAME_CHARS.sub("_", name).strip().rstrip(".")
+    return name[:150] or "Untitled"
+
+
+def chapter_paths(source: str, chapters: List[Dict[str, Any]]) -> List[str]:
+    """
+    Output paths for the chapters of source.
+
+    Files are named "<source name> - 01 - <chapter title>.mp3" and placed
+    next to the source, so the tracks sort in chapter order.
+    """
+    root, ext = os.path.splitext(source)
+    width = max(2, len(str(len(chapters))))
+    return [
+        f"{root} - {number:0{width}d} - "
+        f"{sanitize_filename(chapter.get('title') or f'Chapter {number}')}{ext}"
+        for number, chapter in enumerate(chapters, 1)
+    ]
+
+
+def split_command(
+    ffmpeg_path: str,
+    source: str,
+    dest: str,
+    chapter: Dict[str, Any],
+    number: int,
+    total: int,
+    bitrate: Optional[str] = None,
+) -> List[str]:
+    """
+    Build the ffmpeg command that extracts one chapter.
+
+    Args:
+        ffmpeg_path: Path to ffmpeg.exe
+        source: Downloaded MP3
+        dest: Output file of the chapter
+        chapter: Chapter from the yt-dlp metadata (start_time, end_time, title)
+        number: 1-based chapter number
+        total: Number of chapters
+        bitrate: Re-encode at this bitrate in kbps instead of copying
+
+    Returns:
+        List of command arguments
+    """
+    cmd = [
+        ffmpeg_path,
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-y",
+        "-ss",
+        f"{chapter['start_time']:.3f}",
+    ]
+    if chapter.get("end_time") is not None:
+        cmd.extend(["-to", f"{chapter['end_time']:.3f}"])
+    cmd.extend(["-i", source, "-map", "0", "-map_metadata", "0"])
+    if bitrate:
+        cmd.extend(["-c:a", "libmp3lame", "-b:a", f"{bitrate}k", "-c:v", "copy"])
+    else:
+        cmd.extend(["-c", "copy"])
+    cmd.extend(
+        [
+            "-metadata",
+            f"title={chapter.get('title') or f'Chapter {number}'}",
+            "-metadata",
+            f"track={number}/{total}",
+            dest,
+        ]
+    )
+    return cmd
+
+
+class ChapterSplitter:
+    """
+    Cuts an audio file at its chapter marks with parallel ffmpeg processes.
+
+    Chapters are stream-copied, which only rewrites MP3 frames and needs no
+    decoding. A chapter whose copy fails is re-encoded instead. ffmpeg does
+    the work in separate processes, so a thread per chapter is enough to
+    use all CPU cores.
+    """
+
+    def __init__(self, ffmpeg_path: str, max_workers: Optional[int] = None):
+        """
+        Args:
+            ffmpeg_path: Path to ffmpeg.exe
+            max_workers: Chapters cut at once (defaults to the CPU count)
+        """
+        self.ffmpeg_path = ffmpeg_path
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def split(
+        self,
+        source: str,
+        chapters: List[Dict[str, Any]],
+        run: Callable[[List[str]], Any],
+        bitrate: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Write every chapter of source to its own file.
+
+        Args:
+            source: Downloaded MP3
+            chapters: Chapters from the yt-dlp metadata
+            run: Runs one command, raising CalledProcessError on failure
+            bitrate: Bitrate in kbps used when a chapter must be re-encoded
+
+        Returns:
+            Paths of the chapter files in chapter order
+
+        Raises:
+            subprocess.CalledProcessError: If a chapter could not be written;
+                chapter files written so far are removed
+        """
+        paths = chapter_paths(source, chapters)
+
+        def cut(number: int) -> None:
+            args = (source, paths[number - 1], chapters[number - 1], number)
+            try:
+                run(split_command(self.ffmpeg_path, *args, len(chapters)))
+            except subprocess.CalledProcessError:
+                if not bitrate:
+                    raise
+                # Fall back to re-encoding, e.g. for streams that cannot be cut
+                run(split_command(self.ffmpeg_path, *args, len(chapters), bitrate))
+
+        workers = max(1, min(self.max_workers, len(chapters)))
+        with ThreadPoolExecutor(workers, thread_name_prefix="chapter-split") as pool:
+            futures = [pool.submit(cut, n) for n in range(1, len(chapters) + 1)]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            remove_files(paths)
+            raise
+        return paths
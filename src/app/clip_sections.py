@@ -0,0 +1,103 @@
+"""
+Time ranges for downloading only parts of a video.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+# (start seconds, end seconds or None for the end of the video)
+Section = Tuple[float, Optional[float]]
+
+# One file per section; yt-dlp formats the numeric fields as times
+CLIP_OUTPUT_TEMPLATE = (
+    "%(title)s [%(section_start>%H-%M-%S)s-%(section_end>%H-%M-%S)s].%(ext)s"
+)
+
+
+def parse_time(text: str) -> float:
+    """
+    Parse "90", "1:30" or "1:02:03.5" into seconds.
+
+    Raises:
+        ValueError: If text is not a time
+    """
+    match = re.fullmatch(r"(?:(?:(\d+):)?(\d{1,2}):)?(\d+(?:\.\d+)?)", text.strip())
+    if not match:
+        raise ValueError(f"Invalid time: {text!r}")
+    hours, minutes, seconds = match.groups()
+    return int(hours or 0) * 3600 + int(minutes or 0) * 60 + float(seconds)
+
+
+def format_time(seconds: float) -> str:
+    """Format seconds as "m:ss" or "h:mm:ss"."""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+def parse_sections(text: str) -> List[Section]:
+    """
+    Parse clip ranges such as "0:30-1:00, 1:45:00-1:50:00".
+
+    Ranges are separated by ";" or ","; a range without an end ("58:00-")
+    runs to the end of the video.
+
+    Args:
+        text: Ranges entered by the user
+
+    Returns:
+        List of (start, end) sections in seconds, empty if text is blank
+
+    Raises:
+        ValueError: If a range cannot be parsed or ends before it starts
+    """
+    sections = []
+    for part in re.split(r"[;,]", text):
+        part = part.strip()
+        if not part:
+            continue
+        start_text, sep, end_text = part.partition("-")
+        if not sep:
+            raise ValueError(f"Invalid range: {part!r} (expected start-end)")
+        start = parse_time(start_text)
+        end = parse_time(end_text) if end_text.strip() else None
+        if end is not None and end <= start:
+            raise ValueError(f"Range ends before it starts: {part!r}")
+        sections.append((start, end))
+    return sections
+
+
+def format_sections(sections: List[Section]) -> str:
+    """Human readable form of sections, e.g. "0:30-1:00, 58:00-end"."""
+    return ", ".join(
+        f"{format_time(start)}-{format_time(end) if end is not None else 'end'}"
+        for start, end in sections
+    )
+
+
+def section_args(sections: List[Section]) -> List[str]:
+    """yt-dlp arguments that download only the given sections."""
+    args = []
+    for start, end in sections:
+        end_text = "inf" if end is None else f"{end:g}"
+        args.extend(["--download-sections", f"*{start:g}-{end_text}"])
+    return args
+
+
+def section_lengths(
+    sections: List[Section], duration: Optional[float]
+) -> List[Optional[float]]:
+    """
+    Length of each section in seconds, clamped to the video duration.
+
+    Open-ended sections have no length if the duration is unknown.
+    """
+    lengths = []
+    for start, end in sections:
+        if duration is not None:
+            end = duration if end is None else min(end, duration)
+        lengths.append(None if end is None else max(0.0, end - start))
+    return lengths
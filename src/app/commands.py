@@ -0,0 +1,179 @@
+"""
+yt-dlp command lines for downloads.
+
+Shared by the download manager of the window and headless job workers, so
+both fetch the same formats into the same file names.
+"""
+
+import os
+import re
+from typing import List, Optional
+
+from .clip_sections import CLIP_OUTPUT_TEMPLATE, Section, section_args
+
+# Download modes offered in the mode selector
+SINGLE_MODES = ("Single Video", "MP3 Only")
+CHANNEL_MODES = (
+    "Channel Videos",
+    "Channel Videos MP3",
+    "Channel Shorts",
+    "Channel Shorts MP3",
+)
+DOWNLOAD_MODES = SINGLE_MODES + ("Playlist Video", "Playlist MP3") + CHANNEL_MODES
+
+
+def video_download_command(
+    yt_dlp_path: str,
+    ffmpeg_path: str,
+    url: str,
+    save_path: str,
+    video_quality: str,
+) -> List[str]:
+    """
+    Build yt-dlp.exe command for video download.
+
+    Args:
+        yt_dlp_path: Path to yt-dlp.exe
+        ffmpeg_path: Path to ffmpeg.exe
+        url: Video URL
+        save_path: Download destination path
+        video_quality: Preferred video quality
+
+    Returns:
+        List of command arguments
+    """
+    cmd = [
+        yt_dlp_path,
+        "--ffmpeg-location",
+        ffmpeg_path,
+        "--no-playlist",
+        "--output",
+        os.path.join(save_path, "%(title)s.%(ext)s"),
+        "--format",
+        "bestvideo[ext=mp4]+bestaudio[ext=m4a]/mp4",
+        "--merge-output-format",
+        "mp4",
+        url,
+    ]
+
+    # Apply quality filter if not "Best Available"
+    if video_quality != "Best Available":
+        height = video_quality.split("p")[0]
+        cmd[cmd.index("--format") + 1] = f"bestvideo[height<={height}]+bestaudio/merge"
+
+    return cmd
+
+
+def audio_download_command(
+    yt_dlp_path: str,
+    ffmpeg_path: str,
+    url: str,
+    save_path: str,
+    audio_quality: str,
+) -> List[str]:
+    """
+    Build yt-dlp.exe command for audio extraction.
+
+    Args:
+        yt_dlp_path: Path to yt-dlp.exe
+        ffmpeg_path: Path to ffmpeg.exe
+        url: Video URL
+        save_path: Download destination path
+        audio_quality: Audio quality in kbps
+
+    Returns:
+        List of command arguments
+    """
+    return [
+        yt_dlp_path,
+        "--ffmpeg-location",
+        ffmpeg_path,
+        "--no-playlist",
+        "--output",
+        os.path.join(save_path, "%(title)s.%(ext)s"),
+        "--format",
+        "bestaudio/best",
+        "--extract-audio",
+        "--audio-format",
+        "mp3",
+        "--audio-quality",
+        audio_quality,
+        url,
+    ]
+
+
+def apply_sections(cmd: List[str], save_path: str, sections: List[Section]) -> None:
+    """
+    Restrict a yt-dlp command to the given time ranges.
+
+    Each range is written to its own file named after the title and the
+    range, so clips of the same video do not overwrite each other.
+    """
+    cmd[cmd.index("--output") + 1] = os.path.join(save_path, CLIP_OUTPUT_TEMPLATE)
+    cmd.extend(section_args(sections))
+
+
+def download_command(
+    base_dir: str,
+    url: str,
+    save_path: str,
+    mode: str,
+    video_quality: str = "Best Available",
+    audio_quality: str = "320",
+    sections: Optional[List[Section]] = None,
+) -> List[str]:
+    """
+    Full yt-dlp command for a download task.
+
+    Args:
+        base_dir: Application folder with bin/yt-dlp.exe and bin/ffmpeg.exe
+        url: Video URL
+        save_path: Folder the files are written to
+        mode: Download mode; modes without "Video" extract audio
+        video_quality: Preferred video quality
+        audio_quality: Audio quality in kbps
+        sections: Time ranges to download instead of the whole video
+    """
+    yt_dlp_path = os.path.join(base_dir, "bin", "yt-dlp.exe")
+    ffmpeg_path = os.path.join(base_dir, "bin", "ffmpeg.exe")
+
+    # Build command based on mode
+    if "Video" in mode and "MP3" not in mode:
+        cmd = video_download_command(
+            yt_dlp_path, ffmpeg_path, url, save_path, video_quality
+        )
+    else:
+        cmd = audio_download_command(
+            yt_dlp_path, ffmpeg_path, url, save_path, audio_quality
+        )
+
+    # Fetch only the requested time ranges, one file per range
+    if sections:
+        apply_sections(cmd, save_path, sections)
+
+    # Use Node.js as JavaScript runtime (required by YouTube)
+    cmd.extend(["--js-runtimes", "node"])
+
+    # Reuse .part files left by a paused or interrupted run
+    cmd.append("--continue")
+    return cmd
+
+
+def parse_progress(line: str) -> Optional[int]:
+    """
+    Parse download progress from yt-dlp output line.
+
+    Args:
+        line: A single line of output from yt-dlp.
+
+    Returns:
+        The progress percentage as an integer, or None if not found.
+    """
+    # Look for percentage values (e.g., "  1.5% of ...")
+    match = re.search(r"\[download\]\s+([0-9.]+)%", line)
+    if match:
+        try:
+            return int(float(match.group(1)))
+        except (ValueError, IndexError):
+            pass
+    return None
@@ -0,0 +1,112 @@
+"""
+Adapts the number of concurrent downloads to upstream throttling.
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class AimdController:
+    """
+    Additive-increase/multiplicative-decrease limit for parallel downloads.
+
+    The limit grows by one slot after each "round" of downloads, i.e. after
+    as many healthy completions as the current limit. HTTP 429
+    responses or a sharp drop in total throughput multiply it by
+    decrease_factor. A cooldown makes one burst of throttling errors from
+    several parallel tasks count as a single decrease.
+    """
+
+    def __init__(
+        self,
+        min_limit: int = 1,
+        max_limit: int = 4,
+        initial: int = 2,
+        decrease_factor: float = 0.5,
+        slowdown_ratio: float = 0.5,
+        cooldown: float = 30.0,
+    ):
+        """
+        Args:
+            min_limit: Floor for concurrent downloads
+            max_limit: Ceiling for concurrent downloads
+            initial: Starting limit
+            decrease_factor: Multiplier applied on throttling (0 to 1)
+            slowdown_ratio: A task whose speed times the downloads running
+                with it falls below this fraction of the recent average
+                counts as throttling
+            cooldown: Seconds after a decrease during which further
+                throttling signals are ignored
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.slowdown_ratio = slowdown_ratio
+        self.cooldown = cooldown
+        self._limit = max(min_limit, min(initial, max_limit))
+        self._successes = 0
+        self._total_rate: Optional[float] = None
+        self._last_decrease = float("-inf")
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        """Current number of downloads allowed to run at once."""
+        with self._lock:
+            return self._limit
+
+    def set_bounds(self, min_limit: int, max_limit: int) -> None:
+        """Change floor and ceiling, clamping the current limit."""
+        with self._lock:
+            self.min_limit = min_limit
+            self.max_limit = max_limit
+            self._limit = max(min_limit, min(self._limit, max_limit))
+
+    def on_success(
+        self, throughput: Optional[float] = None, concurrency: float = 1.0
+    ) -> None:
+        """
+        Record a completed download.
+
+        Args:
+            throughput: Average speed of the task in bytes per second
+            concurrency: Average number of downloads running while it did,
+                itself included
+        """
+        with self._lock:
+            slowed = False
+            if throughput:
+                # Tasks share the connection, so per-task speed drops as the
+                # limit grows; compare the total speed it stands for instead
+                total = throughput * max(1.0, concurrency)
+                slowed = (
+                    self._total_rate is not None
+                    and total < self._total_rate * self.slowdown_ratio
+                )
+                # Exponentially weighted average, slow samples included
+                self._total_rate = (
+                    total
+                    if self._total_rate is None
+                    else 0.8 * self._total_rate + 0.2 * total
+                )
+            if slowed:
+                self._decrease()
+                return
+            self._successes += 1
+            if self._successes >= self._limit:
+                self._successes = 0
+                self._limit = min(self.max_limit, self._limit + 1)
+
+    def on_throttle(self) -> None:
+        """Record an HTTP 429 or other sign of upstream throttling."""
+        with self._lock:
+            self._decrease()
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._successes = 0
+        self._limit = max(self.min_limit, int(self._limit * self.decrease_factor))
@@ -0,0 +1,293 @@
+"""
+Local control API of a running instance.
+
+The window listens on a local socket (a Unix domain socket, or a named
+pipe on Windows) only its user can connect to. Clients send one JSON
+object per line and get one JSON object per line back:
+
+    {"command": "add", "urls": ["https://youtu.be/..."], "mode": "MP3 Only"}
+    {"ok": true, "tasks": [{"id": 1, "state": "queued", ...}], "errors": []}
+
+A second launch of the application uses the same API to hand its URLs to
+the running instance instead of starting its own queue.
+"""
+
+import json
+import os
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from PyQt6.QtCore import QObject
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket
+
+from .clip_sections import parse_sections
+from .commands import DOWNLOAD_MODES
+
+if TYPE_CHECKING:
+    from .main_window import YTDGUI
+
+# Per user, so instances of different users on one machine don't meet
+SERVER_NAME = "yt-downloader-gui-" + (
+    os.environ.get("USER") or os.environ.get("USERNAME") or "user"
+)
+
+# Requests longer than this are rejected and the connection is closed
+MAX_REQUEST_BYTES = 1 << 20
+
+# Seconds a client waits for the running instance
+CLIENT_TIMEOUT = 3.0
+
+
+def task_summary(task: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-serializable view of a download task."""
+    summary = {
+        "id": task["id"],
+        "state": task["state"],
+        "title": task.get("title"),
+        "url": task["url"],
+        "mode": task["mode"],
+        "save_path": task["save_path"],
+        "progress": 100 if task["state"] == "completed" else task.get("progress", 0),
+        "attempts": task.get("attempts", 0),
+    }
+    if task.get("files"):
+        summary["files"] = list(task["files"])
+    return summary
+
+
+def send_request(
+    request: Dict[str, Any],
+    name: str = SERVER_NAME,
+    timeout: float = CLIENT_TIMEOUT,
+) -> Optional[Dict[str, Any]]:
+    """
+    Send one request to a running instance and wait for its response.
+
+    Args:
+        request: Request object with a "command"
+        name: Server name the instance listens on
+        timeout: Seconds to wait for connecting and for the response
+
+    Returns:
+        The response, or None if no instance is listening or it did not
+        answer in time
+    """
+    timeout_ms = int(timeout * 1000)
+    socket = QLocalSocket()
+    socket.connectToServer(name)
+    if not socket.waitForConnected(timeout_ms):
+        return None
+    try:
+        socket.write(json.dumps(request).encode() + b"\n")
+        socket.flush()
+        data = b""
+        while not data.endswith(b"\n"):
+            if not socket.waitForReadyRead(timeout_ms):
+                return None
+            data += bytes(socket.readAll())
+        return json.loads(data)
+    except ValueError:
+        return None
+    finally:
+        socket.disconnectFromServer()
+
+
+class ControlServer(QObject):
+    """
+    Answers control API requests in the GUI thread.
+
+    Commands:
+        ping: Check that the instance is running
+        add: Queue "url" or "urls"; optional "mode", "save_path" and
+            "sections" default to the Download page settings
+        list: All tasks of this session
+        status, cancel, pause, resume: Act on the task with "id"
+        show: Bring the window to the front
+    """
+
+    def __init__(self, main_app: "YTDGUI", name: str = SERVER_NAME):
+        """
+        Args:
+            main_app: Main window whose download manager is controlled
+            name: Local server name to listen on
+        """
+        super().__init__()
+        self.main_app = main_app
+        self.name = name
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self.server.newConnection.connect(self._on_new_connection)
+        self._buffers: Dict[QLocalSocket, bytes] = {}
+        self._commands: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+            "ping": self._ping,
+            "add": self._add,
+            "list": self._list,
+            "status": self._status,
+            "cancel": self._cancel,
+            "pause": self._pause,
+            "resume": self._resume,
+            "show": self._show,
+        }
+
+    def listen(self) -> bool:
+        """
+        Start accepting connections.
+
+        A socket left behind by a crashed instance is removed first.
+
+        Returns:
+            False if another instance is already listening
+        """
+        if self.server.listen(self.name):
+            return True
+        if send_request({"command": "ping"}, self.name) is not None:
+            return False
+        QLocalServer.removeServer(self.name)
+        return self.server.listen(self.name)
+
+    def close(self) -> None:
+        """Stop accepting connections and drop connected clients."""
+        self.server.close()
+        for socket in list(self._buffers):
+            socket.abort()
+        self._buffers.clear()
+
+    @property
+    def address(self) -> str:
+        """Socket path or pipe name clients connect to."""
+        return self.server.fullServerName()
+
+    def handle(self, request: Any) -> Dict[str, Any]:
+        """
+        Execute one request.
+
+        Returns:
+            The command's result with "ok": true, or "ok": false and an
+            "error" message
+        """
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "Request must be a JSON object"}
+        command = self._commands.get(str(request.get("command")))
+        if command is None:
+            return {"ok": False, "error": f"Unknown command: {request.get('command')}"}
+        try:
+            return {"ok": True, **command(request)}
+        except KeyError as e:
+            return {"ok": False, "error": f"Missing field: {e.args[0]}"}
+        except (TypeError, ValueError) as e:
+            return {"ok": False, "error": str(e)}
+
+    def _on_new_connection(self) -> None:
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self._buffers[socket] = b""
+            socket.readyRead.connect(lambda s=socket: self._on_ready_read(s))
+            socket.disconnected.connect(lambda s=socket: self._on_disconnected(s))
+
+    def _on_ready_read(self, socket: QLocalSocket) -> None:
+        data = self._buffers.get(socket, b"") + bytes(socket.readAll())
+        *lines, rest = data.split(b"\n")
+        if len(rest) > MAX_REQUEST_BYTES:
+            socket.abort()
+            return
+        self._buffers[socket] = rest
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                response = self.handle(json.loads(line))
+            except ValueError:
+                response = {"ok": False, "error": "Request is not valid JSON"}
+            socket.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+        socket.flush()
+
+    def _on_disconnected(self, socket: QLocalSocket) -> None:
+        self._buffers.pop(socket, None)
+        socket.deleteLater()
+
+    def _task(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """The task a request refers to by "id"."""
+        task = self.main_app.download_manager.tasks.get(int(request["id"]))
+        if task is None:
+            raise ValueError(f"No task with id {request['id']}")
+        return task
+
+    def _ping(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return {"address": self.address}
+
+    @staticmethod
+    def _string(request: Dict[str, Any], field: str) -> Optional[str]:
+        """Optional text field of a request."""
+        value = request.get(field)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"{field} must be a string")
+        return value
+
+    def _add(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if "urls" in request:
+            urls = request["urls"]
+            if not isinstance(urls, list) or not all(
+                isinstance(url, str) for url in urls
+            ):
+                raise ValueError("urls must be a list of strings")
+        elif isinstance(request["url"], str):
+            urls = [request["url"]]
+        else:
+            raise ValueError("url must be a string")
+        mode = self._string(request, "mode") or self.main_app.mode_combo.currentText()
+        if mode not in DOWNLOAD_MODES:
+            raise ValueError(f"Unknown download mode: {mode}")
+        save_path = (
+            self._string(request, "save_path") or self.main_app.path_entry.text()
+        )
+        if not save_path.strip():
+            raise ValueError("No save path given or selected in the window")
+        sections = None
+        if self._string(request, "sections"):
+            sections = parse_sections(request["sections"])
+
+        tasks: List[Dict[str, Any]] = []
+        errors: List[Dict[str, str]] = []
+        for url in urls:
+            try:
+                task = self.main_app.download_manager.queue_url(
+                    url.strip(), save_path.strip(), mode, sections
+                )
+            except ValueError as e:
+                errors.append({"url": url, "error": str(e)})
+                continue
+            if task is not None:
+                tasks.append(task_summary(task))
+        return {"tasks": tasks, "errors": errors}
+
+    def _list(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        manager = self.main_app.download_manager
+        return {
+            "tasks": [task_summary(task) for task in manager.tasks.values()],
+            "queued": len(self.main_app.download_queue),
+            "active": len(manager.active_tasks),
+        }
+
+    def _status(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return {"task": task_summary(self._task(request))}
+
+    def _cancel(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        task = self._task(request)
+        self.main_app.download_manager.cancel_task(task["id"])
+        return {"task": task_summary(task)}
+
+    def _pause(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        task = self._task(request)
+        self.main_app.download_manager.pause_task(task["id"])
+        return {"task": task_summary(task)}
+
+    def _resume(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        task = self._task(request)
+        self.main_app.download_manager.resume_task(task["id"])
+        return {"task": task_summary(task)}
+
+    def _show(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if self.main_app.isMinimized():
+            self.main_app.showNormal()
+        self.main_app.raise_()
+        self.main_app.activateWindow()
+        return {}
@@ -0,0 +1,319 @@
+"""
+Login cookies for yt-dlp, read once and shared by all downloads.
+
+Reading cookies from a browser means opening and decrypting its cookie
+database, which takes seconds and may ask for the keyring. The session
+does it once and keeps a snapshot that holds only the YouTube and Google
+cookies, checked for a login. The snapshot is renewed when its login
+cookies expire, when the cookies.txt file it came from changes, or when a
+download fails with an authentication error.
+
+yt-dlp writes the cookie jar back into its --cookies file when it exits,
+so every download gets its own copy of the snapshot instead of sharing
+one file that concurrent processes rewrite.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from .retry_policy import AUTH, DownloadError
+
+# Browsers yt-dlp can read cookies from
+BROWSERS = ("chrome", "firefox", "edge", "brave", "chromium", "opera", "vivaldi")
+if sys.platform == "darwin":
+    BROWSERS += ("safari",)
+
+# Only these domains are needed for YouTube downloads
+COOKIE_DOMAINS = ("youtube.com", "google.com", "youtube-nocookie.com")
+# cookies.txt marks HttpOnly cookies with this prefix instead of a field
+HTTP_ONLY_PREFIX = "#HttpOnly_"
+# A snapshot without any of these is not logged in
+LOGIN_COOKIES = ("SID", "__Secure-1PSID", "__Secure-3PSID", "SAPISID", "LOGIN_INFO")
+
+# Browser snapshots are renewed after this long even if no cookie expired,
+# since Google rotates some session cookies
+DEFAULT_MAX_AGE = 12 * 3600.0
+EXTRACT_TIMEOUT = 120.0
+
+
+def is_youtube_cookie(domain: str) -> bool:
+    """Whether a cookie for domain is sent to YouTube or its login."""
+    domain = domain.lstrip(".").lower()
+    return any(
+        domain == allowed or domain.endswith("." + allowed)
+        for allowed in COOKIE_DOMAINS
+    )
+
+
+class CookieSession:
+    """Validated cookie snapshot, extracted once and copied per download."""
+
+    def __init__(
+        self,
+        directory: str,
+        yt_dlp_path: str,
+        max_age: float = DEFAULT_MAX_AGE,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            directory: Folder for the snapshot and the per-download copies
+            yt_dlp_path: yt-dlp executable used to read browser cookies
+            max_age: Seconds after which a browser snapshot is renewed
+            clock: Wall clock, compared with cookie expiry times
+        """
+        self.directory = directory
+        self.yt_dlp_path = yt_dlp_path
+        self.max_age = max_age
+        self.browser: Optional[str] = None
+        self.cookie_file: Optional[str] = None
+        # Incremented on every new snapshot
+        self.version = 0
+        self.stats = {"extractions": 0, "refreshes": 0}
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._created = 0.0
+        self._expires: Optional[float] = None
+        self._source_mtime: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.browser or self.cookie_file)
+
+    @property
+    def source(self) -> str:
+        """Where the cookies come from, for log messages."""
+        return self.browser or os.path.basename(self.cookie_file or "") or "no"
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, "snapshot.txt")
+
+    def configure(
+        self, browser: Optional[str] = None, cookie_file: Optional[str] = None
+    ) -> None:
+        """
+        Choose where cookies come from; the next download reads them anew.
+
+        Args:
+            browser: Browser to read cookies from, one of BROWSERS
+            cookie_file: Exported cookies.txt file, used if no browser is set
+        """
+        if browser is not None and browser not in BROWSERS:
+            raise ValueError(f"Unsupported browser: {browser}")
+        with self._lock:
+            self.browser = browser
+            self.cookie_file = None if browser else cookie_file
+            self._invalidate()
+
+    def cookie_path(self, key: Any) -> str:
+        """Path of the cookie file a download passes to yt-dlp."""
+        return os.path.join(self.directory, f"task-{key}.txt")
+
+    def prepare(self, key: Any) -> int:
+        """
+        Copy a current snapshot to the cookie file of a download.
+
+        Args:
+            key: Identifier of the download, as given to cookie_path()
+
+        Returns:
+            Version of the snapshot, to pass to refresh() on an auth error
+
+        Raises:
+            DownloadError: AUTH if no usable login cookies could be read
+        """
+        with self._lock:
+            if not self._is_current():
+                self._renew()
+            path = self.cookie_path(key)
+            shutil.copy(self.snapshot_path, path + ".tmp")
+            os.replace(path + ".tmp", path)
+            return self.version
+
+    def release(self, key: Any) -> None:
+        """Remove the cookie file of a finished download."""
+        try:
+            os.remove(self.cookie_path(key))
+        except OSError:
+            pass
+
+    def release_all(self) -> None:
+        """Remove the cookie files of all downloads, e.g. on exit."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith("task-"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def refresh(self, failed_version: int) -> bool:
+        """
+        Renew the snapshot after a download was refused with it.
+
+        Downloads failing together with the same snapshot renew it once.
+
+        Args:
+            failed_version: Version returned by prepare() for the download
+
+        Returns:
+            Whether a newer snapshot is available to retry with
+        """
+        with self._lock:
+            if not self.enabled:
+                return False
+            if self.version == failed_version:
+                if self.cookie_file and not self._source_changed():
+                    # Exported cookies cannot be renewed by reading them again
+                    return False
+                try:
+                    self._renew()
+                except DownloadError:
+                    return False
+                self.stats["refreshes"] += 1
+            return self.version > failed_version
+
+    def _invalidate(self) -> None:
+        self._created = 0.0
+        self._expires = None
+        self._source_mtime = None
+
+    def _source_changed(self) -> bool:
+        try:
+            return os.path.getmtime(self.cookie_file) != self._source_mtime
+        except OSError:
+            return True
+
+    def _is_current(self) -> bool:
+        """Whether the snapshot exists and is still valid."""
+        if not self.enabled:
+            raise DownloadError("No cookie source configured", AUTH)
+        if not self._created or not os.path.exists(self.snapshot_path):
+            return False
+        now = self._clock()
+        if self._expires is not None and now >= self._expires:
+            return False
+        if self.cookie_file:
+            return not self._source_changed()
+        return now - self._created < self.max_age
+
+    def _renew(self) -> None:
+        """Read the cookies from their source into a new snapshot."""
+        os.makedirs(self.directory, exist_ok=True)
+        raw_path = os.path.join(self.directory, "extracted.txt")
+        try:
+            if self.browser:
+                self._extract_browser(raw_path)
+                source = raw_path
+            else:
+                source = self.cookie_file
+                try:
+                    self._source_mtime = os.path.getmtime(source)
+                except OSError as e:
+                    raise DownloadError(f"Unreadable cookie file {source}: {e}", AUTH)
+            self._expires = self._write_snapshot(source)
+        except DownloadError:
+            # Keep no half-renewed state around
+            self._invalidate()
+            raise
+        finally:
+            try:
+                os.remove(raw_path)
+            except OSError:
+                pass
+        self._created = self._clock()
+        self.version += 1
+
+    def _extract_browser(self, path: str) -> None:
+        """Have yt-dlp dump the browser's cookie jar into path."""
+        # Without a URL yt-dlp only loads the cookies and saves them on exit
+        cmd = [
+            self.yt_dlp_path,
+            "--quiet",
+            "--cookies-from-browser",
+            self.browser,
+            "--cookies",
+            path,
+        ]
+        kwargs = {}
+        if sys.platform == "win32":
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+        try:
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                timeout=EXTRACT_TIMEOUT,
+                **kwargs,
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise DownloadError(f"Could not read {self.browser} cookies: {e}", AUTH)
+        self.stats["extractions"] += 1
+        if not os.path.exists(path):
+            error = result.stderr.strip().splitlines()
+            raise DownloadError(
+                f"Could not read {self.browser} cookies: "
+                f"{error[-1] if error else f'exit code {result.returncode}'}",
+                AUTH,
+            )
+
+    def _write_snapshot(self, source: str) -> Optional[float]:
+        """
+        Keep the unexpired YouTube cookies of a cookies.txt file.
+
+        Returns:
+            When the first login cookie expires, None for session cookies
+
+        Raises:
+            DownloadError: AUTH if the file holds no YouTube login
+        """
+        # Filtered line by line: http.cookiejar rejects whole files over
+        # flags that browser extensions and yt-dlp write inconsistently
+        try:
+            with open(source, encoding="utf-8", errors="replace") as f:
+                lines = f.read().splitlines()
+        except OSError as e:
+            raise DownloadError(f"Unreadable cookie file {source}: {e}", AUTH)
+
+        now = self._clock()
+        kept = []
+        login_expiry = []
+        for line in lines:
+            if line.startswith(HTTP_ONLY_PREFIX):
+                fields = line[len(HTTP_ONLY_PREFIX) :].split("\t")
+            elif line.startswith("#"):
+                continue
+            else:
+                fields = line.split("\t")
+            if len(fields) != 7 or not is_youtube_cookie(fields[0]):
+                continue
+            expires = int(fields[4]) if fields[4].isdigit() else 0
+            if expires and expires <= now:
+                continue
+            kept.append(line)
+            if fields[5] in LOGIN_COOKIES:
+                login_expiry.append(expires or None)
+        if not login_expiry:
+            raise DownloadError(
+                f"No YouTube login found in {self.source} cookies; "
+                "sign in to YouTube there first",
+                AUTH,
+            )
+
+        temp_path = self.snapshot_path + ".tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, "w", encoding="utf-8") as f:
+            f.write("# Netscape HTTP Cookie File\n")
+            f.writelines(line + "\n" for line in kept)
+        os.replace(temp_path, self.snapshot_path)
+        expiry = [expires for expires in login_expiry if expires is not None]
+        return min(expiry) if expiry else None
@@ -0,0 +1,160 @@
+"""
+Limits how many downloads write to the same disk at once.
+"""
+
+import os
+import sys
+import threading
+from typing import Dict, Optional, Tuple
+
+# File systems that live on another machine
+NETWORK_FILESYSTEMS = ("nfs", "nfs4", "cifs", "smbfs", "smb3", "sshfs", "fuse.sshfs")
+
+
+def existing_ancestor(path: str) -> str:
+    """Closest existing directory of path (the save path may not exist yet)."""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def device_id(path: str) -> int:
+    """Device number of the file system that holds path."""
+    return os.stat(existing_ancestor(path)).st_dev
+
+
+def _linux_mount_info(path: str) -> Tuple[Optional[str], Optional[str]]:
+    """Mount point and file system type of path from /proc/mounts."""
+    path = os.path.realpath(existing_ancestor(path))
+    best: Tuple[Optional[str], Optional[str]] = (None, None)
+    try:
+        with open("/proc/mounts") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                # Spaces in mount points are escaped as \040
+                mount_point = fields[1].replace("\\040", " ")
+                prefix = mount_point.rstrip("/") + "/"
+                if path == mount_point or path.startswith(prefix) or mount_point == "/":
+                    if best[0] is None or len(mount_point) >= len(best[0]):
+                        best = (mount_point, fields[2])
+    except OSError:
+        pass
+    return best
+
+
+def _linux_is_rotational(dev: int) -> Optional[bool]:
+    """Whether the block device behind dev is a spinning disk."""
+    base = f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}"
+    # Partitions keep the queue settings on their parent device
+    for candidate in (base, os.path.join(base, "..")):
+        try:
+            with open(os.path.join(candidate, "queue", "rotational")) as f:
+                return f.read().strip() == "1"
+        except OSError:
+            continue
+    return None
+
+
+def classify_device(path: str) -> str:
+    """
+    Guess the kind of storage behind path.
+
+    Returns:
+        "network", "hdd" or "ssd" ("ssd" when the kind cannot be detected)
+    """
+    if sys.platform == "win32":
+        if existing_ancestor(path).startswith("\\\\"):
+            return "network"
+        return "ssd"
+
+    if sys.platform.startswith("linux"):
+        _, fs_type = _linux_mount_info(path)
+        if fs_type in NETWORK_FILESYSTEMS:
+            return "network"
+        try:
+            if _linux_is_rotational(device_id(path)):
+                return "hdd"
+        except OSError:
+            pass
+    return "ssd"
+
+
+class DeviceLimiter:
+    """
+    Per-device slots for downloads writing to the same disk or share.
+
+    Slow devices (spinning disks, network shares) get fewer slots so that
+    parallel ffmpeg merges do not thrash them, while downloads to a fast
+    disk keep running in parallel.
+    """
+
+    DEFAULT_LIMITS = {"ssd": 4, "hdd": 1, "network": 1}
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            limits: Slots per device kind, overriding DEFAULT_LIMITS
+        """
+        self.kind_limits = dict(self.DEFAULT_LIMITS, **(limits or {}))
+        self._overrides: Dict[int, int] = {}
+        self._active: Dict[int, int] = {}
+        self._devices: Dict[str, Tuple[int, str]] = {}
+        self._lock = threading.Lock()
+
+    def device(self, path: str) -> Tuple[int, str]:
+        """(device id, device kind) of path, cached per path."""
+        with self._lock:
+            cached = self._devices.get(path)
+        if cached is not None:
+            return cached
+        try:
+            info = (device_id(path), classify_device(path))
+        except OSError:
+            info = (-1, "ssd")
+        with self._lock:
+            self._devices[path] = info
+        return info
+
+    def set_limit(self, path: str, limit: int) -> None:
+        """Override the number of slots for the device holding path."""
+        dev, _ = self.device(path)
+        with self._lock:
+            self._overrides[dev] = limit
+
+    def limit(self, path: str) -> int:
+        """Number of slots of the device holding path."""
+        dev, kind = self.device(path)
+        with self._lock:
+            return self._overrides.get(dev, self.kind_limits.get(kind, 1))
+
+    def active(self, path: str) -> int:
+        """Number of downloads currently writing to the device of path."""
+        dev, _ = self.device(path)
+        with self._lock:
+            return self._active.get(dev, 0)
+
+    def can_start(self, path: str) -> bool:
+        """Whether another download may write to the device of path."""
+        return self.active(path) < self.limit(path)
+
+    def acquire(self, path: str) -> None:
+        """Take a slot on the device of path."""
+        dev, _ = self.device(path)
+        with self._lock:
+            self._active[dev] = self._active.get(dev, 0) + 1
+
+    def release(self, path: str) -> None:
+        """Return a slot on the device of path."""
+        dev, _ = self.device(path)
+        with self._lock:
+            count = self._active.get(dev, 0) - 1
+            if count > 0:
+                self._active[dev] = count
+            else:
+                self._active.pop(dev, None)
@@ -0,0 +1,238 @@
+"""
+Opt-in diagnostics for UI freezes.
+
+Measures how late the main thread's event loop runs a heartbeat timer,
+times selected slots, and writes cProfile and tracemalloc captures of the
+running session for offline analysis. Enabled with the YTD_DIAGNOSTICS
+environment variable or from the Help menu.
+"""
+
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from PyQt6.QtCore import QObject, QTimer
+
+from .metrics import Histogram
+from .staging import unique_path
+
+ENV_VAR = "YTD_DIAGNOSTICS"
+
+# Heartbeat interval; lag is how much later than this the timer fires
+HEARTBEAT_MS = 100
+# Upper bounds of the lag histogram buckets in milliseconds
+LAG_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Frames kept per allocation for memory snapshots
+TRACEMALLOC_FRAMES = 25
+
+
+def enabled_from_env() -> bool:
+    """Whether the environment turns diagnostics on at startup."""
+    return os.environ.get(ENV_VAR, "").strip().lower() not in ("", "0", "false")
+
+
+class LagMonitor(QObject):
+    """
+    Event-loop lag of the thread it lives in.
+
+    A timer is due every HEARTBEAT_MS; when a slot blocks the loop, the
+    next timeout arrives late by about as long as the slot ran.
+    """
+
+    def __init__(self, interval_ms: int = HEARTBEAT_MS):
+        super().__init__()
+        self.interval_ms = interval_ms
+        self.lag = Histogram(LAG_BUCKETS)
+        self._last = 0.0
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._on_timeout)
+
+    def start(self) -> None:
+        """Start measuring."""
+        self._last = time.perf_counter()
+        self._timer.start()
+
+    def stop(self) -> None:
+        """Stop measuring; the statistics are kept."""
+        self._timer.stop()
+
+    def _on_timeout(self) -> None:
+        now = time.perf_counter()
+        self.observe((now - self._last) * 1000 - self.interval_ms)
+        self._last = now
+
+    def observe(self, lag_ms: float) -> None:
+        """Add one lag measurement in milliseconds."""
+        self.lag.observe(max(0.0, lag_ms))
+
+    def stats(self) -> Dict[str, Any]:
+        """Lag statistics in milliseconds."""
+        return {
+            "samples": self.lag.count,
+            "mean_ms": self.lag.sum / self.lag.count if self.lag.count else 0.0,
+            "p95_ms": self.lag.quantile(0.95),
+            "p99_ms": self.lag.quantile(0.99),
+            "max_ms": self.lag.max,
+        }
+
+
+class SlotStats:
+    """Call count, total and longest duration of named slots."""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        """Add one call of a slot."""
+        with self._lock:
+            stats = self._stats.setdefault(
+                name, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0}
+            )
+            stats["calls"] += 1
+            stats["total_ms"] += seconds * 1000
+            stats["max_ms"] = max(stats["max_ms"], seconds * 1000)
+
+    def slowest(self, count: int = 10) -> List[Dict[str, Any]]:
+        """Slots with the longest single call first."""
+        with self._lock:
+            rows = [{"slot": name, **stats} for name, stats in self._stats.items()]
+        rows.sort(key=lambda row: row["max_ms"], reverse=True)
+        return rows[:count]
+
+
+class Diagnostics:
+    """
+    Diagnostics of a running session.
+
+    Slots are instrumented once at startup; their wrappers only measure
+    while diagnostics are enabled, so they cost one attribute check
+    otherwise.
+    """
+
+    def __init__(self, output_dir: str, enabled: bool = False):
+        """
+        Args:
+            output_dir: Folder for profiles, snapshots and reports
+            enabled: Start measuring right away
+        """
+        self.output_dir = output_dir
+        self.enabled = False
+        self.lag_monitor = LagMonitor()
+        self.slots = SlotStats()
+        self._profile: Optional[cProfile.Profile] = None
+        if enabled:
+            self.enable()
+
+    def enable(self) -> None:
+        """Start the lag monitor, slot timing and allocation tracing."""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.lag_monitor.start()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    def disable(self) -> None:
+        """Stop measuring; collected statistics are kept."""
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.lag_monitor.stop()
+        self.stop_profile()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def instrument(self, obj: Any, names: Iterable[str]) -> None:
+        """
+        Time calls of methods of obj.
+
+        Must run before the methods are connected to signals, as
+        connections keep the method they were made with.
+        """
+        owner = type(obj).__name__
+        for name in names:
+            setattr(obj, name, self._timed(f"{owner}.{name}", getattr(obj, name)))
+
+    def _timed(self, name: str, slot: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(slot)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return slot(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return slot(*args, **kwargs)
+            finally:
+                self.slots.record(name, time.perf_counter() - started)
+
+        return wrapper
+
+    @property
+    def profiling(self) -> bool:
+        """Whether a CPU profile is being recorded."""
+        return self._profile is not None
+
+    def start_profile(self) -> None:
+        """Profile the calling thread (the GUI thread) until stop_profile()."""
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop_profile(self) -> Optional[str]:
+        """
+        Stop profiling and save the profile for pstats or snakeviz.
+
+        Returns:
+            Path of the .prof file, or None if no profile was running
+        """
+        if self._profile is None:
+            return None
+        profile, self._profile = self._profile, None
+        profile.disable()
+        path = self._output_path("profile", "prof")
+        profile.dump_stats(path)
+        return path
+
+    def save_snapshot(self) -> str:
+        """
+        Save the current memory allocations, e.g. to compare two snapshots.
+
+        Raises:
+            RuntimeError: If diagnostics are not enabled
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Memory tracing is not running")
+        path = self._output_path("memory", "tracemalloc")
+        tracemalloc.take_snapshot().dump(path)
+        return path
+
+    def report(self) -> Dict[str, Any]:
+        """Event-loop lag and the slowest slots."""
+        report = {
+            "event_loop_lag": self.lag_monitor.stats(),
+            "slowest_slots": self.slots.slowest(),
+        }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            report["traced_memory"] = {"current": current, "peak": peak}
+        return report
+
+    def save_report(self) -> str:
+        """Write report() as JSON and return its path."""
+        path = self._output_path("report", "json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+    def _output_path(self, kind: str, extension: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return unique_path(
+            os.path.join(self.output_dir, f"{kind}-{stamp}.{extension}")
+        )
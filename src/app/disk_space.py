@@ -0,0 +1,125 @@
+"""
+Admission control that keeps downloads from filling up the destination disk.
+"""
+
+import shutil
+import threading
+from typing import Any, Dict, Optional
+
+from .device_limits import device_id, existing_ancestor
+
+# Merging video and audio streams keeps the inputs until the output is done
+MERGE_OVERHEAD = 2.0
+
+
+def estimate_size(
+    info: Dict[str, Any], audio_quality: Optional[str] = None
+) -> Optional[int]:
+    """
+    Estimate the peak disk usage of a download from yt-dlp metadata.
+
+    Sizes come from filesize or filesize_approx of the requested formats.
+    Merged downloads need room for the streams and the merged file at the
+    same time; MP3 extraction needs room for the source and the MP3.
+
+    Args:
+        info: Video metadata from yt-dlp --dump-json
+        audio_quality: MP3 bitrate in kbps when the audio is extracted
+
+    Returns:
+        Estimated bytes, or None if the formats carry no size
+    """
+    formats = info.get("requested_formats") or [info]
+    sizes = [f.get("filesize") or f.get("filesize_approx") for f in formats]
+    if not all(sizes):
+        return None
+    size = float(sum(sizes))
+    if len(formats) > 1:
+        size *= MERGE_OVERHEAD
+    if audio_quality and info.get("duration"):
+        # The encoder writes the MP3 next to the downloaded source
+        size += info["duration"] * int(audio_quality) * 1000 / 8
+    return int(size)
+
+
+class SpaceReservations:
+    """
+    Reserves free space per destination device for running downloads.
+
+    A task is admitted only if the device's free space, minus what running
+    tasks still expect to write and a safety reserve, fits its estimate.
+    Reservations shrink as tasks write data, since that data already shows
+    up as used space.
+    """
+
+    def __init__(self, reserve_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            reserve_bytes: Free space always left on the device
+        """
+        self.reserve_bytes = reserve_bytes
+        # task id -> (device id, estimated bytes, bytes written so far)
+        self._reservations: Dict[Any, list] = {}
+        self._lock = threading.Lock()
+
+    def free_space(self, path: str) -> int:
+        """Free bytes on the device holding path."""
+        return shutil.disk_usage(existing_ancestor(path)).free
+
+    def reserved(self, path: str) -> int:
+        """Bytes running downloads still expect to write to path's device."""
+        dev = device_id(path)
+        with self._lock:
+            return self._reserved_on(dev)
+
+    def available(self, path: str) -> int:
+        """Bytes a new download may use on the device holding path."""
+        return self.free_space(path) - self.reserved(path) - self.reserve_bytes
+
+    def fits(self, path: str, size: Optional[int]) -> bool:
+        """Whether a download of size bytes (None = unknown) fits on path."""
+        try:
+            return self.available(path) >= (size or 0)
+        except OSError:
+            # Unknown devices are not held back; the write will tell
+            return True
+
+    def try_reserve(self, task_id: Any, path: str, size: Optional[int]) -> bool:
+        """
+        Reserve size bytes on path's device if they fit.
+
+        Returns:
+            True if the task was admitted
+        """
+        try:
+            dev = device_id(path)
+            free = self.free_space(path)
+        except OSError:
+            return True
+        with self._lock:
+            reserved = self._reserved_on(dev, exclude=task_id)
+            if free - reserved - self.reserve_bytes < (size or 0):
+                return False
+            self._reservations[task_id] = [dev, size or 0, 0]
+            return True
+
+    def update(self, task_id: Any, written: float) -> None:
+        """Record how many bytes a task has written so far."""
+        with self._lock:
+            entry = self._reservations.get(task_id)
+            if entry is not None:
+                entry[2] = written
+
+    def release(self, task_id: Any) -> None:
+        """Drop the reservation of a finished or stopped task."""
+        with self._lock:
+            self._reservations.pop(task_id, None)
+
+    def _reserved_on(self, dev: int, exclude: Any = None) -> int:
+        return int(
+            sum(
+                max(0, size - written)
+                for task_id, (entry_dev, size, written) in self._reservations.items()
+                if entry_dev == dev and task_id != exclude
+            )
+        )
@@ -2,14 +2,17 @@
 Handles the download queue and execution.
 """
 
-import cmd
+import collections
+import itertools
 import os
 import re
-import threading
 import subprocess
 import json
-import sys
-from typing import Dict, List, Any, Tuple, TYPE_CHECKING, Optional
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, wait
+from typing import Dict, List, Any, Set, Tuple, TYPE_CHECKING, Optional
 
 from PyQt6.QtWidgets import (
     QMessageBox,
@@ -22,12 +25,61 @@ from PyQt6.QtWidgets import (
     QHBoxLayout,
     QPushButton,
 )
-from PyQt6.QtCore import QTimer, pyqtSignal, QObject, QMetaObject, Qt, Q_ARG
+from PyQt6.QtCore import QTimer, pyqtSignal, QObject
 from PyQt6.QtGui import QIcon
 
+from .bandwidth import BandwidthBudget
+from .chapter_split import ChapterSplitter, chapter_paths
+from .clip_sections import Section, format_sections, parse_sections, section_lengths
+from .commands import (
+    CHANNEL_MODES,
+    SINGLE_MODES,
+    download_command,
+    parse_progress,
+)
+from .concurrency import AimdController
+from .cookie_session import CookieSession
+from .device_limits import DeviceLimiter, device_id
+from .disk_space import SpaceReservations, estimate_size
+from .library import MediaLibrary
+from .listing import Entry, is_short, listing_command, read_entries
+from .loudness import Loudness, LoudnessAnalyzer, gain_for, is_audio_file
+from .metrics import PipelineMetrics, StageTimer, is_postprocessor_line
+from .orchestrator import Orchestrator
+from .prefetch import MetadataPrefetcher
+from .retry_policy import (
+    AUTH,
+    ERROR_HINTS,
+    POSTPROCESSING,
+    RATE_LIMITED,
+    STALLED,
+    DownloadError,
+    RetryPolicy,
+    classify_error,
+)
+from .segmented_download import ConnectionPool, SegmentedDownload, direct_downloads
+from .staging import StagingMover, finished_files
+from .stall_watchdog import StallWatchdog
+from .task_executor import (
+    PARTIAL_FILE_PATTERN,
+    TaskExecutor,
+    find_partial_files,
+    remove_files,
+)
+
 if TYPE_CHECKING:
     from .main_window import YTDGUI
 
+# Pipeline stage a task is in after changing to a state
+STATE_STAGES = {
+    "queued": "queued",
+    "downloading": "metadata",
+    "retrying": "waiting",
+    "paused": "waiting",
+    "moving": "finalize",
+}
+FINAL_STATES = ("completed", "failed", "cancelled")
+
 
 class WorkerSignals(QObject):
     """Defines signals available from a running worker thread."""
@@ -35,7 +87,11 @@ class WorkerSignals(QObject):
     finished = pyqtSignal()
     error = pyqtSignal(tuple)
     result = pyqtSignal(object)
-    download_complete = pyqtSignal()
+    download_complete = pyqtSignal(object)
+    task_updated = pyqtSignal(object)
+    retry_scheduled = pyqtSignal(object, float)
+    loudness_measured = pyqtSignal(str, float)
+    prefetched = pyqtSignal(int, object)
 
 
 class DownloadManager:
@@ -43,10 +99,68 @@ class DownloadManager:
 
     def __init__(self, main_app: "YTDGUI"):
         self.main_app = main_app
+        self.executor = TaskExecutor()
+        # Downloads and listings run as coroutines on one event loop thread
+        self.orchestrator = Orchestrator(self.executor.monitor)
+        self._task_ids = itertools.count(1)
+        self.tasks: Dict[int, Dict[str, Any]] = {}
+        self.active_tasks: Dict[int, Dict[str, Any]] = {}
+        self.concurrency = AimdController(min_limit=1, max_limit=4, initial=2)
+        self.retry_policy = RetryPolicy()
+        self.stall_watchdog = StallWatchdog(threaded=False)
+        self.orchestrator.every(
+            self.stall_watchdog.check_interval, self.stall_watchdog.check
+        )
+        self.bandwidth = BandwidthBudget()
+        # Fetch plain HTTP formats in parallel segments instead of yt-dlp
+        self.segmented_downloads = False
+        self.http_pool = ConnectionPool()
+        # Login cookies, read once and copied to each yt-dlp run
+        self.cookies = CookieSession(
+            os.path.join(main_app.base_dir, "cookies"),
+            os.path.join(main_app.base_dir, "bin", "yt-dlp.exe"),
+        )
+        self.device_limits = DeviceLimiter()
+        self.disk_space = SpaceReservations()
+        self._space_timer: Optional[QTimer] = None
+        self.staging_dir: Optional[str] = None
+        self.mover = StagingMover()
+        self._library: Optional[MediaLibrary] = None
+        self._library_lock = threading.Lock()
+        self.loudness = LoudnessAnalyzer(
+            os.path.join(main_app.base_dir, "bin", "ffmpeg.exe"),
+            executor=self.executor,
+        )
+        self._measuring: Set[str] = set()
+        self._measuring_lock = threading.Lock()
+        self.metrics = PipelineMetrics(
+            os.path.join(main_app.base_dir, "metrics.jsonl"),
+            os.path.join(main_app.base_dir, "metrics.prom"),
+        )
+        self._bandwidth_timer: Optional[QTimer] = None
+        self.failures: List[Tuple[Dict[str, Any], DownloadError]] = []
+        self._failure_dialog: Optional[QMessageBox] = None
+        self._summarized_failures: List[Tuple[Dict[str, Any], DownloadError]] = []
+        self.main_app.diagnostics.instrument(
+            self,
+            (
+                "_on_download_complete",
+                "_on_task_updated",
+                "_on_retry_scheduled",
+                "_show_video_selection_dialog",
+                "process_queue",
+            ),
+        )
         self.signals = WorkerSignals()
         self.signals.error.connect(self._on_playlist_error)
         self.signals.result.connect(self._on_playlist_result)
         self.signals.download_complete.connect(self._on_download_complete)
+        self.signals.task_updated.connect(self._on_task_updated)
+        self.signals.retry_scheduled.connect(self._on_retry_scheduled)
+        self.signals.prefetched.connect(self._on_prefetched)
+        self.prefetcher = MetadataPrefetcher(
+            self.orchestrator, self._prefetch_info, self.signals.prefetched.emit
+        )
 
     def _on_playlist_error(self, error_info: tuple) -> None:
         """Handles errors from the playlist processing thread."""
@@ -64,12 +178,413 @@ class DownloadManager:
             )
             return
 
-    def _on_download_complete(self) -> None:
+    def _on_download_complete(self, task: Dict[str, Any]) -> None:
         """Handle download completion in the main thread."""
-        self.main_app.downloading = False
-        self.main_app.updateProgressSignal.emit(0)
+        if self.active_tasks.pop(task["id"], None) is not None:
+            self.device_limits.release(task.pop("device_path"))
+        self.main_app.downloading = bool(self.active_tasks)
+        # Usage of processes killed after the task's metrics were recorded
+        if task["state"] == "cancelled":
+            self.executor.take_usage(task["id"])
+
+        # Feed the outcome to the adaptive concurrency limit; a task slowed
+        # down by our own bandwidth cap says nothing about upstream throttling
+        if task["state"] in ("completed", "moving"):
+            capped = task.get("rate_limit") is not None
+            self.concurrency.on_success(
+                None if capped else task.get("throughput"), task.get("parallel", 1)
+            )
+
+        # Requeue only now that the attempt no longer holds its slots
+        retry_delay = task.pop("retry_delay", None)
+        if retry_delay is not None:
+            self._schedule_retry(task, retry_delay)
+
+        self._emit_overall_progress()
+        self.process_queue()
+
+        if self.failures and self._is_idle():
+            self._show_failure_summary()
+
+    def _on_retry_scheduled(self, task: Dict[str, Any], delay: float) -> None:
+        """
+        Requeue a task after its backoff delay (main thread).
+
+        The worker asks for the retry before it reports the attempt done;
+        a task still holding its download slot is requeued by
+        _on_download_complete, so it never runs twice in active_tasks.
+        """
+        if task["id"] in self.active_tasks:
+            task["retry_delay"] = delay
+            return
+        self._schedule_retry(task, delay)
+
+    def _schedule_retry(self, task: Dict[str, Any], delay: float) -> None:
+        """Put a task back into the queue after delay seconds."""
+        if delay <= 0:
+            self._retry_task(task)
+            return
+        QTimer.singleShot(int(delay * 1000), lambda: self._retry_task(task))
+
+    def _retry_task(self, task: Dict[str, Any]) -> None:
+        """Put a task waiting for retry back into the queue."""
+        # The user may have paused or cancelled it in the meantime
+        if task["state"] != "retrying":
+            return
+        self._set_task_state(task, "queued")
+
+        # Tasks interrupted on purpose (e.g. rebalancing) keep their turn
+        if task.pop("interrupted", False):
+            self.main_app.download_queue.insert(0, task)
+        else:
+            self.main_app.download_queue.append(task)
+        self.process_queue()
+
+    def set_bandwidth_limit(
+        self, limit: Optional[float], schedule: Optional[List[Any]] = None
+    ) -> None:
+        """
+        Configure the global bandwidth budget.
+
+        Args:
+            limit: Total bytes per second for all downloads, None for unlimited
+            schedule: Optional time-of-day entries from parse_schedule()
+        """
+        self.bandwidth.configure(limit, schedule)
+
+        # Even out the shares periodically, so schedule boundaries and
+        # deferred increases take effect without restarting on every start
+        if self._bandwidth_timer is None:
+            self._bandwidth_timer = QTimer()
+            self._bandwidth_timer.timeout.connect(self._rebalance_bandwidth)
+        self._bandwidth_timer.start(30 * 1000)
+        self._rebalance_bandwidth()
+
+    def set_cookie_source(
+        self, browser: Optional[str] = None, cookie_file: Optional[str] = None
+    ) -> None:
+        """
+        Log in with the cookies of a browser or an exported cookies.txt file.
+
+        Args:
+            browser: Browser to read cookies from, see cookie_session.BROWSERS
+            cookie_file: cookies.txt file, used if no browser is given; neither
+                turns cookies off
+        """
+        self.cookies.configure(browser, cookie_file)
+        self.main_app.use_cookies = self.cookies.enabled
+        if browser:
+            self.main_app.cookie_browser = browser
+        self.main_app.cookie_file = self.cookies.cookie_file
+        if self.cookies.enabled:
+            self.main_app.log_message(f"Using {self.cookies.source} cookies")
+        else:
+            self.main_app.log_message("Cookies disabled")
+
+    def set_segmented_downloads(self, enabled: bool) -> None:
+        """
+        Fetch plain HTTP formats in parallel byte-range segments.
+
+        Applies to downloads started afterwards. Downloads with a bandwidth
+        share or clip ranges are always left to yt-dlp.
+        """
+        self.segmented_downloads = enabled
+        state = "enabled" if enabled else "disabled"
+        self.main_app.log_message(f"Parallel segment downloads {state}")
+
+    def _rebalance_bandwidth(self) -> None:
+        """
+        Restart running downloads whose bandwidth share is out of balance.
+
+        yt-dlp cannot change --limit-rate while running, so affected tasks
+        are stopped and requeued at the front; they resume from their .part
+        files with a new rate. Runs on the bandwidth timer and when the limit
+        changes, never on every start or completion.
+        """
+        running = [
+            task
+            for task in self.active_tasks.values()
+            if task["state"] == "downloading"
+            and "rate_started" in task
+            and not task.get("restart")
+        ]
+        now = time.monotonic()
+        for index in self.bandwidth.rebalance(
+            [(task.get("rate_limit"), now - task["rate_started"]) for task in running],
+            len(self.active_tasks),
+        ):
+            self._restart_task(running[index])
+
+        # Keep checking until downloads capped by a removed limit are lifted
+        if not self.bandwidth.enabled and self._bandwidth_timer is not None:
+            if not any(task.get("rate_limit") for task in running):
+                self._bandwidth_timer.stop()
+
+    def _restart_task(self, task: Dict[str, Any]) -> None:
+        """Stop a running task so it is started again right away."""
+        self.main_app.log_message(
+            f"Rebalancing bandwidth, restarting: {self._task_label(task)}"
+        )
+        task["restart"] = True
+        self._stop_processes(task["id"], cleanup=False)
+
+    def _is_idle(self) -> bool:
+        """Whether no task is running, queued or waiting for a retry."""
+        return (
+            not self.active_tasks
+            and not self.main_app.download_queue
+            and not any(t["state"] == "retrying" for t in self.tasks.values())
+        )
+
+    def _on_task_updated(self, task: Dict[str, Any]) -> None:
+        """Refresh a task's entry in the Activity page in the main thread."""
+        if hasattr(self.main_app, "task_list"):
+            self.main_app.ui_manager.update_task_item(task)
+        if task["state"] in FINAL_STATES and hasattr(self.main_app, "metrics_label"):
+            self.main_app.metrics_label.setText(self.metrics.summary())
+
+    def _set_task_state(self, task: Dict[str, Any], state: str) -> None:
+        """
+        Change a task's state and notify the UI (thread-safe).
+
+        States: queued, downloading, retrying, moving, paused, cancelled,
+        completed, failed
+        """
+        task["state"] = state
+        if state in FINAL_STATES:
+            self._record_metrics(task)
+        else:
+            task["timer"].enter(STATE_STAGES[state])
+        self.signals.task_updated.emit(task)
+
+    def _enter_stage(self, task: Dict[str, Any], stage: str) -> None:
+        """Start timing a pipeline stage of a running task."""
+        if task["state"] == "downloading" and task["timer"].stage != stage:
+            task["timer"].enter(stage)
+
+    def _record_metrics(self, task: Dict[str, Any]) -> None:
+        """Add the stage timings and byte counts of a finished task."""
+        started = task["timer"].started
+        stages = task["timer"].take()
+        output_bytes = 0
+        for path in task.get("files", []) if task["state"] == "completed" else []:
+            try:
+                output_bytes += os.path.getsize(path)
+            except OSError:
+                pass
+        record = {
+            "id": task["id"],
+            "url": task["url"],
+            "title": task.get("title"),
+            "mode": task["mode"],
+            "quality": task["audio_quality"] or task["video_quality"],
+            "state": task["state"],
+            "attempts": task["attempts"],
+            "started": started,
+            "finished": time.time(),
+            "stages": {stage: round(seconds, 3) for stage, seconds in stages.items()},
+            "downloaded_bytes": int(task.pop("downloaded_bytes", 0)),
+            "output_bytes": output_bytes,
+            # CPU, memory and disk I/O of the yt-dlp and ffmpeg processes
+            "resources": self.executor.take_usage(task["id"]),
+        }
+        try:
+            self.metrics.record(record)
+        except OSError as e:
+            self.main_app.log_message(f"Could not write download metrics: {e}")
+
+    def cancel_task(self, task_id: int) -> None:
+        """
+        Cancel a task and remove its partial files.
+
+        Args:
+            task_id: Identifier of the task to cancel
+        """
+        task = self.tasks.get(task_id)
+        if not task or task["state"] in ("cancelled", "completed", "moving"):
+            return
+
+        previous_state = task["state"]
+        self._set_task_state(task, "cancelled")
+        if task in self.main_app.download_queue:
+            self.main_app.download_queue.remove(task)
+        self.prefetcher.discard(task_id)
+        self.cookies.release(task_id)
+
+        if previous_state == "downloading":
+            self._stop_processes(task_id, cleanup=True)
+        # Paused or failed tasks may still have resumable files on disk
+        remove_files(find_partial_files(task.get("outputs", [])))
+
+        self.main_app.log_message(f"Download cancelled: {self._task_label(task)}")
+        self._update_queue_status()
+
+    def pause_task(self, task_id: int) -> None:
+        """
+        Pause a task, keeping its partial files so it can resume later.
+
+        Args:
+            task_id: Identifier of the task to pause
+        """
+        task = self.tasks.get(task_id)
+        if not task or task["state"] not in ("queued", "downloading", "retrying"):
+            return
+
+        previous_state = task["state"]
+        self._set_task_state(task, "paused")
+        if task in self.main_app.download_queue:
+            self.main_app.download_queue.remove(task)
+
+        if previous_state == "downloading":
+            self._stop_processes(task_id, cleanup=False)
+
+        self.main_app.log_message(f"Download paused: {self._task_label(task)}")
+        self._update_queue_status()
+
+    def resume_task(self, task_id: int) -> None:
+        """
+        Put a paused or failed task back at the front of the queue.
+
+        yt-dlp continues from the existing .part file, so only the missing
+        bytes are fetched again.
+
+        Args:
+            task_id: Identifier of the task to resume
+        """
+        task = self.tasks.get(task_id)
+        if not task or task["state"] not in ("paused", "failed"):
+            return
+
+        self._set_task_state(task, "queued")
+        self.main_app.download_queue.insert(0, task)
+        task["attempts"] = 0
+        self.main_app.log_message(f"Download resumed: {self._task_label(task)}")
         self.process_queue()
 
+    def _on_task_stalled(self, task_id: int, reason: str) -> None:
+        """
+        Kill a stalled task so its worker fails it with a retryable error.
+
+        Called on the orchestrator loop. Partial files are kept, so the retry
+        resumes where the stalled process stopped.
+        """
+        task = self.tasks.get(task_id)
+        if not task or task["state"] != "downloading":
+            return
+        task["stalled"] = reason
+        task["stalls"] = task.get("stalls", 0) + 1
+        self.main_app.log_message(
+            f"Download stalled ({reason}), restarting: {self._task_label(task)}"
+        )
+        self._stop_processes(task_id, cleanup=False)
+
+    def _stop_processes(self, task_id: int, cleanup: bool) -> None:
+        """
+        Kill the running processes of a task.
+
+        The download coroutine sees yt-dlp exit and acts on the task's new
+        state; ffmpeg runs of chapter splitting belong to the executor.
+        """
+        self.orchestrator.kill(task_id)
+        segmented = self.tasks.get(task_id, {}).get("segmented")
+        if segmented is not None:
+            segmented.cancel()
+        self.executor.cancel(task_id, cleanup=cleanup)
+
+    def _task_label(self, task: Dict[str, Any]) -> str:
+        """Human readable name of a task for logs and the task list."""
+        label = task.get("title") or task["url"]
+        if task.get("sections"):
+            label += f" (clips {format_sections(task['sections'])})"
+        return label
+
+    def shutdown(self) -> None:
+        """
+        Stop all downloads and extraction workers.
+
+        Pending tasks are dropped, running yt-dlp/ffmpeg process trees are
+        terminated and their partial files are removed.
+        """
+        self.main_app.download_queue.clear()
+        self.stall_watchdog.stop()
+        self.orchestrator.shutdown()
+        # Before the executor, whose shutdown waits for a batch analysis
+        self.loudness.shutdown()
+        self.executor.shutdown()
+        self.http_pool.close()
+        self.cookies.release_all()
+        self.mover.shutdown()
+        if self._library is not None:
+            self._library.close()
+        self.active_tasks.clear()
+        self.main_app.downloading = False
+
+    def _create_task(
+        self,
+        url: str,
+        save_path: str,
+        mode: str,
+        sections: Optional[List[Section]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Build a download task for the queue.
+
+        Args:
+            url: Video URL
+            save_path: Download destination path
+            mode: Download mode
+            sections: Time ranges to download instead of the whole video
+
+        Returns:
+            Task dictionary with a unique id
+        """
+        task = {
+            "id": next(self._task_ids),
+            "state": "queued",
+            "title": None,
+            "outputs": [],
+            "attempts": 0,
+            "url": url,
+            "save_path": save_path,
+            "mode": mode,
+            "sections": sections or None,
+            "split_chapters": (
+                "MP3" in mode and self.main_app.split_chapters_check.isChecked()
+            ),
+            "audio_quality": (
+                self.main_app.audio_quality_default if "MP3" in mode else None
+            ),
+            "video_quality": (
+                self.main_app.video_quality_combo.currentText()
+                if "MP3" not in mode
+                else "Best Available"
+            ),
+            "timer": StageTimer(),
+        }
+        task["timer"].enter("queued")
+        self.tasks[task["id"]] = task
+        self.signals.task_updated.emit(task)
+        return task
+
+    def _update_queue_status(self) -> None:
+        """Show pending tasks and active workers in the Activity page."""
+        if hasattr(self.main_app, "queue_status_label"):
+            text = (
+                f"Queue: {len(self.main_app.download_queue)} pending | "
+                f"Active workers: "
+                f"{self.executor.active_count + self.orchestrator.active_count} | "
+                f"Parallel: {len(self.active_tasks)}/{self.concurrency.limit}"
+            )
+            stalls = self.stall_watchdog.stats["stalls"]
+            if stalls:
+                text += f" | Stalls: {stalls}"
+            held = sum(
+                1 for task in self.main_app.download_queue if task.get("space_held")
+            )
+            if held:
+                text += f" | Waiting for disk space: {held}"
+            self.main_app.queue_status_label.setText(text)
+
     def add_to_queue(self) -> None:
         """
         Validate input and add download task to queue.
@@ -88,89 +603,106 @@ class DownloadManager:
             )
             return
 
-        # Handle different download modes
-        if mode in ["Playlist Video", "Playlist MP3"]:
+        try:
+            # Optional time ranges to download instead of the whole video
+            sections = None
+            if mode in SINGLE_MODES and hasattr(self.main_app, "sections_entry"):
+                try:
+                    sections = parse_sections(self.main_app.sections_entry.text())
+                except ValueError as e:
+                    raise ValueError(f"Clip ranges: {e}") from e
+            self.queue_url(url, save_path, mode, sections)
+        except ValueError as e:
+            QMessageBox.critical(self.main_app, "Error", str(e))
+
+    def queue_url(
+        self,
+        url: str,
+        save_path: str,
+        mode: str,
+        sections: Optional[List[Section]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Add a URL to the queue in one of the download modes.
+
+        Playlists and channels are listed in the background and then shown
+        in the video selection dialog.
+
+        Args:
+            url: Video, playlist or channel URL
+            save_path: Download destination path
+            mode: One of DOWNLOAD_MODES
+            sections: Time ranges to download (single videos only)
+
+        Returns:
+            The queued task, or None for playlists and channels
+
+        Raises:
+            ValueError: If the mode is unknown or the URL does not fit it
+        """
+        if mode in ("Playlist Video", "Playlist MP3"):
             self._handle_playlist_download(url, save_path, mode)
-        elif mode in [
-            "Channel Videos",
-            "Channel Videos MP3",
-            "Channel Shorts",
-            "Channel Shorts MP3",
-        ]:
+        elif mode in CHANNEL_MODES:
             self._handle_channel_download(url, save_path, mode)
+        elif mode in SINGLE_MODES:
+            return self._handle_single_download(url, save_path, mode, sections)
         else:
-            # Single video or MP3 only
-            self._handle_single_download(url, save_path, mode)
+            raise ValueError(f"Unknown download mode: {mode}")
+        return None
 
     def _handle_playlist_download(self, url: str, save_path: str, mode: str) -> None:
         """Handle playlist download mode."""
         if "list=" not in url:
-            QMessageBox.critical(
-                self.main_app,
-                "Error",
+            raise ValueError(
                 "The URL does not appear to be a playlist URL.\n"
-                "Playlist URLs should contain 'list=' parameter.",
+                "Playlist URLs should contain 'list=' parameter."
             )
-            return
-        threading.Thread(
-            target=self.process_playlist, args=(url, save_path, mode), daemon=True
-        ).start()
+        self.orchestrator.submit(
+            ("extract", url), self.process_playlist, url, save_path, mode
+        )
 
     def _handle_channel_download(self, url: str, save_path: str, mode: str) -> None:
         """Handle channel download mode."""
         if "youtube.com/@" not in url and "/channel/" not in url:
-            QMessageBox.critical(
-                self.main_app,
-                "Error",
+            raise ValueError(
                 "The URL does not appear to be a channel URL.\n"
-                "Channel URLs should contain '@' or '/channel/'.",
+                "Channel URLs should contain '@' or '/channel/'."
             )
-            return
         if "?" in url:
-            QMessageBox.critical(
-                self.main_app,
-                "Error",
+            raise ValueError(
                 "Please use a clean channel URL without query parameters.\n"
-                "Example: https://www.youtube.com/@channelname",
+                "Example: https://www.youtube.com/@channelname"
             )
-            return
-        threading.Thread(
-            target=self.process_channel, args=(url, save_path, mode), daemon=True
-        ).start()
+        self.orchestrator.submit(
+            ("extract", url), self.process_channel, url, save_path, mode
+        )
 
-    def _handle_single_download(self, url: str, save_path: str, mode: str) -> None:
+    def _handle_single_download(
+        self,
+        url: str,
+        save_path: str,
+        mode: str,
+        sections: Optional[List[Section]] = None,
+    ) -> Dict[str, Any]:
         """Handle single video or MP3-only download."""
         # Validate that the URL belongs to a trusted YouTube domain
         trusted_domains = ("youtube.com/", "youtu.be/", "music.youtube.com/")
         if not any(domain in url for domain in trusted_domains):
-            QMessageBox.critical(
-                self.main_app,
-                "Error",
+            raise ValueError(
                 "The URL does not appear to be a valid YouTube URL.\n"
-                "Only URLs from youtube.com, youtu.be or music.youtube.com are accepted.",
+                "Only URLs from youtube.com, youtu.be or music.youtube.com "
+                "are accepted."
             )
-            return
-        
+
         # Create download task
-        task = {
-            "url": url,
-            "save_path": save_path,
-            "mode": mode,
-            "audio_quality": (
-                self.main_app.audio_quality_default if "MP3" in mode else None
-            ),
-            "video_quality": (
-                self.main_app.video_quality_combo.currentText()
-                if "MP3" not in mode
-                else "Best Available"
-            ),
-        }
+        task = self._create_task(url, save_path, mode, sections)
 
         self.main_app.download_queue.append(task)
         self.main_app.log_message(f"Task added to queue: {mode}")
         self.process_queue()
+        return task
 
-    def process_playlist(self, url: str, save_path: str, mode: str) -> None:
+    async def process_playlist(self, url: str, save_path: str, mode: str) -> None:
         """
         Process playlist URL and show video selection dialog.
 
@@ -182,28 +714,18 @@ class DownloadManager:
         try:
             # Use yt-dlp.exe to extract playlist information
             yt_dlp_path = os.path.join(self.main_app.base_dir, "bin", "yt-dlp.exe")
-            cmd = [yt_dlp_path, "--quiet", "--flat-playlist", "--dump-json", url]
-
-            creationflags = 0
-            if sys.platform == "win32":
-                creationflags = subprocess.CREATE_NO_WINDOW
-
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True,
-                creationflags=creationflags,
-            )
+            cmd = listing_command(yt_dlp_path, url)
 
-            entries = []
-            for line in result.stdout.strip().split("\n"):
-                if line.strip():
-                    try:
-                        entry = json.loads(line)
-                        entries.append(entry)
-                    except json.JSONDecodeError:
-                        continue
+            entries: List[Entry] = []
+            try:
+                await self.orchestrator.stream(
+                    ("extract", url),
+                    cmd,
+                    lambda line: entries.extend(read_entries([line])),
+                    check=True,
+                )
+            finally:
+                self.executor.take_usage(("extract", url))
 
             if not entries:
                 QMessageBox.warning(
@@ -212,6 +734,8 @@ class DownloadManager:
                 return
 
         except Exception as e:
+            if self.orchestrator.is_shutting_down:
+                return
             QMessageBox.critical(
                 self.main_app, "Error", f"Failed to extract playlist information: {e}"
             )
@@ -222,7 +746,7 @@ class DownloadManager:
             (entries, save_path, mode, "Select Videos from Playlist")
         )
 
-    def process_channel(self, url: str, save_path: str, mode: str) -> None:
+    async def process_channel(self, url: str, save_path: str, mode: str) -> None:
         """
         Process channel URL and show video selection dialog.
 
@@ -239,38 +763,22 @@ class DownloadManager:
         try:
             # Use yt-dlp.exe to extract channel information
             yt_dlp_path = os.path.join(self.main_app.base_dir, "bin", "yt-dlp.exe")
-            cmd = [yt_dlp_path, "--quiet", "--flat-playlist", "--dump-json", url]
-
-            creationflags = 0
-            if sys.platform == "win32":
-                creationflags = subprocess.CREATE_NO_WINDOW
-
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True,
-                creationflags=creationflags,
-            )
+            cmd = listing_command(yt_dlp_path, url)
 
-            entries = []
-            for line in result.stdout.strip().split("\n"):
-                if line.strip():
-                    try:
-                        entry = json.loads(line)
-                        entries.append(entry)
-                    except json.JSONDecodeError:
-                        continue
-
-            # Filter entries based on content type
-            if "Shorts" in mode:
-                # Filter for shorts content
-                entries = [e for e in entries if "shorts" in e.get("url", "").lower()]
-            else:
-                # Filter out shorts for regular videos
-                entries = [
-                    e for e in entries if "shorts" not in e.get("url", "").lower()
-                ]
+            # Keep only shorts or only regular videos while reading
+            shorts = "Shorts" in mode
+            entries: List[Entry] = []
+            try:
+                await self.orchestrator.stream(
+                    ("extract", url),
+                    cmd,
+                    lambda line: entries.extend(
+                        read_entries([line], lambda e: is_short(e) == shorts)
+                    ),
+                    check=True,
+                )
+            finally:
+                self.executor.take_usage(("extract", url))
 
             if not entries:
                 content_type = "shorts" if "Shorts" in mode else "videos"
@@ -280,6 +788,8 @@ class DownloadManager:
                 return
 
         except Exception as e:
+            if self.orchestrator.is_shutting_down:
+                return
             QMessageBox.critical(
                 self.main_app, "Error", f"Failed to extract channel information: {e}"
             )
@@ -294,13 +804,13 @@ class DownloadManager:
         self.signals.result.emit((entries, save_path, mode, dialog_title))
 
     def _show_video_selection_dialog(
-        self, entries: List[Dict], save_path: str, mode: str, title: str
+        self, entries: List[Entry], save_path: str, mode: str, title: str
     ) -> None:
         """
         Show dialog for selecting videos from playlist or channel.
 
         Args:
-            entries: List of video entries
+            entries: Video entries of the listing
             save_path: Download destination path
             mode: Download mode
             title: Dialog window title
@@ -329,16 +839,10 @@ class DownloadManager:
         # Create checkboxes for each video
         checkboxes = []
         for entry in entries:
-            video_url = entry.get("url")
-
-            # Ensure URL is absolute
-            if video_url and not video_url.startswith("http"):
-                base_url = entry.get("webpage_url", "https://www.youtube.com")
-                video_url = base_url.rstrip("/") + "/" + video_url.lstrip("/")
+            video_url = entry.absolute_url()
 
             # Create checkbox with video title
-            title = entry.get("title", "Unknown Title")
-            cb = QCheckBox(title)
+            cb = QCheckBox(entry.title or "Unknown Title")
 
             # Add video favicon if available
             if self.main_app.video_favicon_pixmap:
@@ -403,19 +907,7 @@ class DownloadManager:
         # Add selected videos to download queue
         for video_url, cb in checkboxes:
             if cb.isChecked() and video_url:
-                task = {
-                    "url": video_url,
-                    "save_path": save_path,
-                    "mode": mode,
-                    "audio_quality": (
-                        self.main_app.audio_quality_default if "MP3" in mode else None
-                    ),
-                    "video_quality": (
-                        self.main_app.video_quality_combo.currentText()
-                        if "MP3" not in mode
-                        else "Best Available"
-                    ),
-                }
+                task = self._create_task(video_url, save_path, mode)
                 self.main_app.download_queue.append(task)
                 selected_count += 1
 
@@ -433,28 +925,271 @@ class DownloadManager:
 
     def process_queue(self) -> None:
         """
-        Process the download queue by starting the next download.
+        Process the download queue by starting as many downloads as allowed.
 
-        This method ensures only one download runs at a time and automatically
-        processes the next item in the queue when the current download completes.
+        The number of parallel downloads follows the adaptive concurrency
+        limit, and the next items are started automatically as running
+        downloads complete. Tasks whose destination disk has no free slot
+        are skipped, so a slow disk does not hold back the others.
         """
-        # Update queue status
-        if hasattr(self.main_app, "queue_status_label"):
-            self.main_app.queue_status_label.setText(
-                f"Queue: {len(self.main_app.download_queue)} pending"
-            )
+        if self.executor.is_shutting_down:
+            return
 
-        # Start next download if not already downloading and queue has items
-        if not self.main_app.downloading and self.main_app.download_queue:
-            task = self.main_app.download_queue.pop(0)
+        # Fill free download slots from the front of the queue; a bandwidth
+        # cap allows only as many downloads as get a useful share of it
+        limit = self.concurrency.limit
+        max_tasks = self.bandwidth.max_tasks()
+        if max_tasks is not None:
+            limit = min(limit, max_tasks)
+        while len(self.active_tasks) < limit:
+            task = self._next_startable_task()
+            if task is None:
+                break
+            self.main_app.download_queue.remove(task)
+            task["device_path"] = self._write_path(task)
+            self.device_limits.acquire(task["device_path"])
+            self.active_tasks[task["id"]] = task
             self.main_app.downloading = True
+            task["progress"] = 0
+            task.pop("rate_started", None)
+            self._set_task_state(task, "downloading")
+
+            # Start download as a coroutine on the orchestrator loop
+            self.orchestrator.submit(task["id"], self.download_video, task)
+
+        # Resolve the next tasks' metadata while these download
+        self._prefetch_upcoming()
+
+        # Space may also be freed outside the app; look again periodically
+        if any(task.get("space_held") for task in self.main_app.download_queue):
+            if self._space_timer is None:
+                self._space_timer = QTimer()
+                self._space_timer.setSingleShot(True)
+                self._space_timer.timeout.connect(self.process_queue)
+            if not self._space_timer.isActive():
+                self._space_timer.start(30 * 1000)
+
+        self._update_queue_status()
+
+    def _next_startable_task(self) -> Optional[Dict[str, Any]]:
+        """
+        First queued task whose destination device has a free slot.
+
+        Tasks held back for disk space are skipped until their estimated
+        size fits again.
+        """
+        for task in self.main_app.download_queue:
+            path = self._write_path(task)
+            if not self.device_limits.can_start(path):
+                continue
+            if task.get("space_held"):
+                size = task.get("size_estimate")
+                if not all(
+                    self.disk_space.fits(p, size) for p in {path, task["save_path"]}
+                ):
+                    continue
+                task["space_held"] = False
+            return task
+        return None
+
+    def _write_path(self, task: Dict[str, Any]) -> str:
+        """
+        Directory a task writes its files into while downloading.
+
+        With a staging directory configured, each task downloads and
+        post-processes in its own subdirectory there. A task keeps the
+        directory it started in, so a resumed task finds its .part files.
+        """
+        if "stage_dir" in task:
+            return task["stage_dir"] or task["save_path"]
+        if self.staging_dir:
+            return os.path.join(self.staging_dir, f"task-{os.getpid()}-{task['id']}")
+        return task["save_path"]
+
+    def _finish_download(self, task: Dict[str, Any]) -> None:
+        """
+        Hand a successful download over to its final destination.
+
+        Staged files are moved by the background mover; otherwise the task
+        is finalized right away.
+        """
+        stage_dir = task.get("stage_dir")
+        if not stage_dir:
+            files = [
+                path
+                for path in dict.fromkeys(task["outputs"])
+                if os.path.isfile(path) and not PARTIAL_FILE_PATTERN.search(path)
+            ]
+            self._finalize_task(task, files)
+            return
+
+        self._set_task_state(task, "moving")
+        self.mover.submit(
+            finished_files(stage_dir),
+            task["save_path"],
+            lambda moved, error: self._on_files_moved(task, moved, error),
+        )
+
+    def _on_files_moved(
+        self, task: Dict[str, Any], moved: List[str], error: Optional[Exception]
+    ) -> None:
+        """Finish a staged task once the mover is done (mover thread)."""
+        self.disk_space.release(("destination", task["id"]))
+        if error is not None:
+            self.main_app.log_message(
+                f"Moving {self._task_label(task)} to {task['save_path']} failed: "
+                f"{error}. Staged files are kept in {task['stage_dir']}"
+            )
+            self._set_task_state(task, "failed")
+            self.main_app.downloadErrorSignal.emit(
+                (task, DownloadError(f"Moving to save path failed: {error}"))
+            )
+            return
+
+        try:
+            os.rmdir(task["stage_dir"])
+        except OSError:
+            pass
+        self._finalize_task(task, moved)
+
+    def _finalize_task(self, task: Dict[str, Any], files: List[str]) -> None:
+        """Record the final files of a task and mark it completed."""
+        task["files"] = files
+        try:
+            for path in files:
+                self.library.add_file(
+                    path, title=task.get("title"), video_id=task.get("video_id")
+                )
+        except (OSError, sqlite3.Error) as e:
+            self.main_app.log_message(f"Could not add files to the library: {e}")
+        self._set_task_state(task, "completed")
+        self.analyze_loudness(files)
+
+    @property
+    def library(self) -> MediaLibrary:
+        """Index of downloaded files, opened on first use."""
+        with self._library_lock:
+            if self._library is None:
+                self._library = MediaLibrary(
+                    os.path.join(self.main_app.base_dir, "library.db")
+                )
+            return self._library
+
+    def rescan_library(self, directory: Optional[str] = None) -> None:
+        """
+        Update the library index of a folder in the background.
+
+        Only new and changed files are read, so rescanning a large folder
+        is quick.
+
+        Args:
+            directory: Folder to scan; defaults to the current save path
+        """
+        directory = directory or self.main_app.path_entry.text().strip()
+        if not directory:
+            QMessageBox.critical(self.main_app, "Error", "Please select a save path.")
+            return
+        self.executor.submit(self._scan_library, directory, name="library-scan")
+
+    def _scan_library(self, directory: str) -> None:
+        """Scan a folder into the library (worker thread)."""
+        started = time.monotonic()
+        try:
+            counts = self.library.scan(directory)
+        except (OSError, sqlite3.Error) as e:
+            self.main_app.log_message(f"Library scan of {directory} failed: {e}")
+            return
+        self.main_app.log_message(
+            f"Library scan of {directory} finished in "
+            f"{time.monotonic() - started:.1f}s: {counts['added']} added, "
+            f"{counts['updated']} updated, {counts['removed']} removed, "
+            f"{counts['unchanged']} unchanged ({self.library.count()} files indexed)"
+        )
+
+    def analyze_loudness(self, paths: List[str]) -> List[Future]:
+        """
+        Measure the loudness of audio files in the background.
+
+        Files with a current measurement in the library are skipped. Each
+        result is stored in the library and loudness_measured is emitted
+        with the file's normalization gain.
 
-            # Start download in background thread
-            threading.Thread(
-                target=self.download_video, args=(task,), daemon=True
-            ).start()
+        Returns:
+            Futures of the started measurements
+        """
+        with self._measuring_lock:
+            pending = [
+                path
+                for path in paths
+                if is_audio_file(path) and path not in self._measuring
+            ]
+            self._measuring.update(pending)
+        try:
+            measured = [path for path in pending if self.library.loudness(path)]
+        except sqlite3.Error:
+            measured = []
+        with self._measuring_lock:
+            self._measuring.difference_update(measured)
+        pending = [path for path in pending if path not in measured]
+        return self.loudness.analyze(pending, self._on_loudness_measured)
+
+    def _on_loudness_measured(
+        self, path: str, loudness: Optional[Loudness], error: Optional[Exception]
+    ) -> None:
+        """Store a loudness measurement (analyzer thread)."""
+        with self._measuring_lock:
+            self._measuring.discard(path)
+        if error is not None:
+            self.main_app.log_message(str(error))
+            return
+        try:
+            self.library.set_loudness(path, loudness)
+        except (OSError, sqlite3.Error) as e:
+            self.main_app.log_message(f"Could not store loudness of {path}: {e}")
+        self.signals.loudness_measured.emit(path, gain_for(loudness))
+
+    def loudness_gain(self, path: str) -> Optional[float]:
+        """
+        Normalization gain of a file in dB.
+
+        Returns:
+            The gain if the file was measured; otherwise None, and the file
+            is measured in the background
+        """
+        try:
+            loudness = self.library.loudness(path)
+        except sqlite3.Error:
+            loudness = None
+        if loudness is not None:
+            return gain_for(loudness)
+        self.analyze_loudness([path])
+        return None
+
+    def analyze_library(self) -> None:
+        """Measure all library tracks that have no loudness yet."""
+        self.executor.submit(self._analyze_library, name="loudness-batch")
+
+    def _analyze_library(self) -> None:
+        """Measure the library and log a summary (worker thread)."""
+        started = time.monotonic()
+        try:
+            paths = [
+                path
+                for path in self.library.unmeasured_files()
+                if is_audio_file(path) and os.path.exists(path)
+            ]
+        except sqlite3.Error as e:
+            self.main_app.log_message(f"Loudness analysis failed: {e}")
+            return
+        self.main_app.log_message(f"Analyzing loudness of {len(paths)} track(s)")
+        futures = self.analyze_loudness(paths)
+        wait(futures)
+        self.main_app.log_message(
+            f"Loudness analysis of {len(futures)} track(s) finished in "
+            f"{time.monotonic() - started:.1f}s"
+        )
 
-    def download_video(self, task: Dict[str, Any]) -> None:
+    async def download_video(self, task: Dict[str, Any]) -> None:
         """
         Download video/audio based on task configuration using yt-dlp.exe.
 
@@ -466,245 +1201,651 @@ class DownloadManager:
                 - audio_quality: Audio quality for MP3 extraction
                 - video_quality: Video quality preference
 
-        This method runs in a background thread to avoid blocking the UI.
+        This coroutine runs on the orchestrator loop; blocking steps are
+        handed to its thread pool.
         """
         url = task["url"]
-        save_path = task["save_path"]
-        mode = task["mode"]
-        video_quality = task.get("video_quality", "Best Available")
+        task_id = task.get("id")
 
         self.main_app.update_status(f"Starting download: {os.path.basename(url)}")
 
         try:
-            # Get yt-dlp.exe path
-            yt_dlp_path = os.path.join(self.main_app.base_dir, "bin", "yt-dlp.exe")
-            ffmpeg_path = os.path.join(self.main_app.base_dir, "bin", "ffmpeg.exe")
+            # Download into the staging directory if one is configured
+            save_path = self._write_path(task)
+            if save_path != task["save_path"]:
+                os.makedirs(save_path, exist_ok=True)
+                task["stage_dir"] = save_path
+            else:
+                task["stage_dir"] = None
 
-            # Build command based on mode
-            if "Video" in mode and "MP3" not in mode:
-                # Video download
-                cmd = self._build_video_download_command(
-                    yt_dlp_path, ffmpeg_path, url, save_path, video_quality
+            ffmpeg_path = os.path.join(self.main_app.base_dir, "bin", "ffmpeg.exe")
+            cmd = self._download_command(task, save_path)
+            task.pop("cookie_version", None)
+            if "--cookies" in cmd:
+                task["cookie_version"] = await self.orchestrator.to_thread(
+                    self.cookies.prepare, task_id
                 )
-            else:
-                # Audio extraction
-                cmd = self._build_audio_download_command(
-                    yt_dlp_path,
-                    ffmpeg_path,
-                    url,
-                    save_path,
-                    task.get("audio_quality", "320"),
+                self.main_app.log_message(
+                    f"Using {self.cookies.source} cookies for authentication"
                 )
 
-            # Use Node.js as JavaScript runtime (required by YouTube)
-            cmd.extend(["--js-runtimes", "node"])   # ADDED
-
-
-            # Add cookie support if enabled
-            if self.main_app.use_cookies and self.main_app.cookie_file:
-                cmd.extend(["--cookies", self.main_app.cookie_file])
-                self.main_app.log_message("Using cookie file for authentication")
-
-            # Get video info first for logging
-            info_cmd = [yt_dlp_path, "--quiet", "--dump-json", "--no-playlist", url]
-            if self.main_app.use_cookies and self.main_app.cookie_file:
-                info_cmd.extend(["--cookies", self.main_app.cookie_file])
-
+            # Get video info first for logging and the size estimate, unless
+            # it was prefetched while the task was queued
+            info_cmd = self._info_command(cmd)
+            info = await self.prefetcher.result(task_id, info_cmd) or {}
             try:
-                creationflags = 0
-                if sys.platform == "win32":
-                    creationflags = subprocess.CREATE_NO_WINDOW
-                info_result = subprocess.run(
-                    info_cmd,
-                    capture_output=True,
-                    text=True,
-                    check=True,
-                    creationflags=creationflags,
-                )
-                info = json.loads(info_result.stdout)
-                title = info.get("title", "Unknown Title")
-            except:
+                if not info:
+                    info = await self._fetch_info(task_id, info_cmd)
+                self._apply_info(task, info)
+                title = task["title"]
+            except Exception:
                 title = "Unknown Title"
 
+            task["title"] = title
+            self.signals.task_updated.emit(task)
+
+            # Hold the task back instead of failing it halfway through
+            short_path = self._reserve_space(task, save_path)
+            if short_path is not None:
+                self._hold_for_space(task, short_path)
+                return
+
             self.main_app.log_message(f"Starting download: {title}")
 
-            # Execute download command
-            creationflags = 0
-            if sys.platform == "win32":
-                creationflags = subprocess.CREATE_NO_WINDOW
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                universal_newlines=True,
-                creationflags=creationflags,
+            # Take what the running tasks leave of the bandwidth budget
+            task["rate_limit"] = self.bandwidth.allocate(
+                other.get("rate_limit")
+                for other in list(self.active_tasks.values())
+                if other is not task and "rate_started" in other
             )
+            task["rate_started"] = time.monotonic()
+            if task["rate_limit"] is not None:
+                cmd.extend(["--limit-rate", str(int(task["rate_limit"]))])
+
+            self._enter_stage(task, "download")
+            task.pop("stalled", None)
+            self.stall_watchdog.watch(task_id, self._on_task_stalled)
 
             # Read output line by line for progress updates
-            if process.stdout:
-                for line in iter(process.stdout.readline, ""):
-                    line = line.strip()
-                    if line:
-                        self.main_app.log_message(line)
-                        progress = self._parse_progress(line)
-                        if progress is not None:
-                            self.main_app.updateProgressSignal.emit(progress)
+            started = time.monotonic()
+            finished_bytes = current_bytes = 0.0
+            # Downloads running meanwhile, sampled with each transfer line
+            parallel_total, parallel_samples = len(self.active_tasks), 1
+            section_index = -1
+            error_lines: List[str] = []
+            recent_lines = collections.deque(maxlen=5)
+
+            def handle_line(line: str) -> None:
+                nonlocal finished_bytes, current_bytes, section_index
+                nonlocal parallel_total, parallel_samples
+                line = line.strip()
+                if not line:
+                    return
+                self.main_app.log_message(line)
+                recent_lines.append(line)
+                if line.startswith("ERROR:"):
+                    error_lines.append(line)
+                # Throttling shows up as retried 429s before any failure
+                elif "429" in line and classify_error(line) == RATE_LIMITED:
+                    self.concurrency.on_throttle()
+                if is_postprocessor_line(line):
+                    self._enter_stage(task, "postprocess")
+                if line.startswith("[download] Destination:"):
+                    section_index += 1
+                output_path = self._parse_output_path(line)
+                if output_path and output_path not in task["outputs"]:
+                    task["outputs"].append(output_path)
+                    self.executor.track_output(task_id, output_path)
+                    finished_bytes += current_bytes
+                    current_bytes = 0.0
+                progress = parse_progress(line)
+                if progress is None and task["sections"]:
+                    progress = self._clip_progress(task, section_index, line)
+                if progress is not None:
+                    task["progress"] = progress
+                    self._emit_overall_progress()
+                transfer = self._parse_transfer(line)
+                if transfer is not None:
+                    current_bytes = transfer[0]
+                    self.disk_space.update(task_id, finished_bytes + current_bytes)
+                    parallel_total += len(self.active_tasks)
+                    parallel_samples += 1
+                self._report_heartbeat(task_id, line)
+
+            # Fetch plain HTTP formats in parallel segments; yt-dlp then
+            # finds them downloaded and only merges or converts them
+            downloads = direct_downloads(info)
+            if (
+                self.segmented_downloads
+                and downloads
+                and task["rate_limit"] is None
+                and not task["sections"]
+            ):
+                finished_bytes = await self.orchestrator.to_thread(
+                    self._fetch_segmented, task, downloads
+                )
+
+            if (
+                task["state"] == "downloading"
+                and not task.get("stalled")
+                and not task.get("restart")
+            ):
+                # Execute download command as a tracked process tree
+                returncode = await self.orchestrator.stream(
+                    task_id, cmd, handle_line
+                )
+            else:
+                # Interrupted during the segmented fetch
+                returncode = -1
+            task["downloaded_bytes"] = (
+                task.get("downloaded_bytes", 0) + finished_bytes + current_bytes
+            )
+            self.stall_watchdog.unwatch(task_id)
+
+            # Cancelled while yt-dlp was still writing; remove what it left
+            if task["state"] == "cancelled":
+                remove_files(find_partial_files(task["outputs"]))
+
+            # Stopped to apply a new bandwidth share; requeue immediately
+            restart = task.pop("restart", False)
+            if restart and returncode != 0 and task["state"] == "downloading":
+                task["interrupted"] = True
+                self._set_task_state(task, "retrying")
+                self.signals.retry_scheduled.emit(task, 0.0)
+                return
 
-            process.wait()
+            # Killed by the stall watchdog; retry like a network failure
+            if task.get("stalled"):
+                raise DownloadError(
+                    f"No download progress ({task['stalled']})", STALLED
+                )
+
+            # Paused or cancelled by the user; nothing to report
+            if task["state"] != "downloading":
+                return
 
             # Check if download was successful
-            if process.returncode == 0:
+            if returncode == 0:
+                elapsed = time.monotonic() - started
+                if elapsed > 0 and finished_bytes + current_bytes:
+                    task["throughput"] = (finished_bytes + current_bytes) / elapsed
+                    task["parallel"] = parallel_total / parallel_samples
                 self.main_app.log_message(f"Download completed: {title}")
+                if task["split_chapters"] and task.get("chapters"):
+                    self._enter_stage(task, "postprocess")
+                    await self.orchestrator.to_thread(
+                        self._split_chapters, task, ffmpeg_path
+                    )
+                    if task["state"] != "downloading":
+                        return
+                self._enter_stage(task, "finalize")
+                await self.orchestrator.to_thread(self._finish_download, task)
             else:
-                raise subprocess.CalledProcessError(process.returncode, cmd)
+                message = "\n".join(error_lines or recent_lines) or (
+                    f"yt-dlp exited with code {returncode}"
+                )
+                raise DownloadError(message, classify_error(message))
 
         except Exception as e:
+            if self.orchestrator.is_shutting_down or task["state"] != "downloading":
+                return
+
+            if not isinstance(e, DownloadError):
+                e = DownloadError(str(e), classify_error(str(e)))
+
             error_msg = f"Download failed for {url}: {str(e)}"
             self.main_app.log_message(error_msg)
 
-            # Show detailed error dialog in main thread
+            if e.category == RATE_LIMITED:
+                self.concurrency.on_throttle()
+
+            # Retry transient failures with backoff; partial files are kept
+            task["attempts"] += 1
+
+            # Refused with the current cookies; retry once with fresh ones
+            if (
+                e.category == AUTH
+                and "cookie_version" in task
+                and not task.get("cookies_refreshed")
+                and await self.orchestrator.to_thread(
+                    self.cookies.refresh, task["cookie_version"]
+                )
+            ):
+                task["cookies_refreshed"] = True
+                self._set_task_state(task, "retrying")
+                self.main_app.log_message(
+                    f"Retrying with refreshed {self.cookies.source} cookies"
+                )
+                self.signals.retry_scheduled.emit(task, 0.0)
+                return
+
+            if self.retry_policy.should_retry(e.category, task["attempts"]):
+                delay = self.retry_policy.delay(task["attempts"])
+                self._set_task_state(task, "retrying")
+                self.main_app.log_message(
+                    f"Retrying ({e.category}) in {delay:.0f}s, attempt "
+                    f"{task['attempts'] + 1} of {self.retry_policy.max_attempts}"
+                )
+                self.signals.retry_scheduled.emit(task, delay)
+                return
+
+            self._set_task_state(task, "failed")
+
+            # Collect the failure for the summary shown in the main thread
             # Use a signal to safely call across threads
-            self.main_app.downloadErrorSignal.emit(e)
+            self.main_app.downloadErrorSignal.emit((task, e))
 
         finally:
+            self.stall_watchdog.unwatch(task_id)
+            self.disk_space.release(task_id)
+            # Staged files still need their room on the save path until moved
+            if task["state"] != "moving":
+                self.disk_space.release(("destination", task_id))
+            self.cookies.release(task_id)
+            self.executor.finish(task_id)
+
             # Mark download as complete and process next in queue using signal
-            self.signals.download_complete.emit()
+            self.signals.download_complete.emit(task)
+
+    def _split_chapters(self, task: Dict[str, Any], ffmpeg_path: str) -> None:
+        """
+        Replace a downloaded MP3 by one file per chapter (blocking thread).
+
+        Clips are not split, since their chapter marks refer to the full
+        video.
+
+        Raises:
+            DownloadError: If ffmpeg could not write a chapter
+        """
+        source = next(
+            (
+                path
+                for path in reversed(task["outputs"])
+                if path.endswith(".mp3") and os.path.isfile(path)
+            ),
+            None,
+        )
+        if source is None or task["sections"]:
+            return
+
+        chapters = task["chapters"]
+        self.main_app.log_message(
+            f"Splitting {self._task_label(task)} into {len(chapters)} chapters"
+        )
+        # Let a cancel remove the chapter files written so far
+        for path in chapter_paths(source, chapters):
+            self.executor.track_output(task["id"], path)
+
+        try:
+            paths = ChapterSplitter(ffmpeg_path).split(
+                source,
+                chapters,
+                lambda cmd: self.executor.run(task["id"], cmd),
+                task.get("audio_quality"),
+            )
+        except subprocess.CalledProcessError as e:
+            message = (e.stderr or "").strip() or str(e)
+            raise DownloadError(
+                f"Splitting into chapters failed: {message}", POSTPROCESSING
+            )
+
+        task["outputs"].extend(paths)
+        remove_files([source])
+
+    def _download_command(self, task: Dict[str, Any], save_path: str) -> List[str]:
+        """yt-dlp command for a task writing into save_path."""
+        cmd = download_command(
+            self.main_app.base_dir,
+            task["url"],
+            save_path,
+            task["mode"],
+            task.get("video_quality", "Best Available"),
+            task.get("audio_quality", "320"),
+            task.get("sections"),
+        )
+
+        # Add cookie support if enabled; the file is written by prepare()
+        if self.cookies.enabled:
+            cmd.extend(["--cookies", self.cookies.cookie_path(task["id"])])
+        return cmd
+
+    def _info_command(self, cmd: List[str]) -> List[str]:
+        """
+        yt-dlp metadata command matching a download command.
+
+        It keeps every option of the download (format selection, output
+        template, ffmpeg location, JavaScript runtime, cookies), so yt-dlp
+        extracts the video the same way and reports the formats and file
+        names the download will use. --dump-json only simulates the run.
+        """
+        return [cmd[0], "--quiet", "--dump-json", *cmd[1:]]
+
+    async def _fetch_info(self, key: Any, info_cmd: List[str]) -> Dict[str, Any]:
+        """Run a metadata command on the orchestrator and parse its output."""
+        info_result = await self.orchestrator.run(
+            key, info_cmd, timeout=self.stall_watchdog.stall_timeout
+        )
+        return json.loads(info_result.stdout)
+
+    async def _prefetch_info(self, key: Any, info_cmd: List[str]) -> Dict[str, Any]:
+        """Metadata fetch of the prefetcher; key is ("prefetch", task id)."""
+        if "--cookies" in info_cmd:
+            await self.orchestrator.to_thread(self.cookies.prepare, key[1])
+        return await self._fetch_info(key, info_cmd)
+
+    def _apply_info(self, task: Dict[str, Any], info: Dict[str, Any]) -> None:
+        """Take the title, chapters and size estimate of a task from metadata."""
+        task["title"] = info.get("title", "Unknown Title")
+        task["video_id"] = info.get("id")
+        task["duration"] = info.get("duration")
+        task["chapters"] = info.get("chapters")
+        task["size_estimate"] = estimate_size(
+            info, task.get("audio_quality") if "MP3" in task["mode"] else None
+        )
+        if task["size_estimate"] and task["sections"] and task["duration"]:
+            clip = sum(section_lengths(task["sections"], task["duration"]))
+            task["size_estimate"] = int(
+                task["size_estimate"] * clip / task["duration"]
+            )
+
+    def _prefetch_upcoming(self) -> None:
+        """Prefetch the metadata of the next queued tasks."""
+        upcoming = [
+            task
+            for task in self.main_app.download_queue[: self.prefetcher.depth]
+            if task["state"] == "queued" and not task.get("space_held")
+        ]
+        self.prefetcher.schedule(
+            (
+                task["id"],
+                self._info_command(
+                    self._download_command(task, self._write_path(task))
+                ),
+            )
+            for task in upcoming
+        )
 
-    def _parse_progress(self, line: str) -> Optional[int]:
+    def _on_prefetched(self, task_id: int, info: Optional[Dict[str, Any]]) -> None:
+        """Show what a prefetch found out and prefetch the next task."""
+        task = self.tasks.get(task_id)
+        if info and task and task["state"] == "queued":
+            self._apply_info(task, info)
+            self._on_task_updated(task)
+        self._prefetch_upcoming()
+
+    def _fetch_segmented(
+        self, task: Dict[str, Any], downloads: List[Tuple[str, str, Dict]]
+    ) -> float:
         """
-        Parse download progress from yt-dlp output line.
+        Fetch the files of a task in parallel byte-range segments.
+
+        Runs in the orchestrator's thread pool. A file that cannot be fetched
+        this way is discarded and left to yt-dlp; an interrupted fetch keeps
+        its segment state so the next attempt resumes it.
 
         Args:
-            line: A single line of output from yt-dlp.
+            task: Task being downloaded
+            downloads: (url, path, headers) of its files from direct_downloads()
 
         Returns:
-            The progress percentage as an integer, or None if not found.
+            Bytes fetched
         """
-        # Look for percentage values (e.g., "  1.5% of ...")
-        match = re.search(r"\[download\]\s+([0-9.]+)%", line)
-        if match:
+        task_id = task["id"]
+        fetched = 0
+        for index, (url, path, headers) in enumerate(downloads):
+            if os.path.exists(path):
+                continue
+            if path not in task["outputs"]:
+                task["outputs"].append(path)
+                self.executor.track_output(task_id, path)
+
+            def on_progress(written: int, total: Optional[int]) -> None:
+                if total:
+                    task["progress"] = int(
+                        100 * (index + written / total) / len(downloads)
+                    )
+                    self._emit_overall_progress()
+                self.disk_space.update(task_id, fetched + written)
+                self.stall_watchdog.heartbeat(task_id, fetched + written)
+
+            download = SegmentedDownload(
+                url, path, headers, pool=self.http_pool, on_progress=on_progress
+            )
+            task["segmented"] = download
             try:
-                return int(float(match.group(1)))
-            except (ValueError, IndexError):
-                pass
+                self.main_app.log_message(
+                    f"[download] Segmented download: {os.path.basename(path)}"
+                )
+                fetched += download.run()
+            except (DownloadError, OSError) as e:
+                # Paused, cancelled, stalled or restarted
+                if (
+                    task["state"] != "downloading"
+                    or task.get("stalled")
+                    or task.get("restart")
+                ):
+                    return fetched + download.written
+                self.main_app.log_message(
+                    f"Segmented download failed, using yt-dlp instead: {e}"
+                )
+                download.discard()
+            finally:
+                task["segmented"] = None
+        return fetched
+
+    def _reserve_space(self, task: Dict[str, Any], write_path: str) -> Optional[str]:
+        """
+        Reserve a task's estimated size on the disks it writes to.
+
+        A staged task on another disk needs the room twice: in the staging
+        directory while it downloads, and on its save path once it is moved.
+
+        Returns:
+            The path without enough free space, or None if the task fits
+        """
+        size = task.get("size_estimate")
+        if not self.disk_space.try_reserve(task["id"], write_path, size):
+            return write_path
+        if write_path == task["save_path"]:
+            return None
+        try:
+            separate = device_id(write_path) != device_id(task["save_path"])
+        except OSError:
+            separate = False
+        if separate and not self.disk_space.try_reserve(
+            ("destination", task["id"]), task["save_path"], size
+        ):
+            self.disk_space.release(task["id"])
+            return task["save_path"]
         return None
 
-    def _build_video_download_command(
-        self,
-        yt_dlp_path: str,
-        ffmpeg_path: str,
-        url: str,
-        save_path: str,
-        video_quality: str,
-    ) -> List[str]:
+    def _hold_for_space(self, task: Dict[str, Any], path: str) -> None:
+        """Requeue a task that does not fit on its destination disk yet."""
+        try:
+            available = max(0, self.disk_space.available(path))
+        except OSError:
+            available = 0
+        self.main_app.log_message(
+            f"Not enough disk space for {self._task_label(task)} "
+            f"(needs ~{task['size_estimate'] / 1024 ** 2:.0f} MB, "
+            f"{available / 1024 ** 2:.0f} MB available); "
+            "waiting until space is freed"
+        )
+        task["space_held"] = True
+        task["interrupted"] = True
+        self._set_task_state(task, "retrying")
+        self.signals.retry_scheduled.emit(task, 0.0)
+
+    def _emit_overall_progress(self) -> None:
+        """Show the average progress of all running downloads."""
+        active = list(self.active_tasks.values())
+        if not active:
+            self.main_app.updateProgressSignal.emit(0)
+            return
+        total = sum(task.get("progress", 0) for task in active)
+        self.main_app.updateProgressSignal.emit(int(total / len(active)))
+
+    def _clip_progress(
+        self, task: Dict[str, Any], section_index: int, line: str
+    ) -> Optional[int]:
         """
-        Build yt-dlp.exe command for video download.
+        Progress of a clip download from an ffmpeg "time=" status line.
+
+        Sections are downloaded by ffmpeg one after another, so progress is
+        the time covered in finished sections plus the current position.
 
         Args:
-            yt_dlp_path: Path to yt-dlp.exe
-            ffmpeg_path: Path to ffmpeg.exe
-            url: Video URL
-            save_path: Download destination path
-            video_quality: Preferred video quality
+            task: Task with "sections" and the video "duration"
+            section_index: Index of the section being downloaded
+            line: A single line of output from yt-dlp/ffmpeg.
 
         Returns:
-            List of command arguments
-        """
-        cmd = [
-            yt_dlp_path,
-            "--ffmpeg-location",
-            ffmpeg_path,
-            "--no-playlist",
-            "--output",
-            os.path.join(save_path, "%(title)s.%(ext)s"),
-            "--format",
-            "bestvideo[ext=mp4]+bestaudio[ext=m4a]/mp4",
-            "--merge-output-format",
-            "mp4",
-            url,
-        ]
+            The progress percentage as an integer, or None if not found.
+        """
+        match = re.search(r"\btime=(\d+):(\d{2}):(\d{2}(?:\.\d+)?)", line)
+        if not match:
+            return None
+        lengths = section_lengths(task["sections"], task.get("duration"))
+        if None in lengths or not sum(lengths):
+            return None
+        hours, minutes, seconds = match.groups()
+        position = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+        index = min(max(section_index, 0), len(lengths) - 1)
+        done = sum(lengths[:index]) + min(position, lengths[index])
+        return int(100 * done / sum(lengths))
+
+    def _parse_transfer(self, line: str) -> Optional[Tuple[float, Optional[float]]]:
+        """
+        Parse downloaded bytes and speed from a yt-dlp progress line.
 
-        # Apply quality filter if not "Best Available"
-        if video_quality != "Best Available":
-            height = video_quality.split("p")[0]
-            cmd[cmd.index("--format") + 1] = (
-                f"bestvideo[height<={height}]+bestaudio/merge"
-            )
+        Clip downloads run through ffmpeg, whose "size=" status lines give
+        the bytes written so far but no byte rate.
 
-        return cmd
+        Args:
+            line: A single line of output from yt-dlp.
 
-    def _build_audio_download_command(
-        self,
-        yt_dlp_path: str,
-        ffmpeg_path: str,
-        url: str,
-        save_path: str,
-        audio_quality: str,
-    ) -> List[str]:
+        Returns:
+            (downloaded_bytes, bytes_per_second) or None if not a progress
+            line. The speed is None when yt-dlp reports it as unknown.
+        """
+        match = re.search(r"\bsize=\s*([0-9.]+)\s*([kKMG]i?B)\s.*\btime=", line)
+        if match:
+            try:
+                return self._parse_size(match.group(1), match.group(2).upper()), None
+            except ValueError:
+                return None
+
+        match = re.search(
+            r"\[download\]\s+([0-9.]+)% of\s+~?\s*([0-9.]+)([KMGT]?i?B)"
+            r"(?:.*?\bat\s+([0-9.]+)([KMGT]?i?B)/s)?",
+            line,
+        )
+        if not match:
+            return None
+        try:
+            total = self._parse_size(match.group(2), match.group(3))
+            downloaded = total * float(match.group(1)) / 100
+            speed = None
+            if match.group(4):
+                speed = self._parse_size(match.group(4), match.group(5))
+        except ValueError:
+            return None
+        return downloaded, speed
+
+    def _parse_size(self, value: str, unit: str) -> float:
+        """Convert a yt-dlp size such as ("1.50", "MiB") to bytes."""
+        multipliers = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+        return float(value) * multipliers[unit[0] if unit[0] in "KMGT" else ""]
+
+    def _report_heartbeat(self, task_id: int, line: str) -> None:
+        """Feed progress from a yt-dlp output line to the stall watchdog."""
+        transfer = self._parse_transfer(line)
+        if transfer is not None:
+            self.stall_watchdog.heartbeat(task_id, *transfer, phase="download")
+        elif line.startswith(("[Merger]", "[ExtractAudio]", "[VideoConvertor]")):
+            self.stall_watchdog.heartbeat(task_id, phase="postprocess")
+        elif line.startswith("[download] Destination:"):
+            self.stall_watchdog.heartbeat(task_id, phase="download")
+
+    def _parse_output_path(self, line: str) -> Optional[str]:
         """
-        Build yt-dlp.exe command for audio extraction.
+        Parse a destination file path from yt-dlp output line.
 
         Args:
-            yt_dlp_path: Path to yt-dlp.exe
-            ffmpeg_path: Path to ffmpeg.exe
-            url: Video URL
-            save_path: Download destination path
-            audio_quality: Audio quality in kbps
+            line: A single line of output from yt-dlp.
 
         Returns:
-            List of command arguments
-        """
-        cmd = [
-            yt_dlp_path,
-            "--ffmpeg-location",
-            ffmpeg_path,
-            "--no-playlist",
-            "--output",
-            os.path.join(save_path, "%(title)s.%(ext)s"),
-            "--format",
-            "bestaudio/best",
-            "--extract-audio",
-            "--audio-format",
-            "mp3",
-            "--audio-quality",
-            audio_quality,
-            url,
-        ]
-
-        return cmd
+            The file path yt-dlp or ffmpeg is writing, or None if not found.
+        """
+        for pattern in (
+            r"^\[download\] Destination: (.+)$",
+            r"^\[ExtractAudio\] Destination: (.+)$",
+            r'^\[Merger\] Merging formats into "(.+)"$',
+        ):
+            match = re.search(pattern, line)
+            if match:
+                return match.group(1)
+        return None
 
-    def _show_download_error(self, error: Exception) -> None:
+    def _show_download_error(self, failure: Tuple[Dict[str, Any], Exception]) -> None:
         """
-        Show detailed download error dialog.
+        Record a failed download for the failure summary.
+
+        Failures are collected instead of opening one modal dialog per error,
+        so an unattended batch keeps running; the summary is shown once the
+        queue is idle.
 
         Args:
-            error: Exception that occurred during download
+            failure: (task, exception) tuple for the failed download
         """
-        error_text = str(error)
-
-        # Add helpful hints for common errors
-        if "Failed to decrypt with DPAPI" in error_text:
-            error_text += (
-                "\n\nTroubleshooting tips:\n"
+        task, error = failure
+        if not isinstance(error, DownloadError):
+            error = DownloadError(str(error), classify_error(str(error)))
+        self.failures.append((task, error))
+
+        # Failures reported after the queue drained (e.g. by the mover)
+        if self._is_idle():
+            self._show_failure_summary()
+
+    def _error_hint(self, error: DownloadError) -> str:
+        """Troubleshooting hint for a classified download error."""
+        if "Failed to decrypt with DPAPI" in str(error):
+            return (
+                "Troubleshooting tips:\n"
                 "• Ensure Chrome is completely closed\n"
                 "• Run yt-downloader-gui as the same user who uses Chrome\n"
                 "• Try exporting cookies manually\n"
                 "• Check if cookie file is recent and valid"
             )
-        elif "HTTP Error 403" in error_text:
-            error_text += (
-                "\n\nThis might be a private or age-restricted video.\n"
-                "Try logging in with cookies or check if the video is accessible."
-            )
-        elif "Video unavailable" in error_text:
-            error_text += (
-                "\n\nThe video might be:\n"
-                "• Deleted or made private\n"
-                "• Geo-blocked in your region\n"
-                "• Age-restricted (try using cookies)"
-            )
-
-        QMessageBox.critical(
-            self.main_app, "Download Error", f"Download failed:\n\n{error_text}"
+        return ERROR_HINTS.get(error.category, "")
+
+    def _show_failure_summary(self) -> None:
+        """Show one non-modal dialog summarizing all failed downloads."""
+        # Reuse an open summary instead of stacking dialogs
+        if self._failure_dialog is None or not self._failure_dialog.isVisible():
+            self._failure_dialog = QMessageBox(self.main_app)
+            self._failure_dialog.setIcon(QMessageBox.Icon.Warning)
+            self._failure_dialog.setWindowTitle("Download Errors")
+            self._failure_dialog.setModal(False)
+            self._summarized_failures = []
+        self._summarized_failures.extend(self.failures)
+        self.failures = []
+        failures = self._summarized_failures
+
+        counts = collections.Counter(error.category for _, error in failures)
+        summary = ", ".join(f"{count} {category}" for category, count in counts.items())
+
+        details = []
+        for task, error in failures:
+            details.append(f"{self._task_label(task)}\n[{error.category}] {error}")
+            hint = self._error_hint(error)
+            if hint:
+                details.append(hint)
+            details.append("")
+
+        self._failure_dialog.setText(
+            f"{len(failures)} download(s) failed ({summary}).\n"
+            "Failed tasks can be retried with Resume on the Activity page."
         )
+        self._failure_dialog.setDetailedText("\n".join(details))
+        self._failure_dialog.show()
@@ -0,0 +1,328 @@
+"""
+Download jobs shared by worker processes through an SQLite database.
+
+Workers on one or more machines claim jobs with a lease, renew it while
+they download and report the result. A job whose lease runs out (its
+worker crashed, lost the network or was killed) goes back to the queue
+and is picked up by the next worker that asks for work, so there is no
+coordinator process to keep running.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    save_path TEXT NOT NULL,
+    options TEXT NOT NULL,
+    state TEXT NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    not_before REAL NOT NULL,
+    attempts INTEGER NOT NULL,
+    max_attempts INTEGER NOT NULL,
+    progress INTEGER NOT NULL,
+    files TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, not_before, id);
+"""
+
+# Job states
+QUEUED = "queued"
+LEASED = "leased"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+DEFAULT_LEASE = 60.0
+DEFAULT_MAX_ATTEMPTS = 4
+
+
+class JobQueue:
+    """
+    Queue of download jobs in a database file shared by all workers.
+
+    All processes must reach the file through a file system with working
+    locks (a local disk, or an SMB share); their clocks must agree to well
+    within the lease time, as leases are compared against each worker's
+    own clock.
+    """
+
+    def __init__(self, db_path: str, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            db_path: SQLite database file, created if missing
+            clock: Wall-clock time source in seconds, mainly for tests
+        """
+        self.db_path = db_path
+        self._clock = clock
+        # Transactions are managed explicitly, see _transaction()
+        self._conn = sqlite3.connect(
+            db_path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Hold the database write lock for a read-modify-write.
+
+        BEGIN IMMEDIATE takes the lock up front, so two workers can never
+        claim the same job.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def add(
+        self,
+        url: str,
+        mode: str,
+        save_path: str,
+        options: Optional[Dict[str, Any]] = None,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ) -> int:
+        """
+        Queue a download.
+
+        Args:
+            url: Video URL
+            mode: Download mode, e.g. "MP3 Only"
+            save_path: Folder the worker saves to, as seen by the workers
+            options: video_quality, audio_quality and sections
+            max_attempts: Attempts before the job fails for good
+
+        Returns:
+            Id of the new job
+        """
+        now = self._clock()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (url, mode, save_path, options, state, "
+                "not_before, attempts, max_attempts, progress, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, 0, 0, ?, 0, ?, ?)",
+                (
+                    url,
+                    mode,
+                    save_path,
+                    json.dumps(options or {}),
+                    QUEUED,
+                    max_attempts,
+                    now,
+                    now,
+                ),
+            )
+            return cursor.lastrowid
+
+    def claim(
+        self, worker: str, lease_seconds: float = DEFAULT_LEASE
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Lease the oldest job that is due.
+
+        Jobs whose lease expired are returned to the queue first.
+
+        Args:
+            worker: Name of the claiming worker
+            lease_seconds: Seconds the worker has until it must renew
+
+        Returns:
+            The job, or None if nothing is due
+        """
+        now = self._clock()
+        with self._transaction() as conn:
+            self._expire_leases(conn, now)
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE state = ? AND not_before <= ? "
+                "ORDER BY id LIMIT 1",
+                (QUEUED, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET state = ?, worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1, progress = 0, updated = ? WHERE id = ?",
+                (LEASED, worker, now + lease_seconds, now, row["id"]),
+            )
+            return self._get(conn, row["id"])
+
+    def _expire_leases(self, conn: sqlite3.Connection, now: float) -> None:
+        """Requeue, or fail after their last attempt, jobs of dead workers."""
+        conn.execute(
+            "UPDATE jobs SET state = CASE WHEN attempts < max_attempts "
+            "THEN ? ELSE ? END, "
+            "error = 'Worker ' || worker || ' stopped responding', "
+            "worker = NULL, lease_expires = NULL, updated = ? "
+            "WHERE state = ? AND lease_expires < ?",
+            (QUEUED, FAILED, now, LEASED, now),
+        )
+
+    def heartbeat(
+        self,
+        job_id: int,
+        worker: str,
+        progress: Optional[int] = None,
+        lease_seconds: float = DEFAULT_LEASE,
+    ) -> bool:
+        """
+        Renew a lease and report progress.
+
+        Returns:
+            False if the worker no longer holds the job (its lease expired
+            and it was reassigned, or it was cancelled); the worker must
+            stop working on it
+        """
+        now = self._clock()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, "
+                "progress = COALESCE(?, progress), updated = ? "
+                "WHERE id = ? AND state = ? AND worker = ?",
+                (now + lease_seconds, progress, now, job_id, LEASED, worker),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker: str, files: List[str]) -> bool:
+        """
+        Record a finished job with the files it produced.
+
+        Returns:
+            False if the worker no longer held the job
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = ?, progress = 100, files = ?, error = NULL, "
+                "lease_expires = NULL, updated = ? "
+                "WHERE id = ? AND state = ? AND worker = ?",
+                (COMPLETED, json.dumps(files), self._clock(), job_id, LEASED, worker),
+            )
+            return cursor.rowcount == 1
+
+    def fail(
+        self,
+        job_id: int,
+        worker: str,
+        error: str,
+        retry_delay: Optional[float] = None,
+    ) -> bool:
+        """
+        Record a failed attempt.
+
+        Args:
+            job_id: Job that failed
+            worker: Worker that ran it
+            error: Error message
+            retry_delay: Seconds before the job may run again, or None if
+                the failure is permanent. Jobs out of attempts always fail.
+
+        Returns:
+            False if the worker no longer held the job
+        """
+        now = self._clock()
+        with self._transaction() as conn:
+            job = self._get(conn, job_id)
+            if job is None or job["state"] != LEASED or job["worker"] != worker:
+                return False
+            retry = retry_delay is not None and job["attempts"] < job["max_attempts"]
+            conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, not_before = ?, worker = ?, "
+                "lease_expires = NULL, updated = ? WHERE id = ?",
+                (
+                    QUEUED if retry else FAILED,
+                    error,
+                    now + retry_delay if retry else job["not_before"],
+                    None if retry else worker,
+                    now,
+                    job_id,
+                ),
+            )
+            return True
+
+    def release(self, job_id: int, worker: str) -> bool:
+        """
+        Give a job back without counting the attempt, e.g. on shutdown.
+
+        Returns:
+            False if the worker no longer held the job
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = ?, worker = NULL, lease_expires = NULL, "
+                "attempts = attempts - 1, updated = ? "
+                "WHERE id = ? AND state = ? AND worker = ?",
+                (QUEUED, self._clock(), job_id, LEASED, worker),
+            )
+            return cursor.rowcount == 1
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        Cancel a job that has not finished.
+
+        A worker running it notices at its next heartbeat.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = ?, lease_expires = NULL, updated = ? "
+                "WHERE id = ? AND state IN (?, ?)",
+                (CANCELLED, self._clock(), job_id, QUEUED, LEASED),
+            )
+            return cursor.rowcount == 1
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """A job by id, or None if there is none."""
+        with self._lock:
+            return self._get(self._conn, job_id)
+
+    def jobs(self, state: Optional[str] = None) -> List[Dict[str, Any]]:
+        """All jobs, or those in one state, oldest first."""
+        with self._lock:
+            if state is None:
+                rows = self._conn.execute("SELECT * FROM jobs ORDER BY id")
+            else:
+                rows = self._conn.execute(
+                    "SELECT * FROM jobs WHERE state = ? ORDER BY id", (state,)
+                )
+            return [self._job(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per state."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*) AS count FROM jobs GROUP BY state"
+            )
+            return {row["state"]: row["count"] for row in rows}
+
+    def _get(self, conn: sqlite3.Connection, job_id: int) -> Optional[Dict[str, Any]]:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Dict[str, Any]:
+        """Job dictionary with its JSON columns decoded."""
+        job = dict(row)
+        job["options"] = json.loads(job["options"])
+        job["files"] = json.loads(job["files"]) if job["files"] else []
+        return job
@@ -0,0 +1,240 @@
+"""
+Headless download worker for the shared job queue.
+
+A worker runs without a window: it claims jobs from a JobQueue, downloads
+them with the same yt-dlp commands as the window, renews its lease while
+yt-dlp runs and reports progress, files and failures back to the queue.
+Start one per machine (or several) with `python -m src.worker`.
+"""
+
+import collections
+import os
+import shutil
+import socket
+import subprocess
+import threading
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .commands import download_command, parse_progress
+from .job_queue import DEFAULT_LEASE, LEASED, QUEUED, JobQueue
+from .retry_policy import RetryPolicy, classify_error
+from .staging import finished_files, unique_path
+from .task_executor import TaskExecutor
+
+# Jobs download into this folder inside their save path first, so a job
+# picked up by another worker resumes from the same partial files
+JOB_DIR_PREFIX = ".job-"
+
+
+def default_worker_name() -> str:
+    """Host name and process id, unique among the workers of a queue."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class JobWorker:
+    """Runs jobs of a shared queue one after another."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        base_dir: str,
+        name: Optional[str] = None,
+        lease_seconds: float = DEFAULT_LEASE,
+        poll_interval: float = 2.0,
+        retry_policy: Optional[RetryPolicy] = None,
+        log: Callable[[str], None] = print,
+    ):
+        """
+        Args:
+            queue: Shared job queue
+            base_dir: Application folder with bin/yt-dlp.exe and bin/ffmpeg.exe
+            name: Worker name recorded on its jobs
+            lease_seconds: Lease length; it is renewed every third of it
+            poll_interval: Seconds to wait when no job is due
+            retry_policy: Decides which failures are retried and when
+            log: Receives one line per event
+        """
+        self.queue = queue
+        self.base_dir = base_dir
+        self.name = name or default_worker_name()
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.log = log
+        self.executor = TaskExecutor()
+        self._stop = threading.Event()
+        # Set by the heartbeat when the queue took the current job away
+        self._lost = threading.Event()
+        self._current: Optional[int] = None
+        self._progress: Optional[int] = None
+
+    def stop(self) -> None:
+        """Stop after giving the current job back to the queue."""
+        self._stop.set()
+        # The download loop notices the killed process; partials are kept
+        current = self._current
+        if current is not None:
+            self.executor.cancel(current, cleanup=False)
+
+    def run(self, max_jobs: Optional[int] = None, exit_when_idle: bool = False) -> int:
+        """
+        Process jobs until stopped.
+
+        Args:
+            max_jobs: Stop after this many jobs
+            exit_when_idle: Stop once no job is queued or running anywhere
+
+        Returns:
+            Number of jobs processed
+        """
+        processed = 0
+        self.log(f"Worker {self.name} started")
+        while not self._stop.is_set() and (max_jobs is None or processed < max_jobs):
+            job = self.queue.claim(self.name, self.lease_seconds)
+            if job is None:
+                if exit_when_idle and self._queue_drained():
+                    break
+                self._stop.wait(self.poll_interval)
+                continue
+            self.process(job)
+            processed += 1
+        self.executor.shutdown()
+        self.log(f"Worker {self.name} stopped after {processed} jobs")
+        return processed
+
+    def _queue_drained(self) -> bool:
+        """Whether no job is left to run, now or after a retry delay."""
+        counts = self.queue.counts()
+        return not counts.get(QUEUED) and not counts.get(LEASED)
+
+    def process(self, job: Dict[str, Any]) -> None:
+        """Download one claimed job and report its outcome."""
+        job_id = job["id"]
+        options = job["options"]
+        job_dir = os.path.join(job["save_path"], f"{JOB_DIR_PREFIX}{job_id}")
+        self.log(f"Job {job_id} (attempt {job['attempts']}): {job['url']}")
+
+        cmd = download_command(
+            self.base_dir,
+            job["url"],
+            job_dir,
+            job["mode"],
+            options.get("video_quality", "Best Available"),
+            str(options.get("audio_quality", "320")),
+            [tuple(section) for section in options.get("sections") or []],
+        )
+        self._lost.clear()
+        try:
+            os.makedirs(job_dir, exist_ok=True)
+            returncode, output = self._download(job_id, cmd)
+        except OSError as e:
+            # This machine cannot run the job (missing yt-dlp, unreachable
+            # save path); leave it to the other workers
+            self.queue.release(job_id, self.name)
+            self.log(f"Job {job_id} returned to the queue, stopping worker: {e}")
+            self._stop.set()
+            return
+
+        if self._lost.is_set():
+            self.log(f"Job {job_id} was cancelled or reassigned; dropping it")
+            shutil.rmtree(job_dir, ignore_errors=True)
+            return
+        if returncode == 0:
+            try:
+                files = self._move_files(job_dir, job["save_path"])
+            except OSError as e:
+                # Full or read-only destination: keep the finished files in
+                # the job folder instead of downloading them again
+                error = f"Could not move files into {job['save_path']}: {e}"
+                self.queue.fail(job_id, self.name, error)
+                self.log(f"Job {job_id} failed: {error}; files kept in {job_dir}")
+                return
+            if self.queue.complete(job_id, self.name, files):
+                self.log(f"Job {job_id} completed: {len(files)} files")
+            return
+        if self._stop.is_set():
+            self.queue.release(job_id, self.name)
+            self.log(f"Job {job_id} returned to the queue")
+            return
+
+        error = "\n".join(output) or f"yt-dlp exited with code {returncode}"
+        category = classify_error(error)
+        retry_delay = None
+        if self.retry_policy.should_retry(category, job["attempts"]):
+            retry_delay = self.retry_policy.delay(job["attempts"])
+        self.queue.fail(job_id, self.name, error, retry_delay)
+        if retry_delay is None:
+            # Nothing will resume from the partial files
+            shutil.rmtree(job_dir, ignore_errors=True)
+            self.log(f"Job {job_id} failed ({category}): {error}")
+        else:
+            self.log(f"Job {job_id} failed ({category}), retry in {retry_delay:.0f}s")
+
+    def _download(self, job_id: int, cmd: List[str]) -> Tuple[int, List[str]]:
+        """
+        Run yt-dlp while a heartbeat thread renews the lease.
+
+        Returns:
+            (exit code, error lines or else the last lines of output)
+        """
+        self._progress = None
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job_id, done), name="job-heartbeat"
+        )
+        process = self.executor.popen(
+            job_id,
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors="replace",
+        )
+        self._current = job_id
+        heartbeat.start()
+        error_lines: List[str] = []
+        recent_lines: Deque[str] = collections.deque(maxlen=5)
+        try:
+            for line in process.stdout:
+                line = line.strip()
+                if not line:
+                    continue
+                recent_lines.append(line)
+                if line.startswith("ERROR:"):
+                    error_lines.append(line)
+                progress = parse_progress(line)
+                if progress is not None:
+                    self._progress = progress
+            process.wait()
+        finally:
+            self._current = None
+            self.executor.release(job_id, process)
+            done.set()
+            heartbeat.join()
+        return process.returncode, error_lines or list(recent_lines)
+
+    def _heartbeat(self, job_id: int, done: threading.Event) -> None:
+        """Renew the lease until the download ends; kill it if the job is lost."""
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                held = self.queue.heartbeat(
+                    job_id, self.name, self._progress, self.lease_seconds
+                )
+            except Exception as e:
+                # A busy or unreachable database; the lease still runs
+                self.log(f"Job {job_id}: heartbeat failed: {e}")
+                continue
+            if not held:
+                self._lost.set()
+                self.executor.cancel(job_id, cleanup=False)
+                return
+
+    def _move_files(self, job_dir: str, save_path: str) -> List[str]:
+        """Move a finished job's files into its save path."""
+        files = []
+        for path in finished_files(job_dir):
+            target = unique_path(os.path.join(save_path, os.path.basename(path)))
+            os.replace(path, target)
+            files.append(target)
+        shutil.rmtree(job_dir, ignore_errors=True)
+        return files
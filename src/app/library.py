@@ -0,0 +1,260 @@
+"""
+SQLite index of downloaded media files.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .media_info import probe
+
+MEDIA_EXTENSIONS = (".mp3", ".mp4", ".m4a", ".webm", ".mkv", ".opus")
+
+# yt-dlp's default output template ends with " [<video id>]"
+VIDEO_ID_SUFFIX = re.compile(r"\s*\[([A-Za-z0-9_-]{11})\]$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    title TEXT,
+    video_id TEXT,
+    duration REAL,
+    bitrate INTEGER,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    added REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_video_id ON files (video_id);
+CREATE TABLE IF NOT EXISTS loudness (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    lufs REAL NOT NULL,
+    peak REAL NOT NULL
+);
+"""
+
+UPSERT = """
+INSERT INTO files (path, title, video_id, duration, bitrate, size, mtime, added)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (path) DO UPDATE SET
+    title = {title},
+    video_id = COALESCE(excluded.video_id, files.video_id),
+    duration = excluded.duration,
+    bitrate = excluded.bitrate,
+    size = excluded.size,
+    mtime = excluded.mtime
+"""
+# Downloads know the real title; rescans keep it instead of the file name
+ADD_FILE = UPSERT.format(title="excluded.title")
+SCAN_FILE = UPSERT.format(title="files.title")
+
+COLUMNS = ("path", "title", "video_id", "duration", "bitrate", "size", "mtime")
+
+
+def title_from_filename(path: str) -> Tuple[str, Optional[str]]:
+    """
+    Guess title and video ID of a file from its name.
+
+    Returns:
+        (title, video_id); video_id is None if the name does not contain it
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    match = VIDEO_ID_SUFFIX.search(stem)
+    if match:
+        return stem[: match.start()], match.group(1)
+    return stem, None
+
+
+class MediaLibrary:
+    """
+    Index of media files with their title, video ID, duration and size.
+
+    Folders are rescanned incrementally: files whose size and modification
+    time match the index are skipped, so only new or changed files are
+    opened, and only their headers are read.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: SQLite database file, created if missing
+        """
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._conn.close()
+
+    def add_file(
+        self, path: str, title: Optional[str] = None, video_id: Optional[str] = None
+    ) -> None:
+        """
+        Index a single file, e.g. a finished download.
+
+        Args:
+            path: Media file
+            title: Video title; taken from the file name if not given
+            video_id: Video ID of the source, if known
+        """
+        row = self._index_row(os.path.abspath(path), os.stat(path))
+        if title is not None:
+            row[1] = title
+        if video_id is not None:
+            row[2] = video_id
+        with self._lock, self._conn:
+            self._conn.execute(ADD_FILE, row)
+
+    def scan(self, directory: str) -> Dict[str, int]:
+        """
+        Bring the index of a folder and its subfolders up to date.
+
+        Args:
+            directory: Folder to scan
+
+        Returns:
+            Counts of "added", "updated", "removed" and "unchanged" files
+        """
+        directory = os.path.abspath(directory)
+        prefix = os.path.join(directory, "")
+        with self._lock:
+            known = {
+                path: (size, mtime)
+                for path, size, mtime in self._conn.execute(
+                    "SELECT path, size, mtime FROM files WHERE path >= ? AND path < ?",
+                    (prefix, prefix + "\uffff"),
+                )
+            }
+
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        rows = []
+        for path, stat in self._walk(directory):
+            previous = known.pop(path, None)
+            if previous == (stat.st_size, stat.st_mtime):
+                counts["unchanged"] += 1
+                continue
+            counts["updated" if previous else "added"] += 1
+            rows.append(self._index_row(path, stat))
+
+        # Whatever was not seen on disk anymore has been deleted
+        counts["removed"] = len(known)
+        with self._lock, self._conn:
+            self._conn.executemany(SCAN_FILE, rows)
+            self._conn.executemany(
+                "DELETE FROM files WHERE path = ?", [(path,) for path in known]
+            )
+        return counts
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """Index entry of a file, or None if it is not indexed."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM files WHERE path = ?",
+                (os.path.abspath(path),),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def find_video(self, video_id: str) -> List[Dict[str, Any]]:
+        """Files downloaded from a video."""
+        return self._query("WHERE video_id = ? ORDER BY path", (video_id,))
+
+    def search(self, text: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Files whose title contains text (case-insensitive)."""
+        return self._query(
+            "WHERE title LIKE ? ORDER BY title LIMIT ?", (f"%{text}%", limit)
+        )
+
+    def loudness(self, path: str) -> Optional[Tuple[float, float]]:
+        """
+        Measured (loudness, peak) of a file.
+
+        Returns:
+            None if the file was not measured or has changed since
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lufs, peak FROM loudness "
+                "WHERE path = ? AND size = ? AND mtime = ?",
+                (os.path.abspath(path), stat.st_size, stat.st_mtime),
+            ).fetchone()
+        return (row["lufs"], row["peak"]) if row else None
+
+    def set_loudness(self, path: str, loudness: Tuple[float, float]) -> None:
+        """Store the measured (loudness, peak) of a file as it is now."""
+        stat = os.stat(path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO loudness (path, size, mtime, lufs, peak) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (os.path.abspath(path), stat.st_size, stat.st_mtime, *loudness),
+            )
+
+    def unmeasured_files(self) -> List[str]:
+        """Indexed files without a loudness measurement of their current state."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT files.path FROM files LEFT JOIN loudness "
+                "ON loudness.path = files.path AND loudness.size = files.size "
+                "AND loudness.mtime = files.mtime "
+                "WHERE loudness.path IS NULL ORDER BY files.path"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def count(self) -> int:
+        """Number of indexed files."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def _query(self, where: str, params: Tuple[Any, ...]) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM files {where}", params
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _index_row(self, path: str, stat: os.stat_result) -> List[Any]:
+        """Values for UPSERT, reading only the file's headers."""
+        title, video_id = title_from_filename(path)
+        duration, bitrate = probe(path)
+        return [
+            path,
+            title,
+            video_id,
+            duration,
+            bitrate,
+            stat.st_size,
+            stat.st_mtime,
+            time.time(),
+        ]
+
+    def _walk(self, directory: str) -> Iterator[Tuple[str, os.stat_result]]:
+        """Media files below directory with their stat results."""
+        stack = [directory]
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.name.lower().endswith(MEDIA_EXTENSIONS):
+                            yield entry.path, entry.stat()
+                    except OSError:
+                        continue
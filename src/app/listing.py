@@ -0,0 +1,109 @@
+"""
+Compact records of the videos in a playlist or channel listing.
+
+yt-dlp's --dump-json prints every field it knows about each entry. For a
+channel with tens of thousands of videos, the output, its lines and one
+dict per entry add up to hundreds of megabytes. Listings are therefore
+read line by line, yt-dlp is asked for only the fields the selection
+dialog uses, and each entry is kept in a slotted record.
+"""
+
+import json
+from typing import Callable, Iterable, Iterator, List, Optional
+
+# Fields kept per entry, in the order of the Entry slots
+ENTRY_FIELDS = ("id", "url", "title", "duration", "upload_date")
+
+# Relative entry URLs are resolved against this
+DEFAULT_BASE_URL = "https://www.youtube.com"
+
+
+def listing_command(yt_dlp_path: str, url: str) -> List[str]:
+    """
+    yt-dlp command that prints one JSON object per entry of a listing.
+
+    The -O template projects each entry onto ENTRY_FIELDS, so yt-dlp
+    serializes a few short fields instead of the full info dict.
+    """
+    return [
+        yt_dlp_path,
+        "--flat-playlist",
+        "-O",
+        "%(.{" + ",".join(ENTRY_FIELDS) + "})j",
+        url,
+    ]
+
+
+class Entry:
+    """One video of a listing, holding only the fields in ENTRY_FIELDS."""
+
+    __slots__ = ENTRY_FIELDS
+
+    def __init__(
+        self,
+        id: Optional[str],
+        url: Optional[str],
+        title: Optional[str],
+        duration: Optional[float] = None,
+        upload_date: Optional[str] = None,
+    ):
+        self.id = id
+        self.url = url
+        self.title = title
+        self.duration = duration
+        self.upload_date = upload_date
+
+    @classmethod
+    def from_json(cls, line: str) -> "Entry":
+        """
+        Parse one line of listing output.
+
+        Raises:
+            ValueError: If the line is not a JSON object
+        """
+        data = json.loads(line)
+        if not isinstance(data, dict):
+            raise ValueError("Listing entry is not a JSON object")
+        return cls(*(data.get(field) for field in ENTRY_FIELDS))
+
+    def absolute_url(self, base_url: str = DEFAULT_BASE_URL) -> Optional[str]:
+        """The entry URL, resolved against base_url if it is relative."""
+        if self.url and not self.url.startswith("http"):
+            return base_url.rstrip("/") + "/" + self.url.lstrip("/")
+        return self.url
+
+    def __repr__(self) -> str:
+        return f"Entry(id={self.id!r}, title={self.title!r})"
+
+
+def iter_entries(lines: Iterable[str]) -> Iterator[Entry]:
+    """Parse listing output line by line, skipping lines that are not entries."""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield Entry.from_json(line)
+        except ValueError:
+            # Covers json.JSONDecodeError as well
+            continue
+
+
+def read_entries(
+    lines: Iterable[str], keep: Optional[Callable[[Entry], bool]] = None
+) -> List[Entry]:
+    """
+    Collect the entries of a listing.
+
+    Args:
+        lines: Output lines of listing_command(), e.g. a stream
+        keep: Optional filter; entries it rejects are dropped right away
+
+    Returns:
+        Entries in listing order
+    """
+    return [entry for entry in iter_entries(lines) if keep is None or keep(entry)]
+
+
+def is_short(entry: Entry) -> bool:
+    """Whether an entry is a YouTube Short."""
+    return "shorts" in (entry.url or "").lower()
@@ -0,0 +1,184 @@
+"""
+Measures the loudness of audio files for volume normalization.
+"""
+
+import os
+import re
+import subprocess
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, Set, Tuple
+
+from .task_executor import TaskExecutor
+
+# Playback reference level (ReplayGain 2.0)
+TARGET_LUFS = -18.0
+# Highest true peak allowed after applying gain
+MAX_TRUE_PEAK = -1.0
+
+AUDIO_EXTENSIONS = (".mp3", ".m4a", ".opus", ".ogg", ".flac", ".wav")
+
+# (integrated loudness in LUFS, true peak in dBFS)
+Loudness = Tuple[float, float]
+
+
+def analyze_command(ffmpeg_path: str, path: str) -> List[str]:
+    """ffmpeg command that prints the EBU R128 summary of path."""
+    return [
+        ffmpeg_path,
+        "-hide_banner",
+        "-nostats",
+        "-i",
+        path,
+        "-vn",
+        # Per-frame values go to the verbose log level and are not printed
+        "-af",
+        "ebur128=peak=true:framelog=verbose",
+        "-f",
+        "null",
+        "-",
+    ]
+
+
+def parse_ebur128(output: str) -> Loudness:
+    """
+    Read integrated loudness and true peak from ffmpeg's ebur128 summary.
+
+    Raises:
+        ValueError: If the output contains no summary
+    """
+    number = r"(-?(?:[0-9.]+|inf))"
+    loudness = re.findall(rf"\bI:\s+{number} LUFS", output)
+    peak = re.findall(rf"\bPeak:\s+{number} dBFS", output)
+    if not loudness or not peak:
+        raise ValueError("No loudness summary in ffmpeg output")
+    # The summary comes last
+    return float(loudness[-1]), float(peak[-1])
+
+
+def gain_for(loudness: Loudness, target: float = TARGET_LUFS) -> float:
+    """
+    Gain in dB that brings a track to the target loudness.
+
+    The gain is lowered if the track's true peak would clip otherwise.
+    """
+    lufs, peak = loudness
+    return min(target - lufs, MAX_TRUE_PEAK - peak)
+
+
+def is_audio_file(path: str) -> bool:
+    """Whether path is an audio file that can be normalized."""
+    return path.lower().endswith(AUDIO_EXTENSIONS)
+
+
+class LoudnessAnalyzer:
+    """
+    Runs ffmpeg loudness measurements on all CPU cores.
+
+    Every file is decoded by its own ffmpeg process, so the pool only
+    needs threads to keep one process per core busy. The processes run
+    through a TaskExecutor, so shutdown() can terminate them.
+    """
+
+    def __init__(
+        self,
+        ffmpeg_path: str,
+        max_workers: Optional[int] = None,
+        executor: Optional[TaskExecutor] = None,
+    ):
+        """
+        Args:
+            ffmpeg_path: Path to ffmpeg.exe
+            max_workers: Files measured at once (defaults to the CPU count)
+            executor: Executor that owns the ffmpeg processes; by default
+                the analyzer uses its own
+        """
+        self.ffmpeg_path = ffmpeg_path
+        self._owns_executor = executor is None
+        self.executor = executor or TaskExecutor()
+        self._pool = ThreadPoolExecutor(
+            max_workers or os.cpu_count() or 1, thread_name_prefix="loudness"
+        )
+        self._lock = threading.Lock()
+        self._running: Set[str] = set()
+        self._closed = False
+
+    def measure(
+        self,
+        path: str,
+        run: Optional[Callable[..., subprocess.CompletedProcess]] = None,
+    ) -> Loudness:
+        """
+        Measure one file.
+
+        Raises:
+            OSError: If ffmpeg fails or prints no summary
+        """
+        result = (run or self._run)(
+            analyze_command(self.ffmpeg_path, path),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors="replace",
+        )
+        if result.returncode != 0:
+            error = result.stderr.strip()
+            raise OSError(f"Loudness analysis of {path} failed: {error}")
+        try:
+            return parse_ebur128(result.stderr)
+        except ValueError as e:
+            raise OSError(f"Loudness analysis of {path} failed: {e}") from e
+
+    def analyze(
+        self,
+        paths: Iterable[str],
+        on_done: Callable[[str, Optional[Loudness], Optional[Exception]], None],
+    ) -> List[Future]:
+        """
+        Measure files in the background.
+
+        Args:
+            paths: Files to measure
+            on_done: Called from a worker thread with (path, loudness, error)
+        """
+
+        def job(path: str) -> None:
+            try:
+                loudness = self.measure(path)
+            except Exception as e:
+                if not self._closed:
+                    on_done(path, None, e)
+            else:
+                on_done(path, loudness, None)
+
+        return [self._pool.submit(job, path) for path in paths]
+
+    def _run(self, cmd: List[str], **kwargs: Any) -> subprocess.CompletedProcess:
+        """Run an ffmpeg command as a process of the executor."""
+        # Keyed by the file; the caller measures each file only once at a time
+        key = ("loudness", cmd[cmd.index("-i") + 1])
+        with self._lock:
+            if self._closed:
+                raise OSError("Loudness analysis was stopped")
+            process = self.executor.popen(key, cmd, **kwargs)
+            self._running.add(key)
+        try:
+            stdout, stderr = process.communicate()
+        finally:
+            with self._lock:
+                self._running.discard(key)
+            self.executor.release(key, process)
+            # Usage is only reported for downloads; don't let it pile up
+            self.executor.take_usage(key)
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+    def shutdown(self) -> None:
+        """Drop queued measurements and terminate running ones."""
+        with self._lock:
+            self._closed = True
+            running = list(self._running)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        for key in running:
+            self.executor.cancel(key, cleanup=False)
+        if self._owns_executor:
+            self.executor.shutdown()
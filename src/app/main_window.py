@@ -32,6 +32,10 @@ import os
 from .ui_manager import UIManager
 from .download_manager import DownloadManager
 from .audio_player import AudioPlayer
+from .control_server import ControlServer
+from .diagnostics import Diagnostics, enabled_from_env
+from .waveform import WaveformCache
+from .waveform_slider import WaveformLoader
 
 
 
@@ -81,9 +85,29 @@ class YTDGUI(QMainWindow):
         self.resize(800, 600)
         self.base_dir = base_dir
 
+        # Slots are instrumented before any signal is connected to them
+        self.diagnostics = Diagnostics(
+            os.path.join(base_dir, "diagnostics"), enabled=enabled_from_env()
+        )
+        self.diagnostics.instrument(
+            self,
+            (
+                "_update_status",
+                "_log_message",
+                "_update_progress",
+                "_show_download_error_slot",
+                "on_playlist_result",
+                "update_audio_position",
+                "update_audio_track",
+                "update_audio_waveform",
+            ),
+        )
+
         # Initialize manager components
         self.ui_manager = UIManager(self)
         self.download_manager = DownloadManager(self)
+        # Started by start_control_server() once the window is shown
+        self.control_server = ControlServer(self)
 
         # Set application icon
         self.ui_manager._set_window_icon()
@@ -93,6 +117,17 @@ class YTDGUI(QMainWindow):
 
         # Initialize audio player
         self.audio_player = AudioPlayer()
+        self.audio_player.gain_provider = self.download_manager.loudness_gain
+        self.download_manager.signals.loudness_measured.connect(
+            self.audio_player.set_gain
+        )
+        self.waveforms = WaveformLoader(
+            WaveformCache(
+                os.path.join(base_dir, "waveforms"),
+                os.path.join(base_dir, "bin", "ffmpeg.exe"),
+            )
+        )
+        self.waveforms.ready.connect(self.update_audio_waveform)
 
 
         # Load UI icons
@@ -101,9 +136,10 @@ class YTDGUI(QMainWindow):
         # Build user interface
         self.ui_manager._create_ui()
 
-        self.audio_player.player.positionChanged.connect(self.update_audio_position)
-        self.audio_player.player.durationChanged.connect(self.update_audio_duration)
-        self.audio_player.player.playbackStateChanged.connect(self.update_play_button)
+        self.audio_player.positionChanged.connect(self.update_audio_position)
+        self.audio_player.durationChanged.connect(self.update_audio_duration)
+        self.audio_player.playbackStateChanged.connect(self.update_play_button)
+        self.audio_player.trackChanged.connect(self.update_audio_track)
 
 
         if hasattr(self, "audio_slider"):
@@ -113,7 +149,7 @@ class YTDGUI(QMainWindow):
             
         if hasattr(self, "volume_slider"):
             self.volume_slider.valueChanged.connect(
-                lambda value: self.audio_player.audio_output.setVolume(value / 100)
+                lambda value: self.audio_player.set_volume(value / 100)
             )
 
 
@@ -202,9 +238,38 @@ class YTDGUI(QMainWindow):
             formatted_msg = f"[{timestamp}] {msg}"
             self.log_text.append(formatted_msg)
 
-    def _show_download_error_slot(self, error: Exception) -> None:
-        """Slot method to show download error dialog safely in main thread."""
-        self.download_manager._show_download_error(error)
+    def _show_download_error_slot(self, failure: tuple) -> None:
+        """Slot method to record a download failure safely in main thread."""
+        self.download_manager._show_download_error(failure)
+
+    def start_control_server(self) -> bool:
+        """
+        Accept control API requests and URLs from later launches.
+
+        Returns:
+            False if another instance already owns the control socket
+        """
+        if not self.control_server.listen():
+            self.log_message("Control API unavailable: another instance is running")
+            return False
+        self.log_message(f"Control API listening on {self.control_server.address}")
+        return True
+
+    def closeEvent(self, event) -> None:
+        """Terminate running downloads before the window closes."""
+        self.control_server.close()
+        self.download_manager.shutdown()
+        self.audio_player.stop()
+        self.waveforms.shutdown()
+        # Keep what a diagnostics session measured; a running profile is saved
+        try:
+            if self.diagnostics.enabled:
+                path = self.diagnostics.save_report()
+                self.log_message(f"Diagnostics report saved to {path}")
+            self.diagnostics.disable()
+        except OSError as e:
+            self.log_message(f"Could not save diagnostics: {e}")
+        super().closeEvent(event)
 
 
     def play_audio(self):
@@ -215,23 +280,49 @@ class YTDGUI(QMainWindow):
             self.update_status("Resumed audio")
             return
 
-        # Ако няма заредена → избери файл
-        file_path, _ = QFileDialog.getOpenFileName(
+        # Ако няма заредена → избери файлове (play queue)
+        file_paths, _ = QFileDialog.getOpenFileNames(
             self,
-            "Select MP3 File",
-            "",
-            "Audio Files (*.mp3)"
+            "Select MP3 Files",
+            self.path_entry.text() if hasattr(self, "path_entry") else "",
+            "Audio Files (*.mp3 *.m4a *.opus)"
         )
 
-        if file_path:
-            self.audio_player.load(file_path)
-            self.audio_player.play()
+        if file_paths:
+            self.audio_player.play_files(file_paths)
+            self.update_status("Playing audio")
 
-            # Показва името автоматично
-            if hasattr(self, "song_label"):
-                self.song_label.setText(os.path.basename(file_path))
+    def play_files(self, file_paths: List[str]) -> None:
+        """Replace the play queue with file_paths and start playing."""
+        self.audio_player.play_files(file_paths)
+        self.update_status(f"Playing {len(self.audio_player.queue)} track(s)")
 
-            self.update_status("Playing audio")
+    def next_audio(self):
+        if self.audio_player.next():
+            self.update_status("Next track")
+
+    def previous_audio(self):
+        self.audio_player.previous()
+
+    def update_audio_track(self, file_path):
+        # Показва името автоматично
+        if hasattr(self, "song_label"):
+            queue = self.audio_player.queue
+            self.song_label.setText(
+                f"{os.path.basename(file_path)} ({queue.index + 1}/{len(queue)})"
+            )
+
+        # Waveform of the seek bar; cached tracks show up immediately
+        if hasattr(self, "audio_slider"):
+            self.audio_slider.set_peaks(None)
+            self.waveforms.request(file_path)
+
+    def update_audio_waveform(self, file_path, peaks):
+        current = file_path == self.audio_player.current_file
+        if current and hasattr(self, "audio_slider"):
+            self.audio_slider.set_peaks(peaks)
+        else:
+            peaks.close()
 
 
 
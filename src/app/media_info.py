@@ -0,0 +1,151 @@
+"""
+Reads duration and bitrate of media files from their headers.
+
+Only a few kilobytes of each file are read, so whole folders can be
+indexed without decoding any audio or video.
+"""
+
+import os
+import struct
+from typing import BinaryIO, Optional, Tuple
+
+# (duration in seconds, bitrate in bits per second)
+MediaInfo = Tuple[Optional[float], Optional[int]]
+
+# MPEG audio layer III bitrates in kbps by bitrate index
+MP3_BITRATES = {
+    "mpeg1": (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    "mpeg2": (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG-1
+    2: (22050, 24000, 16000),  # MPEG-2
+    0: (11025, 12000, 8000),  # MPEG-2.5
+}
+
+# How far past the ID3 tag to look for the first MPEG frame
+MP3_SYNC_SEARCH = 64 * 1024
+
+MP4_EXTENSIONS = (".mp4", ".m4a", ".m4v", ".mov")
+
+
+def probe(path: str) -> MediaInfo:
+    """
+    Duration and bitrate of an MP3 or MP4/M4A file.
+
+    Returns:
+        (duration, bitrate); either is None if it cannot be determined
+    """
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            if ext == ".mp3":
+                return _probe_mp3(f, size)
+            if ext in MP4_EXTENSIONS:
+                return _probe_mp4(f, size)
+    except (OSError, IndexError, struct.error):
+        pass
+    return None, None
+
+
+def _id3v2_size(header: bytes) -> int:
+    """Length of an ID3v2 tag at the start of a file, 0 if there is none."""
+    if len(header) < 10 or header[:3] != b"ID3":
+        return 0
+    # Sizes are "syncsafe": 7 bits per byte
+    size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _probe_mp3(f: BinaryIO, size: int) -> MediaInfo:
+    audio_start = _id3v2_size(f.read(10))
+    f.seek(audio_start)
+    data = f.read(MP3_SYNC_SEARCH)
+
+    for offset in range(len(data) - 4):
+        if data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+            continue
+        header = data[offset + 1 : offset + 4]
+        version = (header[0] >> 3) & 0x03
+        layer = (header[0] >> 1) & 0x03
+        bitrate_index = header[1] >> 4
+        rate_index = (header[1] >> 2) & 0x03
+        # Layer III only, skipping invalid and free-format headers
+        if version != 1 and layer == 1 and rate_index != 3:
+            if bitrate_index not in (0, 15):
+                break
+    else:
+        return None, None
+
+    mpeg1 = version == 3
+    mono = header[2] >> 6 == 3
+    sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+    samples_per_frame = 1152 if mpeg1 else 576
+    bitrate = MP3_BITRATES["mpeg1" if mpeg1 else "mpeg2"][bitrate_index] * 1000
+    frame = data[offset:]
+
+    # VBR files carry the frame count in a Xing/Info or VBRI header
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    frames = audio_bytes = None
+    xing = frame[4 + side_info : 4 + side_info + 16]
+    if xing[:4] in (b"Xing", b"Info") and len(xing) >= 8:
+        flags = struct.unpack(">I", xing[4:8])[0]
+        position = 8
+        if flags & 0x1:
+            frames = struct.unpack(">I", xing[position : position + 4])[0]
+            position += 4
+        if flags & 0x2:
+            audio_bytes = struct.unpack(">I", xing[position : position + 4])[0]
+    elif frame[36:40] == b"VBRI":
+        audio_bytes, frames = struct.unpack(">II", frame[46:54])
+
+    if frames:
+        duration = frames * samples_per_frame / sample_rate
+        if audio_bytes:
+            bitrate = int(audio_bytes * 8 / duration)
+        return duration, bitrate
+
+    # Constant bitrate: the stream length gives the duration
+    f.seek(max(0, size - 128))
+    id3v1 = 128 if f.read(3) == b"TAG" else 0
+    audio_size = size - audio_start - offset - id3v1
+    return audio_size * 8 / bitrate, bitrate
+
+
+def _probe_mp4(f: BinaryIO, size: int) -> MediaInfo:
+    # moov may come after the media data, so walk atoms by seeking
+    position, end = 0, size
+    while position + 8 <= end:
+        f.seek(position)
+        atom_size, atom_type = struct.unpack(">I4s", f.read(8))
+        header_size = 8
+        if atom_size == 1:
+            atom_size = struct.unpack(">Q", f.read(8))[0]
+            header_size = 16
+        elif atom_size == 0:
+            atom_size = end - position
+        if atom_size < header_size:
+            break
+
+        if atom_type == b"moov":
+            # mvhd is a direct child of moov
+            end = position + atom_size
+            position += header_size
+            continue
+        if atom_type == b"mvhd":
+            version = f.read(1)[0]
+            # Skip flags and creation/modification times
+            if version == 1:
+                f.seek(19, os.SEEK_CUR)
+                timescale, duration = struct.unpack(">IQ", f.read(12))
+            else:
+                f.seek(11, os.SEEK_CUR)
+                timescale, duration = struct.unpack(">II", f.read(8))
+            if not timescale or not duration:
+                break
+            seconds = duration / timescale
+            return seconds, int(size * 8 / seconds)
+        position += atom_size
+    return None, None
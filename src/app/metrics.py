@@ -0,0 +1,309 @@
+"""
+Timing of the download pipeline stages.
+
+Each task records how long it spends in every stage. Finished tasks are
+aggregated into histograms, appended to a JSON lines file and exported as
+a Prometheus text file, e.g. for node_exporter's textfile collector.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Pipeline stages in order; "waiting" covers retry backoff and pauses
+STAGES = ("queued", "metadata", "download", "postprocess", "finalize", "waiting")
+
+STAGE_NAMES = {
+    "queued": "queue",
+    "metadata": "metadata",
+    "download": "download",
+    "postprocess": "post-processing",
+    "finalize": "finalize",
+    "waiting": "waiting",
+}
+
+# Upper bounds of the histogram buckets in seconds
+DEFAULT_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+# yt-dlp post-processors run after the download in the same process
+POSTPROCESSOR_PREFIXES = (
+    "[Merger]",
+    "[ExtractAudio]",
+    "[Fixup",
+    "[Metadata]",
+    "[EmbedThumbnail]",
+    "[EmbedSubtitle]",
+    "[ModifyChapters]",
+    "[SplitChapters]",
+    "[VideoConvertor]",
+    "[VideoRemuxer]",
+)
+
+PREFIX = "ytd"
+
+# Child process usage totalled per mode and quality
+RESOURCE_METRICS = (
+    ("tasks", "child_tasks_total", "counter", "Tasks with measured processes."),
+    ("cpu_time", "child_cpu_seconds_total", "counter", "CPU time of yt-dlp/ffmpeg."),
+    ("wall_time", "child_wall_seconds_total", "counter", "Run time of yt-dlp/ffmpeg."),
+    ("read_bytes", "child_read_bytes_total", "counter", "Bytes read from disk."),
+    ("write_bytes", "child_write_bytes_total", "counter", "Bytes written to disk."),
+    ("peak_rss", "child_peak_rss_bytes", "gauge", "Largest process tree RSS."),
+)
+
+
+def is_postprocessor_line(line: str) -> bool:
+    """Whether a yt-dlp output line comes from a post-processor."""
+    return line.startswith(POSTPROCESSOR_PREFIXES)
+
+
+class StageTimer:
+    """
+    Time a task spends in each pipeline stage.
+
+    Entering a stage ends the current one; time spent in a stage several
+    times (e.g. across retries) adds up.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            clock: Monotonic time source in seconds
+        """
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.stage: Optional[str] = None
+        self._entered = 0.0
+        self.started = time.time()
+        self.durations: Dict[str, float] = {}
+
+    def enter(self, stage: Optional[str]) -> None:
+        """Switch to stage; None stops timing."""
+        with self._lock:
+            now = self._clock()
+            if self.stage is not None:
+                self.durations[self.stage] = (
+                    self.durations.get(self.stage, 0.0) + now - self._entered
+                )
+            self.stage = stage
+            self._entered = now
+
+    def take(self) -> Dict[str, float]:
+        """Stop timing and return the durations, starting over from zero."""
+        self.enter(None)
+        with self._lock:
+            durations, self.durations = self.durations, {}
+            self.started = time.time()
+        return durations
+
+
+class Histogram:
+    """Prometheus-style histogram with fixed bucket bounds."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # The last count is the +Inf bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add a value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile by interpolating within its bucket.
+
+        The estimate never exceeds the largest observed value.
+
+        Returns:
+            None if no values were observed
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(self.buckets):
+                    # Beyond the last bound
+                    return self.max
+                low = self.buckets[index - 1] if index else 0.0
+                high = self.buckets[index]
+                return min(self.max, low + (high - low) * (rank - seen) / count)
+            seen += count
+        return self.max
+
+
+class PipelineMetrics:
+    """
+    Aggregated stage timings and byte counts of finished tasks.
+
+    Thread-safe; tasks are recorded from the worker threads that finish them.
+    """
+
+    def __init__(
+        self,
+        jsonl_path: Optional[str] = None,
+        prometheus_path: Optional[str] = None,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        """
+        Args:
+            jsonl_path: File that gets one JSON line per finished task
+            prometheus_path: Text file rewritten with the current metrics
+            buckets: Histogram bucket bounds in seconds
+        """
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.stage_seconds = {stage: Histogram(buckets) for stage in STAGES}
+        self.total_seconds = Histogram(buckets)
+        self.tasks: Dict[str, int] = {}
+        self.downloaded_bytes = 0
+        self.output_bytes = 0
+        self.resources: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, record: Dict[str, Any]) -> None:
+        """
+        Add a finished task and write it out.
+
+        Args:
+            record: Task record with "state", "stages" (seconds per stage),
+                "downloaded_bytes" and "output_bytes"; optionally "mode",
+                "quality" and "resources" (usage of its child processes)
+
+        Raises:
+            OSError: If the metrics files cannot be written
+        """
+        with self._lock:
+            for stage, seconds in record["stages"].items():
+                self.stage_seconds[stage].observe(seconds)
+            self.total_seconds.observe(sum(record["stages"].values()))
+            self.tasks[record["state"]] = self.tasks.get(record["state"], 0) + 1
+            self.downloaded_bytes += record.get("downloaded_bytes", 0)
+            self.output_bytes += record.get("output_bytes", 0)
+            if record.get("resources"):
+                self._add_resources(record)
+
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            if self.prometheus_path:
+                tmp = f"{self.prometheus_path}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(self._prometheus_text())
+                os.replace(tmp, self.prometheus_path)
+
+    def _add_resources(self, record: Dict[str, Any]) -> None:
+        """Add a task's process usage to the totals of its mode and quality."""
+        usage = record["resources"]
+        key = (record.get("mode") or "", str(record.get("quality") or ""))
+        totals = self.resources.setdefault(
+            key, {name: 0 for name, _, _, _ in RESOURCE_METRICS}
+        )
+        totals["tasks"] += 1
+        for name in ("cpu_time", "wall_time", "read_bytes", "write_bytes"):
+            totals[name] += usage.get(name) or 0
+        totals["peak_rss"] = max(totals["peak_rss"], usage.get("peak_rss") or 0)
+
+    def prometheus_text(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        with self._lock:
+            return self._prometheus_text()
+
+    def _prometheus_text(self) -> str:
+        lines = [
+            f"# HELP {PREFIX}_stage_seconds Time tasks spent in each pipeline stage.",
+            f"# TYPE {PREFIX}_stage_seconds histogram",
+        ]
+        for stage, histogram in self.stage_seconds.items():
+            labels = f'stage="{stage}"'
+            lines.extend(
+                _histogram_lines(f"{PREFIX}_stage_seconds", labels, histogram)
+            )
+        lines += [
+            f"# HELP {PREFIX}_task_seconds Time from queueing to finishing a task.",
+            f"# TYPE {PREFIX}_task_seconds histogram",
+        ]
+        lines.extend(_histogram_lines(f"{PREFIX}_task_seconds", "", self.total_seconds))
+        lines += [
+            f"# HELP {PREFIX}_tasks_total Finished tasks by final state.",
+            f"# TYPE {PREFIX}_tasks_total counter",
+        ]
+        for state, count in sorted(self.tasks.items()):
+            lines.append(f'{PREFIX}_tasks_total{{state="{state}"}} {count}')
+        lines += [
+            f"# HELP {PREFIX}_downloaded_bytes_total Bytes transferred by yt-dlp.",
+            f"# TYPE {PREFIX}_downloaded_bytes_total counter",
+            f"{PREFIX}_downloaded_bytes_total {self.downloaded_bytes}",
+            f"# HELP {PREFIX}_output_bytes_total Size of the finished files.",
+            f"# TYPE {PREFIX}_output_bytes_total counter",
+            f"{PREFIX}_output_bytes_total {self.output_bytes}",
+        ]
+        for name, metric, kind, help_text in RESOURCE_METRICS:
+            lines += [
+                f"# HELP {PREFIX}_{metric} {help_text}",
+                f"# TYPE {PREFIX}_{metric} {kind}",
+            ]
+            for (mode, quality), totals in sorted(self.resources.items()):
+                labels = f'mode="{_escape(mode)}",quality="{_escape(quality)}"'
+                lines.append(f"{PREFIX}_{metric}{{{labels}}} {totals[name]}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """
+        Average and 95th percentile time per stage, and process usage per
+        mode and quality, for the Activity page.
+        """
+        with self._lock:
+            count = self.total_seconds.count
+            if not count:
+                return "No finished downloads yet"
+            parts = []
+            for stage, histogram in self.stage_seconds.items():
+                if histogram.count:
+                    parts.append(
+                        f"{STAGE_NAMES[stage]} {histogram.sum / histogram.count:.1f}s"
+                        f" (p95 {histogram.quantile(0.95):.1f}s)"
+                    )
+            lines = [f"Average per task ({count} finished): " + ", ".join(parts)]
+            for (mode, quality), totals in sorted(self.resources.items()):
+                tasks = totals["tasks"]
+                wall = totals["wall_time"]
+                # CPU cores kept busy while its processes ran
+                cores = totals["cpu_time"] / wall if wall else 0.0
+                lines.append(
+                    f"{mode} ({quality}): {totals['cpu_time'] / tasks:.1f} CPU s, "
+                    f"{cores:.2f} cores, peak {totals['peak_rss'] / 1e6:.0f} MB "
+                    f"per task ({tasks} measured)"
+                )
+        return "\n".join(lines)
+
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_lines(name: str, labels: str, histogram: Histogram) -> List[str]:
+    """Bucket, sum and count lines of one histogram."""
+    separator = "," if labels else ""
+    lines = []
+    cumulative = 0
+    bounds = [str(bound) for bound in histogram.buckets] + ["+Inf"]
+    for bound, count in zip(bounds, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {histogram.sum}")
+    lines.append(f"{name}_count{suffix} {histogram.count}")
+    return lines
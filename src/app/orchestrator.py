@@ -0,0 +1,545 @@
+"""
+Runs download pipelines as coroutines on one asyncio event loop.
+
+The loop lives in a background thread next to the Qt event loop. Child
+processes are read through non-blocking pipes on that loop, so hundreds
+of yt-dlp/ffmpeg processes, their timeouts and the stall watchdog share a
+single thread instead of one blocked thread per process. Results reach
+the window the same way as from worker threads: through Qt signals, which
+Qt delivers to the GUI thread as queued calls.
+
+On Linux the processes are waited for through pidfds on the loop. The
+exit is noticed before the process is reaped, so the process monitor can
+take its last sample while /proc still holds the usage of everything it
+ran. Elsewhere asyncio waits for them itself, through process handles on
+Windows.
+"""
+
+import asyncio
+import codecs
+import locale
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from .process_stats import PROC_AVAILABLE, MonitoredPopen, ProcessMonitor
+
+# yt-dlp rewrites its progress line with a bare carriage return
+LINE_BREAK = re.compile(r"\r\n|\r|\n")
+READ_SIZE = 64 * 1024
+
+
+class MonitoredProcess:
+    """
+    asyncio-style process whose exit is reported before it is reaped.
+
+    Wraps a MonitoredPopen: the loop watches a pidfd of the process, which
+    becomes readable once it exits but leaves it a zombie. wait() then lets
+    MonitoredPopen run its on_exit callback and reap it. asyncio's own
+    child watchers reap right away, before the exit could be sampled.
+    """
+
+    def __init__(self, popen: MonitoredPopen):
+        self.popen = popen
+        self.pid = popen.pid
+        self.stdout: Optional[asyncio.StreamReader] = None
+        self.stderr: Optional[asyncio.StreamReader] = None
+        self._transports: List[asyncio.BaseTransport] = []
+        self._exit: Optional[asyncio.Future] = None
+
+    @classmethod
+    async def start(cls, cmd: List[str], **kwargs: Any) -> "MonitoredProcess":
+        """Start cmd with subprocess.Popen arguments and connect its pipes."""
+        process = cls(MonitoredPopen(cmd, **kwargs))
+        process.stdout = await process._connect(process.popen.stdout)
+        process.stderr = await process._connect(process.popen.stderr)
+        return process
+
+    async def _connect(self, pipe: Any) -> Optional[asyncio.StreamReader]:
+        if pipe is None:
+            return None
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(loop=loop)
+        transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader, loop=loop), pipe
+        )
+        self._transports.append(transport)
+        return reader
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.popen.returncode
+
+    @property
+    def rusage(self) -> Optional[Any]:
+        return self.popen.rusage
+
+    async def wait(self) -> int:
+        """Wait for the process to exit and reap it."""
+        if self._exit is None:
+            self._exit = asyncio.ensure_future(self._wait_exit())
+        # Shielded: a waiter that times out must not stop the others
+        return await asyncio.shield(self._exit)
+
+    async def _wait_exit(self) -> int:
+        loop = asyncio.get_running_loop()
+        try:
+            fd = os.pidfd_open(self.pid)
+        except OSError:
+            # Kernels before 5.3; wait in a thread instead
+            return await loop.run_in_executor(None, self.popen.wait)
+        try:
+            exited = loop.create_future()
+            loop.add_reader(fd, lambda: exited.done() or exited.set_result(None))
+            try:
+                await exited
+            finally:
+                loop.remove_reader(fd)
+        finally:
+            os.close(fd)
+        # Returns at once; the exit callback runs before the reap
+        return self.popen.wait()
+
+    async def communicate(self) -> Tuple[Optional[bytes], Optional[bytes]]:
+        """Read the output pipes to the end and wait for the exit."""
+
+        async def read(stream: Optional[asyncio.StreamReader]) -> Optional[bytes]:
+            return None if stream is None else await stream.read()
+
+        stdout, stderr = await asyncio.gather(read(self.stdout), read(self.stderr))
+        await self.wait()
+        return stdout, stderr
+
+    def kill(self) -> None:
+        # Popen.kill() polls first, which would reap an exited process
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def close(self) -> None:
+        """Close the pipes, e.g. when the output was not read to the end."""
+        for transport in self._transports:
+            transport.close()
+
+
+# What start_process() returns; both have the same interface
+ChildProcess = Union[asyncio.subprocess.Process, MonitoredProcess]
+
+
+async def start_process(cmd: List[str], **kwargs: Any) -> ChildProcess:
+    """
+    Start a child process in its own process group, like TaskExecutor.popen.
+
+    Args:
+        cmd: Command line to execute
+        **kwargs: Extra arguments for asyncio.create_subprocess_exec, or for
+            subprocess.Popen where the exit can be sampled before the reap
+
+    Returns:
+        The started process
+    """
+    if PROC_AVAILABLE and hasattr(os, "pidfd_open"):
+        kwargs["start_new_session"] = True
+        return await MonitoredProcess.start(cmd, **kwargs)
+    if sys.platform == "win32":
+        kwargs["creationflags"] = (
+            kwargs.get("creationflags", 0)
+            | subprocess.CREATE_NO_WINDOW
+            | subprocess.CREATE_NEW_PROCESS_GROUP
+        )
+    else:
+        kwargs["start_new_session"] = True
+    return await asyncio.create_subprocess_exec(*cmd, **kwargs)
+
+
+async def terminate_process_tree(
+    process: ChildProcess, timeout: float = 3.0
+) -> None:
+    """
+    Terminate a child process together with everything it spawned.
+
+    Coroutine counterpart of task_executor.terminate_process_tree().
+
+    Args:
+        process: Process started through start_process()
+        timeout: Seconds to wait for a graceful exit before killing
+    """
+    if process.returncode is not None:
+        return
+
+    try:
+        if sys.platform == "win32":
+            killer = await asyncio.create_subprocess_exec(
+                "taskkill",
+                "/F",
+                "/T",
+                "/PID",
+                str(process.pid),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                creationflags=subprocess.CREATE_NO_WINDOW,
+            )
+            await killer.wait()
+        else:
+            os.killpg(process.pid, signal.SIGTERM)
+            try:
+                await asyncio.wait_for(process.wait(), timeout)
+            except asyncio.TimeoutError:
+                os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
+
+    # Reap the child so it does not linger as a zombie
+    try:
+        await asyncio.wait_for(process.wait(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+
+
+async def iter_lines(
+    stream: asyncio.StreamReader, encoding: Optional[str] = None
+) -> AsyncIterator[str]:
+    """
+    Decode a pipe and yield it line by line, without line endings.
+
+    Lines end at "\\n", "\\r\\n" or a lone "\\r", as with universal newlines.
+
+    Args:
+        stream: Output pipe of a process
+        encoding: Text encoding, by default the locale's like text mode pipes
+    """
+    decoder = codecs.getincrementaldecoder(
+        encoding or locale.getpreferredencoding(False)
+    )(errors="replace")
+    buffer = ""
+    while True:
+        chunk = await stream.read(READ_SIZE)
+        buffer += decoder.decode(chunk, final=not chunk)
+        if not chunk:
+            if buffer:
+                yield buffer
+            return
+        # A trailing "\r" may be the first half of "\r\n"
+        held = "\r" if buffer.endswith("\r") else ""
+        lines = LINE_BREAK.split(buffer[: len(buffer) - len(held)])
+        buffer = lines.pop() + held
+        for line in lines:
+            yield line
+
+
+class Orchestrator:
+    """
+    Event loop thread that owns the coroutines of tasks and their processes.
+
+    Coroutines are submitted under a key (e.g. a task id), so all work of a
+    task can be cancelled together, and the processes they start can be
+    killed on their own to let the coroutine handle the exit. Blocking
+    steps such as ffmpeg runs through TaskExecutor or database writes go to
+    a small thread pool with to_thread().
+    """
+
+    def __init__(
+        self, monitor: Optional[ProcessMonitor] = None, blocking_threads: int = 4
+    ):
+        """
+        Args:
+            monitor: Measures the CPU, memory and disk I/O of the processes,
+                totalled per key
+            blocking_threads: Threads available to to_thread()
+        """
+        self.monitor = monitor
+        self._blocking = ThreadPoolExecutor(
+            max_workers=blocking_threads, thread_name_prefix="orchestrator-blocking"
+        )
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._futures: Dict[Any, Set[Future]] = {}
+        self._processes: Dict[Any, List[ChildProcess]] = {}
+        self._periodic: List[Tuple[float, Callable[[], Any]]] = []
+        self._shutting_down = False
+
+    @property
+    def active_count(self) -> int:
+        """Number of submitted coroutines that have not finished."""
+        with self._lock:
+            return sum(len(futures) for futures in self._futures.values())
+
+    @property
+    def process_count(self) -> int:
+        """Number of child processes currently running."""
+        with self._lock:
+            return sum(len(procs) for procs in self._processes.values())
+
+    @property
+    def is_shutting_down(self) -> bool:
+        return self._shutting_down
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the loop thread on first use (lock held)."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._run_loop,
+                args=(self._loop,),
+                name="orchestrator",
+                daemon=True,
+            )
+            self._thread.start()
+            for interval, callback in self._periodic:
+                self._schedule_periodic(interval, callback)
+        return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def submit(
+        self, key: Any, coroutine: Callable[..., Awaitable[Any]], *args: Any
+    ) -> Optional[Future]:
+        """
+        Run a coroutine function on the loop.
+
+        Args:
+            key: Owner of the work, used by cancel() and kill()
+            coroutine: Coroutine function to run
+            *args: Positional arguments for it
+
+        Returns:
+            Future for its result, or None if shutting down
+        """
+        with self._lock:
+            if self._shutting_down:
+                return None
+            loop = self._ensure_loop()
+            future = asyncio.run_coroutine_threadsafe(coroutine(*args), loop)
+            self._futures.setdefault(key, set()).add(future)
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key: Any, future: Future) -> None:
+        with self._lock:
+            futures = self._futures.get(key, set())
+            futures.discard(future)
+            if not futures:
+                self._futures.pop(key, None)
+
+    def every(self, interval: float, callback: Callable[[], Any]) -> None:
+        """
+        Call a function on the loop thread every interval seconds.
+
+        Periodic calls start with the loop, i.e. with the first submit().
+        """
+        with self._lock:
+            self._periodic.append((interval, callback))
+            if self._loop is not None:
+                self._schedule_periodic(interval, callback)
+
+    def _schedule_periodic(self, interval: float, callback: Callable[[], Any]) -> None:
+        def tick() -> None:
+            self._loop.call_later(interval, tick)
+            callback()
+
+        self._loop.call_soon_threadsafe(self._loop.call_later, interval, tick)
+
+    def cancel(self, key: Any) -> bool:
+        """
+        Cancel the coroutines of a key; their processes are terminated.
+
+        Returns:
+            True if the key had coroutines running
+        """
+        with self._lock:
+            futures = list(self._futures.get(key, ()))
+        for future in futures:
+            future.cancel()
+        return bool(futures)
+
+    def kill(self, key: Any) -> bool:
+        """
+        Terminate the processes of a key; its coroutines see them exit.
+
+        Returns:
+            True if the key had running processes
+        """
+        with self._lock:
+            procs = list(self._processes.get(key, ()))
+            loop = self._loop
+        if procs:
+            for process in procs:
+                asyncio.run_coroutine_threadsafe(terminate_process_tree(process), loop)
+        return bool(procs)
+
+    async def to_thread(self, function: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking function in the thread pool and await its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._blocking, function, *args)
+
+    async def _start(
+        self, key: Any, cmd: List[str], **kwargs: Any
+    ) -> ChildProcess:
+        """Start a process owned by key."""
+        if self._shutting_down:
+            raise RuntimeError("Orchestrator is shutting down")
+        process = await start_process(cmd, **kwargs)
+        with self._lock:
+            self._processes.setdefault(key, []).append(process)
+        if self.monitor is not None:
+            self.monitor.watch(key, process)
+            if isinstance(process, MonitoredProcess):
+                process.popen.on_exit = lambda _: self.monitor.exited(process)
+        return process
+
+    async def _finish(self, key: Any, process: ChildProcess) -> None:
+        """Make sure a process is gone and stop tracking it."""
+        await terminate_process_tree(process)
+        if isinstance(process, MonitoredProcess):
+            process.close()
+        if self.monitor is not None:
+            self.monitor.finish(process)
+        with self._lock:
+            procs = self._processes.get(key, [])
+            if process in procs:
+                procs.remove(process)
+            if not procs:
+                self._processes.pop(key, None)
+
+    async def stream(
+        self,
+        key: Any,
+        cmd: List[str],
+        on_line: Callable[[str], None],
+        check: bool = False,
+    ) -> int:
+        """
+        Run a command and pass each line of its output to on_line.
+
+        Args:
+            key: Owner of the process
+            cmd: Command line to execute
+            on_line: Called on the loop thread for every output line
+            check: Keep stderr apart and raise if the command fails;
+                otherwise stderr is interleaved with stdout
+
+        Returns:
+            Exit code of the process
+
+        Raises:
+            subprocess.CalledProcessError: With check, if the command fails
+        """
+        process = await self._start(
+            key,
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE if check else subprocess.STDOUT,
+        )
+        try:
+            # Drain stderr alongside, so the process never blocks on it
+            errors = asyncio.ensure_future(process.stderr.read()) if check else None
+            try:
+                async for line in iter_lines(process.stdout):
+                    on_line(line)
+                returncode = await process.wait()
+                stderr = await errors if errors else b""
+            finally:
+                if errors is not None and not errors.done():
+                    errors.cancel()
+        finally:
+            await self._finish(key, process)
+
+        if check and returncode != 0:
+            raise subprocess.CalledProcessError(
+                returncode, cmd, stderr=stderr.decode("utf-8", "replace")
+            )
+        return returncode
+
+    async def run(
+        self, key: Any, cmd: List[str], timeout: Optional[float] = None
+    ) -> subprocess.CompletedProcess:
+        """
+        Run a short-lived command to completion, like TaskExecutor.run().
+
+        Args:
+            key: Owner of the process
+            cmd: Command line to execute
+            timeout: Seconds before the process tree is killed and
+                subprocess.TimeoutExpired is raised
+
+        Returns:
+            The completed process with text output
+
+        Raises:
+            subprocess.CalledProcessError: If the command fails
+        """
+        process = await self._start(
+            key, cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            raise subprocess.TimeoutExpired(cmd, timeout) from None
+        finally:
+            await self._finish(key, process)
+
+        encoding = locale.getpreferredencoding(False)
+        stdout = stdout.decode(encoding, "replace")
+        stderr = stderr.decode(encoding, "replace")
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(
+                process.returncode, cmd, output=stdout, stderr=stderr
+            )
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """
+        Cancel every coroutine, terminate their processes and stop the loop.
+
+        Args:
+            timeout: Seconds to wait for the coroutines to clean up
+        """
+        with self._lock:
+            self._shutting_down = True
+            loop, self._loop = self._loop, None
+        if loop is not None:
+
+            async def cancel_all() -> None:
+                tasks = [
+                    task
+                    for task in asyncio.all_tasks()
+                    if task is not asyncio.current_task()
+                ]
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            try:
+                asyncio.run_coroutine_threadsafe(cancel_all(), loop).result(timeout)
+            except Exception:
+                pass
+            loop.call_soon_threadsafe(loop.stop)
+            if self._thread is not threading.current_thread():
+                self._thread.join(timeout)
+        self._blocking.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,80 @@
+"""
+Ordered list of tracks for the audio player.
+"""
+
+from typing import Iterable, List, Optional
+
+
+class PlayQueue:
+    """
+    Tracks to play with a cursor on the current one.
+
+    The queue knows which track follows the current one, so the player can
+    load it before the current track ends.
+    """
+
+    def __init__(self, repeat: bool = False):
+        """
+        Args:
+            repeat: Start over after the last track
+        """
+        self.tracks: List[str] = []
+        self.index = -1
+        self.repeat = repeat
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    @property
+    def current(self) -> Optional[str]:
+        """Track at the cursor, or None if nothing is queued."""
+        if 0 <= self.index < len(self.tracks):
+            return self.tracks[self.index]
+        return None
+
+    def set_tracks(self, tracks: Iterable[str], start: int = 0) -> Optional[str]:
+        """Replace the queue and move the cursor to start."""
+        self.tracks = list(tracks)
+        self.index = start if self.tracks else -1
+        return self.current
+
+    def add(self, tracks: Iterable[str]) -> None:
+        """Append tracks to the end of the queue."""
+        self.tracks.extend(tracks)
+        if self.index < 0 and self.tracks:
+            self.index = 0
+
+    def clear(self) -> None:
+        """Remove all tracks."""
+        self.tracks = []
+        self.index = -1
+
+    def _next_index(self, index: int) -> Optional[int]:
+        if index + 1 < len(self.tracks):
+            return index + 1
+        if self.repeat and self.tracks:
+            return 0
+        return None
+
+    def peek_next(self) -> Optional[str]:
+        """Track after the current one, without moving the cursor."""
+        index = self._next_index(self.index)
+        return None if index is None else self.tracks[index]
+
+    def advance(self) -> Optional[str]:
+        """Move to the next track; None (cursor unchanged) at the end."""
+        index = self._next_index(self.index)
+        if index is None:
+            return None
+        self.index = index
+        return self.current
+
+    def back(self) -> Optional[str]:
+        """Move to the previous track; None (cursor unchanged) at the start."""
+        if self.index > 0:
+            self.index -= 1
+        elif self.repeat and self.tracks:
+            self.index = len(self.tracks) - 1
+        else:
+            return None
+        return self.current
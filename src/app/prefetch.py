@@ -0,0 +1,162 @@
+"""
+Resolves video metadata for queued tasks before their turn.
+
+Every download starts with a yt-dlp --dump-json run that takes a few
+seconds. The prefetcher runs it for the next tasks in the queue while
+others download, with a bound on how many run at once, so a task starts
+transferring as soon as a slot frees up and its title and size estimate
+are known while it still waits.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from .orchestrator import Orchestrator
+
+# Format URLs in the metadata expire after a few hours; refetch well before
+DEFAULT_MAX_AGE = 30 * 60.0
+
+
+class MetadataPrefetcher:
+    """Fetches and caches metadata of queued tasks on the orchestrator loop."""
+
+    def __init__(
+        self,
+        orchestrator: Orchestrator,
+        fetch: Callable[[Any, List[str]], Awaitable[Dict[str, Any]]],
+        on_done: Optional[Callable[[int, Optional[Dict[str, Any]]], None]] = None,
+        depth: int = 3,
+        max_parallel: int = 2,
+        max_age: float = DEFAULT_MAX_AGE,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            orchestrator: Loop the metadata commands run on
+            fetch: Coroutine function running a metadata command under an
+                orchestrator key and returning the parsed metadata
+            on_done: Called on the loop with (task id, metadata or None)
+                after each prefetch
+            depth: Queued tasks to prefetch ahead
+            max_parallel: Metadata commands running at once
+            max_age: Seconds a prefetched result stays usable
+            clock: Time source, replaceable in tests
+        """
+        self.orchestrator = orchestrator
+        self.depth = depth
+        self.max_parallel = max_parallel
+        self.max_age = max_age
+        self._fetch = fetch
+        self._on_done = on_done
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Task id -> (command, future) of running prefetches
+        self._pending: Dict[int, Tuple[List[str], Future]] = {}
+        # Task id -> (command, metadata, fetched at)
+        self._cache: Dict[int, Tuple[List[str], Dict[str, Any], float]] = {}
+        self.stats = {"started": 0, "hits": 0, "failed": 0}
+
+    @property
+    def pending_count(self) -> int:
+        """Prefetches currently running."""
+        with self._lock:
+            return len(self._pending)
+
+    def schedule(self, upcoming: Iterable[Tuple[int, List[str]]]) -> int:
+        """
+        Start prefetches for the first tasks of the queue.
+
+        Args:
+            upcoming: (task id, metadata command) in queue order; only the
+                first depth entries are considered
+
+        Returns:
+            Number of prefetches started
+        """
+        started = 0
+        now = self._clock()
+        for index, (task_id, cmd) in enumerate(upcoming):
+            if index >= self.depth:
+                break
+            with self._lock:
+                if len(self._pending) >= self.max_parallel:
+                    break
+                if task_id in self._pending:
+                    continue
+                cached = self._cache.get(task_id)
+                if cached and cached[0] == cmd and now - cached[2] < self.max_age:
+                    continue
+                future = self.orchestrator.submit(
+                    ("prefetch", task_id), self._prefetch, task_id, cmd
+                )
+                if future is None:
+                    break
+                self._pending[task_id] = (cmd, future)
+                self.stats["started"] += 1
+            started += 1
+        return started
+
+    async def _prefetch(self, task_id: int, cmd: List[str]) -> None:
+        try:
+            info = await self._fetch(("prefetch", task_id), cmd)
+        except Exception:
+            # The download's own metadata step reports the problem
+            info = None
+        with self._lock:
+            if self._pending.pop(task_id, None) is None:
+                # Discarded meanwhile
+                return
+            if info:
+                self._cache[task_id] = (cmd, info, self._clock())
+            else:
+                self.stats["failed"] += 1
+        if self._on_done is not None:
+            self._on_done(task_id, info)
+
+    async def result(self, task_id: int, cmd: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Take the prefetched metadata of a task that is starting.
+
+        Waits for a prefetch still running for the same command instead of
+        starting a second one. Must be awaited on the orchestrator loop.
+
+        Returns:
+            The metadata, or None if it has to be fetched now
+        """
+        with self._lock:
+            pending = self._pending.get(task_id)
+        if pending is not None and pending[0] == cmd:
+            waiter = asyncio.wrap_future(pending[1])
+            # Unlike awaiting the future, wait() does not raise if the
+            # prefetch itself is cancelled
+            await asyncio.wait([waiter])
+        with self._lock:
+            cached = self._cache.pop(task_id, None)
+        if (
+            cached is None
+            or cached[0] != cmd
+            or self._clock() - cached[2] >= self.max_age
+        ):
+            return None
+        with self._lock:
+            self.stats["hits"] += 1
+        return cached[1]
+
+    def discard(self, task_id: int) -> None:
+        """Forget a task, cancelling its prefetch if it is running."""
+        with self._lock:
+            self._pending.pop(task_id, None)
+            self._cache.pop(task_id, None)
+        self.orchestrator.cancel(("prefetch", task_id))
@@ -0,0 +1,328 @@
+"""
+CPU, memory and disk usage of child process trees.
+
+On Linux, the trees of running yt-dlp and ffmpeg processes are sampled from
+/proc. A process that exits is sampled once more before it is reaped: its
+/proc entry then still holds the CPU time and I/O of all the children it
+waited for, so short runs are measured too. Children reaped between two
+samples of a running tree can still be missed. Elsewhere only the wall
+time is recorded.
+"""
+
+import os
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+PROC = "/proc"
+PROC_AVAILABLE = os.path.exists(os.path.join(PROC, "self", "stat")) and hasattr(
+    os, "waitid"
+)
+
+SAMPLE_INTERVAL = 0.5
+
+if PROC_AVAILABLE:
+    CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+# Usage values that add up across processes; peak_rss is a maximum instead
+SUMMED = ("wall_time", "cpu_time", "read_bytes", "write_bytes")
+
+
+def read_stat(pid: int) -> Optional[Dict[str, float]]:
+    """
+    CPU time and resident memory of a process from /proc/<pid>/stat.
+
+    The CPU time includes children the process has waited for.
+
+    Returns:
+        {"cpu_time": seconds, "rss": bytes}, or None if the process is gone
+    """
+    try:
+        with open(os.path.join(PROC, str(pid), "stat"), "rb") as f:
+            data = f.read().decode(errors="replace")
+    except OSError:
+        return None
+    # The command name is in parentheses and may contain spaces
+    fields = data[data.rindex(")") + 2 :].split()
+    # utime, stime, cutime and cstime are fields 14-17, rss is field 24
+    ticks = sum(int(value) for value in fields[11:15])
+    return {"cpu_time": ticks / CLOCK_TICKS, "rss": int(fields[21]) * PAGE_SIZE}
+
+
+def read_io(pid: int) -> Optional[Dict[str, int]]:
+    """Bytes a process (and its waited-for children) read from and wrote to disk."""
+    try:
+        with open(os.path.join(PROC, str(pid), "io"), "rb") as f:
+            lines = f.read().decode().splitlines()
+    except OSError:
+        return None
+    values = dict(line.split(": ", 1) for line in lines if ": " in line)
+    try:
+        return {
+            "read_bytes": int(values["read_bytes"]),
+            "write_bytes": int(values["write_bytes"]),
+        }
+    except (KeyError, ValueError):
+        return None
+
+
+def iter_tree(pid: int) -> Iterator[int]:
+    """A process and its descendants, parents before their children."""
+    pending = [pid]
+    while pending:
+        current = pending.pop(0)
+        yield current
+        try:
+            threads = os.listdir(os.path.join(PROC, str(current), "task"))
+        except OSError:
+            continue
+        for thread in threads:
+            path = os.path.join(PROC, str(current), "task", thread, "children")
+            try:
+                with open(path) as f:
+                    pending.extend(int(child) for child in f.read().split())
+            except (OSError, ValueError):
+                continue
+
+
+def sample_tree(pid: int) -> Optional[Dict[str, float]]:
+    """
+    Current usage of a process tree.
+
+    Each process reports itself plus the children it already reaped, so
+    summing the live processes counts every process once. Parents are
+    read first: a child reaped in between is then missed for this sample
+    rather than counted twice.
+
+    Returns:
+        cpu_time, rss, read_bytes and write_bytes, or None if the root is gone
+    """
+    total: Optional[Dict[str, float]] = None
+    for index, member in enumerate(iter_tree(pid)):
+        stat = read_stat(member)
+        if stat is None:
+            if index == 0:
+                return None
+            continue
+        if total is None:
+            total = {"cpu_time": 0.0, "rss": 0, "read_bytes": 0, "write_bytes": 0}
+        total["cpu_time"] += stat["cpu_time"]
+        total["rss"] += stat["rss"]
+        io = read_io(member)
+        if io is not None:
+            total["read_bytes"] += io["read_bytes"]
+            total["write_bytes"] += io["write_bytes"]
+    return total
+
+
+def add_usage(total: Dict[str, Any], usage: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Add the usage of another process to a total, in place.
+
+    Values unknown for either side (None) stay unknown.
+    """
+    for key in SUMMED:
+        if key not in total:
+            total[key] = usage.get(key)
+        elif total[key] is not None and usage.get(key) is not None:
+            total[key] += usage[key]
+        else:
+            total[key] = None
+    if "peak_rss" not in total:
+        total["peak_rss"] = usage.get("peak_rss")
+    elif total["peak_rss"] is not None and usage.get("peak_rss") is not None:
+        total["peak_rss"] = max(total["peak_rss"], usage["peak_rss"])
+    else:
+        total["peak_rss"] = None
+    total["processes"] = total.get("processes", 0) + 1
+    return total
+
+
+class MonitoredPopen(subprocess.Popen):
+    """
+    Popen that reports when its process exits, before reaping it.
+
+    wait() first waits for the exit without collecting the exit status, so
+    the process stays a zombie with readable /proc accounting while
+    on_exit runs. It is then reaped with wait4(), whose resource usage
+    (kept in rusage) has the peak memory of the largest process in the tree.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        on_exit: Optional[Callable[[subprocess.Popen], None]] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(*args, **kwargs)
+        self.on_exit = on_exit
+        self.rusage: Optional[Any] = None
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        if self.returncode is None and self.on_exit is not None and PROC_AVAILABLE:
+            if self._wait_exited(timeout):
+                on_exit, self.on_exit = self.on_exit, None
+                on_exit(self)
+                self._reap()
+        return super().wait(timeout)
+
+    def _reap(self) -> None:
+        """Collect the exit status of the exited process with its rusage."""
+        try:
+            _, status, self.rusage = os.wait4(self.pid, 0)
+        except ChildProcessError:
+            # Reaped by a concurrent poll(); wait() picks up its status
+            return
+        self.returncode = os.waitstatus_to_exitcode(status)
+
+    def _wait_exited(self, timeout: Optional[float]) -> bool:
+        """
+        Block until the process exits, leaving it to be reaped.
+
+        Returns:
+            False if the process was already reaped elsewhere
+
+        Raises:
+            subprocess.TimeoutExpired: If it is still running after timeout
+        """
+        flags = os.WEXITED | os.WNOWAIT
+        if timeout is None:
+            try:
+                os.waitid(os.P_PID, self.pid, flags)
+            except ChildProcessError:
+                return False
+            return True
+
+        deadline = time.monotonic() + timeout
+        delay = 0.0005
+        while True:
+            try:
+                if os.waitid(os.P_PID, self.pid, flags | os.WNOHANG) is not None:
+                    return True
+            except ChildProcessError:
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(self.args, timeout)
+            delay = min(delay * 2, remaining, 0.05)
+            time.sleep(delay)
+
+
+class ProcessMonitor:
+    """
+    Resource usage of child processes, totalled per owner key.
+
+    A background thread samples every watched process tree while any is
+    running. Usage of finished processes is added to their owner's total
+    until take() collects it.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        """
+        Args:
+            interval: Seconds between samples of running processes
+        """
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._watched: Dict[subprocess.Popen, Dict[str, Any]] = {}
+        self._totals: Dict[Any, Dict[str, Any]] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, key: Any, process: subprocess.Popen) -> None:
+        """Start measuring a process on behalf of key (e.g. a task id)."""
+        with self._lock:
+            self._watched[process] = {
+                "key": key,
+                "started": time.monotonic(),
+                "ended": None,
+                "sample": None,
+                "peak_rss": 0,
+            }
+            idle = self._thread is None or not self._thread.is_alive()
+            if PROC_AVAILABLE and idle:
+                self._thread = threading.Thread(
+                    target=self._run, name="process-monitor", daemon=True
+                )
+                self._thread.start()
+
+    def sample(self, process: subprocess.Popen) -> None:
+        """Sample a process tree now, e.g. right after the root exited."""
+        with self._lock:
+            state = self._watched.get(process)
+        if state is None or not PROC_AVAILABLE:
+            return
+        current = sample_tree(process.pid)
+        with self._lock:
+            if current is not None:
+                previous = state["sample"] or {}
+                # Totals only grow; a sample can miss a child being reaped
+                state["sample"] = {
+                    key: max(value, previous.get(key, value))
+                    for key, value in current.items()
+                }
+                state["peak_rss"] = max(state["peak_rss"], current["rss"])
+
+    def exited(self, process: subprocess.Popen) -> None:
+        """Take the last sample of a process that exited but is not reaped."""
+        self.sample(process)
+        with self._lock:
+            state = self._watched.get(process)
+            if state is not None:
+                state["ended"] = time.monotonic()
+
+    def finish(self, process: subprocess.Popen) -> None:
+        """Stop measuring a process and add its usage to its owner's total."""
+        with self._lock:
+            state = self._watched.pop(process, None)
+            if state is None:
+                return
+            sample = state["sample"]
+            rusage = getattr(process, "rusage", None)
+            if sample and rusage is not None:
+                # ru_maxrss is in KiB on Linux
+                state["peak_rss"] = max(state["peak_rss"], rusage.ru_maxrss * 1024)
+            usage = {
+                "wall_time": (state["ended"] or time.monotonic()) - state["started"],
+                "cpu_time": sample["cpu_time"] if sample else None,
+                "peak_rss": state["peak_rss"] if sample else None,
+                "read_bytes": sample["read_bytes"] if sample else None,
+                "write_bytes": sample["write_bytes"] if sample else None,
+            }
+            add_usage(self._totals.setdefault(state["key"], {}), usage)
+
+    def take(self, key: Any) -> Optional[Dict[str, Any]]:
+        """
+        Collect and reset the total usage of a key's finished processes.
+
+        Returns:
+            wall_time, cpu_time (seconds), peak_rss, read_bytes, write_bytes
+            (bytes) and the number of processes, or None if none finished.
+            Values that cannot be measured on this platform are None.
+        """
+        with self._lock:
+            return self._totals.pop(key, None)
+
+    def running(self) -> List[subprocess.Popen]:
+        """Processes being measured."""
+        with self._lock:
+            return list(self._watched)
+
+    def _run(self) -> None:
+        """Sample all watched processes until none are left."""
+        while True:
+            time.sleep(self.interval)
+            processes = self.running()
+            if not processes:
+                with self._lock:
+                    if not self._watched:
+                        self._thread = None
+                        return
+                continue
+            for process in processes:
+                if process.returncode is not None:
+                    # Reaped without release(); its last sample has to do
+                    self.finish(process)
+                else:
+                    self.sample(process)
@@ -0,0 +1,153 @@
+"""
+Classifies download failures and decides when to retry them.
+"""
+
+import random
+import re
+from typing import Optional
+
+# Failure categories
+NETWORK = "network"
+RATE_LIMITED = "rate_limited"
+AUTH = "auth"
+UNAVAILABLE = "unavailable"
+POSTPROCESSING = "postprocessing"
+STALLED = "stalled"
+UNKNOWN = "unknown"
+
+# Categories worth retrying automatically
+TRANSIENT_CATEGORIES = (NETWORK, RATE_LIMITED, STALLED)
+
+# Checked in order; the first matching category wins
+ERROR_PATTERNS = (
+    (
+        RATE_LIMITED,
+        re.compile(r"HTTP Error 429|Too Many Requests|rate.?limit", re.IGNORECASE),
+    ),
+    (
+        AUTH,
+        re.compile(
+            r"Failed to decrypt with DPAPI|HTTP Error 403|Sign in to confirm"
+            r"|cookies? (are|is) no longer valid|login required|age.restricted",
+            re.IGNORECASE,
+        ),
+    ),
+    (
+        UNAVAILABLE,
+        re.compile(
+            r"Video unavailable|Private video|This video (has been|is) removed"
+            r"|members.only|not available in your country|HTTP Error 404",
+            re.IGNORECASE,
+        ),
+    ),
+    (
+        POSTPROCESSING,
+        re.compile(
+            r"Postprocessing|Conversion failed|ffmpeg (is )?not found"
+            r"|ffprobe and ffmpeg not found|Merging formats failed",
+            re.IGNORECASE,
+        ),
+    ),
+    (
+        NETWORK,
+        re.compile(
+            r"HTTP Error 5\d\d|timed out|Connection (reset|refused|aborted)"
+            r"|Temporary failure in name resolution|getaddrinfo failed"
+            r"|Network is unreachable|IncompleteRead|Unable to download webpage"
+            r"|Remote end closed connection|Got error:",
+            re.IGNORECASE,
+        ),
+    ),
+)
+
+# Troubleshooting hints shown in the failure summary
+ERROR_HINTS = {
+    AUTH: (
+        "This might be a private or age-restricted video.\n"
+        "Try logging in with cookies or check if the video is accessible."
+    ),
+    UNAVAILABLE: (
+        "The video might be:\n"
+        "• Deleted or made private\n"
+        "• Geo-blocked in your region\n"
+        "• Age-restricted (try using cookies)"
+    ),
+    POSTPROCESSING: "ffmpeg failed while merging or converting the download.",
+    RATE_LIMITED: "YouTube is throttling requests. Try again later.",
+    NETWORK: "Check your internet connection.",
+    STALLED: "The download stopped making progress and was restarted.",
+}
+
+
+class DownloadError(Exception):
+    """A failed download with its classified cause."""
+
+    def __init__(self, message: str, category: str = UNKNOWN):
+        super().__init__(message)
+        self.category = category
+
+
+def classify_error(text: str) -> str:
+    """
+    Classify a failure from yt-dlp/ffmpeg output or an exception message.
+
+    Args:
+        text: Error output to inspect
+
+    Returns:
+        One of the category constants of this module
+    """
+    for category, pattern in ERROR_PATTERNS:
+        if pattern.search(text):
+            return category
+    return UNKNOWN
+
+
+def is_transient(category: str) -> bool:
+    """Whether a failure category is likely to succeed when retried."""
+    return category in TRANSIENT_CATEGORIES
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter for transient download failures."""
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 5.0,
+        max_delay: float = 300.0,
+        jitter: float = 0.5,
+    ):
+        """
+        Args:
+            max_attempts: Total attempts per task, including the first one
+            base_delay: Delay in seconds before the first retry
+            max_delay: Upper bound for a single delay in seconds
+            jitter: Fraction of the delay that is randomized (0 to 1)
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def should_retry(self, category: str, attempts: int) -> bool:
+        """
+        Decide whether a failed task should run again.
+
+        Args:
+            category: Classified failure category
+            attempts: Number of attempts made so far
+        """
+        return is_transient(category) and attempts < self.max_attempts
+
+    def delay(self, attempts: int, rng: Optional[random.Random] = None) -> float:
+        """
+        Seconds to wait before the next attempt.
+
+        Args:
+            attempts: Number of attempts made so far (1 after the first failure)
+            rng: Random generator, mainly for tests
+        """
+        rng = rng or random
+        delay = min(self.max_delay, self.base_delay * 2 ** max(0, attempts - 1))
+        return delay * (1 - self.jitter * rng.random())
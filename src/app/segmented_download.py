@@ -0,0 +1,453 @@
+"""
+Fetches direct media URLs in parallel byte-range segments.
+
+yt-dlp transfers each format as a single HTTP stream. For formats served
+over plain HTTP(S), the file can be fetched here instead: its size is
+probed with a one-byte range request, the file is preallocated and split
+into segments that are fetched in parallel over pooled keep-alive
+connections. Segment progress is kept in a small JSON file next to the
+partial file, so an interrupted download resumes every segment where it
+stopped. yt-dlp then finds the file already downloaded and only merges or
+converts it.
+"""
+
+import http.client
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from .retry_policy import NETWORK, DownloadError, classify_error
+
+# Partial file and segment state of a download in progress
+PART_SUFFIX = ".seg.part"
+STATE_SUFFIX = ".seg.json"
+
+DEFAULT_SEGMENTS = 4
+MIN_SEGMENT_SIZE = 1024 * 1024
+CHUNK_SIZE = 256 * 1024
+# Bytes written between saves of the segment state
+STATE_INTERVAL = 4 * 1024 * 1024
+# Attempts per segment before the download fails
+SEGMENT_ATTEMPTS = 3
+MAX_REDIRECTS = 5
+
+# Formats yt-dlp downloads as one plain HTTP transfer
+DIRECT_PROTOCOLS = ("http", "https")
+
+
+def direct_downloads(info: Dict[str, Any]) -> Optional[List[Tuple[str, str, Dict]]]:
+    """
+    Files yt-dlp would download for a video, if all are plain HTTP transfers.
+
+    Args:
+        info: yt-dlp --dump-json output, produced with the same --output
+            template and format selection as the download
+
+    Returns:
+        (url, path, HTTP headers) per format with the file names yt-dlp
+        uses, or None if a format needs yt-dlp's own downloader (HLS, DASH
+        fragments, ...)
+    """
+    filename = info.get("filename") or info.get("_filename")
+    if not filename:
+        return None
+    merged = info.get("requested_formats")
+    downloads = []
+    for fmt in merged or [info]:
+        if fmt.get("protocol") not in DIRECT_PROTOCOLS or not fmt.get("url"):
+            return None
+        path = filename
+        if merged:
+            # Formats to merge are kept as NAME.fFORMAT_ID.EXT until merged
+            path = f"{os.path.splitext(filename)[0]}.f{fmt['format_id']}.{fmt['ext']}"
+        downloads.append((fmt["url"], path, dict(fmt.get("http_headers") or {})))
+    return downloads
+
+
+def http_error(status: int, reason: str) -> DownloadError:
+    """DownloadError for an unexpected HTTP response, classified like yt-dlp's."""
+    message = f"HTTP Error {status}: {reason}"
+    return DownloadError(message, classify_error(message))
+
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections, reused per scheme, host and port."""
+
+    def __init__(self, timeout: float = 30.0, max_idle: int = 16):
+        """
+        Args:
+            timeout: Socket timeout in seconds
+            max_idle: Idle connections kept open per host
+        """
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.opened = 0
+        self._lock = threading.Lock()
+        self._idle: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+
+    def _connect(self, key: Tuple[str, str, int]) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        connection_class = (
+            http.client.HTTPSConnection
+            if scheme == "https"
+            else http.client.HTTPConnection
+        )
+        with self._lock:
+            self.opened += 1
+        return connection_class(host, port, timeout=self.timeout)
+
+    @contextmanager
+    def request(
+        self, url: str, headers: Dict[str, str]
+    ) -> Iterator[http.client.HTTPResponse]:
+        """
+        Send a GET request on a pooled connection and yield the response.
+
+        The connection goes back to the pool only if the response was read
+        to its end and the server keeps the connection open.
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in DIRECT_PROTOCOLS:
+            raise DownloadError(f"Unsupported URL: {url}")
+        key = (scheme, parts.hostname, parts.port or (443 if scheme == "https" else 80))
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+        with self._lock:
+            idle = self._idle.get(key)
+            connection = idle.pop() if idle else None
+        reused = connection is not None
+        if connection is None:
+            connection = self._connect(key)
+        try:
+            try:
+                connection.request("GET", target, headers=headers)
+                response = connection.getresponse()
+            except (http.client.HTTPException, OSError):
+                if not reused:
+                    raise
+                # The server closed the idle connection meanwhile
+                connection.close()
+                connection = self._connect(key)
+                connection.request("GET", target, headers=headers)
+                response = connection.getresponse()
+        except (http.client.HTTPException, OSError) as e:
+            connection.close()
+            raise DownloadError(f"Connection to {parts.hostname} failed: {e}", NETWORK)
+
+        try:
+            yield response
+        finally:
+            if response.isclosed() and not response.will_close:
+                with self._lock:
+                    idle = self._idle.setdefault(key, [])
+                    if len(idle) < self.max_idle:
+                        idle.append(connection)
+                        connection = None
+            if connection is not None:
+                connection.close()
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+class Segment:
+    """Byte range of a file and how far it has been written."""
+
+    __slots__ = ("start", "end", "position")
+
+    def __init__(self, start: int, end: int, position: Optional[int] = None):
+        self.start = start
+        # Inclusive, like HTTP ranges
+        self.end = end
+        self.position = start if position is None else position
+
+    @property
+    def done(self) -> bool:
+        return self.position > self.end
+
+
+def split_segments(size: int, count: int, min_size: int) -> List[Segment]:
+    """Split size bytes into at most count segments of at least min_size."""
+    count = max(1, min(count, size // max(1, min_size)))
+    step = -(-size // count)
+    return [
+        Segment(start, min(start + step, size) - 1) for start in range(0, size, step)
+    ]
+
+
+class SegmentedDownload:
+    """One file fetched in parallel byte ranges, resumable per segment."""
+
+    def __init__(
+        self,
+        url: str,
+        path: str,
+        headers: Optional[Dict[str, str]] = None,
+        segments: int = DEFAULT_SEGMENTS,
+        pool: Optional[ConnectionPool] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        min_segment_size: int = MIN_SEGMENT_SIZE,
+    ):
+        """
+        Args:
+            url: Direct media URL
+            path: Final file path; the file is assembled in path + PART_SUFFIX
+            headers: HTTP headers yt-dlp would send (User-Agent, ...)
+            segments: Parallel segments for large files
+            pool: Connection pool shared between downloads
+            on_progress: Called with (bytes written, total size) from the
+                segment threads
+            min_segment_size: Files are not split into smaller segments
+        """
+        self.url = url
+        self.path = path
+        self.part_path = path + PART_SUFFIX
+        self.state_path = path + STATE_SUFFIX
+        self.headers = dict(headers or {})
+        self.segment_count = segments
+        self.pool = pool or ConnectionPool()
+        self.on_progress = on_progress
+        self.min_segment_size = min_segment_size
+        self.size: Optional[int] = None
+        self.segments: List[Segment] = []
+        self._validator: Optional[str] = None
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._unsaved = 0
+
+    def cancel(self) -> None:
+        """Stop the download; its progress is kept for a later run."""
+        self._cancelled.set()
+
+    @property
+    def written(self) -> int:
+        """Bytes of the file written so far."""
+        with self._lock:
+            return sum(s.position - s.start for s in self.segments)
+
+    def run(self) -> int:
+        """
+        Download the file, resuming an earlier partial run if possible.
+
+        Returns:
+            Size of the finished file in bytes
+
+        Raises:
+            DownloadError: If the transfer failed, was cancelled or the file
+                does not have the announced length
+        """
+        ranges = self._probe()
+        if ranges:
+            self._prepare()
+            pending = [segment for segment in self.segments if not segment.done]
+            if pending:
+                with ThreadPoolExecutor(
+                    max_workers=len(pending), thread_name_prefix="segment"
+                ) as pool:
+                    failures = [
+                        future.exception()
+                        for future in [pool.submit(self._fetch, s) for s in pending]
+                    ]
+                self._save_state()
+                errors = [error for error in failures if error is not None]
+                if errors:
+                    raise errors[0]
+        else:
+            self._fetch_whole()
+        if self._cancelled.is_set():
+            raise DownloadError("Download cancelled")
+        self._verify()
+        os.replace(self.part_path, self.path)
+        self._remove(self.state_path)
+        return os.path.getsize(self.path)
+
+    def discard(self) -> None:
+        """Remove the partial file and its state, e.g. before yt-dlp retries."""
+        self._remove(self.part_path)
+        self._remove(self.state_path)
+
+    def _probe(self) -> bool:
+        """
+        Find the final URL, size and validator of the file.
+
+        Returns:
+            Whether the server serves byte ranges of a known total size
+        """
+        url = self.url
+        for _ in range(MAX_REDIRECTS + 1):
+            with self.pool.request(url, {**self.headers, "Range": "bytes=0-0"}) as r:
+                r.read()
+                if r.status in (301, 302, 303, 307, 308) and r.getheader("Location"):
+                    url = urljoin(url, r.getheader("Location"))
+                    continue
+                self.url = url
+                self._validator = r.getheader("ETag") or r.getheader("Last-Modified")
+                if r.status == 206:
+                    content_range = r.getheader("Content-Range") or ""
+                    total = content_range.rpartition("/")[2]
+                    if total.isdigit():
+                        self.size = int(total)
+                        return True
+                    return False
+                if r.status == 200:
+                    length = r.getheader("Content-Length")
+                    self.size = int(length) if length and length.isdigit() else None
+                    return False
+                raise http_error(r.status, r.reason)
+        raise DownloadError(f"Too many redirects: {self.url}", NETWORK)
+
+    def _prepare(self) -> None:
+        """Load the state of an earlier run, or preallocate a new file."""
+        state = self._load_state()
+        if state is not None:
+            self.segments = [Segment(*segment) for segment in state["segments"]]
+            return
+
+        self.segments = split_segments(
+            self.size, self.segment_count, self.min_segment_size
+        )
+        with open(self.part_path, "wb") as f:
+            # Reserve the space up front: less fragmentation, early ENOSPC
+            if hasattr(os, "posix_fallocate") and self.size:
+                try:
+                    os.posix_fallocate(f.fileno(), 0, self.size)
+                except OSError:
+                    f.truncate(self.size)
+            else:
+                f.truncate(self.size)
+        self._save_state()
+
+    def _load_state(self) -> Optional[Dict[str, Any]]:
+        """Segment state of an earlier run of the same file, if usable."""
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+            part_size = os.path.getsize(self.part_path)
+        except (OSError, ValueError):
+            return None
+        if (
+            state.get("size") != self.size
+            or state.get("validator") != self._validator
+            or part_size != self.size
+        ):
+            # The file changed upstream or the partial file is damaged
+            return None
+        return state
+
+    def _save_state(self) -> None:
+        with self._lock:
+            state = {
+                "size": self.size,
+                "validator": self._validator,
+                "segments": [[s.start, s.end, s.position] for s in self.segments],
+            }
+            self._unsaved = 0
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.state_path)
+
+    def _fetch(self, segment: Segment) -> None:
+        """Fetch one segment, resuming from its position after a failure."""
+        attempt = 0
+        with open(self.part_path, "r+b") as f:
+            while not segment.done and not self._cancelled.is_set():
+                headers = {
+                    **self.headers,
+                    "Range": f"bytes={segment.position}-{segment.end}",
+                }
+                if self._validator:
+                    # Get a 200 instead of mixing two versions of the file
+                    headers["If-Range"] = self._validator
+                try:
+                    with self.pool.request(self.url, headers) as response:
+                        expected = f"bytes {segment.position}-{segment.end}/"
+                        content_range = response.getheader("Content-Range") or ""
+                        if response.status != 206:
+                            raise http_error(response.status, response.reason)
+                        if not content_range.startswith(expected):
+                            raise DownloadError(
+                                f"Unexpected range {content_range!r}", NETWORK
+                            )
+                        f.seek(segment.position)
+                        self._copy(response, f, segment)
+                    if not segment.done and not self._cancelled.is_set():
+                        raise DownloadError("Connection closed early", NETWORK)
+                except (DownloadError, http.client.HTTPException, OSError) as e:
+                    attempt += 1
+                    category = getattr(e, "category", NETWORK)
+                    if category != NETWORK or attempt >= SEGMENT_ATTEMPTS:
+                        raise
+                    time.sleep(0.5 * attempt)
+
+    def _copy(self, response: http.client.HTTPResponse, f: Any, segment: Segment):
+        """Write a response body into its segment of the file."""
+        while not self._cancelled.is_set():
+            remaining = segment.end + 1 - segment.position
+            if remaining <= 0:
+                response.read()
+                break
+            chunk = response.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            f.write(chunk)
+            with self._lock:
+                segment.position += len(chunk)
+                self._unsaved += len(chunk)
+                save = self._unsaved >= STATE_INTERVAL
+            if save:
+                f.flush()
+                self._save_state()
+            if self.on_progress is not None:
+                self.on_progress(self.written, self.size)
+
+    def _fetch_whole(self) -> None:
+        """Fetch the file as one stream from a server without byte ranges."""
+        segment = Segment(0, (self.size or 0) - 1)
+        self.segments = [segment]
+        with self.pool.request(self.url, self.headers) as response:
+            if response.status != 200:
+                raise http_error(response.status, response.reason)
+            with open(self.part_path, "wb") as f:
+                while not self._cancelled.is_set():
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    with self._lock:
+                        segment.position += len(chunk)
+                    if self.on_progress is not None:
+                        self.on_progress(self.written, self.size)
+        if self.size is None and not self._cancelled.is_set():
+            # Nothing to check the length against
+            self.size = segment.position
+
+    def _verify(self) -> None:
+        """Make sure every byte of the announced length was written."""
+        incomplete = [s for s in self.segments if not s.done]
+        actual = os.path.getsize(self.part_path)
+        if incomplete or actual != self.size:
+            missing = sum(s.end + 1 - s.position for s in incomplete)
+            raise DownloadError(
+                f"Incomplete download: {actual} bytes on disk, {missing} of "
+                f"{self.size} bytes missing",
+                NETWORK,
+            )
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
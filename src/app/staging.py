@@ -0,0 +1,164 @@
+"""
+Moves finished downloads from a local staging directory to their save path.
+"""
+
+import errno
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from .task_executor import PARTIAL_FILE_PATTERN
+
+# Copy chunk size; small enough to react quickly to shutdown
+COPY_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def unique_path(path: str) -> str:
+    """Return path, or "name (n).ext" if a file with that name already exists."""
+    if not os.path.exists(path):
+        return path
+    root, ext = os.path.splitext(path)
+    counter = 1
+    while os.path.exists(f"{root} ({counter}){ext}"):
+        counter += 1
+    return f"{root} ({counter}){ext}"
+
+
+def finished_files(directory: str) -> List[str]:
+    """Completed (non-partial) files in a staging directory."""
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return []
+    return [
+        os.path.join(directory, name)
+        for name in names
+        if os.path.isfile(os.path.join(directory, name))
+        and not PARTIAL_FILE_PATTERN.search(name)
+    ]
+
+
+class StagingMover:
+    """
+    Background stage that moves staged files to their final destination.
+
+    Files on the same file system are renamed. Otherwise they are copied to
+    a hidden temporary name next to the destination and renamed into place,
+    so the save path never contains a half-written file. Copies wait until
+    the destination has enough free space.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        reserve_bytes: int = 256 * 1024 * 1024,
+        space_retry_interval: float = 30.0,
+    ):
+        """
+        Args:
+            max_workers: Number of files moved in parallel
+            reserve_bytes: Free space to leave on the destination
+            space_retry_interval: Seconds between free space checks while
+                waiting for room on the destination
+        """
+        self.reserve_bytes = reserve_bytes
+        self.space_retry_interval = space_retry_interval
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="stage-mover")
+        self._stop = threading.Event()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Number of move jobs not finished yet."""
+        with self._lock:
+            return self._pending
+
+    def submit(
+        self,
+        files: List[str],
+        dest_dir: str,
+        on_done: Callable[[List[str], Optional[Exception]], None],
+    ) -> Future:
+        """
+        Move files into dest_dir in the background.
+
+        Args:
+            files: Finished files in the staging directory
+            dest_dir: Final save path
+            on_done: Called from the mover thread with (moved_paths, error)
+        """
+        with self._lock:
+            self._pending += 1
+        return self._pool.submit(self._move_all, files, dest_dir, on_done)
+
+    def _move_all(
+        self,
+        files: List[str],
+        dest_dir: str,
+        on_done: Callable[[List[str], Optional[Exception]], None],
+    ) -> None:
+        moved: List[str] = []
+        error: Optional[Exception] = None
+        try:
+            os.makedirs(dest_dir, exist_ok=True)
+            for src in files:
+                moved.append(self.move_file(src, dest_dir))
+        except Exception as e:
+            error = e
+        finally:
+            with self._lock:
+                self._pending -= 1
+        on_done(moved, error)
+
+    def move_file(self, src: str, dest_dir: str) -> str:
+        """
+        Atomically move one file into dest_dir.
+
+        Returns:
+            Final path of the file
+        """
+        dest = unique_path(os.path.join(dest_dir, os.path.basename(src)))
+        same_device = os.stat(src).st_dev == os.stat(dest_dir).st_dev
+        if same_device:
+            os.replace(src, dest)
+            return dest
+
+        self._wait_for_space(dest_dir, os.path.getsize(src))
+
+        tmp = os.path.join(dest_dir, f".{os.path.basename(dest)}.moving")
+        try:
+            with open(src, "rb") as fsrc, open(tmp, "wb") as fdst:
+                while True:
+                    if self._stop.is_set():
+                        raise InterruptedError("Move cancelled")
+                    chunk = fsrc.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    fdst.write(chunk)
+                fdst.flush()
+                os.fsync(fdst.fileno())
+            shutil.copystat(src, tmp)
+            os.replace(tmp, dest)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+        os.remove(src)
+        return dest
+
+    def _wait_for_space(self, dest_dir: str, size: int) -> None:
+        """Block until dest_dir can take size bytes plus the reserve."""
+        while shutil.disk_usage(dest_dir).free < size + self.reserve_bytes:
+            if self._stop.wait(self.space_retry_interval):
+                raise OSError(errno.ENOSPC, "Not enough space", dest_dir)
+
+    def shutdown(self) -> None:
+        """Abort running copies (staged files are kept) and stop the workers."""
+        self._stop.set()
+        self._pool.shutdown(wait=True)
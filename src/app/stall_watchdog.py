@@ -0,0 +1,176 @@
+"""
+Detects downloads whose yt-dlp/ffmpeg process stopped making progress.
+"""
+
+import collections
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Stall reasons
+NO_PROGRESS = "no_progress"
+TOO_SLOW = "too_slow"
+
+
+class _Heartbeat:
+    """Progress bookkeeping for one watched task."""
+
+    __slots__ = ("on_stall", "last_bytes", "last_progress", "slow_since", "phase")
+
+    def __init__(self, on_stall: Callable[[Any, str], None], now: float):
+        self.on_stall = on_stall
+        self.last_bytes = -1.0
+        self.last_progress = now
+        self.slow_since: Optional[float] = None
+        self.phase = "download"
+
+
+class StallWatchdog:
+    """
+    Watches progress heartbeats of running tasks from a background thread.
+
+    A task is considered stalled when its downloaded byte count has not grown
+    for stall_timeout seconds, or when its speed stayed below min_speed for
+    slow_timeout seconds. Post-processing (ffmpeg merge/extract) prints no
+    progress, so it gets its own, longer timeout.
+    """
+
+    def __init__(
+        self,
+        stall_timeout: float = 120.0,
+        min_speed: float = 10 * 1024,
+        slow_timeout: float = 600.0,
+        postprocess_timeout: float = 1800.0,
+        check_interval: float = 5.0,
+        threaded: bool = True,
+    ):
+        """
+        Args:
+            stall_timeout: Seconds without new bytes before a task is stalled
+            min_speed: Speed floor in bytes per second (0 disables the check)
+            slow_timeout: Seconds below min_speed before a task is stalled
+            postprocess_timeout: Seconds allowed for a silent ffmpeg step
+            check_interval: Seconds between checks of the watchdog thread
+            threaded: Check from a thread of its own; pass False to call
+                check() every check_interval from an event loop instead
+        """
+        self.stall_timeout = stall_timeout
+        self.min_speed = min_speed
+        self.slow_timeout = slow_timeout
+        self.postprocess_timeout = postprocess_timeout
+        self.check_interval = check_interval
+        self.threaded = threaded
+        self.stats: Dict[str, int] = collections.Counter()
+        self._tasks: Dict[Any, _Heartbeat] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, task_id: Any, on_stall: Callable[[Any, str], None]) -> None:
+        """
+        Start watching a task.
+
+        Args:
+            task_id: Identifier of the task
+            on_stall: Called from the thread running check() with
+                (task_id, reason)
+        """
+        with self._lock:
+            self._tasks[task_id] = _Heartbeat(on_stall, time.monotonic())
+            if not self.threaded:
+                return
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="stall-watchdog", daemon=True
+                )
+                self._thread.start()
+
+    def unwatch(self, task_id: Any) -> None:
+        """Stop watching a task."""
+        with self._lock:
+            self._tasks.pop(task_id, None)
+
+    def heartbeat(
+        self,
+        task_id: Any,
+        downloaded_bytes: Optional[float] = None,
+        speed: Optional[float] = None,
+        phase: Optional[str] = None,
+    ) -> None:
+        """
+        Report progress of a task.
+
+        Args:
+            task_id: Identifier of the task
+            downloaded_bytes: Bytes downloaded so far, if known
+            speed: Current speed in bytes per second, if known
+            phase: "download" or "postprocess" when the task changes stage
+        """
+        now = time.monotonic()
+        with self._lock:
+            beat = self._tasks.get(task_id)
+            if beat is None:
+                return
+
+            if phase and phase != beat.phase:
+                beat.phase = phase
+                beat.last_progress = now
+                beat.slow_since = None
+
+            if downloaded_bytes is not None and downloaded_bytes != beat.last_bytes:
+                # A new file (video then audio stream) restarts the byte count
+                beat.last_bytes = downloaded_bytes
+                beat.last_progress = now
+
+            if speed is not None and self.min_speed:
+                if speed < self.min_speed:
+                    if beat.slow_since is None:
+                        beat.slow_since = now
+                else:
+                    beat.slow_since = None
+
+    def check(self, now: Optional[float] = None) -> None:
+        """Detect stalled tasks and report them through their callbacks."""
+        now = time.monotonic() if now is None else now
+        stalled = []
+        with self._lock:
+            for task_id, beat in list(self._tasks.items()):
+                timeout = (
+                    self.postprocess_timeout
+                    if beat.phase == "postprocess"
+                    else self.stall_timeout
+                )
+                if now - beat.last_progress >= timeout:
+                    reason = NO_PROGRESS
+                elif (
+                    beat.phase == "download"
+                    and beat.slow_since is not None
+                    and now - beat.slow_since >= self.slow_timeout
+                ):
+                    reason = TOO_SLOW
+                else:
+                    continue
+
+                # Report each stall once; the task is requeued by the callback
+                del self._tasks[task_id]
+                self.stats["stalls"] += 1
+                self.stats[reason] += 1
+                stalled.append((beat.on_stall, task_id, reason))
+
+        for on_stall, task_id, reason in stalled:
+            on_stall(task_id, reason)
+
+    def stop(self) -> None:
+        """Stop the watchdog thread."""
+        self._stop.set()
+        with self._lock:
+            self._tasks.clear()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            self.check()
+            with self._lock:
+                if not self._tasks:
+                    self._thread = None
+                    return
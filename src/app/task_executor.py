@@ -0,0 +1,301 @@
+"""
+Tracks background workers and the child processes they spawn.
+"""
+
+import glob
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from .process_stats import MonitoredPopen, ProcessMonitor
+from .segmented_download import PART_SUFFIX, STATE_SUFFIX
+
+# Files yt-dlp and ffmpeg leave behind while a download is still in progress
+PARTIAL_FILE_PATTERN = re.compile(
+    r"(\.part|\.ytdl|\.part-Frag\d+(\.part)?|\.temp\.\w+|\.f\d+\.\w+(\.part)?)$"
+)
+
+
+def terminate_process_tree(process: subprocess.Popen, timeout: float = 3.0) -> None:
+    """
+    Terminate a child process together with everything it spawned.
+
+    yt-dlp starts ffmpeg as its own child, so killing only the direct child
+    would leave the merge/extract process running.
+
+    Args:
+        process: Process started through TaskExecutor.popen
+        timeout: Seconds to wait for a graceful exit before killing
+    """
+    if process.poll() is not None:
+        return
+
+    try:
+        if sys.platform == "win32":
+            subprocess.run(
+                ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                capture_output=True,
+                creationflags=subprocess.CREATE_NO_WINDOW,
+            )
+        else:
+            os.killpg(process.pid, signal.SIGTERM)
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
+
+    # Reap the child so it does not linger as a zombie
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def find_partial_files(outputs: Iterable[str]) -> List[str]:
+    """
+    List unfinished files that belong to a set of download destinations.
+
+    Args:
+        outputs: Destination paths reported by yt-dlp for one task
+
+    Returns:
+        Existing partial or intermediate files for those destinations
+    """
+    partials = set()
+    for output in outputs:
+        candidates = [output + ".part", output + ".ytdl"]
+        candidates.extend(output + suffix for suffix in (PART_SUFFIX, STATE_SUFFIX))
+        candidates.extend(glob.glob(glob.escape(output) + ".part-Frag*"))
+        if PARTIAL_FILE_PATTERN.search(output):
+            candidates.append(output)
+        partials.update(path for path in candidates if os.path.isfile(path))
+    return sorted(partials)
+
+
+def remove_files(paths: Iterable[str]) -> int:
+    """
+    Delete files, ignoring ones that are already gone.
+
+    Returns:
+        Number of files removed
+    """
+    removed = 0
+    for path in paths:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+class TaskExecutor:
+    """
+    Runs background workers and owns every child process they spawn.
+
+    Each download task registers its processes and output files here, so
+    a task can be cancelled on its own and the whole executor can be shut
+    down cleanly when the window closes. The CPU time, memory and disk I/O
+    of the processes are totalled per task (see take_usage()).
+    """
+
+    def __init__(self):
+        self.monitor = ProcessMonitor()
+        self._lock = threading.RLock()
+        self._workers: Dict[int, threading.Thread] = {}
+        self._processes: Dict[Any, List[subprocess.Popen]] = {}
+        self._outputs: Dict[Any, Set[str]] = {}
+        self._shutting_down = False
+
+    @property
+    def active_count(self) -> int:
+        """Number of worker threads currently running."""
+        with self._lock:
+            return len(self._workers)
+
+    @property
+    def is_shutting_down(self) -> bool:
+        return self._shutting_down
+
+    def submit(
+        self, target: Callable[..., Any], *args: Any, name: Optional[str] = None
+    ) -> Optional[threading.Thread]:
+        """
+        Start a tracked worker thread.
+
+        Args:
+            target: Callable to run in the background
+            *args: Positional arguments for the callable
+            name: Optional thread name for debugging
+
+        Returns:
+            The started thread, or None if the executor is shutting down
+        """
+        with self._lock:
+            if self._shutting_down:
+                return None
+
+            def run() -> None:
+                try:
+                    target(*args)
+                finally:
+                    with self._lock:
+                        self._workers.pop(threading.get_ident(), None)
+
+            thread = threading.Thread(target=run, name=name, daemon=True)
+            thread.start()
+            self._workers[thread.ident] = thread
+            return thread
+
+    def popen(self, task_id: Any, cmd: List[str], **kwargs: Any) -> subprocess.Popen:
+        """
+        Start a child process in its own process group and track it.
+
+        Args:
+            task_id: Identifier of the task that owns the process
+            cmd: Command line to execute
+            **kwargs: Extra arguments passed to subprocess.Popen
+
+        Returns:
+            The started process
+        """
+        if sys.platform == "win32":
+            kwargs["creationflags"] = (
+                kwargs.get("creationflags", 0)
+                | subprocess.CREATE_NO_WINDOW
+                | subprocess.CREATE_NEW_PROCESS_GROUP
+            )
+        else:
+            kwargs.pop("creationflags", None)
+            kwargs["start_new_session"] = True
+
+        with self._lock:
+            if self._shutting_down:
+                raise RuntimeError("Executor is shutting down")
+            process = MonitoredPopen(cmd, on_exit=self.monitor.exited, **kwargs)
+            self._processes.setdefault(task_id, []).append(process)
+            self.monitor.watch(task_id, process)
+        return process
+
+    def run(
+        self, task_id: Any, cmd: List[str], timeout: Optional[float] = None
+    ) -> subprocess.CompletedProcess:
+        """
+        Run a short-lived command to completion as a tracked process.
+
+        Behaves like subprocess.run(capture_output=True, text=True, check=True)
+        but the process can be terminated by cancel() or shutdown().
+
+        Args:
+            task_id: Identifier of the task that owns the process
+            cmd: Command line to execute
+            timeout: Seconds before the process tree is killed and
+                subprocess.TimeoutExpired is raised
+
+        Returns:
+            The completed process
+        """
+        process = self.popen(
+            task_id,
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            terminate_process_tree(process)
+            process.communicate()
+            raise
+        finally:
+            self.release(task_id, process)
+
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(
+                process.returncode, cmd, output=stdout, stderr=stderr
+            )
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+    def release(self, task_id: Any, process: subprocess.Popen) -> None:
+        """Stop tracking a process that has exited."""
+        self.monitor.finish(process)
+        with self._lock:
+            procs = self._processes.get(task_id, [])
+            if process in procs:
+                procs.remove(process)
+            if not procs:
+                self._processes.pop(task_id, None)
+
+    def take_usage(self, task_id: Any) -> Optional[Dict[str, Any]]:
+        """
+        Collect the resource usage of a task's finished processes.
+
+        Usage adds up over all processes of the task (e.g. across retries)
+        until it is taken; see ProcessMonitor.take().
+        """
+        return self.monitor.take(task_id)
+
+    def track_output(self, task_id: Any, path: str) -> None:
+        """Remember a file a task writes so its partial files can be removed."""
+        with self._lock:
+            self._outputs.setdefault(task_id, set()).add(path)
+
+    def finish(self, task_id: Any) -> None:
+        """Forget everything tracked for a task that completed normally."""
+        with self._lock:
+            self._processes.pop(task_id, None)
+            self._outputs.pop(task_id, None)
+
+    def cancel(self, task_id: Any, cleanup: bool = True) -> bool:
+        """
+        Terminate all processes of a task.
+
+        Args:
+            task_id: Identifier of the task to stop
+            cleanup: Whether to delete the task's partial files afterwards.
+                Pass False to keep them so a later run can resume.
+
+        Returns:
+            True if the task had running processes
+        """
+        with self._lock:
+            procs = list(self._processes.pop(task_id, []))
+            outputs = self._outputs.pop(task_id, set()) if cleanup else set()
+
+        for process in procs:
+            terminate_process_tree(process)
+            self.monitor.finish(process)
+
+        if outputs:
+            remove_files(find_partial_files(outputs))
+        return bool(procs)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """
+        Stop accepting work, kill every child process and wait for workers.
+
+        Args:
+            timeout: Total seconds to wait for worker threads to exit
+        """
+        with self._lock:
+            self._shutting_down = True
+            task_ids = list(set(self._processes) | set(self._outputs))
+
+        for task_id in task_ids:
+            self.cancel(task_id, cleanup=True)
+
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            workers = list(self._workers.values())
+        for thread in workers:
+            if thread is threading.current_thread():
+                continue
+            thread.join(max(0.0, deadline - time.monotonic()))
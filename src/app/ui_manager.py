@@ -3,7 +3,7 @@ Handles creation and management of the UI.
 """
 
 import os
-from typing import TYPE_CHECKING
+from typing import Any, Dict, TYPE_CHECKING
 
 from PyQt6.QtWidgets import (
     QApplication,
@@ -15,6 +15,8 @@ from PyQt6.QtWidgets import (
     QInputDialog,
     QLabel,
     QLineEdit,
+    QListWidget,
+    QListWidgetItem,
     QMainWindow,
     QMessageBox,
     QProgressBar,
@@ -31,6 +33,11 @@ from PyQt6.QtCore import QSize, Qt
 from PyQt6.QtWidgets import QSlider
 from PyQt6.QtCore import Qt
 
+from .bandwidth import parse_schedule
+from .commands import DOWNLOAD_MODES, SINGLE_MODES
+from .cookie_session import BROWSERS
+from .waveform_slider import WaveformSlider
+
 if TYPE_CHECKING:
     from .main_window import YTDGUI
 
@@ -42,6 +49,7 @@ class UIManager:
         self.main_app = main_app
         self.main_app.icons = {}
         self.main_app.video_favicon_pixmap = None
+        self._task_items: Dict[int, QListWidgetItem] = {}
 
     def _load_stylesheet(self) -> None:
         """Load and apply the application stylesheet."""
@@ -105,6 +113,53 @@ class UIManager:
         # File menu
         file_menu = menubar.addMenu("File")
 
+        # Bandwidth settings
+        limit_action = QAction("Bandwidth Limit...", self.main_app)
+        limit_action.triggered.connect(self.show_bandwidth_limit_dialog)
+        file_menu.addAction(limit_action)
+
+        schedule_action = QAction("Bandwidth Schedule...", self.main_app)
+        schedule_action.triggered.connect(self.show_bandwidth_schedule_dialog)
+        file_menu.addAction(schedule_action)
+
+        login_action = QAction("Login...", self.main_app)
+        login_action.triggered.connect(self.show_login_dialog)
+        file_menu.addAction(login_action)
+
+        staging_action = QAction("Staging Folder...", self.main_app)
+        staging_action.triggered.connect(self.show_staging_dialog)
+        file_menu.addAction(staging_action)
+
+        library_action = QAction("Rescan Library", self.main_app)
+        library_action.triggered.connect(
+            lambda: self.main_app.download_manager.rescan_library()
+        )
+        file_menu.addAction(library_action)
+
+        loudness_action = QAction("Analyze Loudness", self.main_app)
+        loudness_action.triggered.connect(
+            lambda: self.main_app.download_manager.analyze_library()
+        )
+        file_menu.addAction(loudness_action)
+
+        normalize_action = QAction("Normalize Loudness", self.main_app)
+        normalize_action.setCheckable(True)
+        normalize_action.setChecked(self.main_app.audio_player.normalize)
+        normalize_action.toggled.connect(self.main_app.audio_player.set_normalize)
+        file_menu.addAction(normalize_action)
+
+        segmented_action = QAction("Parallel Segment Downloads", self.main_app)
+        segmented_action.setCheckable(True)
+        segmented_action.setChecked(
+            self.main_app.download_manager.segmented_downloads
+        )
+        segmented_action.toggled.connect(
+            self.main_app.download_manager.set_segmented_downloads
+        )
+        file_menu.addAction(segmented_action)
+
+        file_menu.addSeparator()
+
         # Exit action
         exit_action = QAction("Exit", self.main_app)
         exit_action.triggered.connect(self.main_app.close)
@@ -117,6 +172,184 @@ class UIManager:
         about_action.triggered.connect(self.show_about)
         help_menu.addAction(about_action)
 
+        # Diagnostics for UI freezes; also enabled by YTD_DIAGNOSTICS=1
+        diagnostics = self.main_app.diagnostics
+        diagnostics_menu = help_menu.addMenu("Diagnostics")
+
+        enable_action = QAction("Enable Diagnostics", self.main_app)
+        enable_action.setCheckable(True)
+        enable_action.setChecked(diagnostics.enabled)
+        enable_action.toggled.connect(
+            lambda checked: diagnostics.enable() if checked else diagnostics.disable()
+        )
+        diagnostics_menu.addAction(enable_action)
+
+        self._profile_action = QAction("Start CPU Profile", self.main_app)
+        self._profile_action.triggered.connect(self.toggle_profile)
+        diagnostics_menu.addAction(self._profile_action)
+
+        snapshot_action = QAction("Save Memory Snapshot", self.main_app)
+        snapshot_action.triggered.connect(self.save_memory_snapshot)
+        diagnostics_menu.addAction(snapshot_action)
+
+        report_action = QAction("Save Diagnostics Report", self.main_app)
+        report_action.triggered.connect(self.save_diagnostics_report)
+        diagnostics_menu.addAction(report_action)
+
+    def show_bandwidth_limit_dialog(self) -> None:
+        """Ask for the total download rate shared by all downloads."""
+        bandwidth = self.main_app.download_manager.bandwidth
+        current = (bandwidth.limit or 0) / (1024 * 1024)
+        value, ok = QInputDialog.getDouble(
+            self.main_app,
+            "Bandwidth Limit",
+            "Total download limit in MB/s (0 = unlimited):",
+            current,
+            0,
+            10000,
+            2,
+        )
+        if not ok:
+            return
+        limit = value * 1024 * 1024 or None
+        self.main_app.download_manager.set_bandwidth_limit(limit, bandwidth.schedule)
+        self.main_app.update_status(
+            f"Bandwidth limit: {value:.2f} MB/s" if limit else "Bandwidth unlimited"
+        )
+
+    def show_bandwidth_schedule_dialog(self) -> None:
+        """Ask for time-of-day bandwidth limits."""
+        text, ok = QInputDialog.getText(
+            self.main_app,
+            "Bandwidth Schedule",
+            "Limits in MB/s per time range, 0 = unlimited\n"
+            "(e.g. 09:00-18:00=2; 18:00-09:00=0). Leave empty to disable:",
+        )
+        if not ok:
+            return
+        try:
+            schedule = parse_schedule(text)
+        except ValueError as e:
+            QMessageBox.critical(self.main_app, "Error", str(e))
+            return
+        bandwidth = self.main_app.download_manager.bandwidth
+        self.main_app.download_manager.set_bandwidth_limit(bandwidth.limit, schedule)
+        self.main_app.update_status("Bandwidth schedule updated")
+
+    def show_login_dialog(self) -> None:
+        """Ask where the login cookies for YouTube come from."""
+        cookie_file_choice = "cookies.txt file..."
+        choices = ["Off", cookie_file_choice] + list(BROWSERS)
+        current = 0
+        if self.main_app.use_cookies:
+            current = (
+                choices.index(self.main_app.cookie_browser)
+                if not self.main_app.cookie_file
+                and self.main_app.cookie_browser in choices
+                else 1
+            )
+        choice, ok = QInputDialog.getItem(
+            self.main_app,
+            "Login",
+            "Use the YouTube login of a browser, or an exported cookies.txt:",
+            choices,
+            current,
+            False,
+        )
+        if not ok:
+            return
+        manager = self.main_app.download_manager
+        if choice == cookie_file_choice:
+            path, _ = QFileDialog.getOpenFileName(
+                self.main_app, "Select cookies.txt", "", "Cookie files (*.txt)"
+            )
+            if not path:
+                return
+            manager.set_cookie_source(cookie_file=path)
+        elif choice == "Off":
+            manager.set_cookie_source()
+        else:
+            manager.set_cookie_source(browser=choice)
+        self.main_app.update_status(f"Login: {manager.cookies.source} cookies")
+
+    def show_staging_dialog(self) -> None:
+        """Ask for a local folder where downloads are assembled."""
+        manager = self.main_app.download_manager
+        text, ok = QInputDialog.getText(
+            self.main_app,
+            "Staging Folder",
+            "Fast local folder (SSD/tmpfs) used while downloading and merging.\n"
+            "Finished files are moved to the save location. Leave empty to disable:",
+            text=manager.staging_dir or "",
+        )
+        if not ok:
+            return
+        path = text.strip()
+        if path:
+            try:
+                os.makedirs(path, exist_ok=True)
+            except OSError as e:
+                QMessageBox.critical(self.main_app, "Error", str(e))
+                return
+        manager.staging_dir = path or None
+        self.main_app.update_status(
+            f"Staging folder: {path}" if path else "Staging folder disabled"
+        )
+
+    def toggle_profile(self) -> None:
+        """Start a CPU profile of the GUI thread, or stop and save it."""
+        diagnostics = self.main_app.diagnostics
+        try:
+            if diagnostics.profiling:
+                path = diagnostics.stop_profile()
+                self.main_app.log_message(f"CPU profile saved to {path}")
+            else:
+                diagnostics.start_profile()
+                self.main_app.log_message("CPU profile started")
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self.main_app, "Error", f"CPU profile failed: {e}")
+        self._profile_action.setText(
+            "Stop CPU Profile" if diagnostics.profiling else "Start CPU Profile"
+        )
+
+    def save_memory_snapshot(self) -> None:
+        """Save a tracemalloc snapshot of the running session."""
+        try:
+            path = self.main_app.diagnostics.save_snapshot()
+        except RuntimeError:
+            QMessageBox.information(
+                self.main_app,
+                "Diagnostics",
+                "Enable diagnostics first; memory is only traced while enabled.",
+            )
+            return
+        except OSError as e:
+            QMessageBox.critical(self.main_app, "Error", f"Snapshot failed: {e}")
+            return
+        self.main_app.log_message(f"Memory snapshot saved to {path}")
+
+    def save_diagnostics_report(self) -> None:
+        """Write event-loop lag and slot timings to a JSON report."""
+        diagnostics = self.main_app.diagnostics
+        try:
+            path = diagnostics.save_report()
+        except OSError as e:
+            QMessageBox.critical(self.main_app, "Error", f"Report failed: {e}")
+            return
+        lag = diagnostics.lag_monitor.stats()
+        message = f"Diagnostics report saved to {path}"
+        if lag["samples"]:
+            message += (
+                f" (event loop lag p95 {lag['p95_ms']:.0f} ms, "
+                f"max {lag['max_ms']:.0f} ms)"
+            )
+        self.main_app.log_message(message)
+        for slot in diagnostics.slots.slowest(3):
+            self.main_app.log_message(
+                f"  {slot['slot']}: {slot['calls']} calls, "
+                f"slowest {slot['max_ms']:.0f} ms"
+            )
+
     def show_about(self) -> None:
         about_text = (
             "yt-downloader-gui\n"
@@ -185,18 +418,7 @@ class UIManager:
 
         layout.addWidget(QLabel("Download Mode:"))
         self.main_app.mode_combo = QComboBox()
-        self.main_app.mode_combo.addItems(
-            [
-                "Single Video",
-                "MP3 Only",
-                "Playlist Video",
-                "Playlist MP3",
-                "Channel Videos",
-                "Channel Videos MP3",
-                "Channel Shorts",
-                "Channel Shorts MP3",
-            ]
-        )
+        self.main_app.mode_combo.addItems(DOWNLOAD_MODES)
         self.main_app.mode_combo.currentTextChanged.connect(self.mode_changed)
         layout.addWidget(self.main_app.mode_combo)
 
@@ -218,6 +440,19 @@ class UIManager:
         layout.addWidget(self.main_app.video_quality_label)
         layout.addWidget(self.main_app.video_quality_combo)
 
+        self.main_app.sections_label = QLabel("Clip Ranges (optional):")
+        self.main_app.sections_entry = QLineEdit()
+        self.main_app.sections_entry.setPlaceholderText(
+            "Download only parts, e.g. 0:30-1:00, 1:45:00-1:50:00"
+        )
+        layout.addWidget(self.main_app.sections_label)
+        layout.addWidget(self.main_app.sections_entry)
+
+        self.main_app.split_chapters_check = QCheckBox(
+            "Split MP3 into one file per chapter"
+        )
+        layout.addWidget(self.main_app.split_chapters_check)
+
         self.mode_changed(self.main_app.mode_combo.currentText())
 
         download_btn = QPushButton("Download")
@@ -229,14 +464,20 @@ class UIManager:
 
         audio_layout = QHBoxLayout()
 
+        prev_btn = QPushButton("⏮ Prev")
         self.main_app.play_btn = QPushButton("▶ Play")
         stop_btn = QPushButton("⏹ Stop")
+        next_btn = QPushButton("⏭ Next")
 
+        prev_btn.clicked.connect(self.main_app.previous_audio)
         self.main_app.play_btn.clicked.connect(self.main_app.play_audio)
         stop_btn.clicked.connect(self.main_app.stop_audio)
+        next_btn.clicked.connect(self.main_app.next_audio)
 
+        audio_layout.addWidget(prev_btn)
         audio_layout.addWidget(self.main_app.play_btn)
         audio_layout.addWidget(stop_btn)
+        audio_layout.addWidget(next_btn)
 
         layout.addLayout(audio_layout)
         # --------------------------------------
@@ -259,7 +500,7 @@ class UIManager:
         layout.addWidget(self.main_app.song_label)
 
         # Progress slider
-        self.main_app.audio_slider = QSlider(Qt.Orientation.Horizontal)
+        self.main_app.audio_slider = WaveformSlider()
         self.main_app.audio_slider.setRange(0, 100)
         layout.addWidget(self.main_app.audio_slider)
 
@@ -280,6 +521,12 @@ class UIManager:
             self.main_app.video_quality_label.show()
             self.main_app.video_quality_combo.show()
 
+        # Clip ranges only make sense for a single video
+        single = text in SINGLE_MODES
+        self.main_app.sections_label.setVisible(single)
+        self.main_app.sections_entry.setVisible(single)
+        self.main_app.split_chapters_check.setVisible("MP3" in text)
+
     def create_activity_page(self) -> QWidget:
         page = QWidget()
         layout = QVBoxLayout(page)
@@ -289,6 +536,37 @@ class UIManager:
         self.main_app.progress_bar = QProgressBar()
         layout.addWidget(self.main_app.progress_bar)
 
+        # Per-task controls
+        layout.addWidget(QLabel("Downloads"))
+        self.main_app.task_list = QListWidget()
+        self.main_app.task_list.setMaximumHeight(140)
+        self.main_app.task_list.setSelectionMode(
+            QListWidget.SelectionMode.ExtendedSelection
+        )
+        layout.addWidget(self.main_app.task_list)
+
+        task_buttons = QHBoxLayout()
+        for label, action in (
+            ("Pause", self.main_app.download_manager.pause_task),
+            ("Resume", self.main_app.download_manager.resume_task),
+            ("Cancel", self.main_app.download_manager.cancel_task),
+        ):
+            btn = QPushButton(label)
+            btn.clicked.connect(lambda checked, a=action: self._apply_to_selected(a))
+            task_buttons.addWidget(btn)
+        play_btn = QPushButton("Play")
+        play_btn.clicked.connect(self.play_selected)
+        task_buttons.addWidget(play_btn)
+        task_buttons.addStretch()
+        layout.addLayout(task_buttons)
+
+        # Where the time of finished downloads went, stage by stage
+        self.main_app.metrics_label = QLabel(
+            self.main_app.download_manager.metrics.summary()
+        )
+        self.main_app.metrics_label.setWordWrap(True)
+        layout.addWidget(self.main_app.metrics_label)
+
         self.main_app.log_text = QTextEdit(readOnly=True)
         layout.addWidget(self.main_app.log_text)
 
@@ -299,12 +577,40 @@ class UIManager:
 
         bottom.addStretch()
 
-        self.main_app.queue_status_label = QLabel("Queue: 0 pending")
+        self.main_app.queue_status_label = QLabel("Queue: 0 pending | Active workers: 0")
         bottom.addWidget(self.main_app.queue_status_label)
 
         layout.addLayout(bottom)
         return page
 
+    def update_task_item(self, task: Dict[str, Any]) -> None:
+        """Create or refresh the task list entry for a download task."""
+        item = self._task_items.get(task["id"])
+        if item is None:
+            item = QListWidgetItem()
+            item.setData(Qt.ItemDataRole.UserRole, task["id"])
+            self.main_app.task_list.addItem(item)
+            self._task_items[task["id"]] = item
+
+        name = task.get("title") or task["url"]
+        item.setText(f"#{task['id']} [{task['state']}] {name}")
+
+    def play_selected(self) -> None:
+        """Queue the files of the selected completed downloads in the player."""
+        tasks = self.main_app.download_manager.tasks
+        files = [
+            path
+            for item in self.main_app.task_list.selectedItems()
+            for path in tasks[item.data(Qt.ItemDataRole.UserRole)].get("files", [])
+        ]
+        if files:
+            self.main_app.play_files(files)
+
+    def _apply_to_selected(self, action) -> None:
+        """Run a task action (pause/resume/cancel) on every selected task."""
+        for item in self.main_app.task_list.selectedItems():
+            action(item.data(Qt.ItemDataRole.UserRole))
+
     def _create_ui(self) -> None:
         self._load_stylesheet()
         self.create_menubar()
@@ -0,0 +1,275 @@
+"""
+Waveform peaks of audio files for the player's seek bar.
+
+Audio is decoded by ffmpeg to low-rate mono PCM and streamed through a
+min/max reduction, so memory use does not depend on the track length.
+Peaks are cached in a small binary file that is memory-mapped on load.
+"""
+
+import array
+import hashlib
+import mmap
+import os
+import struct
+import subprocess
+import sys
+from typing import BinaryIO, Callable, Optional, Sequence
+
+try:
+    import numpy
+except ImportError:  # Optional; the array module is used instead
+    numpy = None
+
+# Decoding rate; enough to show the envelope of the signal
+SAMPLE_RATE = 8000
+PEAKS_PER_SECOND = 50
+SAMPLES_PER_PEAK = SAMPLE_RATE // PEAKS_PER_SECOND
+
+# Header: magic, format version, peaks per second, number of peaks; the
+# peaks follow in native byte order, as cache files never leave the machine
+PEAKS_MAGIC = b"WFPK"
+PEAKS_HEADER = struct.Struct("=4sHHI")
+PEAKS_VERSION = 1
+
+# Bytes read from each end of a file for its cache key
+HASH_SAMPLE_SIZE = 64 * 1024
+
+# Peaks computed per read from the decoder
+CHUNK_PEAKS = 1024
+
+
+def file_key(path: str) -> str:
+    """
+    Cache key of a media file.
+
+    Hashes the size and the first and last 64 KiB instead of the whole
+    file, which identifies a download but takes no time for large files.
+    """
+    digest = hashlib.sha1()
+    size = os.path.getsize(path)
+    digest.update(str(size).encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(HASH_SAMPLE_SIZE))
+        if size > HASH_SAMPLE_SIZE:
+            f.seek(max(HASH_SAMPLE_SIZE, size - HASH_SAMPLE_SIZE))
+            digest.update(f.read(HASH_SAMPLE_SIZE))
+    return digest.hexdigest()
+
+
+def decode_command(ffmpeg_path: str, path: str) -> list:
+    """ffmpeg command that writes the audio of path as mono 16-bit PCM."""
+    return [
+        ffmpeg_path,
+        "-v",
+        "error",
+        "-i",
+        path,
+        "-vn",
+        "-ac",
+        "1",
+        "-ar",
+        str(SAMPLE_RATE),
+        "-f",
+        "s16le",
+        "-",
+    ]
+
+
+def _reduce(data: bytes) -> Sequence[int]:
+    """Interleaved (min, max) of each block of SAMPLES_PER_PEAK samples."""
+    if numpy is not None:
+        samples = numpy.frombuffer(data, dtype="<i2")
+        full = len(samples) - len(samples) % SAMPLES_PER_PEAK
+        blocks = samples[:full].reshape(-1, SAMPLES_PER_PEAK)
+        peaks = numpy.empty((len(blocks), 2), dtype="<i2")
+        peaks[:, 0] = blocks.min(axis=1)
+        peaks[:, 1] = blocks.max(axis=1)
+        if full < len(samples):
+            tail = samples[full:]
+            peaks = numpy.vstack([peaks, [[tail.min(), tail.max()]]])
+        return peaks.ravel().tolist()
+
+    samples = array.array("h")
+    samples.frombytes(data)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    peaks = []
+    for start in range(0, len(samples), SAMPLES_PER_PEAK):
+        block = samples[start : start + SAMPLES_PER_PEAK]
+        peaks.append(min(block))
+        peaks.append(max(block))
+    return peaks
+
+
+def compute_peaks(stream: BinaryIO) -> array.array:
+    """
+    Reduce a stream of mono s16le PCM to interleaved (min, max) peaks.
+
+    Args:
+        stream: PCM at SAMPLE_RATE, e.g. the stdout of decode_command()
+
+    Returns:
+        array of signed 16-bit values, two per peak
+    """
+    chunk_size = CHUNK_PEAKS * SAMPLES_PER_PEAK * 2
+    peaks = array.array("h")
+    pending = b""
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        pending += data
+        # Only reduce whole peaks; the rest waits for the next chunk
+        usable = len(pending) - len(pending) % (SAMPLES_PER_PEAK * 2)
+        if usable:
+            peaks.extend(_reduce(pending[:usable]))
+            pending = pending[usable:]
+    if len(pending) >= 2:
+        peaks.extend(_reduce(pending[: len(pending) - len(pending) % 2]))
+    return peaks
+
+
+class Peaks:
+    """
+    Memory-mapped peaks file.
+
+    Attributes:
+        peaks_per_second: Time resolution of the peaks
+        values: Interleaved (min, max) signed 16-bit values
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: File written by write_peaks()
+
+        Raises:
+            ValueError: If the file is not a peaks file
+        """
+        with open(path, "rb") as f:
+            header = f.read(PEAKS_HEADER.size)
+            if len(header) < PEAKS_HEADER.size:
+                raise ValueError(f"Truncated peaks file: {path}")
+            magic, version, self.peaks_per_second, count = PEAKS_HEADER.unpack(
+                header
+            )
+            if magic != PEAKS_MAGIC or version != PEAKS_VERSION:
+                raise ValueError(f"Not a peaks file: {path}")
+            if os.fstat(f.fileno()).st_size < PEAKS_HEADER.size + count * 4:
+                raise ValueError(f"Truncated peaks file: {path}")
+            # mmap cannot map empty files
+            self._map = None
+            self._data = memoryview(b"")
+            if count:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._data = memoryview(self._map)
+        end = PEAKS_HEADER.size + count * 4
+        self.values = self._data[PEAKS_HEADER.size : end].cast("h")
+
+    def __len__(self) -> int:
+        """Number of peaks."""
+        return len(self.values) // 2
+
+    def envelope(self, width: int) -> list:
+        """
+        Reduce the peaks to width (min, max) pairs, e.g. one per pixel.
+
+        Returns:
+            List of (min, max) tuples; empty if there are no peaks
+        """
+        count = len(self)
+        if not count or width <= 0:
+            return []
+        result = []
+        for x in range(width):
+            start = x * count // width
+            end = max(start + 1, (x + 1) * count // width)
+            lows = self.values[start * 2 : end * 2 : 2]
+            highs = self.values[start * 2 + 1 : end * 2 : 2]
+            result.append((min(lows), max(highs)))
+        return result
+
+    def close(self) -> None:
+        """Unmap the file."""
+        self.values.release()
+        self._data.release()
+        if self._map is not None:
+            self._map.close()
+
+
+def write_peaks(path: str, peaks: array.array) -> None:
+    """Write peaks atomically, so readers never map a partial file."""
+    values = array.array("h", peaks)
+    count = len(values) // 2
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(PEAKS_HEADER.pack(PEAKS_MAGIC, PEAKS_VERSION, PEAKS_PER_SECOND, count))
+        values.tofile(f)
+    os.replace(tmp, path)
+
+
+class WaveformCache:
+    """Peaks files of audio tracks, keyed by file contents."""
+
+    def __init__(self, cache_dir: str, ffmpeg_path: str):
+        """
+        Args:
+            cache_dir: Folder for the peaks files
+            ffmpeg_path: Path to ffmpeg.exe
+        """
+        self.cache_dir = cache_dir
+        self.ffmpeg_path = ffmpeg_path
+
+    def cache_path(self, path: str) -> str:
+        """Peaks file of a track."""
+        return os.path.join(self.cache_dir, f"{file_key(path)}.peaks")
+
+    def load(self, path: str) -> Optional[Peaks]:
+        """Cached peaks of a track, or None if they were not computed yet."""
+        try:
+            return Peaks(self.cache_path(path))
+        except (OSError, ValueError):
+            return None
+
+    def get(
+        self,
+        path: str,
+        popen: Callable[..., subprocess.Popen] = subprocess.Popen,
+    ) -> Peaks:
+        """
+        Peaks of a track, decoding it if they are not cached.
+
+        Args:
+            path: Audio file
+            popen: Starts the ffmpeg process (subprocess.Popen signature)
+
+        Raises:
+            OSError: If the file cannot be read or decoded
+        """
+        peaks = self.load(path)
+        if peaks is not None:
+            return peaks
+
+        kwargs = {}
+        if sys.platform == "win32":
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+        process = popen(
+            decode_command(self.ffmpeg_path, path),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            **kwargs,
+        )
+        try:
+            values = compute_peaks(process.stdout)
+        finally:
+            process.stdout.close()
+            stderr = process.stderr.read().decode(errors="replace").strip()
+            process.stderr.close()
+            process.wait()
+        if process.returncode != 0:
+            raise OSError(f"Decoding {path} failed: {stderr}")
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_path = self.cache_path(path)
+        write_peaks(cache_path, values)
+        return Peaks(cache_path)
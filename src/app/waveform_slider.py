@@ -0,0 +1,159 @@
+"""
+Seek bar that shows the waveform of the current track.
+"""
+
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Tuple
+
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+from PyQt6.QtGui import QColor, QMouseEvent, QPainter, QPaintEvent, QResizeEvent
+from PyQt6.QtWidgets import QSlider, QStyle, QWidget
+
+from .task_executor import TaskExecutor
+from .waveform import Peaks, WaveformCache
+
+# Owner of the decoder process in the loader's executor
+DECODE_KEY = "waveform"
+
+
+class WaveformLoader(QObject):
+    """
+    Computes waveform peaks in a background thread.
+
+    Cached peaks are reported right away; otherwise the track is decoded by
+    a single worker so that skipping through a queue does not start many
+    decoders at once. The decoder runs through a TaskExecutor, so
+    shutdown() can terminate it.
+    """
+
+    ready = pyqtSignal(str, object)
+
+    def __init__(self, cache: WaveformCache):
+        """
+        Args:
+            cache: Peaks cache used to load and store waveforms
+        """
+        super().__init__()
+        self.cache = cache
+        self.executor = TaskExecutor()
+        self._pool = ThreadPoolExecutor(1, thread_name_prefix="waveform")
+        self._wanted: Optional[str] = None
+
+    def request(self, path: str) -> None:
+        """Load the peaks of path; ready is emitted with (path, Peaks)."""
+        self._wanted = path
+        self._pool.submit(self._load, path)
+
+    def _load(self, path: str) -> None:
+        # A newer request replaced this one while it was waiting
+        if path != self._wanted:
+            return
+        processes: List[subprocess.Popen] = []
+
+        def popen(cmd: List[str], **kwargs: Any) -> subprocess.Popen:
+            processes.append(self.executor.popen(DECODE_KEY, cmd, **kwargs))
+            return processes[-1]
+
+        try:
+            peaks = self.cache.get(path, popen=popen)
+        except (OSError, ValueError, RuntimeError):
+            # RuntimeError: the executor was shut down meanwhile
+            return
+        finally:
+            for process in processes:
+                self.executor.release(DECODE_KEY, process)
+            self.executor.take_usage(DECODE_KEY)
+        self.ready.emit(path, peaks)
+
+    def shutdown(self) -> None:
+        """Drop waiting requests and terminate a running decoder."""
+        self._wanted = None
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.executor.shutdown(timeout=0)
+
+
+class WaveformSlider(QSlider):
+    """
+    Horizontal slider that draws the track's waveform as its groove.
+
+    The part already played is highlighted. Clicking or dragging anywhere
+    on the waveform seeks there. Without peaks it looks like a plain slider.
+    """
+
+    PLAYED_COLOR = QColor(52, 152, 219)
+    REMAINING_COLOR = QColor(160, 160, 160)
+
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(Qt.Orientation.Horizontal, parent)
+        self.setMinimumHeight(48)
+        self._peaks: Optional[Peaks] = None
+        self._envelope: List[Tuple[int, int]] = []
+
+    def set_peaks(self, peaks: Optional[Peaks]) -> None:
+        """Show the waveform of peaks (None for a plain slider)."""
+        if self._peaks is not None and self._peaks is not peaks:
+            self._peaks.close()
+        self._peaks = peaks
+        self._update_envelope()
+        self.update()
+
+    def _update_envelope(self) -> None:
+        # Reduced once per size change, not on every repaint
+        self._envelope = self._peaks.envelope(self.width()) if self._peaks else []
+
+    def resizeEvent(self, event: QResizeEvent) -> None:
+        super().resizeEvent(event)
+        self._update_envelope()
+
+    def paintEvent(self, event: QPaintEvent) -> None:
+        if not self._envelope:
+            super().paintEvent(event)
+            return
+
+        painter = QPainter(self)
+        middle = self.height() / 2
+        scale = middle / 32768
+        span = self.maximum() - self.minimum()
+        played_x = (
+            int(self.width() * (self.value() - self.minimum()) / span) if span else 0
+        )
+        for x, (low, high) in enumerate(self._envelope):
+            painter.setPen(self.PLAYED_COLOR if x < played_x else self.REMAINING_COLOR)
+            painter.drawLine(
+                x, int(middle - high * scale), x, int(middle - low * scale)
+            )
+        painter.setPen(self.PLAYED_COLOR)
+        painter.drawLine(played_x, 0, played_x, self.height())
+        painter.end()
+
+    def _seek_to(self, event: QMouseEvent) -> None:
+        value = QStyle.sliderValueFromPosition(
+            self.minimum(),
+            self.maximum(),
+            int(event.position().x()),
+            max(1, self.width()),
+        )
+        # Emits sliderMoved while the slider is down
+        self.setSliderPosition(value)
+
+    def mousePressEvent(self, event: QMouseEvent) -> None:
+        if not self._envelope or event.button() != Qt.MouseButton.LeftButton:
+            super().mousePressEvent(event)
+            return
+        self.setSliderDown(True)
+        self._seek_to(event)
+
+    def mouseMoveEvent(self, event: QMouseEvent) -> None:
+        if not self._envelope or not self.isSliderDown():
+            super().mouseMoveEvent(event)
+            return
+        self._seek_to(event)
+
+    def mouseReleaseEvent(self, event: QMouseEvent) -> None:
+        if not self._envelope or not self.isSliderDown():
+            super().mouseReleaseEvent(event)
+            return
+        self._seek_to(event)
+        self.setSliderDown(False)
+
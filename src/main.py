@@ -6,12 +6,63 @@ License: MIT
 Repository: https://github.com/uikraft-hub/yt-downloader-gui
 """
 
+import argparse
 import sys
 import os
 from PyQt6.QtWidgets import QApplication
+from src.app.control_server import send_request
+from src.app.commands import DOWNLOAD_MODES
 from src.app.main_window import YTDGUI
 
 
+def parse_arguments(argv):
+    """
+    Parse the command line left over after Qt took its own options.
+
+    Args:
+        argv: Arguments without the program name
+    """
+    parser = argparse.ArgumentParser(prog="yt-downloader-gui")
+    parser.add_argument("urls", nargs="*", help="URLs to add to the queue")
+    parser.add_argument("--mode", choices=DOWNLOAD_MODES, help="Download mode")
+    parser.add_argument("--save-path", help="Download folder")
+    parser.add_argument(
+        "--new-instance",
+        action="store_true",
+        help="Start a separate window instead of using the running one",
+    )
+    return parser.parse_args(argv)
+
+
+def forward_to_running_instance(args) -> bool:
+    """
+    Hand the URLs to an instance that is already running.
+
+    Returns:
+        True if an instance took them over
+    """
+    if send_request({"command": "show"}) is None:
+        return False
+    if args.urls:
+        response = send_request(
+            {
+                "command": "add",
+                "urls": args.urls,
+                "mode": args.mode,
+                "save_path": args.save_path,
+            }
+        )
+        if response is None:
+            return False
+        if not response["ok"]:
+            print(f"[yt-downloader-gui] {response['error']}", file=sys.stderr)
+        for error in response.get("errors", []):
+            print(
+                f"[yt-downloader-gui] {error['url']}: {error['error']}",
+                file=sys.stderr,
+            )
+    return True
+
 
 def main():
     """
@@ -21,6 +72,11 @@ def main():
     """
     # Create Qt application
     app = QApplication(sys.argv)
+    args = parse_arguments(app.arguments()[1:])
+
+    # One window per user: later launches feed the running queue
+    if not args.new_instance and forward_to_running_instance(args):
+        sys.exit(0)
 
     # Set application metadata
     app.setApplicationName("yt-downloader-gui")
@@ -37,6 +93,21 @@ def main():
     # Create and show main window
     window = YTDGUI(base_dir)
     window.show()
+    window.start_control_server()
+
+    if args.urls:
+        response = window.control_server.handle(
+            {
+                "command": "add",
+                "urls": args.urls,
+                "mode": args.mode,
+                "save_path": args.save_path,
+            }
+        )
+        if not response["ok"]:
+            window.log_message(response["error"])
+        for error in response.get("errors", []):
+            window.log_message(f"{error['url']}: {error['error']}")
 
     # Start event loop
     sys.exit(app.exec())
@@ -0,0 +1,118 @@
+"""
+Headless download worker and job queue tool.
+
+Run workers on every machine that should download, all pointing at the
+same queue database, and add jobs from anywhere:
+
+    python -m src.worker jobs.db add URL --mode "MP3 Only" --save-path /music
+    python -m src.worker jobs.db work
+    python -m src.worker jobs.db status
+"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+
+from src.app.clip_sections import parse_sections
+from src.app.commands import SINGLE_MODES
+from src.app.job_queue import DEFAULT_LEASE, DEFAULT_MAX_ATTEMPTS, JobQueue
+from src.app.job_worker import JobWorker
+
+
+def parse_arguments(argv):
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(prog="yt-downloader-gui-worker")
+    parser.add_argument("queue", help="Job queue database shared by the workers")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Queue downloads")
+    add.add_argument("urls", nargs="+", help="Video URLs")
+    add.add_argument("--mode", choices=SINGLE_MODES, default="MP3 Only")
+    add.add_argument(
+        "--save-path", required=True, help="Download folder as seen by the workers"
+    )
+    add.add_argument("--video-quality", default="Best Available")
+    add.add_argument("--audio-quality", default="320")
+    add.add_argument("--sections", help='Clip ranges, e.g. "1:30-2:00"')
+    add.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+
+    work = commands.add_parser("work", help="Download queued jobs")
+    work.add_argument("--name", help="Worker name (default: host-pid)")
+    work.add_argument("--lease", type=float, default=DEFAULT_LEASE)
+    work.add_argument("--poll-interval", type=float, default=2.0)
+    work.add_argument(
+        "--exit-when-idle",
+        action="store_true",
+        help="Stop when no job is queued or running",
+    )
+    work.add_argument(
+        "--base-dir", help="Folder with bin/yt-dlp.exe (default: the application's)"
+    )
+
+    status = commands.add_parser("status", help="Show jobs")
+    status.add_argument("--json", action="store_true", help="Print jobs as JSON")
+
+    cancel = commands.add_parser("cancel", help="Cancel jobs")
+    cancel.add_argument("ids", nargs="+", type=int)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Worker entry point."""
+    args = parse_arguments(sys.argv[1:] if argv is None else argv)
+    queue = JobQueue(args.queue)
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    if getattr(sys, "frozen", False):
+        base_dir = os.path.dirname(sys.executable)
+
+    if args.command == "add":
+        options = {
+            "video_quality": args.video_quality,
+            "audio_quality": args.audio_quality,
+            "sections": parse_sections(args.sections) if args.sections else None,
+        }
+        for url in args.urls:
+            job_id = queue.add(
+                url, args.mode, args.save_path, options, args.max_attempts
+            )
+            print(f"Job {job_id}: {url}")
+
+    elif args.command == "work":
+        worker = JobWorker(
+            queue,
+            args.base_dir or base_dir,
+            name=args.name,
+            lease_seconds=args.lease,
+            poll_interval=args.poll_interval,
+            log=lambda msg: print(f"[worker] {msg}", flush=True),
+        )
+        # Give the current job back instead of waiting for its lease to expire
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: worker.stop())
+        worker.run(exit_when_idle=args.exit_when_idle)
+
+    elif args.command == "status":
+        jobs = queue.jobs()
+        if args.json:
+            print(json.dumps(jobs, indent=2))
+        else:
+            for job in jobs:
+                worker = f" on {job['worker']}" if job["state"] == "leased" else ""
+                print(
+                    f"{job['id']:>5} {job['state']:<9} {job['progress']:>3}% "
+                    f"{job['url']}{worker}"
+                )
+            print(", ".join(f"{n} {state}" for state, n in queue.counts().items()))
+
+    elif args.command == "cancel":
+        for job_id in args.ids:
+            if not queue.cancel(job_id):
+                print(f"Job {job_id} is not queued or running", file=sys.stderr)
+
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
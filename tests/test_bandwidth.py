@@ -0,0 +1,101 @@
+import datetime
+import os
+import sys
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.bandwidth import BandwidthBudget, parse_schedule
+
+MB = 1024 * 1024
+
+
+class TestBandwidthBudget(unittest.TestCase):
+    """Tests for the BandwidthBudget class and schedule parsing."""
+
+    def test_parse_schedule(self):
+        """Test parsing of time ranges in MB/s."""
+        entries = parse_schedule("09:00-18:00=2.5; 22:00-06:00=0")
+        self.assertEqual(
+            entries,
+            [
+                (datetime.time(9, 0), datetime.time(18, 0), 2.5 * MB),
+                (datetime.time(22, 0), datetime.time(6, 0), None),
+            ],
+        )
+        with self.assertRaises(ValueError):
+            parse_schedule("9-18=2")
+
+    def test_share_is_split_evenly_with_floor(self):
+        """Test that the budget is divided among tasks without starving any."""
+        budget = BandwidthBudget(limit=4 * MB, min_share=1 * MB)
+        self.assertEqual(budget.share(1), 4 * MB)
+        self.assertEqual(budget.share(4), 1 * MB)
+        self.assertEqual(budget.share(8), 1 * MB)
+        self.assertIsNone(BandwidthBudget().share(3))
+
+    def test_schedule_overrides_base_limit(self):
+        """Test time-of-day limits, including ranges past midnight."""
+        budget = BandwidthBudget(
+            limit=10 * MB, schedule=parse_schedule("09:00-18:00=2; 22:00-06:00=0")
+        )
+        day = datetime.datetime(2024, 1, 1, 12, 0)
+        evening = datetime.datetime(2024, 1, 1, 20, 0)
+        night = datetime.datetime(2024, 1, 1, 3, 0)
+        self.assertEqual(budget.current_limit(day), 2 * MB)
+        self.assertEqual(budget.current_limit(evening), 10 * MB)
+        self.assertIsNone(budget.current_limit(night))
+
+    def test_max_tasks_fit_the_floor(self):
+        """Test that concurrency is capped so minimum shares fit the limit."""
+        budget = BandwidthBudget(limit=4 * MB, min_share=1 * MB)
+        self.assertEqual(budget.max_tasks(), 4)
+        self.assertEqual(BandwidthBudget(limit=0.5 * MB, min_share=MB).max_tasks(), 1)
+        self.assertIsNone(BandwidthBudget().max_tasks())
+
+    def test_starting_task_takes_leftover(self):
+        """Test a new task uses the unused budget of the running ones."""
+        budget = BandwidthBudget(limit=4 * MB, min_share=0.5 * MB)
+        self.assertEqual(budget.allocate([]), 4 * MB)
+        self.assertEqual(budget.allocate([4 * MB]), 0.5 * MB)
+        self.assertEqual(budget.allocate([1 * MB]), 2 * MB)
+        self.assertIsNone(BandwidthBudget().allocate([MB]))
+
+        # Even shares stay as they are; an uneven split is evened out by
+        # lowering the larger one at the next periodic check
+        running = [(2 * MB, 60.0), (2 * MB, 0.0)]
+        self.assertEqual(budget.rebalance(running, 2), [])
+        running = [(3 * MB, 60.0), (1 * MB, 0.0)]
+        self.assertEqual(budget.rebalance(running, 2), [0])
+
+    def test_rebalance_lowers_before_raising(self):
+        """Test over-share tasks restart first and increases wait for a delay."""
+        budget = BandwidthBudget(
+            limit=4 * MB, min_share=0.5 * MB, increase_delay=20.0
+        )
+        # Three tasks sharing: the first holds the whole limit
+        running = [(4 * MB, 60.0), (0.5 * MB, 5.0), (0.5 * MB, 5.0)]
+        self.assertEqual(budget.rebalance(running), [0])
+        # Once lowered, the short ones are raised only after the delay
+        running = [(4 / 3 * MB, 0.0), (0.5 * MB, 5.0), (0.5 * MB, 5.0)]
+        self.assertEqual(budget.rebalance(running), [])
+        running = [(4 / 3 * MB, 0.0), (0.5 * MB, 25.0), (0.5 * MB, 5.0)]
+        self.assertEqual(budget.rebalance(running), [1])
+        # Small differences are not worth a restart
+        running = [(1.4 * MB, 60.0), (1.3 * MB, 60.0), (1.3 * MB, 60.0)]
+        self.assertEqual(budget.rebalance(running), [])
+        # An unlimited task is over the cap
+        self.assertEqual(budget.rebalance([(None, 0.0), (2 * MB, 0.0)]), [0])
+
+    def test_rebalance_lifts_removed_limit(self):
+        """Test capped tasks are restarted without a limit after the delay."""
+        budget = BandwidthBudget(increase_delay=20.0)
+        running = [(MB, 25.0), (MB, 5.0), (None, 60.0)]
+        self.assertEqual(budget.rebalance(running), [0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.chapter_split import ChapterSplitter, chapter_paths, split_command
+
+
+class TestChapterSplitter(unittest.TestCase):
+    """Tests for splitting audio files at chapter marks."""
+
+    def setUp(self):
+        """Set up a fake source file and its chapters."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp_dir.name, "Mix.mp3")
+        with open(self.source, "w") as f:
+            f.write("audio")
+        self.chapters = [
+            {"start_time": 0.0, "end_time": 61.5, "title": "Intro"},
+            {"start_time": 61.5, "end_time": 200.0, "title": "AC/DC: Live"},
+            {"start_time": 200.0, "end_time": None, "title": ""},
+        ]
+        self.commands = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _run(self, cmd):
+        """Pretend to be ffmpeg by writing the output file."""
+        with self.lock:
+            self.commands.append(cmd)
+        with open(cmd[-1], "w") as f:
+            f.write("chapter")
+
+    def test_chapter_paths(self):
+        """Test numbered, file-system safe chapter names."""
+        paths = chapter_paths(self.source, self.chapters)
+        self.assertEqual(
+            [os.path.basename(path) for path in paths],
+            [
+                "Mix - 01 - Intro.mp3",
+                "Mix - 02 - AC_DC_ Live.mp3",
+                "Mix - 03 - Chapter 3.mp3",
+            ],
+        )
+
+    def test_split_command_uses_stream_copy(self):
+        """Test the ffmpeg command for one chapter."""
+        cmd = split_command("ffmpeg", "in.mp3", "out.mp3", self.chapters[1], 2, 3)
+        self.assertEqual(cmd[cmd.index("-ss") + 1], "61.500")
+        self.assertEqual(cmd[cmd.index("-to") + 1], "200.000")
+        self.assertEqual(cmd[cmd.index("-c") + 1], "copy")
+        self.assertIn("track=2/3", cmd)
+        # The last chapter runs to the end of the file
+        cmd = split_command("ffmpeg", "in.mp3", "out.mp3", self.chapters[2], 3, 3)
+        self.assertNotIn("-to", cmd)
+
+    def test_split_writes_every_chapter(self):
+        """Test that all chapters are cut in parallel."""
+        paths = ChapterSplitter("ffmpeg", max_workers=3).split(
+            self.source, self.chapters, self._run
+        )
+        self.assertEqual(len(self.commands), 3)
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+
+    def test_split_falls_back_to_reencoding(self):
+        """Test that a failed stream copy is retried with re-encoding."""
+
+        def run(cmd):
+            if "-c" in cmd:
+                raise subprocess.CalledProcessError(1, cmd)
+            self._run(cmd)
+
+        ChapterSplitter("ffmpeg").split(self.source, self.chapters[:1], run, "192")
+        self.assertIn("192k", self.commands[0])
+
+    def test_split_failure_removes_written_chapters(self):
+        """Test that a failed split leaves no partial set of chapters."""
+
+        def run(cmd):
+            if "track=2/3" in cmd:
+                raise subprocess.CalledProcessError(1, cmd)
+            self._run(cmd)
+
+        with self.assertRaises(subprocess.CalledProcessError):
+            ChapterSplitter("ffmpeg").split(self.source, self.chapters, run)
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["Mix.mp3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.clip_sections import (
+    format_sections,
+    parse_sections,
+    parse_time,
+    section_args,
+    section_lengths,
+)
+
+
+class TestClipSections(unittest.TestCase):
+    """Tests for clip range parsing."""
+
+    def test_parse_time(self):
+        """Test seconds, minutes and hours notation."""
+        self.assertEqual(parse_time("90"), 90)
+        self.assertEqual(parse_time("1:30"), 90)
+        self.assertEqual(parse_time("1:02:03.5"), 3723.5)
+        with self.assertRaises(ValueError):
+            parse_time("1m30")
+
+    def test_parse_sections(self):
+        """Test several ranges including one running to the end."""
+        sections = parse_sections("0:30-1:00; 1:45:00-")
+        self.assertEqual(sections, [(30, 60), (6300, None)])
+        self.assertEqual(format_sections(sections), "0:30-1:00, 1:45:00-end")
+        self.assertEqual(parse_sections("  "), [])
+
+    def test_parse_sections_invalid(self):
+        """Test that malformed or reversed ranges are rejected."""
+        for text in ("1:00", "1:00-0:30", "a-b"):
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    parse_sections(text)
+
+    def test_section_args(self):
+        """Test the yt-dlp arguments for the ranges."""
+        self.assertEqual(
+            section_args([(30, 60), (6300, None)]),
+            ["--download-sections", "*30-60", "--download-sections", "*6300-inf"],
+        )
+
+    def test_section_lengths(self):
+        """Test lengths clamped to the video duration."""
+        sections = [(30, 60), (100, None), (150, 500)]
+        self.assertEqual(section_lengths(sections, 200), [30, 100, 50])
+        self.assertEqual(section_lengths(sections, None), [30, None, 350])
+
+
+if __name__ == "__main__":
+    unittest.main()
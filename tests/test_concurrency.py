@@ -0,0 +1,74 @@
+import os
+import sys
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.concurrency import AimdController
+
+
+class TestAimdController(unittest.TestCase):
+    """Tests for the AimdController class."""
+
+    def test_additive_increase_up_to_ceiling(self):
+        """Test that successes grow the limit by about one per round."""
+        controller = AimdController(min_limit=1, max_limit=3, initial=1)
+        controller.on_success()
+        self.assertEqual(controller.limit, 2)
+
+        # At limit 2 it takes two successes to add one slot
+        controller.on_success()
+        self.assertEqual(controller.limit, 2)
+        controller.on_success()
+        self.assertEqual(controller.limit, 3)
+
+        for _ in range(10):
+            controller.on_success()
+        self.assertEqual(controller.limit, 3)
+
+    def test_multiplicative_decrease_down_to_floor(self):
+        """Test that throttling halves the limit but not below the floor."""
+        controller = AimdController(min_limit=2, max_limit=8, initial=8, cooldown=0)
+        controller.on_throttle()
+        self.assertEqual(controller.limit, 4)
+        controller.on_throttle()
+        self.assertEqual(controller.limit, 2)
+        controller.on_throttle()
+        self.assertEqual(controller.limit, 2)
+
+    def test_cooldown_merges_throttle_bursts(self):
+        """Test that parallel 429s from one burst count as one decrease."""
+        controller = AimdController(max_limit=8, initial=8, cooldown=60)
+        for _ in range(5):
+            controller.on_throttle()
+        self.assertEqual(controller.limit, 4)
+
+    def test_throughput_drop_counts_as_throttling(self):
+        """Test that a sharp per-task slowdown decreases the limit."""
+        controller = AimdController(max_limit=8, initial=4, cooldown=0)
+        controller.on_success(throughput=1000)
+        limit = controller.limit
+        controller.on_success(throughput=100)
+        self.assertLess(controller.limit, limit)
+
+
+    def test_sharing_the_connection_is_not_throttling(self):
+        """Test per-task speed falling with more parallel tasks keeps the limit."""
+        controller = AimdController(max_limit=8, initial=1, cooldown=0)
+        limits = []
+        for _ in range(40):
+            running = controller.limit
+            controller.on_success(throughput=8000 / running, concurrency=running)
+            limits.append(controller.limit)
+        self.assertEqual(limits, sorted(limits))
+        self.assertEqual(controller.limit, 8)
+
+        # A real drop of the total speed still counts
+        controller.on_success(throughput=100, concurrency=8)
+        self.assertEqual(controller.limit, 4)
+
+if __name__ == "__main__":
+    unittest.main()
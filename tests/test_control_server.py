@@ -0,0 +1,179 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import uuid
+from unittest.mock import MagicMock
+
+from PyQt6.QtCore import QCoreApplication
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+from app.control_server import ControlServer, send_request, task_summary
+
+
+def make_task(task_id, state="queued"):
+    return {
+        "id": task_id,
+        "state": state,
+        "title": None,
+        "url": f"https://www.youtube.com/watch?v={task_id}",
+        "mode": "MP3 Only",
+        "save_path": "/music",
+        "attempts": 0,
+    }
+
+
+class TestControlServer(unittest.TestCase):
+    """Tests for the ControlServer class."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def setUp(self):
+        self.main_app = MagicMock()
+        self.main_app.mode_combo.currentText.return_value = "Single Video"
+        self.main_app.path_entry.text.return_value = "/videos"
+        self.main_app.download_queue = []
+        self.manager = self.main_app.download_manager
+        self.manager.tasks = {}
+        self.manager.active_tasks = {}
+        self.server = ControlServer(self.main_app, f"ytd-test-{uuid.uuid4().hex}")
+
+    def tearDown(self):
+        self.server.close()
+
+    def queue_url(self, url, save_path, mode, sections):
+        if "bad" in url:
+            raise ValueError("The URL does not appear to be a valid YouTube URL.")
+        task = make_task(len(self.manager.tasks) + 1)
+        task.update(url=url, save_path=save_path, mode=mode)
+        self.manager.tasks[task["id"]] = task
+        return task
+
+    def test_add_uses_window_settings_by_default(self):
+        """Test add queues each URL and reports the ones that were rejected."""
+        self.manager.queue_url.side_effect = self.queue_url
+        urls = ["https://youtu.be/a", "bad", "https://youtu.be/b"]
+        response = self.server.handle({"command": "add", "urls": urls})
+        self.assertTrue(response["ok"])
+        self.assertEqual([task["id"] for task in response["tasks"]], [1, 2])
+        self.assertEqual(response["tasks"][0]["mode"], "Single Video")
+        self.assertEqual(response["tasks"][0]["save_path"], "/videos")
+        self.assertEqual(response["errors"][0]["url"], "bad")
+
+        response = self.server.handle(
+            {
+                "command": "add",
+                "url": "https://youtu.be/c",
+                "mode": "MP3 Only",
+                "save_path": "/music",
+                "sections": "0:10-0:20",
+            }
+        )
+        url, save_path, mode, sections = self.manager.queue_url.call_args[0]
+        self.assertEqual((save_path, mode), ("/music", "MP3 Only"))
+        self.assertEqual(sections, [(10.0, 20.0)])
+
+    def test_invalid_requests(self):
+        """Test malformed requests get an error instead of raising."""
+        self.main_app.path_entry.text.return_value = ""
+        for request, error in (
+            ([1, 2], "JSON object"),
+            ({"command": "explode"}, "Unknown command"),
+            ({"command": "status"}, "Missing field: id"),
+            ({"command": "status", "id": "x"}, "invalid literal"),
+            ({"command": "status", "id": 7}, "No task with id 7"),
+            ({"command": "add", "urls": "https://youtu.be/a"}, "list of strings"),
+            ({"command": "add", "url": "https://youtu.be/a"}, "No save path"),
+            ({"command": "add", "urls": {"a": 1}}, "list of strings"),
+            ({"command": "add", "urls": ["a", 5]}, "list of strings"),
+            ({"command": "add", "url": 5}, "url must be a string"),
+            ({"command": "add", "url": "a", "save_path": 5}, "save_path must be"),
+            ({"command": "add", "url": "a", "mode": ["MP3 Only"]}, "mode must be"),
+            ({"command": "add", "url": "a", "mode": "Podcast"}, "Unknown download"),
+            (
+                {"command": "add", "url": "a", "save_path": "/m", "sections": [1]},
+                "sections must be a string",
+            ),
+        ):
+            with self.subTest(request=request):
+                response = self.server.handle(request)
+                self.assertFalse(response["ok"])
+                self.assertIn(error, response["error"])
+
+    def test_task_commands(self):
+        """Test list, status and cancel act on the download manager's tasks."""
+        self.manager.tasks = {1: make_task(1, "downloading"), 2: make_task(2)}
+        self.manager.tasks[1]["progress"] = 40
+        self.main_app.download_queue = [self.manager.tasks[2]]
+
+        response = self.server.handle({"command": "list"})
+        self.assertEqual(len(response["tasks"]), 2)
+        self.assertEqual(response["queued"], 1)
+
+        response = self.server.handle({"command": "status", "id": 1})
+        self.assertEqual(response["task"]["progress"], 40)
+
+        self.server.handle({"command": "cancel", "id": "2"})
+        self.manager.cancel_task.assert_called_once_with(2)
+
+    def test_task_summary_is_json(self):
+        """Test summaries of finished tasks serialize and show full progress."""
+        task = make_task(3, "completed")
+        task.update(files=("/music/a.mp3",), timer=object())
+        summary = task_summary(task)
+        self.assertEqual(summary["progress"], 100)
+        self.assertEqual(json.loads(json.dumps(summary))["files"], ["/music/a.mp3"])
+
+    def test_second_process_talks_to_running_instance(self):
+        """Test a client in another process gets answers over the socket."""
+        self.manager.tasks = {1: make_task(1)}
+        self.assertTrue(self.server.listen())
+        self.assertIsNone(send_request({"command": "ping"}, "ytd-test-nobody", 0.2))
+
+        script = (
+            "import json, sys\n"
+            f"sys.path.insert(0, {SRC_DIR!r})\n"
+            "from PyQt6.QtCore import QCoreApplication\n"
+            "from app.control_server import send_request\n"
+            "app = QCoreApplication([])\n"
+            f"response = send_request({{'command': 'list'}}, {self.server.name!r})\n"
+            "print(json.dumps(response))\n"
+        )
+        client = subprocess.Popen(
+            [sys.executable, "-c", script], stdout=subprocess.PIPE, text=True
+        )
+        deadline = time.monotonic() + 10
+        while client.poll() is None and time.monotonic() < deadline:
+            self.app.processEvents()
+            time.sleep(0.01)
+        response = json.loads(client.communicate(timeout=5)[0])
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["tasks"][0]["id"], 1)
+
+    @unittest.skipIf(sys.platform == "win32", "named pipes leave no files behind")
+    def test_listen_replaces_stale_socket(self):
+        """Test the socket file of a crashed instance does not block listening."""
+        path = os.path.join(tempfile.gettempdir(), self.server.name)
+        stale = socket.socket(socket.AF_UNIX)
+        stale.bind(path)
+        stale.close()
+        try:
+            self.assertTrue(self.server.listen())
+            self.assertEqual(self.server.address, path)
+        finally:
+            self.server.close()
+            if os.path.exists(path):
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.cookie_session import CookieSession
+from app.retry_policy import AUTH, DownloadError
+
+NOW = 1_700_000_000
+
+
+def cookie_line(domain, name, expires=NOW + 3600, value="v"):
+    return f"{domain}\tTRUE\t/\tTRUE\t{expires}\t{name}\t{value}\n"
+
+
+def cookie_file(lines):
+    return "# Netscape HTTP Cookie File\n" + "".join(lines)
+
+
+BROWSER_COOKIES = cookie_file(
+    [
+        cookie_line(".youtube.com", "LOGIN_INFO", NOW + 7200),
+        cookie_line(".google.com", "SID", NOW + 3600),
+        cookie_line(".youtube.com", "PREF", NOW + 99999),
+        cookie_line(".youtube.com", "OLD", NOW - 10),
+        cookie_line(".example.com", "session"),
+        cookie_line("accounts.google.com", "__Host-GAPS"),
+    ]
+)
+
+# Stand-in for yt-dlp: dumps the "browser" jar into --cookies and counts runs
+FAKE_YT_DLP = """#!{python}
+import os, sys
+args = sys.argv[1:]
+here = os.path.dirname(os.path.abspath(__file__))
+with open(os.path.join(here, "runs.log"), "a") as f:
+    f.write(args[args.index("--cookies-from-browser") + 1] + "\\n")
+with open(os.path.join(here, "browser.txt")) as source:
+    jar = source.read()
+if jar:
+    with open(args[args.index("--cookies") + 1], "w") as f:
+        f.write(jar)
+else:
+    sys.stderr.write("ERROR: could not find chrome cookies database\\n")
+sys.exit(2)
+"""
+
+
+class Clock:
+    def __init__(self):
+        self.now = NOW
+
+    def __call__(self):
+        return self.now
+
+
+class TestCookieSession(unittest.TestCase):
+    """Tests for the CookieSession class."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.bin_dir = os.path.join(self.tmp_dir.name, "bin")
+        os.makedirs(self.bin_dir)
+        yt_dlp = os.path.join(self.bin_dir, "yt-dlp.exe")
+        with open(yt_dlp, "w") as f:
+            f.write(FAKE_YT_DLP.format(python=sys.executable))
+        os.chmod(yt_dlp, 0o755)
+        self.set_browser_cookies(BROWSER_COOKIES)
+        self.clock = Clock()
+        self.session = CookieSession(
+            os.path.join(self.tmp_dir.name, "cookies"), yt_dlp, clock=self.clock
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def set_browser_cookies(self, text):
+        with open(os.path.join(self.bin_dir, "browser.txt"), "w") as f:
+            f.write(text)
+
+    def extractions(self):
+        log = os.path.join(self.bin_dir, "runs.log")
+        if not os.path.exists(log):
+            return 0
+        with open(log) as f:
+            return len(f.read().split())
+
+    def cookie_names(self, key):
+        with open(self.session.cookie_path(key)) as f:
+            return sorted(
+                line.split("\t")[5]
+                for line in f
+                if line.strip() and not line.startswith("#")
+            )
+
+    def test_extracts_once_and_filters(self):
+        """Test the browser is read once and downloads get filtered copies."""
+        self.session.configure(browser="chrome")
+        self.assertEqual(self.session.prepare(1), 1)
+        self.assertEqual(self.session.prepare(2), 1)
+
+        self.assertEqual(self.extractions(), 1)
+        self.assertEqual(
+            self.cookie_names(1), ["LOGIN_INFO", "PREF", "SID", "__Host-GAPS"]
+        )
+        self.assertNotEqual(self.session.cookie_path(1), self.session.cookie_path(2))
+        if sys.platform != "win32":
+            mode = os.stat(self.session.cookie_path(1)).st_mode
+            self.assertEqual(mode & 0o077, 0)
+
+        self.session.release(1)
+        self.assertFalse(os.path.exists(self.session.cookie_path(1)))
+        self.session.release_all()
+        self.assertEqual(os.listdir(self.session.directory), ["snapshot.txt"])
+
+    def test_renews_when_login_expires(self):
+        """Test the snapshot lives until its first login cookie expires."""
+        self.session.configure(browser="firefox")
+        self.session.prepare(1)
+        self.clock.now = NOW + 3599
+        self.assertEqual(self.session.prepare(1), 1)
+
+        self.clock.now = NOW + 3600
+        self.set_browser_cookies(
+            cookie_file([cookie_line(".youtube.com", "SID", NOW + 9000)])
+        )
+        self.assertEqual(self.session.prepare(1), 2)
+        self.assertEqual(self.extractions(), 2)
+        self.assertEqual(self.cookie_names(1), ["SID"])
+
+    def test_refresh_after_auth_error_runs_once(self):
+        """Test downloads refused with the same snapshot renew it only once."""
+        self.session.configure(browser="chrome")
+        version = self.session.prepare(1)
+
+        self.assertTrue(self.session.refresh(version))
+        self.assertTrue(self.session.refresh(version))
+        self.assertEqual(self.extractions(), 2)
+        self.assertEqual(self.session.stats["refreshes"], 1)
+
+        # A failed renewal leaves nothing to retry with
+        self.set_browser_cookies("")
+        self.assertFalse(self.session.refresh(version + 1))
+        with self.assertRaises(DownloadError) as ctx:
+            self.session.prepare(1)
+        self.assertEqual(ctx.exception.category, AUTH)
+        self.assertIn("cookies database", str(ctx.exception))
+
+    def test_cookie_file_source(self):
+        """Test exported files are validated and read again only when changed."""
+        path = os.path.join(self.tmp_dir.name, "cookies.txt")
+        with open(path, "w") as f:
+            f.write(cookie_file([cookie_line(".youtube.com", "PREF")]))
+        self.session.configure(cookie_file=path)
+        with self.assertRaises(DownloadError) as ctx:
+            self.session.prepare(1)
+        self.assertEqual(ctx.exception.category, AUTH)
+
+        with open(path, "w") as f:
+            f.write(BROWSER_COOKIES)
+        os.utime(path, (NOW, NOW))
+        version = self.session.prepare(1)
+        self.assertFalse(self.session.refresh(version))
+
+        os.utime(path, (NOW + 60, NOW + 60))
+        self.assertTrue(self.session.refresh(version))
+        self.assertEqual(self.extractions(), 0)
+
+        self.session.configure()
+        self.assertFalse(self.session.enabled)
+        with self.assertRaises(DownloadError):
+            self.session.prepare(1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.device_limits import DeviceLimiter, classify_device, existing_ancestor
+
+
+class TestDeviceLimiter(unittest.TestCase):
+    """Tests for the DeviceLimiter class."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_existing_ancestor(self):
+        """Test that save paths which do not exist yet resolve to a parent."""
+        missing = os.path.join(self.path, "a", "b")
+        self.assertEqual(existing_ancestor(missing), os.path.abspath(self.path))
+
+    def test_classify_device(self):
+        """Test that the device kind is always one of the known kinds."""
+        self.assertIn(classify_device(self.path), ("ssd", "hdd", "network"))
+
+    def test_slots_are_shared_per_device(self):
+        """Test that paths on the same device share their slots."""
+        limiter = DeviceLimiter()
+        other = os.path.join(self.path, "sub")
+        limiter.set_limit(self.path, 2)
+
+        limiter.acquire(self.path)
+        self.assertTrue(limiter.can_start(other))
+        limiter.acquire(other)
+        self.assertFalse(limiter.can_start(self.path))
+        self.assertEqual(limiter.active(self.path), 2)
+
+        limiter.release(other)
+        self.assertTrue(limiter.can_start(self.path))
+
+    def test_kind_limits(self):
+        """Test that slow device kinds get fewer slots."""
+        limiter = DeviceLimiter(limits={"ssd": 3})
+        limiter._devices[self.path] = (1, "hdd")
+        limiter._devices["/fast"] = (2, "ssd")
+        self.assertEqual(limiter.limit(self.path), 1)
+        self.assertEqual(limiter.limit("/fast"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import pstats
+import sys
+import tempfile
+import tracemalloc
+import unittest
+from unittest.mock import patch
+
+from PyQt6.QtCore import QCoreApplication
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.diagnostics import ENV_VAR, Diagnostics, LagMonitor, enabled_from_env
+
+
+class Window:
+    """Stand-in for an object with slots."""
+
+    def _update_progress(self, value):
+        return value * 2
+
+
+class TestDiagnostics(unittest.TestCase):
+    """Tests for the Diagnostics class."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.diagnostics = Diagnostics(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.diagnostics.disable()
+        self.tmp_dir.cleanup()
+
+    def test_enabled_from_env(self):
+        """Test the environment switch."""
+        for value, expected in (("1", True), ("yes", True), ("0", False), ("", False)):
+            with patch.dict(os.environ, {ENV_VAR: value}):
+                self.assertEqual(enabled_from_env(), expected)
+
+    def test_slots_are_timed_only_while_enabled(self):
+        """Test that instrumented methods keep working and are measured."""
+        window = Window()
+        self.diagnostics.instrument(window, ["_update_progress"])
+        self.assertEqual(window._update_progress(2), 4)
+        self.assertEqual(self.diagnostics.slots.slowest(), [])
+
+        self.diagnostics.enable()
+        window._update_progress(3)
+        slowest = self.diagnostics.slots.slowest()
+        self.assertEqual(slowest[0]["slot"], "Window._update_progress")
+        self.assertEqual(slowest[0]["calls"], 1)
+
+    def test_lag_statistics(self):
+        """Test lag statistics of a loop that was blocked once."""
+        monitor = LagMonitor()
+        for lag in (1, 2, 3, -1, 400):
+            monitor.observe(lag)
+        stats = monitor.stats()
+        self.assertEqual(stats["samples"], 5)
+        self.assertEqual(stats["max_ms"], 400)
+        self.assertLessEqual(stats["p99_ms"], 400)
+        self.assertAlmostEqual(stats["mean_ms"], 81.2)
+
+    def test_profile_and_snapshot_files(self):
+        """Test that captures are written in their standard formats."""
+        self.diagnostics.enable()
+        self.assertTrue(tracemalloc.is_tracing())
+        self.diagnostics.start_profile()
+        sum(range(1000))
+        path = self.diagnostics.stop_profile()
+        self.assertFalse(self.diagnostics.profiling)
+        self.assertGreater(pstats.Stats(path).total_calls, 0)
+
+        snapshot = tracemalloc.Snapshot.load(self.diagnostics.save_snapshot())
+        self.assertIsInstance(snapshot.statistics("filename"), list)
+
+        first = self.diagnostics.save_report()
+        second = self.diagnostics.save_report()
+        self.assertNotEqual(first, second)
+
+    def test_snapshot_requires_tracing(self):
+        """Test that snapshots are refused while diagnostics are off."""
+        with self.assertRaises(RuntimeError):
+            self.diagnostics.save_snapshot()
+
+
+if __name__ == "__main__":
+    unittest.main()
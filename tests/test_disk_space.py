@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.disk_space import SpaceReservations, estimate_size
+
+
+class TestEstimateSize(unittest.TestCase):
+    """Tests for estimate_size."""
+
+    def test_merged_formats_need_room_for_inputs_and_output(self):
+        """Test that merged downloads count the streams twice."""
+        info = {
+            "requested_formats": [
+                {"filesize": 1000},
+                {"filesize": None, "filesize_approx": 500},
+            ]
+        }
+        self.assertEqual(estimate_size(info), 3000)
+
+    def test_single_format_with_mp3_extraction(self):
+        """Test that the extracted MP3 is added to the source size."""
+        info = {"filesize_approx": 4000, "duration": 8}
+        # 8 s at 128 kbps = 128000 bytes
+        self.assertEqual(estimate_size(info, "128"), 132000)
+
+    def test_unknown_size(self):
+        """Test that formats without a size give no estimate."""
+        info = {"requested_formats": [{"filesize": 1000}, {}]}
+        self.assertIsNone(estimate_size(info))
+
+
+class TestSpaceReservations(unittest.TestCase):
+    """Tests for the SpaceReservations class."""
+
+    def setUp(self):
+        """Set up reservations on a temporary directory with fake free space."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = self.tmp_dir.name
+        self.space = SpaceReservations(reserve_bytes=100)
+        patcher = patch.object(self.space, "free_space", return_value=1100)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_reservations_hold_back_tasks_that_do_not_fit(self):
+        """Test admission against free space minus running reservations."""
+        self.assertTrue(self.space.try_reserve(1, self.path, 600))
+        self.assertFalse(self.space.fits(self.path, 600))
+        self.assertFalse(self.space.try_reserve(2, self.path, 600))
+        self.assertTrue(self.space.try_reserve(2, self.path, 400))
+        self.assertEqual(self.space.available(self.path), 0)
+
+    def test_written_bytes_shrink_the_reservation(self):
+        """Test that data already on disk is no longer reserved."""
+        self.space.try_reserve(1, self.path, 600)
+        self.space.update(1, 450)
+        self.assertEqual(self.space.reserved(self.path), 150)
+
+    def test_release(self):
+        """Test that a released reservation frees its space."""
+        self.space.try_reserve(1, self.path, 1000)
+        self.space.release(1)
+        self.assertTrue(self.space.fits(self.path, 1000))
+
+    def test_unknown_size_only_needs_the_reserve(self):
+        """Test that tasks without an estimate are admitted."""
+        self.assertTrue(self.space.try_reserve(1, self.path, None))
+        self.assertEqual(self.space.reserved(self.path), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
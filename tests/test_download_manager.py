@@ -1,13 +1,14 @@
 import os
 import sys
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 # Add the 'src' directory to the Python path to allow for absolute imports
 sys.path.insert(
     0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
 )
 
+from app.commands import apply_sections, audio_download_command, video_download_command
 from app.download_manager import DownloadManager
 
 
@@ -24,6 +25,9 @@ class TestDownloadManager(unittest.TestCase):
 
         # Instantiate the DownloadManager with the mocked main app
         self.download_manager = DownloadManager(self.mock_main_app)
+        # Keep finished-task metrics out of the source tree
+        self.download_manager.metrics.jsonl_path = None
+        self.download_manager.metrics.prometheus_path = None
 
     def test_build_video_download_command_best_quality(self):
         """Test building a video download command for the best available quality."""
@@ -47,7 +51,7 @@ class TestDownloadManager(unittest.TestCase):
             url,
         ]
 
-        cmd = self.download_manager._build_video_download_command(
+        cmd = video_download_command(
             yt_dlp_path, ffmpeg_path, url, save_path, video_quality
         )
         self.assertEqual(cmd, expected_cmd)
@@ -74,7 +78,7 @@ class TestDownloadManager(unittest.TestCase):
             url,
         ]
 
-        cmd = self.download_manager._build_video_download_command(
+        cmd = video_download_command(
             yt_dlp_path, ffmpeg_path, url, save_path, video_quality
         )
         self.assertEqual(cmd, expected_cmd)
@@ -104,11 +108,253 @@ class TestDownloadManager(unittest.TestCase):
             url,
         ]
 
-        cmd = self.download_manager._build_audio_download_command(
+        cmd = audio_download_command(
             yt_dlp_path, ffmpeg_path, url, save_path, audio_quality
         )
         self.assertEqual(cmd, expected_cmd)
 
+    def test_create_task_assigns_unique_ids(self):
+        """Test that each queued task gets its own id for tracking."""
+        first = self.download_manager._create_task("url1", "/fake/path", "MP3 Only")
+        second = self.download_manager._create_task("url2", "/fake/path", "MP3 Only")
+        self.assertNotEqual(first["id"], second["id"])
+        self.assertEqual(first["video_quality"], "Best Available")
+
+    def test_pause_resume_and_cancel_queued_task(self):
+        """Test per-task controls on a task that has not started yet."""
+        self.mock_main_app.download_queue = []
+        self.download_manager.process_queue = MagicMock()
+        task = self.download_manager._create_task("url", "/fake/path", "MP3 Only")
+        self.mock_main_app.download_queue.append(task)
+
+        self.download_manager.pause_task(task["id"])
+        self.assertEqual(task["state"], "paused")
+        self.assertNotIn(task, self.mock_main_app.download_queue)
+
+        self.download_manager.resume_task(task["id"])
+        self.assertEqual(task["state"], "queued")
+        self.assertEqual(self.mock_main_app.download_queue[0], task)
+
+        self.download_manager.cancel_task(task["id"])
+        self.assertEqual(task["state"], "cancelled")
+        self.assertEqual(self.mock_main_app.download_queue, [])
+
+    def test_stage_timings_are_recorded(self):
+        """Test that a finished task reports the time spent in each stage."""
+        self.mock_main_app.download_queue = []
+        task = self.download_manager._create_task("url", "/fake/path", "MP3 Only")
+        self.download_manager._set_task_state(task, "downloading")
+        self.download_manager._enter_stage(task, "download")
+        task["downloaded_bytes"] = 1000.0
+        self.download_manager._set_task_state(task, "failed")
+
+        metrics = self.download_manager.metrics
+        self.assertEqual(metrics.tasks, {"failed": 1})
+        self.assertEqual(metrics.downloaded_bytes, 1000)
+        for stage in ("queued", "metadata", "download"):
+            self.assertEqual(metrics.stage_seconds[stage].count, 1)
+        self.assertEqual(metrics.stage_seconds["finalize"].count, 0)
+        self.assertIsNone(task["timer"].stage)
+
+    def test_process_queue_skips_busy_device(self):
+        """Test that a task for a busy disk does not block other disks."""
+        self.mock_main_app.download_queue = []
+        self.download_manager.orchestrator.submit = MagicMock()
+        limiter = self.download_manager.device_limits
+        limiter._devices["/hdd"] = (1, "hdd")
+        limiter._devices["/ssd"] = (2, "ssd")
+
+        tasks = [
+            self.download_manager._create_task("url1", "/hdd", "MP3 Only"),
+            self.download_manager._create_task("url2", "/hdd", "MP3 Only"),
+            self.download_manager._create_task("url3", "/ssd", "MP3 Only"),
+        ]
+        self.mock_main_app.download_queue.extend(tasks)
+        self.download_manager.process_queue()
+
+        self.assertEqual(
+            [t["state"] for t in tasks], ["downloading", "queued", "downloading"]
+        )
+        self.assertEqual(self.mock_main_app.download_queue, [tasks[1]])
+
+    def test_zero_delay_retry_keeps_task_tracked(self):
+        """Test a task requeued at once is started only after its slot is freed."""
+        self.mock_main_app.download_queue = []
+        self.download_manager.orchestrator.submit = MagicMock()
+        limiter = self.download_manager.device_limits
+        limiter._devices["/hdd"] = (1, "hdd")
+        task = self.download_manager._create_task("url", "/hdd", "MP3 Only")
+        self.mock_main_app.download_queue.append(task)
+        self.download_manager.process_queue()
+
+        # The worker asks for the retry before it reports the attempt done
+        self.download_manager._set_task_state(task, "retrying")
+        self.download_manager._on_retry_scheduled(task, 0.0)
+        self.assertEqual(task["state"], "retrying")
+        self.download_manager._on_download_complete(task)
+
+        self.assertEqual(task["state"], "downloading")
+        self.assertEqual(list(self.download_manager.active_tasks), [task["id"]])
+        self.assertTrue(self.mock_main_app.downloading)
+        self.assertEqual(limiter.active("/hdd"), 1)
+        self.assertEqual(self.download_manager.orchestrator.submit.call_count, 2)
+
+        self.download_manager._set_task_state(task, "completed")
+        self.download_manager._on_download_complete(task)
+        self.assertEqual(self.download_manager.active_tasks, {})
+        self.assertEqual(limiter.active("/hdd"), 0)
+
+    def test_cookie_refresh_retry_keeps_device_slot(self):
+        """Test a retry with refreshed cookies does not leak a device slot."""
+        self.mock_main_app.download_queue = []
+        self.download_manager.orchestrator.submit = MagicMock()
+        limiter = self.download_manager.device_limits
+        limiter._devices["/ssd"] = (3, "ssd")
+        task = self.download_manager._create_task("url", "/ssd", "MP3 Only")
+        self.mock_main_app.download_queue.append(task)
+        self.download_manager.process_queue()
+
+        # Signals in the order download_video sends them after an AUTH error
+        signals = self.download_manager.signals
+        task["cookies_refreshed"] = True
+        self.download_manager._set_task_state(task, "retrying")
+        signals.retry_scheduled.emit(task, 0.0)
+        signals.download_complete.emit(task)
+
+        self.assertEqual(task["state"], "downloading")
+        self.assertIn(task["id"], self.download_manager.active_tasks)
+        self.assertEqual(limiter.active("/ssd"), 1)
+
+        self.download_manager._set_task_state(task, "failed")
+        signals.download_complete.emit(task)
+        self.assertEqual(limiter.active("/ssd"), 0)
+        self.assertFalse(self.mock_main_app.downloading)
+
+    def test_starting_task_does_not_restart_others(self):
+        """Test a new download under a bandwidth cap leaves running ones alone."""
+        MB = 1024 * 1024
+        self.mock_main_app.download_queue = []
+        self.download_manager.orchestrator.submit = MagicMock()
+        self.download_manager._restart_task = MagicMock()
+        self.download_manager.bandwidth.configure(4 * MB)
+        self.download_manager.concurrency._limit = 3
+        running = [
+            self.download_manager._create_task(f"url{i}", "/music", "MP3 Only")
+            for i in range(2)
+        ]
+        for task in running:
+            task.update(state="downloading", rate_limit=2 * MB, rate_started=0.0)
+            self.download_manager.active_tasks[task["id"]] = task
+        new_task = self.download_manager._create_task("url2", "/music", "MP3 Only")
+        self.mock_main_app.download_queue.append(new_task)
+
+        self.download_manager.process_queue()
+
+        self.assertEqual(new_task["state"], "downloading")
+        self.download_manager._restart_task.assert_not_called()
+        self.assertFalse(any(task.get("restart") for task in running))
+
+    def test_staged_task_reserves_space_on_save_path(self):
+        """Test a staged task needs room on both the staging and save disk."""
+        space = self.download_manager.disk_space
+        space.reserve_bytes = 0
+        free = {"/stage/task-1": 1000, "/music": 500}
+        task = self.download_manager._create_task("url", "/music", "MP3 Only")
+        task["size_estimate"] = 600
+
+        # Paths of different length stand for different devices
+        with patch.object(space, "free_space", side_effect=free.get), patch(
+            "app.download_manager.device_id", side_effect=len
+        ), patch("app.disk_space.device_id", side_effect=len):
+            reserve = self.download_manager._reserve_space
+            self.assertEqual(reserve(task, "/stage/task-1"), "/music")
+            self.assertEqual(space.reserved("/stage/task-1"), 0)
+
+            free["/music"] = 700
+            self.assertIsNone(reserve(task, "/stage/task-1"))
+            self.assertEqual(space.reserved("/stage/task-1"), 600)
+            self.assertEqual(space.reserved("/music"), 600)
+
+    def test_parse_output_path(self):
+        """Test extracting destination files from yt-dlp output."""
+        parse = self.download_manager._parse_output_path
+        self.assertEqual(
+            parse("[download] Destination: /fake/path/video.f137.mp4"),
+            "/fake/path/video.f137.mp4",
+        )
+        self.assertEqual(
+            parse('[Merger] Merging formats into "/fake/path/video.mp4"'),
+            "/fake/path/video.mp4",
+        )
+        self.assertIsNone(parse("[download]  42.0% of 10.00MiB"))
+
+    def test_parse_transfer(self):
+        """Test extracting downloaded bytes and speed from progress lines."""
+        parse = self.download_manager._parse_transfer
+        downloaded, speed = parse(
+            "[download]  50.0% of   10.00MiB at    2.00MiB/s ETA 00:02"
+        )
+        self.assertEqual(downloaded, 5 * 1024**2)
+        self.assertEqual(speed, 2 * 1024**2)
+
+        downloaded, speed = parse(
+            "[download]  10.0% of ~  1.00GiB at  Unknown B/s ETA Unknown (frag 1/10)"
+        )
+        self.assertAlmostEqual(downloaded, 0.1 * 1024**3)
+        self.assertIsNone(speed)
+        self.assertIsNone(parse("[Merger] Merging formats into \"x.mp4\""))
+
+        downloaded, speed = parse(
+            "frame=  250 fps= 50 q=-1.0 size=    2048kB time=00:00:10.00 "
+            "bitrate=1677.7kbits/s speed=2.0x"
+        )
+        self.assertEqual(downloaded, 2 * 1024**2)
+        self.assertIsNone(speed)
+
+    def test_info_command_uses_download_options(self):
+        """Test metadata is extracted with the same options as the download."""
+        self.download_manager.cookies.browser = "firefox"
+        task = self.download_manager._create_task(
+            "https://www.youtube.com/watch?v=test", "/fake", "Single Video"
+        )
+        cmd = self.download_manager._download_command(task, "/fake")
+        info_cmd = self.download_manager._info_command(cmd)
+
+        self.assertEqual(info_cmd[0], cmd[0])
+        self.assertIn("--dump-json", info_cmd)
+        for option in (
+            "--js-runtimes",
+            "--ffmpeg-location",
+            "--cookies",
+            "--format",
+            "--output",
+        ):
+            with self.subTest(option=option):
+                self.assertEqual(
+                    info_cmd[info_cmd.index(option) + 1], cmd[cmd.index(option) + 1]
+                )
+        self.assertIn(task["url"], info_cmd)
+
+    def test_clip_progress(self):
+        """Test progress of a clip download across its sections."""
+        task = {"sections": [(30.0, 60.0), (100.0, None)], "duration": 190.0}
+        progress = self.download_manager._clip_progress
+        line = "size=     512kB time=00:00:15.00 bitrate= 279.6kbits/s speed=30x"
+        # 15 of 30 seconds in the first of two sections (120 s in total)
+        self.assertEqual(progress(task, 0, line), 12)
+        # First section done, 15 of 90 seconds in the second
+        self.assertEqual(progress(task, 1, line), 37)
+        self.assertIsNone(progress(task, 0, "[download] Destination: x.mp4"))
+
+    def test_apply_sections(self):
+        """Test restricting a command to clip ranges."""
+        cmd = audio_download_command(
+            "yt-dlp", "ffmpeg", "https://www.youtube.com/watch?v=test", "/fake", "320"
+        )
+        apply_sections(cmd, "/fake", [(90.0, 120.5)])
+        self.assertIn("section_start", cmd[cmd.index("--output") + 1])
+        self.assertEqual(cmd[-2:], ["--download-sections", "*90-120.5"])
+
 
 if __name__ == "__main__":
     unittest.main()
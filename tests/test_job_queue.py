@@ -0,0 +1,134 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.job_queue import CANCELLED, COMPLETED, FAILED, LEASED, QUEUED, JobQueue
+
+
+class Clock:
+    """Manually advanced time source."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestJobQueue(unittest.TestCase):
+    """Tests for the JobQueue class."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "jobs.db")
+        self.clock = Clock()
+        self.queue = JobQueue(self.db_path, clock=self.clock)
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp_dir.cleanup()
+
+    def test_claim_leases_oldest_job_once(self):
+        """Test jobs are handed out in order, each to one worker."""
+        first = self.queue.add("https://youtu.be/a", "MP3 Only", "/music")
+        second = self.queue.add(
+            "https://youtu.be/b", "Single Video", "/video", {"video_quality": "720p"}
+        )
+
+        job = self.queue.claim("w1", lease_seconds=30)
+        self.assertEqual(job["id"], first)
+        self.assertEqual(job["state"], LEASED)
+        self.assertEqual(job["worker"], "w1")
+        self.assertEqual(job["attempts"], 1)
+        self.assertEqual(job["lease_expires"], 1030.0)
+
+        # A second connection, as from another process, gets the next job
+        other = JobQueue(self.db_path, clock=self.clock)
+        try:
+            job = other.claim("w2")
+            self.assertEqual(job["id"], second)
+            self.assertEqual(job["options"], {"video_quality": "720p"})
+            self.assertIsNone(other.claim("w3"))
+        finally:
+            other.close()
+
+    def test_expired_lease_is_reassigned(self):
+        """Test a job of a worker that stopped heartbeating goes to another."""
+        job_id = self.queue.add("https://youtu.be/a", "MP3 Only", "/music")
+        self.queue.claim("dead", lease_seconds=30)
+
+        self.clock.now += 20
+        self.assertIsNone(self.queue.claim("w2"))
+        self.clock.now += 11
+        job = self.queue.claim("w2", lease_seconds=30)
+        self.assertEqual((job["id"], job["attempts"]), (job_id, 2))
+        self.assertIn("dead stopped responding", job["error"])
+
+        # The dead worker finds out when it comes back
+        self.assertFalse(self.queue.heartbeat(job_id, "dead", 50))
+        self.assertFalse(self.queue.complete(job_id, "dead", ["/music/a.mp3"]))
+        self.assertTrue(self.queue.heartbeat(job_id, "w2", 50))
+        self.assertEqual(self.queue.get(job_id)["progress"], 50)
+
+    def test_heartbeat_extends_lease(self):
+        """Test renewing keeps the job with its worker past the first lease."""
+        job_id = self.queue.add("https://youtu.be/a", "MP3 Only", "/music")
+        self.queue.claim("w1", lease_seconds=30)
+        self.clock.now += 25
+        self.assertTrue(self.queue.heartbeat(job_id, "w1", lease_seconds=30))
+        self.clock.now += 25
+        self.assertIsNone(self.queue.claim("w2"))
+        self.assertTrue(self.queue.complete(job_id, "w1", ["/music/a.mp3"]))
+
+        job = self.queue.get(job_id)
+        self.assertEqual(job["state"], COMPLETED)
+        self.assertEqual(job["progress"], 100)
+        self.assertEqual(job["files"], ["/music/a.mp3"])
+
+    def test_failures_retry_after_delay_until_out_of_attempts(self):
+        """Test retried jobs wait for their delay and fail after max_attempts."""
+        job_id = self.queue.add("https://youtu.be/a", "MP3 Only", "/m", max_attempts=2)
+
+        self.queue.claim("w1")
+        self.assertTrue(self.queue.fail(job_id, "w1", "HTTP Error 503", 10))
+        self.assertEqual(self.queue.get(job_id)["state"], QUEUED)
+        self.assertIsNone(self.queue.claim("w1"))
+
+        self.clock.now += 10
+        self.assertEqual(self.queue.claim("w1")["attempts"], 2)
+        self.queue.fail(job_id, "w1", "HTTP Error 503", 10)
+        job = self.queue.get(job_id)
+        self.assertEqual(job["state"], FAILED)
+        self.assertEqual(job["error"], "HTTP Error 503")
+
+    def test_expired_last_attempt_fails(self):
+        """Test a job whose worker dies on its last attempt is not retried."""
+        job_id = self.queue.add("https://youtu.be/a", "MP3 Only", "/m", max_attempts=1)
+        self.queue.claim("dead", lease_seconds=5)
+        self.clock.now += 6
+        self.assertIsNone(self.queue.claim("w2"))
+        self.assertEqual(self.queue.get(job_id)["state"], FAILED)
+
+    def test_release_and_cancel(self):
+        """Test released jobs keep their attempts and cancelled jobs stop."""
+        job_id = self.queue.add("https://youtu.be/a", "MP3 Only", "/music")
+        self.queue.claim("w1")
+        self.assertTrue(self.queue.release(job_id, "w1"))
+        job = self.queue.claim("w2")
+        self.assertEqual(job["attempts"], 1)
+
+        self.assertTrue(self.queue.cancel(job_id))
+        self.assertFalse(self.queue.heartbeat(job_id, "w2"))
+        self.assertFalse(self.queue.cancel(job_id))
+        self.assertEqual(self.queue.counts(), {CANCELLED: 1})
+        self.assertEqual(len(self.queue.jobs(CANCELLED)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+import errno
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.job_queue import CANCELLED, COMPLETED, FAILED, JobQueue
+from app.job_worker import JOB_DIR_PREFIX, JobWorker
+from app.retry_policy import RetryPolicy
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Stand-in for yt-dlp: logs each run, then succeeds, fails or hangs by URL
+FAKE_YT_DLP = """#!{python}
+import os, sys, time
+args = sys.argv[1:]
+output = args[args.index("--output") + 1]
+url = [a for a in args if a.startswith("https://")][0]
+name = url.rsplit("/", 1)[-1]
+log = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runs.log")
+with open(log, "a") as f:
+    f.write(name + "\\n")
+with open(log) as f:
+    runs = f.read().split().count(name)
+if name.startswith("fail"):
+    print("ERROR: [youtube] " + name + ": Video unavailable", flush=True)
+    sys.exit(1)
+if name.startswith("flaky") and runs == 1:
+    print("ERROR: Unable to download webpage: HTTP Error 503", flush=True)
+    sys.exit(1)
+for percent in range(0, 101, 25):
+    print("[download]  %.1f%% of 1.00MiB" % percent, flush=True)
+    time.sleep(10 if name.startswith("slow") else 0.05)
+with open(os.path.join(os.path.dirname(output), name + ".mp3"), "w") as f:
+    f.write(url)
+"""
+
+
+class TestJobWorker(unittest.TestCase):
+    """Tests for the JobWorker class and the worker command."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = self.tmp_dir.name
+        self.save_path = os.path.join(self.base_dir, "music")
+        os.makedirs(self.save_path)
+        bin_dir = os.path.join(self.base_dir, "bin")
+        os.makedirs(bin_dir)
+        yt_dlp = os.path.join(bin_dir, "yt-dlp.exe")
+        with open(yt_dlp, "w") as f:
+            f.write(FAKE_YT_DLP.format(python=sys.executable))
+        os.chmod(yt_dlp, 0o755)
+        self.log_path = os.path.join(bin_dir, "runs.log")
+        self.db_path = os.path.join(self.base_dir, "jobs.db")
+        self.queue = JobQueue(self.db_path)
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp_dir.cleanup()
+
+    def runs(self):
+        """Names of the videos the fake yt-dlp was started for."""
+        if not os.path.exists(self.log_path):
+            return []
+        with open(self.log_path) as f:
+            return f.read().split()
+
+    def add(self, name, **kwargs):
+        return self.queue.add(
+            f"https://youtu.be/{name}", "MP3 Only", self.save_path, **kwargs
+        )
+
+    def make_worker(self, **kwargs):
+        return JobWorker(
+            self.queue,
+            self.base_dir,
+            name="test-worker",
+            retry_policy=RetryPolicy(base_delay=0),
+            log=lambda msg: None,
+            **kwargs,
+        )
+
+    def test_completes_and_retries_jobs(self):
+        """Test files are moved into the save path and transient errors retried."""
+        ok = self.add("ok")
+        flaky = self.add("flaky")
+        failing = self.add("fail")
+
+        processed = self.make_worker().run(exit_when_idle=True)
+
+        self.assertEqual(processed, 4)
+        self.assertEqual(sorted(self.runs()), ["fail", "flaky", "flaky", "ok"])
+        job = self.queue.get(ok)
+        self.assertEqual(job["state"], COMPLETED)
+        self.assertEqual(job["files"], [os.path.join(self.save_path, "ok.mp3")])
+        self.assertEqual(self.queue.get(flaky)["state"], COMPLETED)
+        self.assertEqual(self.queue.get(flaky)["attempts"], 2)
+        job = self.queue.get(failing)
+        self.assertEqual(job["state"], FAILED)
+        self.assertIn("Video unavailable", job["error"])
+        self.assertEqual(sorted(os.listdir(self.save_path)), ["flaky.mp3", "ok.mp3"])
+
+    def test_unwritable_destination_fails_job(self):
+        """Test a failed move fails the job and keeps its files."""
+        job_id = self.add("ok")
+        self.add("other")
+        denied = OSError(errno.EACCES, "Permission denied")
+
+        with patch("app.job_worker.os.replace", side_effect=denied):
+            processed = self.make_worker().run(exit_when_idle=True)
+
+        self.assertEqual(processed, 2)
+        job = self.queue.get(job_id)
+        self.assertEqual(job["state"], FAILED)
+        self.assertIn("Permission denied", job["error"])
+        job_dir = os.path.join(self.save_path, f"{JOB_DIR_PREFIX}{job_id}")
+        self.assertEqual(os.listdir(job_dir), ["ok.mp3"])
+
+    def test_cancelled_job_is_killed(self):
+        """Test a worker stops a download cancelled through the queue."""
+        job_id = self.add("slow")
+        worker = self.make_worker(lease_seconds=0.6)
+        thread = threading.Thread(target=worker.run, kwargs={"max_jobs": 1})
+        thread.start()
+        deadline = time.monotonic() + 10
+        while "slow" not in self.runs() and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        self.queue.cancel(job_id)
+        thread.join(10)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(self.queue.get(job_id)["state"], CANCELLED)
+        self.assertEqual(os.listdir(self.save_path), [])
+
+    def test_several_worker_processes(self):
+        """Test worker processes share the queue and take over a dead worker's job."""
+        names = [f"video{i}" for i in range(8)] + ["fail"]
+        ids = [self.add(name) for name in names]
+        # A worker that claims a job and dies without renewing its lease
+        self.assertEqual(self.queue.claim("dead", lease_seconds=1)["id"], ids[0])
+
+        cmd = [
+            sys.executable,
+            "-m",
+            "src.worker",
+            self.db_path,
+            "work",
+            "--exit-when-idle",
+            "--poll-interval",
+            "0.1",
+            "--lease",
+            "2",
+            "--base-dir",
+            self.base_dir,
+        ]
+        workers = [
+            subprocess.Popen(
+                cmd + ["--name", f"w{i}"],
+                cwd=ROOT,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+            )
+            for i in range(3)
+        ]
+        outputs = [worker.communicate(timeout=60)[0] for worker in workers]
+        for worker, output in zip(workers, outputs):
+            self.assertEqual(worker.returncode, 0, output)
+
+        # Every job ran exactly once, the orphaned one after its lease ran out
+        self.assertEqual(sorted(self.runs()), sorted(names))
+        self.assertEqual(self.queue.get(ids[-1])["state"], FAILED)
+        for job_id in ids[:-1]:
+            job = self.queue.get(job_id)
+            self.assertEqual(job["state"], COMPLETED)
+            self.assertIn(job["worker"], ("w0", "w1", "w2"))
+        self.assertEqual(self.queue.get(ids[0])["attempts"], 2)
+        self.assertEqual(
+            sorted(os.listdir(self.save_path)),
+            sorted(f"{name}.mp3" for name in names[:-1]),
+        )
+        # The jobs were spread over the workers
+        self.assertGreater(sum("completed" in output for output in outputs), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
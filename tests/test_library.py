@@ -0,0 +1,102 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.library import MediaLibrary, title_from_filename
+
+
+class TestMediaLibrary(unittest.TestCase):
+    """Tests for the MediaLibrary class."""
+
+    def setUp(self):
+        """Set up a library and a folder with media files."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.music = os.path.join(self.tmp_dir.name, "music")
+        os.makedirs(os.path.join(self.music, "album"))
+        self.library = MediaLibrary(os.path.join(self.tmp_dir.name, "library.db"))
+
+    def tearDown(self):
+        self.library.close()
+        self.tmp_dir.cleanup()
+
+    def _write(self, name, data=b"data"):
+        path = os.path.join(self.music, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_title_from_filename(self):
+        """Test titles and video IDs from yt-dlp file names."""
+        self.assertEqual(
+            title_from_filename("/x/Song [dQw4w9WgXcQ].mp3"), ("Song", "dQw4w9WgXcQ")
+        )
+        self.assertEqual(
+            title_from_filename("/x/Song [live].mp3"), ("Song [live]", None)
+        )
+
+    def test_incremental_scan(self):
+        """Test that rescans only pick up new, changed and deleted files."""
+        first = self._write("one.mp3")
+        self._write(os.path.join("album", "two.m4a"))
+        self._write("notes.txt")
+        self.assertEqual(
+            self.library.scan(self.music),
+            {"added": 2, "updated": 0, "removed": 0, "unchanged": 0},
+        )
+
+        self._write("one.mp3", b"longer data")
+        os.remove(os.path.join(self.music, "album", "two.m4a"))
+        self._write("three.mp4")
+        self.assertEqual(
+            self.library.scan(self.music),
+            {"added": 1, "updated": 1, "removed": 1, "unchanged": 0},
+        )
+        self.assertEqual(self.library.get(first)["size"], 11)
+        self.assertEqual(self.library.count(), 2)
+
+    def test_scan_keeps_download_metadata(self):
+        """Test that a rescan does not replace the title of a download."""
+        path = self._write("Song_ Title.mp3")
+        self.library.add_file(path, title="Song: Title", video_id="dQw4w9WgXcQ")
+        self._write("Song_ Title.mp3", b"retagged")
+        self.library.scan(self.music)
+
+        entry = self.library.find_video("dQw4w9WgXcQ")[0]
+        self.assertEqual(entry["title"], "Song: Title")
+        self.assertEqual(entry["size"], 8)
+        self.assertEqual(self.library.search("song:")[0]["path"], path)
+
+    def test_scan_is_limited_to_the_folder(self):
+        """Test that files indexed from other folders are not removed."""
+        other = os.path.join(self.tmp_dir.name, "music2")
+        os.makedirs(other)
+        with open(os.path.join(other, "x.mp3"), "wb") as f:
+            f.write(b"x")
+        self.library.scan(other)
+        self.library.scan(self.music)
+        self.assertEqual(self.library.count(), 1)
+
+    def test_loudness_is_invalidated_by_changes(self):
+        """Test that a loudness measurement is only valid for the same file."""
+        path = self._write("one.mp3")
+        self.library.scan(self.music)
+        self.assertEqual(self.library.unmeasured_files(), [path])
+
+        self.library.set_loudness(path, (-12.5, -0.4))
+        self.assertEqual(self.library.loudness(path), (-12.5, -0.4))
+        self.assertEqual(self.library.unmeasured_files(), [])
+
+        self._write("one.mp3", b"changed data")
+        self.library.scan(self.music)
+        self.assertIsNone(self.library.loudness(path))
+        self.assertEqual(self.library.unmeasured_files(), [path])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+import json
+import os
+import sys
+import tracemalloc
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.listing import (
+    ENTRY_FIELDS,
+    Entry,
+    is_short,
+    iter_entries,
+    listing_command,
+    read_entries,
+)
+
+# Entries of a large channel for the memory benchmark
+BENCHMARK_ENTRIES = 20000
+
+
+def full_entry(index: int) -> dict:
+    """A flat-playlist entry with the fields yt-dlp --dump-json prints."""
+    video_id = f"vid{index:08d}"
+    return {
+        "_type": "url",
+        "ie_key": "Youtube",
+        "id": video_id,
+        "url": f"https://www.youtube.com/watch?v={video_id}",
+        "title": f"Video number {index} with a reasonably long title",
+        "description": "A description of the video. " * 8,
+        "duration": 300 + index % 600,
+        "channel_id": "UC0123456789abcdefghijkl",
+        "channel": "Some Channel",
+        "channel_url": "https://www.youtube.com/channel/UC0123456789abcdefghijkl",
+        "uploader": "Some Channel",
+        "uploader_id": "@somechannel",
+        "uploader_url": "https://www.youtube.com/@somechannel",
+        "thumbnails": [
+            {
+                "url": f"https://i.ytimg.com/vi/{video_id}/hq{size}.jpg",
+                "height": size,
+                "width": size * 16 // 9,
+            }
+            for size in (90, 180, 360, 720)
+        ],
+        "timestamp": None,
+        "release_timestamp": None,
+        "availability": None,
+        "view_count": 1000 + index,
+        "live_status": None,
+        "channel_is_verified": None,
+        "__x_forwarded_for_ip": None,
+        "webpage_url": f"https://www.youtube.com/watch?v={video_id}",
+        "original_url": f"https://www.youtube.com/watch?v={video_id}",
+        "webpage_url_basename": "watch",
+        "webpage_url_domain": "youtube.com",
+        "extractor": "youtube",
+        "extractor_key": "Youtube",
+        "playlist_count": BENCHMARK_ENTRIES,
+        "playlist": "Some Channel - Videos",
+        "playlist_id": "UC0123456789abcdefghijkl",
+        "playlist_title": "Some Channel - Videos",
+        "playlist_uploader": "Some Channel",
+        "playlist_uploader_id": "@somechannel",
+        "n_entries": BENCHMARK_ENTRIES,
+        "playlist_index": index + 1,
+        "__last_playlist_index": BENCHMARK_ENTRIES,
+        "playlist_autonumber": index + 1,
+        "epoch": 1700000000,
+        "release_year": None,
+        "upload_date": "20240101",
+        "_version": {"version": "2024.12.13", "repository": "yt-dlp/yt-dlp"},
+    }
+
+
+def projected_entry(index: int) -> dict:
+    """The same entry as printed through the listing_command() template."""
+    entry = full_entry(index)
+    return {field: entry[field] for field in ENTRY_FIELDS}
+
+
+class TestListing(unittest.TestCase):
+    """Tests for parsing playlist and channel listings."""
+
+    def test_command_projects_entry_fields(self):
+        """Test the command asks yt-dlp for only the entry fields."""
+        cmd = listing_command("yt-dlp.exe", "https://youtube.com/playlist?list=x")
+        self.assertIn("--flat-playlist", cmd)
+        self.assertNotIn("--dump-json", cmd)
+        template = cmd[cmd.index("-O") + 1]
+        self.assertEqual(template, "%(.{id,url,title,duration,upload_date})j")
+
+    def test_iter_entries_skips_bad_lines(self):
+        """Test blank, broken and non-object lines are skipped."""
+        lines = [
+            json.dumps({"id": "a", "url": "https://x/a", "title": "A"}),
+            "",
+            "{not json",
+            "[1, 2]",
+            "WARNING: something",
+            json.dumps({"id": "b", "url": "https://x/b", "title": "B"}),
+        ]
+        self.assertEqual([entry.id for entry in iter_entries(lines)], ["a", "b"])
+
+    def test_entry_keeps_only_known_fields(self):
+        """Test entries parse the projected fields and ignore the rest."""
+        entry = Entry.from_json(json.dumps(full_entry(3)))
+        self.assertEqual(entry.id, "vid00000003")
+        self.assertEqual(entry.duration, 303)
+        self.assertEqual(entry.upload_date, "20240101")
+        self.assertFalse(hasattr(entry, "__dict__"))
+
+        missing = Entry.from_json('{"id": "x"}')
+        self.assertIsNone(missing.title)
+        self.assertIsNone(missing.url)
+
+    def test_absolute_url(self):
+        """Test relative entry URLs are resolved."""
+        self.assertEqual(
+            Entry("a", "/shorts/a", "A").absolute_url(),
+            "https://www.youtube.com/shorts/a",
+        )
+        self.assertEqual(Entry("a", "https://x/a", "A").absolute_url(), "https://x/a")
+        self.assertIsNone(Entry("a", None, "A").absolute_url())
+
+    def test_read_entries_filters_while_reading(self):
+        """Test the filter decides per entry and keeps the listing order."""
+        lines = (
+            json.dumps({"id": str(i), "url": url, "title": str(i)})
+            for i, url in enumerate(
+                ["https://y/watch?v=0", "https://y/shorts/1", "https://y/watch?v=2"]
+            )
+        )
+        entries = read_entries(lines, lambda entry: not is_short(entry))
+        self.assertEqual([entry.id for entry in entries], ["0", "2"])
+
+    def test_peak_memory_benchmark(self):
+        """
+        Benchmark peak memory of reading a large channel listing.
+
+        Compares the previous approach (whole --dump-json output, its split
+        lines and a dict per entry) with streaming projected lines into
+        Entry records.
+        """
+        full_lines = [json.dumps(full_entry(i)) for i in range(BENCHMARK_ENTRIES)]
+        projected_lines = [
+            json.dumps(projected_entry(i)) for i in range(BENCHMARK_ENTRIES)
+        ]
+
+        def dump_json_dicts():
+            stdout = "\n".join(full_lines)
+            entries = []
+            for line in stdout.strip().split("\n"):
+                if line.strip():
+                    entries.append(json.loads(line))
+            return entries
+
+        def streamed_records():
+            # Lines are produced one at a time, as from a pipe
+            return read_entries(line for line in projected_lines)
+
+        def peak(build):
+            tracemalloc.start()
+            try:
+                result = build()
+                _, peak_bytes = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            self.assertEqual(len(result), BENCHMARK_ENTRIES)
+            return peak_bytes
+
+        before = peak(dump_json_dicts)
+        after = peak(streamed_records)
+        print(
+            f"\n{BENCHMARK_ENTRIES} entries: --dump-json dicts peak "
+            f"{before / 1e6:.1f} MB, streamed records peak {after / 1e6:.1f} MB",
+            file=sys.stderr,
+        )
+        self.assertLess(after * 10, before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.loudness import (
+    LoudnessAnalyzer,
+    analyze_command,
+    gain_for,
+    is_audio_file,
+    parse_ebur128,
+)
+
+SUMMARY = """
+[Parsed_ebur128_0 @ 0x1] t: 0.4  TARGET:-23 LUFS    M: -20.1 S:-120.7     I: -20.1 LUFS
+[Parsed_ebur128_0 @ 0x1] Summary:
+
+  Integrated loudness:
+    I:         -11.3 LUFS
+    Threshold: -21.6 LUFS
+
+  Loudness range:
+    LRA:         4.2 LU
+
+  True peak:
+    Peak:        0.6 dBFS
+"""
+
+
+class TestLoudness(unittest.TestCase):
+    """Tests for loudness measurement helpers."""
+
+    def test_parse_summary(self):
+        """Test that the summary values are read, not the per-frame ones."""
+        self.assertEqual(parse_ebur128(SUMMARY), (-11.3, 0.6))
+        with self.assertRaises(ValueError):
+            parse_ebur128("Input #0, mp3, from 'x.mp3':")
+
+    def test_parse_silence(self):
+        """Test that silent tracks with an infinite peak are parsed."""
+        output = "I:         -70.0 LUFS\nPeak:       -inf dBFS\n"
+        self.assertEqual(parse_ebur128(output), (-70.0, float("-inf")))
+
+    def test_gain_for(self):
+        """Test target gain and true peak limiting."""
+        self.assertAlmostEqual(gain_for((-11.3, -3.0)), -6.7)
+        # Raising by 8 dB would clip; only 2 dB headroom are left
+        self.assertAlmostEqual(gain_for((-26.0, -3.0)), 2.0)
+        self.assertAlmostEqual(gain_for((-26.0, -3.0), target=-23.0), 2.0)
+        self.assertAlmostEqual(gain_for((-26.0, -10.0), target=-23.0), 3.0)
+
+    def test_analyze_command(self):
+        """Test that ffmpeg decodes without writing output."""
+        cmd = analyze_command("ffmpeg", "a.mp3")
+        self.assertEqual(cmd[cmd.index("-i") + 1], "a.mp3")
+        self.assertIn("ebur128=peak=true:framelog=verbose", cmd)
+        self.assertEqual(cmd[-3:], ["-f", "null", "-"])
+
+    def test_is_audio_file(self):
+        """Test which downloads are normalized."""
+        self.assertTrue(is_audio_file("/x/Song.MP3"))
+        self.assertFalse(is_audio_file("/x/Video.mp4"))
+
+
+class TestLoudnessAnalyzer(unittest.TestCase):
+    """Tests for the LoudnessAnalyzer class."""
+
+    def test_measure(self):
+        """Test a measurement and a failing ffmpeg run."""
+        analyzer = LoudnessAnalyzer("ffmpeg", max_workers=1)
+        self.addCleanup(analyzer.shutdown)
+
+        def run(cmd, **kwargs):
+            return subprocess.CompletedProcess(cmd, 0, None, SUMMARY)
+
+        self.assertEqual(analyzer.measure("a.mp3", run=run), (-11.3, 0.6))
+
+        def fail(cmd, **kwargs):
+            return subprocess.CompletedProcess(cmd, 1, None, "Invalid data")
+
+        with self.assertRaises(OSError):
+            analyzer.measure("a.mp3", run=fail)
+
+    def test_analyze_reports_every_file(self):
+        """Test that results and errors of all files are reported."""
+        analyzer = LoudnessAnalyzer("ffmpeg", max_workers=2)
+        self.addCleanup(analyzer.shutdown)
+
+        def measure(path, run=None):
+            if path == "bad.mp3":
+                raise OSError("broken")
+            return (-14.0, -1.0)
+
+        analyzer.measure = measure
+        results = {}
+        lock = threading.Lock()
+
+        def on_done(path, loudness, error):
+            with lock:
+                results[path] = (loudness, type(error))
+
+        for future in analyzer.analyze(["a.mp3", "b.mp3", "bad.mp3"], on_done):
+            future.result()
+        self.assertEqual(results["a.mp3"], ((-14.0, -1.0), type(None)))
+        self.assertEqual(results["bad.mp3"], (None, OSError))
+        self.assertEqual(len(results), 3)
+
+
+    @unittest.skipIf(sys.platform == "win32", "needs an executable script")
+    def test_shutdown_terminates_running_analysis(self):
+        """Test closing does not wait for the ffmpeg run of a long file."""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        ffmpeg = os.path.join(tmp_dir.name, "ffmpeg")
+        with open(ffmpeg, "w") as f:
+            f.write(f"#!{sys.executable}\nimport time\ntime.sleep(30)\n")
+        os.chmod(ffmpeg, 0o755)
+        analyzer = LoudnessAnalyzer(ffmpeg, max_workers=1)
+        results = []
+        analyzer.analyze(["a.mp3", "b.mp3"], lambda *result: results.append(result))
+        deadline = time.monotonic() + 5
+        while not analyzer._running and time.monotonic() < deadline:
+            time.sleep(0.02)
+        process = analyzer.executor._processes[("loudness", "a.mp3")][0]
+
+        started = time.monotonic()
+        analyzer.shutdown()
+
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertIsNotNone(process.wait(5))
+        self.assertEqual(results, [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import struct
+import sys
+import tempfile
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.media_info import probe
+
+# MPEG-1 layer III, 128 kbps, 44.1 kHz, stereo
+MP3_FRAME_HEADER = b"\xff\xfb\x90\x00"
+MP3_FRAME_SIZE = 417
+
+
+def mp3_frame(payload: bytes = b"") -> bytes:
+    """One MPEG audio frame, optionally starting with a VBR header."""
+    body = bytes(32) + payload
+    return MP3_FRAME_HEADER + body + bytes(MP3_FRAME_SIZE - 4 - len(body))
+
+
+def atom(kind: bytes, payload: bytes) -> bytes:
+    """One MP4 atom."""
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+class TestProbe(unittest.TestCase):
+    """Tests for reading durations from file headers."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write(self, name, data):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_cbr_mp3_with_id3_tag(self):
+        """Test a constant bitrate MP3 behind an ID3v2 tag."""
+        id3 = b"ID3\x04\x00\x00" + bytes([0, 0, 1, 0]) + bytes(128)
+        path = self._write("cbr.mp3", id3 + mp3_frame() * 100)
+        duration, bitrate = probe(path)
+        self.assertEqual(bitrate, 128000)
+        self.assertAlmostEqual(duration, 100 * MP3_FRAME_SIZE * 8 / 128000)
+
+    def test_vbr_mp3_with_xing_header(self):
+        """Test the frame count of a Xing header."""
+        xing = b"Xing" + struct.pack(">III", 3, 1000, 417000)
+        path = self._write("vbr.mp3", mp3_frame(xing) + mp3_frame() * 3)
+        duration, bitrate = probe(path)
+        self.assertAlmostEqual(duration, 1000 * 1152 / 44100)
+        self.assertEqual(bitrate, int(417000 * 8 / duration))
+
+    def test_mp4_with_moov_after_media_data(self):
+        """Test the movie header of an MP4 whose moov atom comes last."""
+        mvhd = atom(b"mvhd", bytes(12) + struct.pack(">II", 1000, 5000) + bytes(80))
+        data = atom(b"ftyp", b"isom") + atom(b"mdat", bytes(4000)) + atom(b"moov", mvhd)
+        path = self._write("video.mp4", data)
+        duration, bitrate = probe(path)
+        self.assertEqual(duration, 5.0)
+        self.assertEqual(bitrate, int(len(data) * 8 / 5.0))
+
+    def test_unreadable_files(self):
+        """Test that unknown or broken files give no information."""
+        self.assertEqual(probe(self._write("junk.mp3", b"junk")), (None, None))
+        self.assertEqual(probe(self._write("video.webm", b"\x1a\x45")), (None, None))
+        self.assertEqual(probe(os.path.join(self.tmp_dir.name, "x.mp4")), (None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.metrics import (
+    Histogram,
+    PipelineMetrics,
+    StageTimer,
+    is_postprocessor_line,
+)
+
+
+class FakeClock:
+    """Clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestStageTimer(unittest.TestCase):
+    """Tests for the StageTimer class."""
+
+    def test_stages_add_up(self):
+        """Test that repeated stages accumulate and take() starts over."""
+        clock = FakeClock()
+        timer = StageTimer(clock)
+        timer.enter("queued")
+        clock.now = 2.0
+        timer.enter("download")
+        clock.now = 5.0
+        timer.enter("waiting")
+        clock.now = 6.0
+        timer.enter("download")
+        clock.now = 10.0
+        self.assertEqual(
+            timer.take(), {"queued": 2.0, "download": 7.0, "waiting": 1.0}
+        )
+        self.assertIsNone(timer.stage)
+        self.assertEqual(timer.take(), {})
+
+
+class TestHistogram(unittest.TestCase):
+    """Tests for the Histogram class."""
+
+    def test_observe_and_quantile(self):
+        """Test bucket counts and interpolated quantiles."""
+        histogram = Histogram((1, 10))
+        for value in (0.5, 1, 4, 20):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.sum, 25.5)
+        self.assertAlmostEqual(histogram.quantile(0.5), 1.0)
+        self.assertAlmostEqual(histogram.quantile(0.75), 10.0)
+        self.assertEqual(histogram.quantile(1.0), 20)
+
+        # Interpolation stops at the largest value seen
+        single = Histogram((1, 10))
+        single.observe(4)
+        self.assertEqual(single.quantile(0.95), 4)
+        self.assertIsNone(Histogram().quantile(0.5))
+
+
+class TestPipelineMetrics(unittest.TestCase):
+    """Tests for the PipelineMetrics class."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.jsonl = os.path.join(self.tmp_dir.name, "metrics.jsonl")
+        self.prom = os.path.join(self.tmp_dir.name, "metrics.prom")
+        self.metrics = PipelineMetrics(self.jsonl, self.prom, buckets=(1, 10))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _record(self, state="completed", download=4.0):
+        self.metrics.record(
+            {
+                "id": 1,
+                "state": state,
+                "stages": {"queued": 0.5, "download": download},
+                "downloaded_bytes": 100,
+                "output_bytes": 80,
+            }
+        )
+
+    def test_record_writes_json_lines(self):
+        """Test that every finished task is appended as one JSON line."""
+        self._record()
+        self._record(state="failed")
+        with open(self.jsonl, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([r["state"] for r in records], ["completed", "failed"])
+        self.assertEqual(records[0]["stages"]["download"], 4.0)
+
+    def test_prometheus_export(self):
+        """Test the text exposition of histograms and counters."""
+        self._record()
+        self._record(download=20.0)
+        with open(self.prom, encoding="utf-8") as f:
+            text = f.read()
+        self.assertEqual(text, self.metrics.prometheus_text())
+        self.assertIn('ytd_stage_seconds_bucket{stage="download",le="10"} 1', text)
+        self.assertIn('ytd_stage_seconds_bucket{stage="download",le="+Inf"} 2', text)
+        self.assertIn('ytd_stage_seconds_count{stage="download"} 2', text)
+        self.assertIn("ytd_task_seconds_sum 25.0", text)
+        self.assertIn('ytd_tasks_total{state="completed"} 2', text)
+        self.assertIn("ytd_downloaded_bytes_total 200", text)
+        self.assertIn("# TYPE ytd_stage_seconds histogram", text)
+
+    def test_summary(self):
+        """Test the Activity page summary."""
+        self.assertEqual(self.metrics.summary(), "No finished downloads yet")
+        self._record()
+        summary = self.metrics.summary()
+        self.assertIn("(1 finished)", summary)
+        self.assertIn("download 4.0s", summary)
+        self.assertNotIn("finalize", summary)
+
+    def test_resources_per_mode_and_quality(self):
+        """Test that process usage is totalled per mode and quality."""
+        for cpu in (2.0, 4.0):
+            self.metrics.record(
+                {
+                    "state": "completed",
+                    "mode": "MP3 Only",
+                    "quality": "320",
+                    "stages": {"download": 1.0},
+                    "resources": {
+                        "wall_time": 4.0,
+                        "cpu_time": cpu,
+                        "peak_rss": 50e6 * cpu,
+                        "read_bytes": None,
+                        "write_bytes": 1000,
+                    },
+                }
+            )
+        totals = self.metrics.resources[("MP3 Only", "320")]
+        self.assertEqual(totals["tasks"], 2)
+        self.assertEqual(totals["cpu_time"], 6.0)
+        self.assertEqual(totals["peak_rss"], 200e6)
+        self.assertEqual(totals["read_bytes"], 0)
+
+        text = self.metrics.prometheus_text()
+        self.assertIn(
+            'ytd_child_cpu_seconds_total{mode="MP3 Only",quality="320"} 6.0', text
+        )
+        self.assertIn("# TYPE ytd_child_peak_rss_bytes gauge", text)
+        self.assertIn("MP3 Only (320): 3.0 CPU s, 0.75 cores", self.metrics.summary())
+
+    def test_postprocessor_lines(self):
+        """Test detection of yt-dlp post-processing output."""
+        self.assertTrue(is_postprocessor_line("[ExtractAudio] Destination: a.mp3"))
+        self.assertTrue(is_postprocessor_line('[Merger] Merging formats into "a"'))
+        self.assertTrue(is_postprocessor_line("[FixupM4a] Correcting container"))
+        self.assertFalse(is_postprocessor_line("[download]  50.0% of 1.00MiB"))
+
+
+if __name__ == "__main__":
+    unittest.main()
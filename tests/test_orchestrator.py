@@ -0,0 +1,224 @@
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import CancelledError
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.orchestrator import Orchestrator, iter_lines
+from app.process_stats import PROC_AVAILABLE, ProcessMonitor
+
+SLEEPER = [
+    sys.executable,
+    "-c",
+    "import time; print('started', flush=True); time.sleep(30)",
+]
+
+
+# Burns CPU in a grandchild that exits before its parent
+BUSY_TREE = (
+    "import subprocess, sys\n"
+    "subprocess.run([sys.executable, '-c', "
+    "'import time\\nend = time.process_time() + 0.3\\n"
+    "while time.process_time() < end: pass'])\n"
+)
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+class TestIterLines(unittest.TestCase):
+    """Tests for iter_lines()."""
+
+    def test_splits_universal_newlines_across_chunks(self):
+        """Test "\\r", "\\n" and "\\r\\n" end lines even when split between reads."""
+
+        async def collect():
+            stream = asyncio.StreamReader()
+            for chunk in (b"a\r", b"\nb\rc", b"\n\xc3", b"\xa9\r", b"tail"):
+                stream.feed_data(chunk)
+            stream.feed_eof()
+            return [line async for line in iter_lines(stream, "utf-8")]
+
+        self.assertEqual(asyncio.run(collect()), ["a", "b", "c", "é", "tail"])
+
+
+class TestOrchestrator(unittest.TestCase):
+    """Tests for the Orchestrator class."""
+
+    def setUp(self):
+        self.monitor = ProcessMonitor()
+        self.orchestrator = Orchestrator(self.monitor)
+
+    def tearDown(self):
+        self.orchestrator.shutdown(timeout=5)
+
+    def test_stream_passes_lines_and_returns_exit_code(self):
+        """Test output lines reach the callback and the process is released."""
+        lines = []
+        script = "import sys\nprint('one')\nsys.stderr.write('two\\n')\nsys.exit(3)"
+        future = self.orchestrator.submit(
+            1,
+            self.orchestrator.stream,
+            1,
+            [sys.executable, "-c", script],
+            lines.append,
+        )
+        self.assertEqual(future.result(10), 3)
+        self.assertEqual(sorted(lines), ["one", "two"])
+        self.assertEqual(self.orchestrator.process_count, 0)
+        self.assertTrue(wait_until(lambda: self.orchestrator.active_count == 0))
+        self.assertEqual(self.monitor.take(1)["processes"], 1)
+
+    def test_stream_check_raises_with_stderr(self):
+        """Test check=True keeps stderr apart and raises on failure."""
+        lines = []
+        failing = "print('partial'); raise SystemExit('broken')"
+        future = self.orchestrator.submit(
+            1,
+            self.orchestrator.stream,
+            1,
+            [sys.executable, "-c", failing],
+            lines.append,
+            True,
+        )
+        with self.assertRaises(subprocess.CalledProcessError) as ctx:
+            future.result(10)
+        self.assertIn("broken", ctx.exception.stderr)
+        self.assertEqual(lines, ["partial"])
+
+    def test_run_captures_output_and_times_out(self):
+        """Test run() behaves like TaskExecutor.run() with a timeout."""
+        future = self.orchestrator.submit(
+            1, self.orchestrator.run, 1, [sys.executable, "-c", "print('ok')"]
+        )
+        self.assertEqual(future.result(10).stdout.strip(), "ok")
+
+        future = self.orchestrator.submit(1, self.orchestrator.run, 1, SLEEPER, 0.5)
+        with self.assertRaises(subprocess.TimeoutExpired):
+            future.result(10)
+        self.assertEqual(self.orchestrator.process_count, 0)
+
+    @unittest.skipUnless(PROC_AVAILABLE, "needs /proc")
+    def test_usage_is_sampled_before_reaping(self):
+        """Test short commands report the CPU time and memory of their tree."""
+        cmd = [sys.executable, "-c", BUSY_TREE]
+        self.orchestrator.submit(1, self.orchestrator.run, 1, cmd).result(10)
+        self.orchestrator.submit(
+            2, self.orchestrator.stream, 2, cmd, lambda line: None
+        ).result(10)
+
+        for key in (1, 2):
+            usage = self.monitor.take(key)
+            self.assertGreaterEqual(usage["cpu_time"], 0.25)
+            self.assertGreater(usage["peak_rss"], 0)
+            self.assertIsNotNone(usage["read_bytes"])
+
+    def test_kill_ends_process_but_not_coroutine(self):
+        """Test kill() lets the coroutine handle the exit of its process."""
+        lines = []
+        future = self.orchestrator.submit(
+            1, self.orchestrator.stream, 1, SLEEPER, lines.append
+        )
+        self.assertTrue(wait_until(lambda: lines == ["started"]))
+
+        self.assertTrue(self.orchestrator.kill(1))
+        self.assertNotEqual(future.result(10), 0)
+        self.assertFalse(self.orchestrator.kill(1))
+
+    @unittest.skipIf(sys.platform == "win32", "process groups are POSIX only")
+    def test_cancel_terminates_grandchildren(self):
+        """Test cancelling a coroutine kills the process tree it started."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pid_file = os.path.join(tmp_dir, "grandchild.pid")
+            script = (
+                "import subprocess, sys, time\n"
+                "p = subprocess.Popen([sys.executable, '-c', "
+                "'import time; time.sleep(30)'])\n"
+                f"open({pid_file!r}, 'w').write(str(p.pid))\n"
+                "time.sleep(30)\n"
+            )
+            future = self.orchestrator.submit(
+                1,
+                self.orchestrator.stream,
+                1,
+                [sys.executable, "-c", script],
+                lambda line: None,
+            )
+            self.assertTrue(wait_until(lambda: os.path.exists(pid_file)))
+            time.sleep(0.05)
+            with open(pid_file) as f:
+                grandchild_pid = int(f.read())
+
+            self.assertTrue(self.orchestrator.cancel(1))
+            with self.assertRaises(CancelledError):
+                future.result(10)
+
+            def gone():
+                try:
+                    os.kill(grandchild_pid, 0)
+                except ProcessLookupError:
+                    return True
+                return False
+
+            self.assertTrue(wait_until(gone))
+            self.assertTrue(wait_until(lambda: self.orchestrator.process_count == 0))
+
+    def test_many_processes_share_one_loop(self):
+        """Test concurrent processes do not need a thread each."""
+        baseline = threading.active_count()
+        peak = [0]
+        count = 40
+        script = "import time; time.sleep(0.5); print('done')"
+
+        def observe(line):
+            peak[0] = max(peak[0], threading.active_count())
+
+        futures = [
+            self.orchestrator.submit(
+                i,
+                self.orchestrator.stream,
+                i,
+                [sys.executable, "-c", script],
+                observe,
+            )
+            for i in range(count)
+        ]
+        self.assertEqual([future.result(30) for future in futures], [0] * count)
+        # The loop thread and the process monitor, with some leeway; older
+        # Pythons on Linux wait for each child in a thread of its own
+        if sys.platform == "win32" or sys.version_info >= (3, 12):
+            self.assertLess(peak[0] - baseline, 5)
+
+    def test_every_and_shutdown(self):
+        """Test periodic calls run on the loop and shutdown stops new work."""
+        ticks = []
+        self.orchestrator.every(0.05, lambda: ticks.append(threading.current_thread()))
+        pending = self.orchestrator.submit(
+            1, self.orchestrator.stream, 1, SLEEPER, lambda line: None
+        )
+        self.assertTrue(wait_until(lambda: len(ticks) >= 2))
+        self.assertEqual(ticks[0].name, "orchestrator")
+
+        self.orchestrator.shutdown(timeout=5)
+        self.assertTrue(pending.cancelled())
+        self.assertEqual(self.orchestrator.process_count, 0)
+        self.assertIsNone(
+            self.orchestrator.submit(2, self.orchestrator.run, 2, SLEEPER)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
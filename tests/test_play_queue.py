@@ -0,0 +1,56 @@
+import os
+import sys
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.play_queue import PlayQueue
+
+
+class TestPlayQueue(unittest.TestCase):
+    """Tests for the PlayQueue class."""
+
+    def test_empty_queue(self):
+        """Test that an empty queue has no current or next track."""
+        queue = PlayQueue()
+        self.assertIsNone(queue.current)
+        self.assertIsNone(queue.peek_next())
+        self.assertIsNone(queue.advance())
+        self.assertIsNone(queue.back())
+
+    def test_navigation(self):
+        """Test moving forward and back through the queue."""
+        queue = PlayQueue()
+        self.assertEqual(queue.set_tracks(["a", "b", "c"], start=1), "b")
+        self.assertEqual(queue.peek_next(), "c")
+        self.assertEqual(queue.advance(), "c")
+        # The end of the queue keeps the cursor on the last track
+        self.assertIsNone(queue.advance())
+        self.assertEqual(queue.current, "c")
+        self.assertEqual(queue.back(), "b")
+        self.assertEqual(queue.back(), "a")
+        self.assertIsNone(queue.back())
+
+    def test_add_to_empty_queue_selects_first_track(self):
+        """Test that adding to an empty queue makes the first track current."""
+        queue = PlayQueue()
+        queue.add(["a", "b"])
+        self.assertEqual(queue.current, "a")
+        queue.add(["c"])
+        self.assertEqual(len(queue), 3)
+        self.assertEqual(queue.current, "a")
+
+    def test_repeat_wraps_around(self):
+        """Test that a repeating queue starts over after the last track."""
+        queue = PlayQueue(repeat=True)
+        queue.set_tracks(["a", "b"], start=1)
+        self.assertEqual(queue.peek_next(), "a")
+        self.assertEqual(queue.advance(), "a")
+        self.assertEqual(queue.back(), "b")
+
+
+if __name__ == "__main__":
+    unittest.main()
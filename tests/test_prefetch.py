@@ -0,0 +1,142 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.orchestrator import Orchestrator
+from app.prefetch import MetadataPrefetcher
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMetadataPrefetcher(unittest.TestCase):
+    """Tests for the MetadataPrefetcher class."""
+
+    def setUp(self):
+        self.orchestrator = Orchestrator()
+        self.clock = Clock()
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        self.fetched = []
+        self.done = []
+        self.delay = 0.1
+        self.prefetcher = MetadataPrefetcher(
+            self.orchestrator,
+            self.fetch,
+            lambda task_id, info: self.done.append((task_id, info)),
+            depth=3,
+            max_parallel=2,
+            max_age=60,
+            clock=self.clock,
+        )
+
+    def tearDown(self):
+        self.orchestrator.shutdown(timeout=5)
+
+    async def fetch(self, key, cmd):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            self.fetched.append(key[1])
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            with self.lock:
+                self.running -= 1
+        if cmd[-1] == "broken":
+            raise ValueError("no JSON")
+        return {"title": cmd[-1]}
+
+    def upcoming(self, *ids):
+        return [(task_id, ["yt-dlp", f"video{task_id}"]) for task_id in ids]
+
+    def result(self, task_id, cmd):
+        future = self.orchestrator.submit(
+            ("start", task_id), self.prefetcher.result, task_id, cmd
+        )
+        return future.result(5)
+
+    def test_prefetches_next_tasks_with_bounded_concurrency(self):
+        """Test only depth tasks are fetched and at most max_parallel at once."""
+        queue = self.upcoming(1, 2, 3, 4, 5)
+        self.assertEqual(self.prefetcher.schedule(queue), 2)
+        self.assertEqual(self.prefetcher.schedule(queue), 0)
+        # Rescheduled after each prefetch, like the download manager does
+        while len(self.done) < 3:
+            self.assertTrue(wait_until(lambda: self.prefetcher.pending_count < 2))
+            self.prefetcher.schedule(queue)
+            time.sleep(0.02)
+
+        self.assertTrue(wait_until(lambda: self.prefetcher.pending_count == 0))
+        self.assertEqual(sorted(self.fetched), [1, 2, 3])
+        self.assertEqual(self.peak, 2)
+        self.assertEqual(self.prefetcher.schedule(queue), 0)
+
+    def test_result_uses_cache_or_waits_for_running_prefetch(self):
+        """Test a starting task reuses the prefetch instead of fetching again."""
+        self.prefetcher.schedule(self.upcoming(1, 2))
+        self.assertTrue(wait_until(lambda: len(self.done) == 2))
+        self.assertEqual(self.done[0][1], {"title": "video1"})
+        self.assertEqual(self.result(1, ["yt-dlp", "video1"]), {"title": "video1"})
+        # Taken once; a changed command (other quality, cookies) is not served
+        self.assertIsNone(self.result(1, ["yt-dlp", "video1"]))
+        self.assertIsNone(self.result(2, ["yt-dlp", "other"]))
+
+        self.delay = 0.3
+        self.prefetcher.schedule(self.upcoming(3))
+        self.assertEqual(self.result(3, ["yt-dlp", "video3"]), {"title": "video3"})
+        self.assertEqual(self.fetched.count(3), 1)
+        self.assertEqual(self.prefetcher.stats["hits"], 2)
+
+    def test_expired_and_failed_prefetches(self):
+        """Test stale metadata is fetched again and failures are left alone."""
+        self.prefetcher.schedule(self.upcoming(1) + [(2, ["yt-dlp", "broken"])])
+        self.assertTrue(wait_until(lambda: len(self.done) == 2))
+        self.assertIn((2, None), self.done)
+        self.assertEqual(self.prefetcher.stats["failed"], 1)
+        self.assertIsNone(self.result(2, ["yt-dlp", "broken"]))
+
+        self.clock.now = 61
+        self.assertEqual(self.prefetcher.schedule(self.upcoming(1)), 1)
+        self.assertTrue(wait_until(lambda: len(self.done) == 3))
+        self.assertEqual(self.fetched.count(1), 2)
+        self.clock.now = 122
+        self.assertIsNone(self.result(1, ["yt-dlp", "video1"]))
+
+    def test_discard_cancels_running_prefetch(self):
+        """Test a cancelled task's prefetch is stopped and not cached."""
+        self.delay = 5
+        self.prefetcher.schedule(self.upcoming(1))
+        self.assertTrue(wait_until(lambda: self.running == 1))
+
+        self.prefetcher.discard(1)
+
+        self.assertTrue(wait_until(lambda: self.running == 0))
+        self.assertEqual(self.prefetcher.pending_count, 0)
+        self.assertIsNone(self.result(1, ["yt-dlp", "video1"]))
+        self.assertEqual(self.done, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
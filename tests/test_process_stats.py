@@ -0,0 +1,110 @@
+import os
+import subprocess
+import sys
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.process_stats import (
+    PROC_AVAILABLE,
+    MonitoredPopen,
+    ProcessMonitor,
+    add_usage,
+    sample_tree,
+)
+from app.task_executor import TaskExecutor
+
+# Burns CPU in a grandchild, so its time only reaches the child once reaped
+BUSY_TREE = (
+    "import subprocess, sys\n"
+    "subprocess.run([sys.executable, '-c', "
+    "'import time\\nend = time.process_time() + 0.3\\n"
+    "while time.process_time() < end: pass'])\n"
+)
+
+
+class TestAddUsage(unittest.TestCase):
+    """Tests for add_usage()."""
+
+    def test_sums_and_peaks(self):
+        """Test that usage adds up and peak memory is the maximum."""
+        total = {}
+        add_usage(total, {"wall_time": 1.0, "cpu_time": 0.5, "peak_rss": 10})
+        add_usage(total, {"wall_time": 2.0, "cpu_time": 0.25, "peak_rss": 30})
+        self.assertEqual(total["wall_time"], 3.0)
+        self.assertEqual(total["cpu_time"], 0.75)
+        self.assertEqual(total["peak_rss"], 30)
+        self.assertEqual(total["processes"], 2)
+
+    def test_unknown_values_stay_unknown(self):
+        """Test that a value missing on one process is not reported."""
+        total = add_usage({}, {"wall_time": 1.0, "cpu_time": 0.5})
+        add_usage(total, {"wall_time": 1.0, "cpu_time": None})
+        self.assertIsNone(total["cpu_time"])
+        self.assertEqual(total["wall_time"], 2.0)
+
+
+@unittest.skipUnless(PROC_AVAILABLE, "needs /proc")
+class TestProcessMonitor(unittest.TestCase):
+    """Tests for the ProcessMonitor class."""
+
+    def test_exit_sample_includes_reaped_children(self):
+        """Test that the CPU time of a finished grandchild is counted."""
+        monitor = ProcessMonitor(interval=60)
+        process = MonitoredPopen(
+            [sys.executable, "-c", BUSY_TREE], on_exit=monitor.exited
+        )
+        monitor.watch("task", process)
+        process.wait()
+        monitor.finish(process)
+
+        usage = monitor.take("task")
+        self.assertGreaterEqual(usage["cpu_time"], 0.25)
+        self.assertGreater(usage["peak_rss"], 0)
+        self.assertGreater(usage["wall_time"], 0)
+        self.assertEqual(usage["processes"], 1)
+        self.assertIsNone(monitor.take("task"))
+
+    def test_sample_of_running_tree(self):
+        """Test sampling a running process and one that is gone."""
+        process = subprocess.Popen(
+            [sys.executable, "-c", "print('ready', flush=True); input()"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        try:
+            process.stdout.readline()
+            sample = sample_tree(process.pid)
+        finally:
+            process.communicate(b"\n")
+        self.assertGreater(sample["rss"], 0)
+        self.assertIn("write_bytes", sample)
+        self.assertIsNone(sample_tree(process.pid))
+
+
+class TestTaskExecutorUsage(unittest.TestCase):
+    """Tests for resource accounting of TaskExecutor processes."""
+
+    def setUp(self):
+        self.executor = TaskExecutor()
+
+    def tearDown(self):
+        self.executor.shutdown(timeout=2)
+
+    def test_usage_adds_up_per_task(self):
+        """Test that all processes of a task are totalled until taken."""
+        self.executor.run(1, [sys.executable, "-c", "pass"])
+        self.executor.run(1, [sys.executable, "-c", BUSY_TREE])
+        usage = self.executor.take_usage(1)
+        self.assertEqual(usage["processes"], 2)
+        self.assertGreater(usage["wall_time"], 0)
+        if PROC_AVAILABLE:
+            self.assertGreaterEqual(usage["cpu_time"], 0.25)
+        self.assertIsNone(self.executor.take_usage(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
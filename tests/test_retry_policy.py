@@ -0,0 +1,63 @@
+import os
+import random
+import sys
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app import retry_policy
+from app.retry_policy import RetryPolicy, classify_error
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Tests for error classification and the RetryPolicy class."""
+
+    def test_classify_error(self):
+        """Test that yt-dlp error messages map to the expected categories."""
+        cases = {
+            "ERROR: unable to download video data: HTTP Error 429: Too Many Requests": (
+                retry_policy.RATE_LIMITED
+            ),
+            "ERROR: unable to download video data: HTTP Error 503: Service Unavailable": (
+                retry_policy.NETWORK
+            ),
+            "ERROR: [youtube] abc: Unable to download webpage: timed out": (
+                retry_policy.NETWORK
+            ),
+            "ERROR: Failed to decrypt with DPAPI": retry_policy.AUTH,
+            "ERROR: unable to download video data: HTTP Error 403: Forbidden": (
+                retry_policy.AUTH
+            ),
+            "ERROR: [youtube] abc: Video unavailable": retry_policy.UNAVAILABLE,
+            "ERROR: [youtube] abc: Private video": retry_policy.UNAVAILABLE,
+            "ERROR: Postprocessing: Conversion failed!": retry_policy.POSTPROCESSING,
+            "yt-dlp exited with code 1": retry_policy.UNKNOWN,
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(classify_error(text), expected)
+
+    def test_only_transient_errors_are_retried(self):
+        """Test that retries stop for permanent errors and after max attempts."""
+        policy = RetryPolicy(max_attempts=3)
+        self.assertTrue(policy.should_retry(retry_policy.NETWORK, 1))
+        self.assertTrue(policy.should_retry(retry_policy.RATE_LIMITED, 2))
+        self.assertFalse(policy.should_retry(retry_policy.NETWORK, 3))
+        self.assertFalse(policy.should_retry(retry_policy.UNAVAILABLE, 1))
+        self.assertFalse(policy.should_retry(retry_policy.AUTH, 1))
+
+    def test_delay_grows_exponentially_with_jitter(self):
+        """Test the backoff delay bounds."""
+        policy = RetryPolicy(base_delay=2.0, max_delay=10.0, jitter=0.5)
+        rng = random.Random(1)
+        for attempts, full_delay in ((1, 2.0), (2, 4.0), (3, 8.0), (6, 10.0)):
+            delay = policy.delay(attempts, rng)
+            self.assertGreaterEqual(delay, full_delay * 0.5)
+            self.assertLessEqual(delay, full_delay)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,241 @@
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.retry_policy import UNAVAILABLE, DownloadError
+from app.segmented_download import (
+    PART_SUFFIX,
+    STATE_SUFFIX,
+    ConnectionPool,
+    SegmentedDownload,
+    direct_downloads,
+)
+
+KIB = 1024
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves the server's payload with byte ranges, like a media CDN."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.active += 1
+        try:
+            self._send_media()
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+    def _send_media(self):
+        server = self.server
+        if self.path == "/moved":
+            self.send_response(302)
+            self.send_header("Location", "/media")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path != "/media":
+            self.send_error(404)
+            return
+
+        payload = server.payload
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if not server.ranges or not match or (if_range and if_range != server.etag):
+            start, end, status = 0, len(payload) - 1, 200
+        else:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or len(payload) - 1), len(payload) - 1)
+            status = 206
+        body = payload[start : end + 1]
+
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", server.etag)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+        self.end_headers()
+
+        with server.lock:
+            drop = server.drops > 0 and len(body) > 1
+            if drop:
+                server.drops -= 1
+        if drop:
+            # Send half the range, then lose the connection
+            body = body[: len(body) // 2]
+            self.close_connection = True
+        self.wfile.write(body)
+        with server.lock:
+            server.served += len(body)
+
+
+class TestSegmentedDownload(unittest.TestCase):
+    """Tests for SegmentedDownload against a local range-serving server."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.payload = os.urandom(1536 * KIB)
+        self.server.etag = '"v1"'
+        self.server.ranges = True
+        self.server.drops = 0
+        self.server.connections = 0
+        self.server.served = 0
+        self.server.active = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "video.f137.mp4")
+        self.pool = ConnectionPool(timeout=10)
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def make_download(self, path="/media", **kwargs):
+        kwargs.setdefault("segments", 4)
+        kwargs.setdefault("min_segment_size", 64 * KIB)
+        return SegmentedDownload(
+            self.base_url + path, self.path, pool=self.pool, **kwargs
+        )
+
+    def read_file(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def cancel_halfway(self, download):
+        def on_progress(written, total):
+            if written >= total // 2:
+                download.cancel()
+
+        download.on_progress = on_progress
+        with self.assertRaises(DownloadError):
+            download.run()
+
+    def test_fetches_segments_in_parallel_over_pooled_connections(self):
+        """Test the file is assembled from segments and connections are reused."""
+        download = self.make_download()
+        size = download.run()
+
+        self.assertEqual(size, len(self.server.payload))
+        self.assertEqual(self.read_file(), self.server.payload)
+        self.assertEqual(len(download.segments), 4)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["video.f137.mp4"])
+        # The probe's connection is reused by a segment
+        self.assertLessEqual(self.pool.opened, 4)
+
+        os.remove(self.path)
+        self.make_download().run()
+        self.assertEqual(self.read_file(), self.server.payload)
+        self.assertEqual(self.server.connections, self.pool.opened)
+        self.assertLessEqual(self.pool.opened, 4)
+
+    def test_resumes_each_segment_after_cancel(self):
+        """Test a second run fetches only the bytes the first one did not write."""
+        download = self.make_download()
+        self.cancel_halfway(download)
+        self.assertTrue(os.path.exists(self.path + PART_SUFFIX))
+        self.assertTrue(os.path.exists(self.path + STATE_SUFFIX))
+        written = download.written
+        # Responses of the cancelled run may still be in flight
+        deadline = time.monotonic() + 5
+        while self.server.active and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.server.served = 0
+
+        self.make_download().run()
+
+        self.assertEqual(self.read_file(), self.server.payload)
+        self.assertLess(self.server.served, len(self.server.payload) - written + 4)
+        self.assertFalse(os.path.exists(self.path + STATE_SUFFIX))
+
+    def test_restarts_when_file_changed_upstream(self):
+        """Test a partial file of an older version is not reused."""
+        self.cancel_halfway(self.make_download())
+        self.server.payload = os.urandom(len(self.server.payload))
+        self.server.etag = '"v2"'
+
+        self.make_download().run()
+
+        self.assertEqual(self.read_file(), self.server.payload)
+
+    def test_retries_dropped_connection(self):
+        """Test a segment continues from where its connection broke off."""
+        self.server.drops = 2
+        self.make_download("/moved").run()
+        self.assertEqual(self.read_file(), self.server.payload)
+
+    def test_falls_back_to_single_stream(self):
+        """Test servers without range support are read in one request."""
+        self.server.ranges = False
+        download = self.make_download()
+        download.run()
+        self.assertEqual(self.read_file(), self.server.payload)
+        self.assertEqual(len(download.segments), 1)
+
+    def test_http_error_is_classified(self):
+        """Test a missing file raises a DownloadError yt-dlp's way."""
+        with self.assertRaises(DownloadError) as ctx:
+            self.make_download("/missing").run()
+        self.assertEqual(ctx.exception.category, UNAVAILABLE)
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+
+class TestDirectDownloads(unittest.TestCase):
+    """Tests for direct_downloads()."""
+
+    def test_merged_formats_use_yt_dlp_file_names(self):
+        """Test video and audio formats map to yt-dlp's intermediate files."""
+        info = {
+            "filename": "/music/Title.mp4",
+            "requested_formats": [
+                {"format_id": "137", "ext": "mp4", "protocol": "https", "url": "v"},
+                {"format_id": "140", "ext": "m4a", "protocol": "https", "url": "a"},
+            ],
+        }
+        self.assertEqual(
+            direct_downloads(info),
+            [("v", "/music/Title.f137.mp4", {}), ("a", "/music/Title.f140.m4a", {})],
+        )
+
+    def test_single_format_and_unsupported_protocols(self):
+        """Test single files keep their name and HLS is left to yt-dlp."""
+        info = {
+            "_filename": "/music/Title.webm",
+            "protocol": "https",
+            "url": "a",
+            "http_headers": {"User-Agent": "x"},
+        }
+        self.assertEqual(
+            direct_downloads(info), [("a", "/music/Title.webm", {"User-Agent": "x"})]
+        )
+        info["protocol"] = "m3u8_native"
+        self.assertIsNone(direct_downloads(info))
+
+
+if __name__ == "__main__":
+    unittest.main()
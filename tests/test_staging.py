@@ -0,0 +1,101 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.staging import StagingMover, finished_files, unique_path
+
+
+class TestStagingMover(unittest.TestCase):
+    """Tests for the StagingMover class."""
+
+    def setUp(self):
+        """Set up a staging and a destination directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.stage = os.path.join(self.tmp_dir.name, "stage")
+        self.dest = os.path.join(self.tmp_dir.name, "dest")
+        os.makedirs(self.stage)
+        os.makedirs(self.dest)
+        self.mover = StagingMover(max_workers=1, reserve_bytes=0)
+
+    def tearDown(self):
+        self.mover.shutdown()
+        self.tmp_dir.cleanup()
+
+    def _write(self, directory, name, data=b"data"):
+        path = os.path.join(directory, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_finished_files_skips_partials(self):
+        """Test that only completed files are picked up for moving."""
+        self._write(self.stage, "video.mp4")
+        self._write(self.stage, "other.mp4.part")
+        self._write(self.stage, "other.f137.mp4")
+        self.assertEqual(
+            finished_files(self.stage), [os.path.join(self.stage, "video.mp4")]
+        )
+
+    def test_unique_path(self):
+        """Test that existing destination files are never overwritten."""
+        self._write(self.dest, "video.mp4")
+        self.assertEqual(
+            unique_path(os.path.join(self.dest, "video.mp4")),
+            os.path.join(self.dest, "video (1).mp4"),
+        )
+
+    def test_submit_moves_files_and_reports(self):
+        """Test a background move and its completion callback."""
+        src = self._write(self.stage, "video.mp4", b"x" * 1000)
+        done = threading.Event()
+        result = {}
+
+        def on_done(moved, error):
+            result.update(moved=moved, error=error)
+            done.set()
+
+        self.mover.submit([src], self.dest, on_done)
+        self.assertTrue(done.wait(5))
+        self.assertIsNone(result["error"])
+        self.assertEqual(result["moved"], [os.path.join(self.dest, "video.mp4")])
+        self.assertFalse(os.path.exists(src))
+        with open(result["moved"][0], "rb") as f:
+            self.assertEqual(f.read(), b"x" * 1000)
+
+    def test_cross_device_copy_is_atomic(self):
+        """Test the copy path used when staging is on another file system."""
+        src = self._write(self.stage, "video.mp4", b"y" * 5000)
+        real_stat = os.stat
+
+        class FakeStat:
+            def __init__(self, result, dev):
+                self._result = result
+                self.st_dev = dev
+
+            def __getattr__(self, name):
+                return getattr(self._result, name)
+
+        def fake_stat(path, *args, **kwargs):
+            result = real_stat(path, *args, **kwargs)
+            dev = 1 if str(path).startswith(self.stage) else 2
+            return FakeStat(result, dev)
+
+        with patch("app.staging.os.stat", side_effect=fake_stat):
+            dest = self.mover.move_file(src, self.dest)
+
+        self.assertEqual(os.listdir(self.dest), ["video.mp4"])
+        self.assertFalse(os.path.exists(src))
+        with open(dest, "rb") as f:
+            self.assertEqual(f.read(), b"y" * 5000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import unittest
+from unittest.mock import MagicMock
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.stall_watchdog import NO_PROGRESS, TOO_SLOW, StallWatchdog
+
+
+class TestStallWatchdog(unittest.TestCase):
+    """Tests for the StallWatchdog class."""
+
+    def setUp(self):
+        """Set up a watchdog whose thread never fires during the tests."""
+        self.watchdog = StallWatchdog(
+            stall_timeout=60,
+            min_speed=1000,
+            slow_timeout=300,
+            postprocess_timeout=600,
+            check_interval=3600,
+        )
+        self.on_stall = MagicMock()
+
+    def tearDown(self):
+        self.watchdog.stop()
+
+    def test_no_progress_is_reported_once(self):
+        """Test that a task without new bytes is reported as stalled."""
+        self.watchdog.watch(1, self.on_stall)
+        self.watchdog.heartbeat(1, downloaded_bytes=100, speed=5000)
+
+        self.watchdog.check(time.monotonic() + 30)
+        self.on_stall.assert_not_called()
+
+        self.watchdog.check(time.monotonic() + 61)
+        self.on_stall.assert_called_once_with(1, NO_PROGRESS)
+
+        self.watchdog.check(time.monotonic() + 120)
+        self.assertEqual(self.on_stall.call_count, 1)
+        self.assertEqual(self.watchdog.stats["stalls"], 1)
+        self.assertEqual(self.watchdog.stats[NO_PROGRESS], 1)
+
+    def test_slow_download_is_reported(self):
+        """Test the speed floor check."""
+        self.watchdog.stall_timeout = 10000
+        self.watchdog.watch(1, self.on_stall)
+        self.watchdog.heartbeat(1, downloaded_bytes=100, speed=10)
+        self.watchdog.heartbeat(1, downloaded_bytes=200, speed=20)
+
+        self.watchdog.check(time.monotonic() + 301)
+        self.on_stall.assert_called_once_with(1, TOO_SLOW)
+
+    def test_speed_recovery_resets_slow_timer(self):
+        """Test that a fast heartbeat clears the slow state."""
+        self.watchdog.stall_timeout = 10000
+        self.watchdog.watch(1, self.on_stall)
+        self.watchdog.heartbeat(1, downloaded_bytes=100, speed=10)
+        self.watchdog.heartbeat(1, downloaded_bytes=200, speed=5000)
+
+        self.watchdog.check(time.monotonic() + 301)
+        self.on_stall.assert_not_called()
+
+    def test_postprocess_uses_longer_timeout(self):
+        """Test that silent ffmpeg steps get the post-processing timeout."""
+        self.watchdog.watch(1, self.on_stall)
+        self.watchdog.heartbeat(1, phase="postprocess")
+
+        self.watchdog.check(time.monotonic() + 120)
+        self.on_stall.assert_not_called()
+
+        self.watchdog.check(time.monotonic() + 601)
+        self.on_stall.assert_called_once_with(1, NO_PROGRESS)
+
+    def test_unwatched_task_is_ignored(self):
+        """Test that finished tasks are never reported."""
+        self.watchdog.watch(1, self.on_stall)
+        self.watchdog.unwatch(1)
+        self.watchdog.check(time.monotonic() + 1000)
+        self.on_stall.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
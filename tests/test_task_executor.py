@@ -0,0 +1,141 @@
+import os
+import sys
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.task_executor import TaskExecutor, find_partial_files
+
+
+class TestTaskExecutor(unittest.TestCase):
+    """Tests for the TaskExecutor class."""
+
+    def setUp(self):
+        """Set up the test environment."""
+        self.executor = TaskExecutor()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.executor.shutdown(timeout=2)
+        self.tmp_dir.cleanup()
+
+    def test_active_count_tracks_workers(self):
+        """Test that running workers are counted and removed when they finish."""
+        release = threading.Event()
+        self.executor.submit(release.wait)
+        self.executor.submit(release.wait)
+        self.assertEqual(self.executor.active_count, 2)
+
+        release.set()
+        deadline = time.monotonic() + 2
+        while self.executor.active_count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.executor.active_count, 0)
+
+    def test_cancel_terminates_process_and_removes_partials(self):
+        """Test cancelling a task kills its process and deletes partial files."""
+        output = os.path.join(self.tmp_dir.name, "video.mp4")
+        part_file = output + ".part"
+        done_file = os.path.join(self.tmp_dir.name, "other.mp4.part")
+        for path in (part_file, done_file):
+            with open(path, "w") as f:
+                f.write("data")
+
+        self.executor.track_output(1, output)
+        process = self.executor.popen(
+            1, [sys.executable, "-c", "import time; time.sleep(30)"]
+        )
+        self.assertEqual(self.executor._processes[1], [process])
+
+        self.assertTrue(self.executor.cancel(1))
+        self.assertIsNotNone(process.poll())
+        self.assertNotIn(1, self.executor._processes)
+        self.assertFalse(os.path.exists(part_file))
+        self.assertTrue(os.path.exists(done_file))
+
+    @unittest.skipIf(sys.platform == "win32", "process groups are POSIX only")
+    def test_cancel_terminates_grandchildren(self):
+        """Test that processes spawned by the child are terminated as well."""
+        pid_file = os.path.join(self.tmp_dir.name, "grandchild.pid")
+        script = (
+            "import subprocess, sys, time\n"
+            "p = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])\n"
+            f"open({pid_file!r}, 'w').write(str(p.pid))\n"
+            "time.sleep(30)\n"
+        )
+        self.executor.popen(1, [sys.executable, "-c", script])
+
+        deadline = time.monotonic() + 5
+        while not os.path.exists(pid_file) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        time.sleep(0.05)
+        with open(pid_file) as f:
+            grandchild_pid = int(f.read())
+
+        self.executor.cancel(1)
+
+        deadline = time.monotonic() + 3
+        alive = True
+        while alive and time.monotonic() < deadline:
+            try:
+                os.kill(grandchild_pid, 0)
+                time.sleep(0.02)
+            except ProcessLookupError:
+                alive = False
+        self.assertFalse(alive)
+
+    def test_shutdown_rejects_new_work(self):
+        """Test that no workers or processes start after shutdown."""
+        self.executor.shutdown()
+        self.assertIsNone(self.executor.submit(lambda: None))
+        with self.assertRaises(RuntimeError):
+            self.executor.popen(1, [sys.executable, "-c", "pass"])
+
+    def test_run_raises_on_failure(self):
+        """Test that run() behaves like subprocess.run(check=True)."""
+        result = self.executor.run(1, [sys.executable, "-c", "print('ok')"])
+        self.assertEqual(result.stdout.strip(), "ok")
+        with self.assertRaises(subprocess.CalledProcessError):
+            self.executor.run(1, [sys.executable, "-c", "raise SystemExit(3)"])
+
+    def test_cancel_keeps_partials_for_resume(self):
+        """Test that cancel(cleanup=False) leaves the .part file in place."""
+        output = os.path.join(self.tmp_dir.name, "video.mp4")
+        open(output + ".part", "w").close()
+        self.executor.track_output(1, output)
+        self.executor.popen(1, [sys.executable, "-c", "import time; time.sleep(30)"])
+
+        self.executor.cancel(1, cleanup=False)
+        self.assertTrue(os.path.exists(output + ".part"))
+
+    def test_find_partial_files(self):
+        """Test detection of yt-dlp and ffmpeg intermediate files."""
+        names = [
+            "a.mp4.part",
+            "a.mp4.ytdl",
+            "a.f137.mp4",
+            "a.f137.mp4.part",
+            "a.mp4.part-Frag3.part",
+            "a.mp4",
+            "b.mp4.part",
+        ]
+        for name in names:
+            open(os.path.join(self.tmp_dir.name, name), "w").close()
+
+        outputs = [
+            os.path.join(self.tmp_dir.name, "a.mp4"),
+            os.path.join(self.tmp_dir.name, "a.f137.mp4"),
+        ]
+        found = [os.path.basename(p) for p in find_partial_files(outputs)]
+        self.assertEqual(sorted(found), sorted(names[:5]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import io
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+# Add the 'src' directory to the Python path to allow for absolute imports
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+)
+
+from app.waveform import (
+    SAMPLES_PER_PEAK,
+    Peaks,
+    WaveformCache,
+    compute_peaks,
+    file_key,
+    write_peaks,
+)
+from app.waveform_slider import DECODE_KEY, WaveformLoader
+
+
+def pcm(samples):
+    """Mono s16le PCM bytes."""
+    return struct.pack(f"<{len(samples)}h", *samples)
+
+
+class TestWaveform(unittest.TestCase):
+    """Tests for waveform peak computation and caching."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_compute_peaks(self):
+        """Test min/max per block, including a partial last block."""
+        samples = [0] * SAMPLES_PER_PEAK * 2 + [5, -7]
+        samples[3] = 1000
+        samples[SAMPLES_PER_PEAK + 1] = -2000
+        peaks = compute_peaks(io.BytesIO(pcm(samples)))
+        self.assertEqual(list(peaks), [0, 1000, -2000, 0, -7, 5])
+
+    def test_compute_peaks_across_read_chunks(self):
+        """Test that results do not depend on how the stream is split."""
+
+        class Trickle(io.BytesIO):
+            def read(self, size=-1):
+                return super().read(min(size, 333))
+
+        data = pcm([(i * 37) % 2001 - 1000 for i in range(SAMPLES_PER_PEAK * 10)])
+        self.assertEqual(
+            compute_peaks(Trickle(data)), compute_peaks(io.BytesIO(data))
+        )
+
+    def test_peaks_file_round_trip(self):
+        """Test writing and memory-mapping a peaks file."""
+        path = os.path.join(self.tmp_dir.name, "track.peaks")
+        write_peaks(path, [-1, 1, -5, 7, -3, 2, -9, 4])
+        peaks = Peaks(path)
+        self.assertEqual(len(peaks), 4)
+        self.assertEqual(peaks.envelope(2), [(-5, 7), (-9, 4)])
+        self.assertEqual(len(peaks.envelope(8)), 8)
+        peaks.close()
+
+    def test_invalid_peaks_file(self):
+        """Test that foreign files are rejected."""
+        path = os.path.join(self.tmp_dir.name, "bad.peaks")
+        with open(path, "wb") as f:
+            f.write(b"not a peaks file")
+        with self.assertRaises(ValueError):
+            Peaks(path)
+
+    def test_cache_decodes_once(self):
+        """Test that a track is decoded once and then loaded from cache."""
+        track = os.path.join(self.tmp_dir.name, "song.mp3")
+        with open(track, "wb") as f:
+            f.write(b"audio")
+        calls = []
+        script = (
+            "import sys, struct; sys.stdout.buffer.write("
+            f"struct.pack('<4h', 1, -2, 3, -4) * {SAMPLES_PER_PEAK})"
+        )
+
+        def popen(cmd, **kwargs):
+            calls.append(cmd)
+            return subprocess.Popen([sys.executable, "-c", script], **kwargs)
+
+        cache = WaveformCache(os.path.join(self.tmp_dir.name, "waves"), "ffmpeg")
+        peaks = cache.get(track, popen=popen)
+        self.assertEqual(len(peaks), 4)
+        self.assertEqual(peaks.envelope(1), [(-4, 3)])
+        peaks.close()
+
+        cache.get(track, popen=popen).close()
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(cache.cache_path(track).endswith(f"{file_key(track)}.peaks"))
+
+
+class TestWaveformLoader(unittest.TestCase):
+    """Tests for the WaveformLoader class."""
+
+    @unittest.skipIf(sys.platform == "win32", "needs an executable script")
+    def test_shutdown_terminates_decoder(self):
+        """Test closing the app does not leave a long decode running."""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        ffmpeg = os.path.join(tmp_dir.name, "ffmpeg")
+        with open(ffmpeg, "w") as f:
+            f.write(f"#!{sys.executable}\nimport time\ntime.sleep(30)\n")
+        os.chmod(ffmpeg, 0o755)
+        track = os.path.join(tmp_dir.name, "song.mp3")
+        with open(track, "wb") as f:
+            f.write(b"audio")
+        loader = WaveformLoader(
+            WaveformCache(os.path.join(tmp_dir.name, "waves"), ffmpeg)
+        )
+        ready = []
+        loader.ready.connect(lambda *result: ready.append(result))
+        loader.request(track)
+        deadline = time.monotonic() + 5
+        while not loader.executor._processes and time.monotonic() < deadline:
+            time.sleep(0.02)
+        process = loader.executor._processes[DECODE_KEY][0]
+
+        started = time.monotonic()
+        loader.shutdown()
+
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertIsNotNone(process.wait(5))
+        self.assertEqual(ready, [])
+
+
+if __name__ == "__main__":
+    unittest.main()